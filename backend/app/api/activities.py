@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.activity import Activity
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.api.pagination import SortKey, keyset_page, finish_page, MAX_PAGE_SIZE
 from pydantic import BaseModel
 from datetime import datetime, date, time
 
 router = APIRouter()
 
+# Ordem da agenda: por vencimento, atividades sem data/hora por último (date.max/time.max = DUE_*_LAST)
+DUE_ORDER = SortKey(
+    Activity.due_order(),
+    lambda activity: (activity.due_date or date.max, activity.due_time or time.max, activity.id),
+    descending=False,
+)
+
 class ActivityBase(BaseModel):
     type: str  # task, call, meeting, note
     subject: str
@@ -45,22 +53,48 @@ class ActivityResponse(ActivityBase):
 
 @router.get("/", response_model=List[ActivityResponse])
 async def list_activities(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100,
-    status: Optional[str] = None
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    contact_id: Optional[int] = None,
+    opportunity_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True)
 ):
+    """
+    Lista atividades por vencimento (data e hora, as sem data por último),
+    paginando por cursor: o cursor da próxima página vem no cabeçalho X-Next-Cursor.
+    """
     query = select(Activity)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Activity.owner_id == current_user.id)
-    
+    elif owner_id is not None:
+        query = query.where(Activity.owner_id == owner_id)
+
     if status:
         query = query.where(Activity.status == status)
-    
-    query = query.offset(skip).limit(limit).order_by(Activity.due_date, Activity.due_time)
-    result = await db.execute(query)
-    activities = result.scalars().all()
+    if type:
+        query = query.where(Activity.type == type)
+    if contact_id is not None:
+        query = query.where(Activity.contact_id == contact_id)
+    if opportunity_id is not None:
+        query = query.where(Activity.opportunity_id == opportunity_id)
+    if created_from:
+        query = query.where(Activity.created_at >= created_from)
+    if created_to:
+        query = query.where(Activity.created_at < created_to)
+    if q:
+        query = query.where(Activity.subject.ilike(f"%{q}%"))
+
+    result = await db.execute(keyset_page(query, Activity, limit, cursor, skip, key=DUE_ORDER))
+    activities = finish_page(result.scalars().all(), limit, response, key=DUE_ORDER)
     return [ActivityResponse.model_validate(activity) for activity in activities]
 
 @router.post("/", response_model=ActivityResponse)
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
 from app.core.database import get_db
 from app.models.user import User
-from app.models.ai_config import AIConfig, AIModelStatus
+from app.models.ai_config import AIConfig
 from app.models.ai_chat import AIChatMessage
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.core.http_clients import http_clients
+from app.services.ai_config_cache import ai_config_cache, AIConfigSnapshot
+from app.services.ai_service import AIService
+from app.services.ai_scheduler import ai_scheduler, estimate_tokens, AISchedulerTimeout, PRIORITY_INTERACTIVE
 from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
 import httpx
 import json
 import os
@@ -35,36 +38,18 @@ class GenerateQuoteRequest(BaseModel):
     requirements: str
     estimated_hours: int
 
-async def get_active_ai_config(db: AsyncSession) -> Optional[AIConfig]:
-    """Busca a configuração de IA ativa e padrão"""
-    # Primeiro tenta buscar o padrão ativo
-    result = await db.execute(
-        select(AIConfig).where(
-            and_(
-                AIConfig.is_default == True,
-                AIConfig.is_active == True,
-                AIConfig.status == AIModelStatus.ACTIVE.value
-            )
-        ).order_by(AIConfig.priority.desc())
-    )
-    config = result.scalar_one_or_none()
-    
-    # Se não encontrar padrão, busca qualquer ativo
-    if not config:
-        result = await db.execute(
-            select(AIConfig).where(
-                and_(
-                    AIConfig.is_active == True,
-                    AIConfig.status == AIModelStatus.ACTIVE.value
-                )
-            ).order_by(AIConfig.priority.desc(), AIConfig.is_default.desc())
-        )
-        config = result.scalar_one_or_none()
-    
-    return config
-
-async def call_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSession] = None, config: Optional[AIConfig] = None) -> str:
-    """Chama a API de IA baseado na configuração"""
+async def get_active_ai_config(db: AsyncSession) -> Optional[AIConfigSnapshot]:
+    """Busca a configuração de IA ativa e padrão (cache em memória, invalidado ao salvar configs)"""
+    return await ai_config_cache.get_active_config(db)
+
+async def call_ai_api(
+    prompt: str,
+    max_tokens: int = 1000,
+    db: Optional[AsyncSession] = None,
+    config: Optional[AIConfig] = None,
+    priority: str = PRIORITY_INTERACTIVE,
+) -> str:
+    """Chama a API de IA baseado na configuração (respeitando a fila/limites do provider, ver ai_scheduler)"""
     # Se não tiver config, buscar do banco
     if not config and db:
         config = await get_active_ai_config(db)
@@ -85,32 +70,79 @@ async def call_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSes
         raise HTTPException(status_code=500, detail=f"API key não configurada para {config.provider}")
     
     try:
-        if config.provider == "grok":
-            return await _call_grok_api(prompt, max_tokens, config)
-        elif config.provider == "openai":
-            return await _call_openai_api(prompt, max_tokens, config)
-        elif config.provider == "anthropic":
-            return await _call_anthropic_api(prompt, max_tokens, config)
-        elif config.provider == "ollama":
-            return await _call_ollama_api(prompt, max_tokens, config)
-        elif config.provider == "google":
-            return await _call_google_api(prompt, max_tokens, config)
-        elif config.provider == "mistral":
-            return await _call_mistral_api(prompt, max_tokens, config)
-        elif config.provider == "cohere":
-            return await _call_cohere_api(prompt, max_tokens, config)
-        elif config.provider == "cloudflare":
-            return await _call_cloudflare_api(prompt, max_tokens, config)
-        else:
-            raise HTTPException(status_code=500, detail=f"Provider '{config.provider}' não suportado")
+        async with ai_scheduler.slot(config, priority, estimate_tokens(prompt, max_tokens=max_tokens)):
+            return await _dispatch_ai_call(prompt, max_tokens, config)
     except HTTPException:
         raise
+    except AISchedulerTimeout as e:
+        raise HTTPException(status_code=503, detail=f"Provedor de IA ocupado, tente novamente em instantes: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao chamar API de IA: {str(e)}")
 
+async def _dispatch_ai_call(prompt: str, max_tokens: int, config: AIConfig) -> str:
+    """Encaminha a chamada para o provider da configuração"""
+    if config.provider == "grok":
+        return await _call_grok_api(prompt, max_tokens, config)
+    elif config.provider == "openai":
+        return await _call_openai_api(prompt, max_tokens, config)
+    elif config.provider == "anthropic":
+        return await _call_anthropic_api(prompt, max_tokens, config)
+    elif config.provider == "ollama":
+        return await _call_ollama_api(prompt, max_tokens, config)
+    elif config.provider == "google":
+        return await _call_google_api(prompt, max_tokens, config)
+    elif config.provider == "mistral":
+        return await _call_mistral_api(prompt, max_tokens, config)
+    elif config.provider == "cohere":
+        return await _call_cohere_api(prompt, max_tokens, config)
+    elif config.provider == "cloudflare":
+        return await _call_cloudflare_api(prompt, max_tokens, config)
+    else:
+        raise HTTPException(status_code=500, detail=f"Provider '{config.provider}' não suportado")
+
+async def stream_ai_api(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSession] = None, config: Optional[AIConfig] = None) -> AsyncIterator[str]:
+    """Versão em streaming de call_ai_api: produz o texto em pedaços à medida que o provider responde"""
+    if not config and db:
+        config = await get_active_ai_config(db)
+
+    # Sem config (fallback GROK_API_KEY legado): resposta inteira num único pedaço
+    if not config:
+        yield await call_ai_api(prompt, max_tokens, db)
+        return
+
+    if not config.api_key and config.provider != "ollama":
+        raise HTTPException(status_code=500, detail=f"API key não configurada para {config.provider}")
+
+    try:
+        async for delta in AIService(db, priority=PRIORITY_INTERACTIVE).stream_with_config(config, prompt, max_tokens=max_tokens):
+            yield delta
+    except HTTPException:
+        raise
+    except AISchedulerTimeout as e:
+        raise HTTPException(status_code=503, detail=f"Provedor de IA ocupado, tente novamente em instantes: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Erro ao chamar API de IA: {str(e)}")
+
+async def open_ai_stream(prompt: str, max_tokens: int = 1000, db: Optional[AsyncSession] = None) -> Tuple[str, AsyncIterator[str]]:
+    """
+    Inicia o streaming e aguarda o primeiro pedaço antes de responder ao navegador,
+    para que erros de configuração/provider (sem config, 401, 429...) ainda virem
+    respostas HTTP normais em vez de um evento de erro no meio do SSE.
+    """
+    deltas = stream_ai_api(prompt, max_tokens, db)
+    try:
+        first = await deltas.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    return first, deltas
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Serializa um evento Server-Sent Events (delta, done, error)"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str, ensure_ascii=False)}\n\n"
+
 async def _call_grok_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do Grok/xAI"""
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("ai") as client:
         response = await client.post(
             "https://api.x.ai/v1/chat/completions",
             headers={
@@ -133,7 +165,7 @@ async def _call_grok_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
 async def _call_openai_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do OpenAI"""
     base_url = config.base_url or "https://api.openai.com/v1"
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("ai") as client:
         response = await client.post(
             f"{base_url}/chat/completions",
             headers={
@@ -155,7 +187,7 @@ async def _call_openai_api(prompt: str, max_tokens: int, config: AIConfig) -> st
 
 async def _call_anthropic_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do Anthropic (Claude)"""
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("ai") as client:
         response = await client.post(
             "https://api.anthropic.com/v1/messages",
             headers={
@@ -180,7 +212,7 @@ async def _call_ollama_api(prompt: str, max_tokens: int, config: AIConfig) -> st
     base_url = config.base_url or "http://localhost:11434"
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("ollama") as client:
             response = await client.post(
                 f"{base_url}/api/generate",
                 json={
@@ -261,7 +293,7 @@ async def _call_google_api(prompt: str, max_tokens: int, config: AIConfig) -> st
         )
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("ai") as client:
             # Usar v1 em vez de v1beta (mais estável)
             # Adicionar prefixo "models/" se não tiver
             model_name = config.model_name
@@ -332,7 +364,7 @@ async def _call_google_api(prompt: str, max_tokens: int, config: AIConfig) -> st
 
 async def _call_mistral_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do Mistral AI"""
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("ai") as client:
         response = await client.post(
             "https://api.mistral.ai/v1/chat/completions",
             headers={
@@ -354,7 +386,7 @@ async def _call_mistral_api(prompt: str, max_tokens: int, config: AIConfig) -> s
 
 async def _call_cohere_api(prompt: str, max_tokens: int, config: AIConfig) -> str:
     """Chama a API do Cohere"""
-    async with httpx.AsyncClient() as client:
+    async with http_clients.client("ai") as client:
         response = await client.post(
             "https://api.cohere.ai/v1/generate",
             headers={
@@ -427,7 +459,7 @@ async def _call_cloudflare_api(prompt: str, max_tokens: int, config: AIConfig) -
                 "max_tokens": max_tokens
             }
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("ai") as client:
             response = await client.post(
                 full_url,
                 headers={
@@ -494,16 +526,10 @@ async def _call_cloudflare_api(prompt: str, max_tokens: int, config: AIConfig) -
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao chamar Cloudflare API: {str(e)}")
 
-@router.post("/chat")
-async def chat_with_ai(
-    request: AIRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    """Chat geral com IA com suporte a ações"""
-    try:
-        # Adicionar contexto do usuário e ferramentas disponíveis
-        tools_description = """
+def _build_chat_prompt(request: AIRequest, current_user: User) -> str:
+    """Monta o prompt da Helena (CRM) com ferramentas, contexto e histórico"""
+    # Adicionar contexto do usuário e ferramentas disponíveis
+    tools_description = """
 FERRAMENTAS DISPONÍVEIS (você pode executar ações no sistema):
 
 1. CRIAR CONTATO:
@@ -553,8 +579,8 @@ INSTRUÇÕES IMPORTANTES:
 - Se precisar de mais informações, pergunte ao usuário antes de executar
 - Após executar, confirme o que foi feito de forma clara e amigável
 """
-        
-        context_prompt = f"""Você é Helena, uma assistente de CRM inteligente e amigável para a empresa Innexar. 
+    
+    context_prompt = f"""Você é Helena, uma assistente de CRM inteligente e amigável para a empresa Innexar. 
 Seu nome é Helena e você deve sempre se apresentar como Helena.
 O usuário atual é {current_user.name} com papel de {get_user_role_str(current_user)}.
 
@@ -565,21 +591,66 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
 
 """
 
-        if request.context:
-            context_prompt += f"Contexto adicional: {json.dumps(request.context, ensure_ascii=False)}\n\n"
-
-        # Adicionar histórico de conversa se disponível
-        if request.context and "conversation_history" in request.context:
-            history = request.context["conversation_history"]
-            if history:
-                context_prompt += "Histórico da conversa:\n"
-                for msg in history[-5:]:  # Últimas 5 mensagens
-                    role = msg.get("role", "user")
-                    content = msg.get("content", "")
-                    context_prompt += f"{'Usuário' if role == 'user' else 'Assistente'}: {content}\n"
-                context_prompt += "\n"
+    if request.context:
+        context_prompt += f"Contexto adicional: {json.dumps(request.context, ensure_ascii=False)}\n\n"
+
+    # Adicionar histórico de conversa se disponível
+    if request.context and "conversation_history" in request.context:
+        history = request.context["conversation_history"]
+        if history:
+            context_prompt += "Histórico da conversa:\n"
+            for msg in history[-5:]:  # Últimas 5 mensagens
+                role = msg.get("role", "user")
+                content = msg.get("content", "")
+                context_prompt += f"{'Usuário' if role == 'user' else 'Assistente'}: {content}\n"
+            context_prompt += "\n"
+
+    return context_prompt + f"Usuário: {request.prompt}\n\nAssistente:"
+
+async def _apply_ai_actions(response: str, db: AsyncSession, current_user: User) -> Tuple[str, bool, Optional[str]]:
+    """Detecta uma chamada de função na resposta da IA, executa e substitui pelo resultado"""
+    action_executed = False
+    action_result = None
+    final_response = response
+    
+    # Verificar se a resposta contém uma chamada de função
+    action_patterns = [
+        r'create_contact\s*\([^)]*\)',
+        r'update_contact\s*\([^)]*\)',
+        r'create_opportunity\s*\([^)]*\)',
+        r'update_opportunity\s*\([^)]*\)',
+        r'create_activity\s*\([^)]*\)',
+        r'list_contacts\s*\([^)]*\)',
+        r'list_opportunities\s*\([^)]*\)'
+    ]
+    
+    for pattern in action_patterns:
+        match = re.search(pattern, response, re.IGNORECASE)
+        if match:
+            action_call = match.group(0)
+            try:
+                action_result = await _execute_ai_action(action_call, db, current_user)
+                action_executed = True
+                # Substituir a chamada de função pelo resultado
+                final_response = response.replace(action_call, action_result)
+                break
+            except Exception as e:
+                print(f"Erro ao executar ação: {str(e)}")
+                action_result = f"Erro ao executar ação: {str(e)}"
+                final_response = response.replace(action_call, action_result)
+                break
+
+    return final_response, action_executed, action_result
 
-        full_prompt = context_prompt + f"Usuário: {request.prompt}\n\nAssistente:"
+@router.post("/chat")
+async def chat_with_ai(
+    request: AIRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Chat geral com IA com suporte a ações"""
+    try:
+        full_prompt = _build_chat_prompt(request, current_user)
 
         # Salvar mensagem do usuário
         user_message = AIChatMessage(
@@ -608,36 +679,7 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
             )
 
         # Detectar e executar ações na resposta da IA
-        action_executed = False
-        action_result = None
-        final_response = response
-        
-        # Verificar se a resposta contém uma chamada de função
-        action_patterns = [
-            r'create_contact\s*\([^)]*\)',
-            r'update_contact\s*\([^)]*\)',
-            r'create_opportunity\s*\([^)]*\)',
-            r'update_opportunity\s*\([^)]*\)',
-            r'create_activity\s*\([^)]*\)',
-            r'list_contacts\s*\([^)]*\)',
-            r'list_opportunities\s*\([^)]*\)'
-        ]
-        
-        for pattern in action_patterns:
-            match = re.search(pattern, response, re.IGNORECASE)
-            if match:
-                action_call = match.group(0)
-                try:
-                    action_result = await _execute_ai_action(action_call, db, current_user)
-                    action_executed = True
-                    # Substituir a chamada de função pelo resultado
-                    final_response = response.replace(action_call, action_result)
-                    break
-                except Exception as e:
-                    print(f"Erro ao executar ação: {str(e)}")
-                    action_result = f"Erro ao executar ação: {str(e)}"
-                    final_response = response.replace(action_call, action_result)
-                    break
+        final_response, action_executed, action_result = await _apply_ai_actions(response, db, current_user)
 
         # Salvar resposta da IA
         ai_message = AIChatMessage(
@@ -668,6 +710,76 @@ Responda de forma natural e amigável, mas seja proativo em executar ações qua
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Erro no chat com IA: {str(e)}")
 
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: AIRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Chat geral com IA em streaming (SSE).
+    Eventos: `delta` ({"text"}) a cada pedaço, `done` com o mesmo payload de POST /ai/chat
+    (a resposta final pode diferir do texto acumulado quando uma ação é executada) ou `error`.
+    As mensagens só são salvas quando a resposta termina.
+    """
+    from fastapi.responses import StreamingResponse
+
+    sent_at = datetime.utcnow()
+    full_prompt = _build_chat_prompt(request, current_user)
+    first, deltas = await open_ai_stream(full_prompt, request.max_tokens, db)
+    # Don't hold a pooled connection while tokens are streaming
+    await db.commit()
+
+    async def event_stream():
+        parts = [first]
+        if first:
+            yield format_sse_event("delta", {"text": first})
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield format_sse_event("delta", {"text": delta})
+        except HTTPException as e:
+            yield format_sse_event("error", {"detail": e.detail})
+            return
+
+        response = "".join(parts)
+        try:
+            final_response, action_executed, action_result = await _apply_ai_actions(response, db, current_user)
+            db.add(AIChatMessage(
+                user_id=current_user.id,
+                role="user",
+                content=request.prompt,
+                created_at=sent_at
+            ))
+            db.add(AIChatMessage(
+                user_id=current_user.id,
+                role="assistant",
+                content=final_response,
+                message_metadata={
+                    "action_executed": action_executed,
+                    "action_result": action_result,
+                    "original_response": response
+                } if action_executed else None
+            ))
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            yield format_sse_event("error", {"detail": f"Erro ao salvar conversa: {str(e)}"})
+            return
+
+        yield format_sse_event("done", {
+            "response": final_response,
+            "timestamp": datetime.utcnow().isoformat(),
+            "action_executed": action_executed,
+            "action_result": action_result
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 async def _execute_ai_action(action_string: str, db: AsyncSession, current_user: User) -> str:
     """Executa uma ação da IA baseada na string gerada pelo modelo"""
     try:
@@ -204,10 +204,15 @@ async def ai_create_opportunity(
         
         # Se não tiver contact_id mas tiver contact_name, buscar ou criar contato
         if not contact_id and request.contact_name:
-            result = await db.execute(
-                select(Contact).where(Contact.name.ilike(f"%{request.contact_name}%"))
+            from app.services.crm_search import find_contact_by_name
+
+            # Só o mesmo nome (sem diferença de acento/maiúsculas); vendedor vê apenas os seus contatos
+            user_role = get_user_role_str(current_user)
+            contact = await find_contact_by_name(
+                db,
+                request.contact_name,
+                owner_id=current_user.id if user_role == "vendedor" else None
             )
-            contact = result.scalar_one_or_none()
             
             if not contact:
                 # Criar contato automaticamente
@@ -409,15 +414,14 @@ async def ai_list_contacts(
         query = query.where(Contact.owner_id == current_user.id)
     
     if search:
-        query = query.where(
-            Contact.name.ilike(f"%{search}%") |
-            Contact.email.ilike(f"%{search}%") |
-            Contact.company.ilike(f"%{search}%")
-        )
-    
-    query = query.limit(limit)
-    result = await db.execute(query)
-    contacts = result.scalars().all()
+        from app.services.crm_search import search_contacts
+
+        owner_id = current_user.id if user_role == "vendedor" else None
+        contacts = [c for c, _ in await search_contacts(db, search, owner_id=owner_id, limit=limit)]
+    else:
+        query = query.limit(limit)
+        result = await db.execute(query)
+        contacts = result.scalars().all()
     
     return {
         "contacts": [
@@ -448,11 +452,14 @@ async def ai_list_opportunities(
         query = query.where(Opportunity.owner_id == current_user.id)
     
     if search:
-        query = query.where(Opportunity.name.ilike(f"%{search}%"))
-    
-    query = query.limit(limit)
-    result = await db.execute(query)
-    opportunities = result.scalars().all()
+        from app.services.crm_search import search_opportunities
+
+        owner_id = current_user.id if user_role == "vendedor" else None
+        opportunities = [o for o, _ in await search_opportunities(db, search, owner_id=owner_id, limit=limit)]
+    else:
+        query = query.limit(limit)
+        result = await db.execute(query)
+        opportunities = result.scalars().all()
     
     return {
         "opportunities": [
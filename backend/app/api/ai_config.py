@@ -8,6 +8,10 @@ from app.core.database import get_db
 from app.models.user import User
 from app.models.ai_config import AIConfig, AIModelProvider, AIModelStatus, AITaskRouting
 from app.api.dependencies import get_current_user, get_user_role_str, require_admin
+from app.core.http_clients import http_clients
+from app.services.ai_config_cache import ai_config_cache
+from app.services.ai_response_cache import ai_response_cache
+from app.services.ai_scheduler import ai_scheduler
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime
@@ -69,6 +73,8 @@ class AIRoutingResponse(BaseModel):
     primary_config_id: Optional[int]
     fallback_config_id: Optional[int] = None
     temperature: float = 0.7
+    cache_enabled: bool = False
+    cache_ttl_seconds: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -78,6 +84,8 @@ class AIRoutingUpdate(BaseModel):
     primary_config_id: int
     fallback_config_id: Optional[int] = None
     temperature: Optional[float] = 0.7
+    cache_enabled: Optional[bool] = None
+    cache_ttl_seconds: Optional[int] = None
 
 # Modelos disponíveis por provider
 AVAILABLE_MODELS = {
@@ -179,7 +187,7 @@ async def fetch_available_models(
 
     try:
         models = []
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("ai") as client:
             
             # OpenAI & Grok & Mistral & DeepSeek (OpenAI compatible)
             if request.provider in ["openai", "grok", "mistral", "deepseek"]:
@@ -292,7 +300,7 @@ async def list_google_models(
     api_key = api_key.strip()
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("ai") as client:
             response = await client.get(
                 "https://generativelanguage.googleapis.com/v1/models",
                 params={"key": api_key},
@@ -358,7 +366,7 @@ async def list_cloudflare_models(
     account_id = account_id.strip()
     
     try:
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             # Cloudflare API to list models
             response = await client.get(
                 f"https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/models/search",
@@ -491,6 +499,7 @@ async def create_ai_config(
     
     db.add(config)
     await db.commit()
+    await ai_config_cache.invalidate()
     await db.refresh(config)
     
     return AIConfigResponse(
@@ -551,20 +560,47 @@ async def update_ai_routing(
         routing.fallback_config_id = routing_data.fallback_config_id
         if routing_data.temperature is not None:
             routing.temperature = routing_data.temperature
+        if routing_data.cache_enabled is not None:
+            routing.cache_enabled = routing_data.cache_enabled
+        if routing_data.cache_ttl_seconds is not None:
+            routing.cache_ttl_seconds = routing_data.cache_ttl_seconds
         routing.updated_at = datetime.utcnow()
     else:
         routing = AITaskRouting(
             task_type=routing_data.task_type,
             primary_config_id=routing_data.primary_config_id,
             fallback_config_id=routing_data.fallback_config_id,
-            temperature=routing_data.temperature or 0.7
+            temperature=routing_data.temperature or 0.7,
+            cache_enabled=bool(routing_data.cache_enabled),
+            cache_ttl_seconds=routing_data.cache_ttl_seconds
         )
         db.add(routing)
     
     await db.commit()
+    await ai_config_cache.invalidate()
     await db.refresh(routing)
     return routing
 
+@router.get("/response-cache")
+async def get_ai_response_cache_stats(
+    current_user: User = Depends(require_admin)
+):
+    """Estatísticas do cache de respostas de IA (hits/misses por camada)"""
+    return ai_response_cache.metrics()
+
+@router.get("/scheduler")
+async def get_ai_scheduler_status(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """Fila, chamadas em andamento e pausas (Retry-After) por configuração de IA"""
+    result = await db.execute(select(AIConfig.id))
+    config_ids = [row[0] for row in result.all()]
+    return {
+        **ai_scheduler.metrics(),
+        "configs": await ai_scheduler.status(config_ids),
+    }
+
 @router.put("/{config_id}", response_model=AIConfigResponse)
 async def update_ai_config(
     config_id: int,
@@ -616,6 +652,7 @@ async def update_ai_config(
     
     config.updated_at = datetime.utcnow()
     await db.commit()
+    await ai_config_cache.invalidate()
     await db.refresh(config)
     
     return AIConfigResponse(
@@ -654,6 +691,7 @@ async def delete_ai_config(
     
     await db.delete(config)
     await db.commit()
+    await ai_config_cache.invalidate()
     
     return {"message": "Configuração deletada com sucesso"}
 
@@ -688,6 +726,8 @@ async def test_ai_config(
         config.last_error = None if test_result["success"] else test_result.get("error", "Erro desconhecido")
         
         await db.commit()
+        # Status decides which config get_active_ai_config picks
+        await ai_config_cache.invalidate()
         
         return test_result
         
@@ -696,6 +736,7 @@ async def test_ai_config(
         config.status = AIModelStatus.ERROR.value
         config.last_error = str(e)
         await db.commit()
+        await ai_config_cache.invalidate()
         
         return {
             "success": False,
@@ -708,7 +749,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
     
     try:
         if config.provider == "grok":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.x.ai/v1/chat/completions",
                     headers={
@@ -729,7 +770,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
         
         elif config.provider == "openai":
             base_url = config.base_url or "https://api.openai.com/v1"
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     f"{base_url}/chat/completions",
                     headers={
@@ -749,7 +790,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "anthropic":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.anthropic.com/v1/messages",
                     headers={
@@ -771,7 +812,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
         
         elif config.provider == "ollama":
             base_url = config.base_url or "http://localhost:11434"
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ollama") as client:
                 response = await client.post(
                     f"{base_url}/api/generate",
                     json={
@@ -788,7 +829,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
         
 
         elif config.provider == "deepseek":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.deepseek.com/chat/completions",
                     headers={
@@ -808,7 +849,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
 
         elif config.provider == "cohere":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.cohere.com/v1/chat",
                     headers={
@@ -842,7 +883,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     "error": "API key inválida. A chave do Google Gemini deve começar com 'AIza'. Verifique se copiou a chave completa."
                 }
             
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 try:
                     # Primeiro, verificar se o modelo existe listando os modelos disponíveis
                     list_response = await client.get(
@@ -920,7 +961,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     return {"success": False, "error": str(e)}
         
         elif config.provider == "mistral":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.mistral.ai/v1/chat/completions",
                     headers={
@@ -940,7 +981,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     return {"success": False, "error": f"Status {response.status_code}: {response.text[:200]}"}
         
         elif config.provider == "cohere":
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     "https://api.cohere.ai/v1/generate",
                     headers={
@@ -1001,7 +1042,7 @@ async def _test_provider_connection(config: AIConfig) -> Dict[str, Any]:
                     "max_tokens": 10
                 }
             
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("ai") as client:
                 response = await client.post(
                     full_url,
                     headers={
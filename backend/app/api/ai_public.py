@@ -10,10 +10,10 @@ from app.models.user import User
 from app.models.ai_config import AIConfig, AIModelStatus
 from app.models.chat_session import ChatSession, ChatMessage
 from app.models.contact import Contact
-from app.api.ai import call_ai_api, get_active_ai_config
+from app.api.ai import call_ai_api, get_active_ai_config, open_ai_stream, format_sse_event
 from app.api.helena_prompts import get_helena_prompt
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import json
 import uuid
 import re
@@ -181,6 +181,144 @@ Data: {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}
         return None
 
 
+async def _ensure_chat_configured(db: AsyncSession) -> None:
+    """O chat público exige ao menos um admin ativo (sistema configurado)"""
+    # Buscar usuário admin padrão para contexto (mas não salvar mensagens associadas a ele)
+    result = await db.execute(
+        select(User).where(User.role == "admin", User.is_active == True).limit(1)
+    )
+    admin_user = result.scalar_one_or_none()
+    
+    if not admin_user:
+        raise HTTPException(
+            status_code=500,
+            detail="Sistema não configurado corretamente"
+        )
+
+
+async def _prepare_public_chat(request: "PublicAIRequest", db: AsyncSession) -> Tuple[ChatSession, str]:
+    """Carrega/cria a sessão do visitante e monta o prompt da Helena com o histórico"""
+    # Usar prompt do módulo helena_prompts (com base de conhecimento atualizada)
+    base_prompt = get_helena_prompt(request.language)
+    
+    # === GERENCIAR SESSÃO ===
+    session = None
+    history_text = ""
+    
+    if request.session_id:
+        # Buscar sessão existente
+        result = await db.execute(
+            select(ChatSession).where(ChatSession.id == request.session_id)
+        )
+        session = result.scalar_one_or_none()
+    
+    if not session:
+        # Criar nova sessão
+        session = ChatSession(
+            id=request.session_id or str(uuid.uuid4()),
+            language=request.language or "pt",
+            visitor_hash=request.context.get("visitor_hash", "") if request.context else ""
+        )
+        db.add(session)
+        await db.flush()
+    else:
+        # Atualizar última atividade
+        session.last_activity = datetime.utcnow()
+    
+    # Buscar histórico (últimas 10 mensagens)
+    history_result = await db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.session_id == session.id)
+        .order_by(ChatMessage.timestamp.desc())
+        .limit(10)
+    )
+    history_messages = list(reversed(history_result.scalars().all()))
+    
+    # Formatar histórico para o prompt
+    if history_messages:
+        history_lines = []
+        for msg in history_messages:
+            role_label = "Visitante" if msg.role == "user" else "Helena"
+            history_lines.append(f"{role_label}: {msg.content}")
+        history_text = "\n".join(history_lines)
+        base_prompt += f"\n\n=== HISTÓRICO DA CONVERSA ===\n{history_text}\n\n=== REGRAS DE CONTEXTO ===\n1. USE o histórico para manter contexto\n2. NÃO repita informações já dadas\n3. Desenvolva a conversa baseado no que foi falado"
+    
+    if request.context:
+        context_str = json.dumps(request.context, ensure_ascii=False)
+        base_prompt += f"\n\nContexto adicional: {context_str}"
+
+    return session, f"{base_prompt}\n\nVisitante: {request.message}\n\nHelena:"
+
+
+async def _save_public_chat_exchange(session: ChatSession, message: str, response: str, db: AsyncSession, sent_at: Optional[datetime] = None) -> None:
+    """Salva a pergunta do visitante e a resposta da Helena e tenta capturar o lead"""
+    # Salvar mensagem do usuário
+    user_message = ChatMessage(
+        session_id=session.id,
+        role="user",
+        content=message,
+        timestamp=sent_at or datetime.utcnow()
+    )
+    db.add(user_message)
+    
+    # Salvar resposta da Helena
+    assistant_message = ChatMessage(
+        session_id=session.id,
+        role="assistant",
+        content=response
+    )
+    db.add(assistant_message)
+    
+    await db.commit()
+    
+    # === CAPTURA AUTOMÁTICA DE LEADS ===
+    # Verificar se já capturou lead nesta sessão
+    if not session.lead_captured:
+        lead_data = await extract_lead_from_conversation(session.id, db)
+        if lead_data and lead_data.get("email"):
+            await create_lead_from_chat(lead_data, session, db)
+
+
+def _public_chat_error(e: Exception, language: Optional[str]) -> HTTPException:
+    """Converte falhas ao chamar a IA em mensagens amigáveis no idioma do visitante"""
+    if isinstance(e, HTTPException):
+        # Tratar erros específicos de quota/rate limit
+        error_detail = str(e.detail) if hasattr(e, 'detail') else str(e)
+        
+        # Verificar se é erro de quota do Google Gemini
+        if "429" in error_detail or "quota" in error_detail.lower() or "rate limit" in error_detail.lower():
+            language_messages = {
+                "pt": "Desculpe, nosso assistente virtual está temporariamente indisponível devido ao alto volume de solicitações. Por favor, tente novamente em alguns minutos ou entre em contato conosco através do formulário de contato.",
+                "es": "Lo sentimos, nuestro asistente virtual está temporalmente no disponible debido al alto volumen de solicitudes. Por favor, intente nuevamente en unos minutos o contáctenos a través del formulario de contacto.",
+                "en": "Sorry, our virtual assistant is temporarily unavailable due to high request volume. Please try again in a few minutes or contact us through the contact form."
+            }
+            message = language_messages.get(language, language_messages["en"])
+            return HTTPException(
+                status_code=503,  # Service Unavailable
+                detail=message
+            )
+        
+        # Outros erros HTTP
+        return e
+
+    import traceback
+    error_trace = traceback.format_exc()
+    print(f"Erro ao chamar API de IA: {str(e)}")
+    print(f"Traceback: {error_trace}")
+    
+    language_messages = {
+        "pt": "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente ou entre em contato conosco através do formulário de contato.",
+        "es": "Lo sentimos, ocurrió un error al procesar su mensaje. Por favor, intente nuevamente o contáctenos a través del formulario de contacto.",
+        "en": "Sorry, an error occurred while processing your message. Please try again or contact us through the contact form."
+    }
+    message = language_messages.get(language, language_messages["en"])
+    
+    return HTTPException(
+        status_code=500,
+        detail=message
+    )
+
+
 class PublicAIRequest(BaseModel):
     message: str
     session_id: Optional[str] = None  # ID da sessão para memória
@@ -197,17 +335,7 @@ async def public_chat_with_ai(
     Não requer autenticação, mas tem limitações (não pode executar ações no CRM)
     """
     try:
-        # Buscar usuário admin padrão para contexto (mas não salvar mensagens associadas a ele)
-        result = await db.execute(
-            select(User).where(User.role == "admin", User.is_active == True).limit(1)
-        )
-        admin_user = result.scalar_one_or_none()
-        
-        if not admin_user:
-            raise HTTPException(
-                status_code=500,
-                detail="Sistema não configurado corretamente"
-            )
+        await _ensure_chat_configured(db)
 
         # Criar prompt contextualizado para o site
         language_prompts = {
@@ -401,85 +529,13 @@ Be friendly, professional, and helpful. If the visitor wants contact information
 IMPORTANT: You CANNOT create contacts, opportunities, or execute actions in the CRM. Only provide information and guide the visitor."""
         }
 
-        # Usar prompt do módulo helena_prompts (com base de conhecimento atualizada)
-        base_prompt = get_helena_prompt(request.language)
-        
-        # === GERENCIAR SESSÃO ===
-        session = None
-        history_text = ""
-        
-        if request.session_id:
-            # Buscar sessão existente
-            result = await db.execute(
-                select(ChatSession).where(ChatSession.id == request.session_id)
-            )
-            session = result.scalar_one_or_none()
-        
-        if not session:
-            # Criar nova sessão
-            session = ChatSession(
-                id=request.session_id or str(uuid.uuid4()),
-                language=request.language or "pt",
-                visitor_hash=request.context.get("visitor_hash", "") if request.context else ""
-            )
-            db.add(session)
-            await db.flush()
-        else:
-            # Atualizar última atividade
-            session.last_activity = datetime.utcnow()
-        
-        # Buscar histórico (últimas 10 mensagens)
-        history_result = await db.execute(
-            select(ChatMessage)
-            .where(ChatMessage.session_id == session.id)
-            .order_by(ChatMessage.timestamp.desc())
-            .limit(10)
-        )
-        history_messages = list(reversed(history_result.scalars().all()))
-        
-        # Formatar histórico para o prompt
-        if history_messages:
-            history_lines = []
-            for msg in history_messages:
-                role_label = "Visitante" if msg.role == "user" else "Helena"
-                history_lines.append(f"{role_label}: {msg.content}")
-            history_text = "\n".join(history_lines)
-            base_prompt += f"\n\n=== HISTÓRICO DA CONVERSA ===\n{history_text}\n\n=== REGRAS DE CONTEXTO ===\n1. USE o histórico para manter contexto\n2. NÃO repita informações já dadas\n3. Desenvolva a conversa baseado no que foi falado"
-        
-        if request.context:
-            context_str = json.dumps(request.context, ensure_ascii=False)
-            base_prompt += f"\n\nContexto adicional: {context_str}"
-
-        full_prompt = f"{base_prompt}\n\nVisitante: {request.message}\n\nHelena:"
+        session, full_prompt = await _prepare_public_chat(request, db)
 
         try:
             # Usar configuração de IA ativa (call_ai_api já busca automaticamente)
             response = await call_ai_api(full_prompt, max_tokens=1000, db=db)
             
-            # Salvar mensagem do usuário
-            user_message = ChatMessage(
-                session_id=session.id,
-                role="user",
-                content=request.message
-            )
-            db.add(user_message)
-            
-            # Salvar resposta da Helena
-            assistant_message = ChatMessage(
-                session_id=session.id,
-                role="assistant",
-                content=response
-            )
-            db.add(assistant_message)
-            
-            await db.commit()
-            
-            # === CAPTURA AUTOMÁTICA DE LEADS ===
-            # Verificar se já capturou lead nesta sessão
-            if not session.lead_captured:
-                lead_data = await extract_lead_from_conversation(session.id, db)
-                if lead_data and lead_data.get("email"):
-                    await create_lead_from_chat(lead_data, session, db)
+            await _save_public_chat_exchange(session, request.message, response, db)
             
             return {
                 "response": response,
@@ -488,42 +544,8 @@ IMPORTANT: You CANNOT create contacts, opportunities, or execute actions in the
                 "language": request.language
             }
 
-        except HTTPException as e:
-            # Tratar erros específicos de quota/rate limit
-            error_detail = str(e.detail) if hasattr(e, 'detail') else str(e)
-            
-            # Verificar se é erro de quota do Google Gemini
-            if "429" in error_detail or "quota" in error_detail.lower() or "rate limit" in error_detail.lower():
-                language_messages = {
-                    "pt": "Desculpe, nosso assistente virtual está temporariamente indisponível devido ao alto volume de solicitações. Por favor, tente novamente em alguns minutos ou entre em contato conosco através do formulário de contato.",
-                    "es": "Lo sentimos, nuestro asistente virtual está temporalmente no disponible debido al alto volumen de solicitudes. Por favor, intente nuevamente en unos minutos o contáctenos a través del formulario de contacto.",
-                    "en": "Sorry, our virtual assistant is temporarily unavailable due to high request volume. Please try again in a few minutes or contact us through the contact form."
-                }
-                message = language_messages.get(request.language, language_messages["en"])
-                raise HTTPException(
-                    status_code=503,  # Service Unavailable
-                    detail=message
-                )
-            
-            # Outros erros HTTP
-            raise
         except Exception as e:
-            import traceback
-            error_trace = traceback.format_exc()
-            print(f"Erro ao chamar API de IA: {str(e)}")
-            print(f"Traceback: {error_trace}")
-            
-            language_messages = {
-                "pt": "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente ou entre em contato conosco através do formulário de contato.",
-                "es": "Lo sentimos, ocurrió un error al procesar su mensaje. Por favor, intente nuevamente o contáctenos a través del formulario de contacto.",
-                "en": "Sorry, an error occurred while processing your message. Please try again or contact us through the contact form."
-            }
-            message = language_messages.get(request.language, language_messages["en"])
-            
-            raise HTTPException(
-                status_code=500,
-                detail=message
-            )
+            raise _public_chat_error(e, request.language)
 
     except HTTPException:
         raise
@@ -534,6 +556,56 @@ IMPORTANT: You CANNOT create contacts, opportunities, or execute actions in the
         )
 
 
+@router.post("/chat/stream")
+async def public_chat_with_ai_stream(
+    request: PublicAIRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Chat público com IA em streaming (SSE) - mesmas regras de POST /chat.
+    Eventos: `delta` ({"text"}) a cada pedaço da resposta, `done` com o mesmo payload
+    de POST /chat quando a conversa é salva, ou `error` ({"detail"}) se a IA falhar no meio.
+    """
+    from fastapi.responses import StreamingResponse
+
+    sent_at = datetime.utcnow()
+    try:
+        await _ensure_chat_configured(db)
+        session, full_prompt = await _prepare_public_chat(request, db)
+        # Persist the (possibly new) session now so no pooled connection is held while streaming
+        await db.commit()
+        first, deltas = await open_ai_stream(full_prompt, max_tokens=1000, db=db)
+    except Exception as e:
+        raise _public_chat_error(e, request.language)
+
+    async def event_stream():
+        parts = [first]
+        if first:
+            yield format_sse_event("delta", {"text": first})
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield format_sse_event("delta", {"text": delta})
+            await _save_public_chat_exchange(session, request.message, "".join(parts), db, sent_at=sent_at)
+        except Exception as e:
+            await db.rollback()
+            yield format_sse_event("error", {"detail": _public_chat_error(e, request.language).detail})
+            return
+
+        yield format_sse_event("done", {
+            "response": "".join(parts),
+            "session_id": session.id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "language": request.language
+        })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============ CAPTURA DE LEADS ============
 
 class LeadCaptureRequest(BaseModel):
@@ -31,7 +31,7 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
     
     # Criar token
     access_token = create_access_token(
-        data={"sub": user.email, "user_id": user.id, "role": get_user_role_str(user)}
+        data={"sub": user.email, "user_id": user.id, "role": get_user_role_str(user), "tv": user.token_version or 0}
     )
     
     return {
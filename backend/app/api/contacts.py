@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.contact import Contact
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.api.pagination import keyset_page, finish_page, MAX_PAGE_SIZE
+from app.models.search import CONTACT_TRIGRAM_COLUMNS
+from app.services.crm_search import substring_filter
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -62,21 +65,66 @@ class ContactResponse(ContactBase):
 
 @router.get("/", response_model=List[ContactResponse])
 async def list_contacts(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True)
 ):
-    # Vendedor vê apenas seus contatos, admin vê todos
+    """
+    Lista contatos do mais novo para o mais antigo, paginando por cursor:
+    o cursor da próxima página vem no cabeçalho X-Next-Cursor.
+    """
+    # Vendedor vê apenas seus contatos, admin vê todos (ou filtra por owner_id)
     query = select(Contact)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Contact.owner_id == current_user.id)
-    
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    contacts = result.scalars().all()
+    elif owner_id is not None:
+        query = query.where(Contact.owner_id == owner_id)
+
+    if status:
+        query = query.where(Contact.status == status)
+    if created_from:
+        query = query.where(Contact.created_at >= created_from)
+    if created_to:
+        query = query.where(Contact.created_at < created_to)
+    if q:
+        query = query.where(substring_filter(Contact, CONTACT_TRIGRAM_COLUMNS, q))
+
+    result = await db.execute(keyset_page(query, Contact, limit, cursor, skip))
+    contacts = finish_page(result.scalars().all(), limit, response)
     return [ContactResponse.model_validate(contact) for contact in contacts]
 
+class ContactSearchResult(ContactResponse):
+    score: float
+
+@router.get("/search", response_model=List[ContactSearchResult])
+async def search_contacts(
+    q: str = Query(..., min_length=1, max_length=200),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Busca contatos por nome, e-mail ou empresa, ignorando acentos e maiúsculas,
+    tolerando erros de digitação. Resultados ordenados por relevância (score).
+    """
+    from app.services.crm_search import search_contacts as run_search
+
+    owner_id = current_user.id if get_user_role_str(current_user) == "vendedor" else None
+    matches = await run_search(db, q, owner_id=owner_id, status=status, limit=limit)
+    return [
+        ContactSearchResult(**ContactResponse.model_validate(contact).model_dump(), score=round(score, 4))
+        for contact, score in matches
+    ]
+
 @router.post("/", response_model=ContactResponse)
 async def create_contact(
     contact_data: ContactCreate,
@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
-from app.core.database import get_db
+from sqlalchemy import select, func
+from app.core.database import get_read_db, ReadSessionLocal
 from app.models.user import User
 from app.models.contact import Contact
 from app.models.opportunity import Opportunity
 from app.models.activity import Activity
+from app.models.dashboard_rollup import DashboardRollup, GLOBAL_OWNER_ID
 from app.api.dependencies import get_current_user, get_user_role_str
 from pydantic import BaseModel
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 from decimal import Decimal
+import asyncio
 
 router = APIRouter()
 
@@ -26,56 +28,100 @@ class DashboardResponse(BaseModel):
     recent_activities: List[dict]
     top_opportunities: List[dict]
 
-@router.get("/vendedor", response_model=DashboardResponse)
-async def get_vendedor_dashboard(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
-):
-    # Estatísticas do vendedor
-    contacts_count = await db.scalar(
-        select(func.count(Contact.id)).where(Contact.owner_id == current_user.id)
-    )
-    
-    opportunities_count = await db.scalar(
-        select(func.count(Opportunity.id)).where(Opportunity.owner_id == current_user.id)
+async def _load_stats(db: AsyncSession, owner_id: Optional[int]) -> DashboardStats:
+    """
+    Todas as estatísticas numa única consulta: oportunidades agrupadas por estágio
+    (ROLLUP gera a linha de total) e contagens de contatos/atividades como subconsultas.
+    Os estágios vêm dos dados, não de uma lista fixa.
+    """
+    opportunity_filter = [Opportunity.owner_id == owner_id] if owner_id is not None else []
+    contact_filter = [Contact.owner_id == owner_id] if owner_id is not None else []
+    activity_filter = [Activity.owner_id == owner_id] if owner_id is not None else []
+
+    contacts_count = select(func.count(Contact.id)).where(*contact_filter).scalar_subquery()
+    pending_count = (
+        select(func.count(Activity.id))
+        .where(Activity.status == "pending", *activity_filter)
+        .scalar_subquery()
     )
-    
-    total_value = await db.scalar(
-        select(func.sum(Opportunity.value)).where(Opportunity.owner_id == current_user.id)
-    ) or Decimal("0")
-    
-    pending_activities_count = await db.scalar(
-        select(func.count(Activity.id)).where(
-            and_(
-                Activity.owner_id == current_user.id,
-                Activity.status == "pending"
-            )
+    result = await db.execute(
+        select(
+            Opportunity.stage,
+            func.grouping(Opportunity.stage).label("is_total"),
+            func.count(Opportunity.id).label("opportunities"),
+            func.sum(Opportunity.value).label("value"),
+            contacts_count.label("contacts"),
+            pending_count.label("pending"),
         )
+        .where(*opportunity_filter)
+        .group_by(func.rollup(Opportunity.stage))
     )
-    
-    # Oportunidades por estágio
-    opportunities_by_stage = {}
-    stages = ["qualificacao", "proposta", "negociacao", "fechado", "perdido"]
-    for stage in stages:
-        count = await db.scalar(
-            select(func.count(Opportunity.id)).where(
-                and_(
-                    Opportunity.owner_id == current_user.id,
-                    Opportunity.stage == stage
-                )
-            )
-        )
-        opportunities_by_stage[stage] = count or 0
-    
-    # Atividades recentes
-    activities_result = await db.execute(
-        select(Activity)
-        .where(Activity.owner_id == current_user.id)
-        .order_by(Activity.created_at.desc())
-        .limit(10)
+
+    stats = DashboardStats(
+        total_contacts=0,
+        total_opportunities=0,
+        total_value=Decimal("0"),
+        pending_activities=0,
+        opportunities_by_stage={},
     )
-    recent_activities = [
-        {
+    for row in result.all():
+        if row.is_total:
+            stats.total_contacts = row.contacts or 0
+            stats.pending_activities = row.pending or 0
+            stats.total_opportunities = row.opportunities or 0
+            stats.total_value = row.value or Decimal("0")
+        else:
+            stats.opportunities_by_stage[row.stage or "sem_estagio"] = row.opportunities
+    return stats
+
+async def _load_rollup_stats(db: AsyncSession, owner_id: Optional[int]) -> Optional[DashboardStats]:
+    """
+    Estatísticas a partir de dashboard_rollups (mantida a cada flush do ORM):
+    soma os shards do vendedor, ou de todos os vendedores na visão admin.
+    Retorna None enquanto a tabela não tiver o marcador de backfill (gravado por
+    reconcile(), na migração ou no beat), para cair na agregação direta.
+    """
+    from app.services import dashboard_rollups as rollups
+
+    query = (
+        select(DashboardRollup.metric, func.sum(DashboardRollup.value).label("value"))
+        .group_by(DashboardRollup.metric)
+    )
+    if owner_id is not None:
+        query = query.where(DashboardRollup.owner_id.in_((owner_id, GLOBAL_OWNER_ID)))
+    values = {row.metric: row.value for row in (await db.execute(query)).all()}
+    if not values.get(rollups.METRIC_BACKFILLED):
+        return None
+
+    return DashboardStats(
+        total_contacts=int(values.get(rollups.METRIC_CONTACTS, 0)),
+        total_opportunities=int(values.get(rollups.METRIC_OPPORTUNITIES, 0)),
+        total_value=values.get(rollups.METRIC_OPPORTUNITY_VALUE, Decimal("0")),
+        pending_activities=int(values.get(rollups.METRIC_PENDING_ACTIVITIES, 0)),
+        opportunities_by_stage={
+            metric[len(rollups.STAGE_PREFIX):]: int(value)
+            for metric, value in values.items()
+            if metric.startswith(rollups.STAGE_PREFIX) and value
+        },
+    )
+
+async def _load_dashboard_stats(db: AsyncSession, owner_id: Optional[int], fresh: bool) -> DashboardStats:
+    if not fresh:
+        stats = await _load_rollup_stats(db, owner_id)
+        if stats is not None:
+            return stats
+    return await _load_stats(db, owner_id)
+
+async def _load_recent_activities(owner_id: Optional[int]) -> List[dict]:
+    async with ReadSessionLocal() as session:
+        query = select(Activity).order_by(Activity.created_at.desc()).limit(10)
+        if owner_id is not None:
+            query = query.where(Activity.owner_id == owner_id)
+        activities = (await session.execute(query)).scalars().all()
+
+    recent_activities = []
+    for a in activities:
+        item = {
             "id": a.id,
             "type": a.type,
             "subject": a.subject,
@@ -83,42 +129,62 @@ async def get_vendedor_dashboard(
             "due_date": a.due_date.isoformat() if a.due_date else None,
             "created_at": a.created_at.isoformat()
         }
-        for a in activities_result.scalars().all()
-    ]
-    
-    # Top oportunidades
-    opportunities_result = await db.execute(
-        select(Opportunity)
-        .where(Opportunity.owner_id == current_user.id)
-        .order_by(Opportunity.value.desc())
-        .limit(5)
-    )
-    top_opportunities = [
-        {
+        if owner_id is None:
+            item["owner_id"] = a.owner_id
+        recent_activities.append(item)
+    return recent_activities
+
+async def _load_top_opportunities(owner_id: Optional[int]) -> List[dict]:
+    async with ReadSessionLocal() as session:
+        query = select(Opportunity).order_by(Opportunity.value.desc()).limit(5)
+        if owner_id is not None:
+            query = query.where(Opportunity.owner_id == owner_id)
+        opportunities = (await session.execute(query)).scalars().all()
+
+    top_opportunities = []
+    for o in opportunities:
+        item = {
             "id": o.id,
             "name": o.name,
             "value": float(o.value) if o.value else 0,
             "stage": o.stage,
             "probability": o.probability
         }
-        for o in opportunities_result.scalars().all()
-    ]
-    
+        if owner_id is None:
+            item["owner_id"] = o.owner_id
+        top_opportunities.append(item)
+    return top_opportunities
+
+async def build_dashboard(db: AsyncSession, owner_id: Optional[int], fresh: bool = False) -> DashboardResponse:
+    """
+    Monta o dashboard (owner_id=None = visão admin, todos os vendedores).
+    As estatísticas vêm dos rollups; fresh=True recalcula direto das tabelas.
+    A agregação roda na sessão da requisição e as duas listas em sessões próprias,
+    as três em paralelo: o tempo total é o da consulta mais lenta, não a soma.
+    """
+    stats, recent_activities, top_opportunities = await asyncio.gather(
+        _load_dashboard_stats(db, owner_id, fresh),
+        _load_recent_activities(owner_id),
+        _load_top_opportunities(owner_id),
+    )
     return DashboardResponse(
-        stats=DashboardStats(
-            total_contacts=contacts_count or 0,
-            total_opportunities=opportunities_count or 0,
-            total_value=total_value,
-            pending_activities=pending_activities_count or 0,
-            opportunities_by_stage=opportunities_by_stage
-        ),
+        stats=stats,
         recent_activities=recent_activities,
         top_opportunities=top_opportunities
     )
 
+@router.get("/vendedor", response_model=DashboardResponse)
+async def get_vendedor_dashboard(
+    fresh: bool = False,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    return await build_dashboard(db, owner_id=current_user.id, fresh=fresh)
+
 @router.get("/admin", response_model=DashboardResponse)
 async def get_admin_dashboard(
-    db: AsyncSession = Depends(get_db),
+    fresh: bool = False,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Apenas admin
@@ -126,69 +192,4 @@ async def get_admin_dashboard(
     if role_str.lower() != "admin":
         raise HTTPException(status_code=403, detail="Acesso negado")
     
-    # Estatísticas gerais
-    contacts_count = await db.scalar(select(func.count(Contact.id)))
-    opportunities_count = await db.scalar(select(func.count(Opportunity.id)))
-    total_value = await db.scalar(select(func.sum(Opportunity.value))) or Decimal("0")
-    pending_activities_count = await db.scalar(
-        select(func.count(Activity.id)).where(Activity.status == "pending")
-    )
-    
-    # Oportunidades por estágio
-    opportunities_by_stage = {}
-    stages = ["qualificacao", "proposta", "negociacao", "fechado", "perdido"]
-    for stage in stages:
-        count = await db.scalar(
-            select(func.count(Opportunity.id)).where(Opportunity.stage == stage)
-        )
-        opportunities_by_stage[stage] = count or 0
-    
-    # Atividades recentes (todos)
-    activities_result = await db.execute(
-        select(Activity)
-        .order_by(Activity.created_at.desc())
-        .limit(10)
-    )
-    recent_activities = [
-        {
-            "id": a.id,
-            "type": a.type,
-            "subject": a.subject,
-            "status": a.status,
-            "owner_id": a.owner_id,
-            "due_date": a.due_date.isoformat() if a.due_date else None,
-            "created_at": a.created_at.isoformat()
-        }
-        for a in activities_result.scalars().all()
-    ]
-    
-    # Top oportunidades (todas)
-    opportunities_result = await db.execute(
-        select(Opportunity)
-        .order_by(Opportunity.value.desc())
-        .limit(5)
-    )
-    top_opportunities = [
-        {
-            "id": o.id,
-            "name": o.name,
-            "value": float(o.value) if o.value else 0,
-            "stage": o.stage,
-            "probability": o.probability,
-            "owner_id": o.owner_id
-        }
-        for o in opportunities_result.scalars().all()
-    ]
-    
-    return DashboardResponse(
-        stats=DashboardStats(
-            total_contacts=contacts_count or 0,
-            total_opportunities=opportunities_count or 0,
-            total_value=total_value,
-            pending_activities=pending_activities_count or 0,
-            opportunities_by_stage=opportunities_by_stage
-        ),
-        recent_activities=recent_activities,
-        top_opportunities=top_opportunities
-    )
-
+    return await build_dashboard(db, owner_id=None, fresh=fresh)
@@ -3,6 +3,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
 from app.core.auth import verify_token
+from app.core.config import settings
+from app.services.user_principal_cache import user_principal_cache
 from app.models.user import User, UserRole
 
 def get_user_role_str(user: User) -> str:
@@ -47,12 +49,17 @@ async def get_current_user(
     
     payload = verify_token(token)
     
-    if not payload:
+    # Tokens com escopo (ex.: stream de logs) valem só na rota para a qual foram emitidos
+    if not payload or payload.get("scope"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido"
         )
     
+    return await get_user_from_payload(db, payload)
+
+async def get_user_from_payload(db: AsyncSession, payload: dict) -> User:
+    """Carrega o usuário ativo de um payload JWT já validado (confere a versão do token)"""
     user_id = payload.get("user_id")
     if not user_id:
         raise HTTPException(
@@ -60,8 +67,14 @@ async def get_current_user(
             detail="Token inválido"
         )
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    token_version = payload.get("tv", 0)
+    if settings.USER_CACHE_ENABLED:
+        user = await user_principal_cache.get_user(db, user_id, token_version)
+    else:
+        result = await db.execute(select(User).where(User.id == user_id))
+        user = result.scalar_one_or_none()
+        if user and (user.token_version or 0) != token_version:
+            user = None
     
     if not user or not user.is_active:
         raise HTTPException(
@@ -66,19 +66,19 @@ async def send_email(
     # Send appropriate email
     success = False
     if request.email_type == "payment_confirmation":
-        success = email_service.send_payment_confirmation(order_dict)
+        success = await email_service.send_payment_confirmation(order_dict)
     elif request.email_type == "onboarding_complete":
-        success = email_service.send_onboarding_complete(order_dict)
+        success = await email_service.send_onboarding_complete(order_dict)
     elif request.email_type == "in_progress":
-        success = email_service.send_site_in_progress(order_dict)
+        success = await email_service.send_site_in_progress(order_dict)
     elif request.email_type == "ready_for_review":
         if not request.preview_url:
             raise HTTPException(status_code=400, detail="preview_url required for ready_for_review email")
-        success = email_service.send_ready_for_review(order_dict, request.preview_url)
+        success = await email_service.send_ready_for_review(order_dict, request.preview_url)
     elif request.email_type == "delivered":
         if not request.site_url:
             raise HTTPException(status_code=400, detail="site_url required for delivered email")
-        success = email_service.send_site_delivered(order_dict, request.site_url)
+        success = await email_service.send_site_delivered(order_dict, request.site_url)
     else:
         raise HTTPException(status_code=400, detail=f"Unknown email_type: {request.email_type}")
 
@@ -101,7 +101,7 @@ async def send_payment_confirmation_email(
         raise HTTPException(status_code=404, detail="Order not found")
 
     order_dict = order_to_dict(order)
-    success = email_service.send_payment_confirmation(order_dict)
+    success = await email_service.send_payment_confirmation(order_dict)
 
     return {"success": success}
 
@@ -119,7 +119,7 @@ async def send_onboarding_complete_email(
         raise HTTPException(status_code=404, detail="Order not found")
 
     order_dict = order_to_dict(order)
-    success = email_service.send_onboarding_complete(order_dict)
+    success = await email_service.send_onboarding_complete(order_dict)
 
     return {"success": success}
 
@@ -140,7 +140,7 @@ async def send_verification_email(
     """Send email verification with portal credentials."""
     verification_url = f"https://innexar.app/dashboard/verify?token={request.verification_token}"
     
-    success = email_service.send_custom_email(
+    success = await email_service.send_custom_email(
         to_email=request.email,
         subject="Verifique seu email - Innexar Portal",
         template_data={
@@ -11,6 +11,9 @@ from app.models.lead_analysis import LeadAnalysis
 from app.models.ai_config import AIConfig, AIModelStatus
 from app.api.dependencies import get_current_user, get_user_role_str
 from app.api.ai import call_ai_api, get_active_ai_config
+from app.services.ai_config_cache import ai_config_cache
+from app.services.ai_response_cache import ai_response_cache
+from app.services.ai_scheduler import PRIORITY_LEAD_ANALYSIS
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 from datetime import datetime
@@ -37,6 +40,35 @@ class LeadAnalysisResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Task type da análise de leads: uma regra de roteamento com esse nome controla o cache
+# (cache_enabled / cache_ttl_seconds); sem regra, a resposta fica em cache pelo TTL padrão
+LEAD_ANALYSIS_TASK = "lead_analysis"
+
+
+async def run_lead_analysis(db: AsyncSession, prompt: str, ai_config) -> Dict[str, Any]:
+    """
+    Chama a IA para a análise passando pelo cache de respostas.
+    A chave inclui provider, modelo e o prompt (que carrega os dados do lead), então
+    reanalisar um lead que não mudou não chama o provider de novo.
+    Retorna {"content", "cache_key", "cached"}; cache_key é None quando a regra desativa o cache.
+    """
+    routing = await ai_config_cache.get_routing(db, LEAD_ANALYSIS_TASK)
+    if routing is not None and not routing.cache_enabled:
+        content = await call_ai_api(prompt, max_tokens=4000, db=db, config=ai_config, priority=PRIORITY_LEAD_ANALYSIS)
+        return {"content": content, "cache_key": None, "cached": False}
+
+    key = ai_response_cache.make_key(ai_config.provider, ai_config.model_name, None, LEAD_ANALYSIS_TASK, prompt)
+    cached = await ai_response_cache.get(key)
+    if cached is not None and cached.get("content"):
+        return {"content": cached["content"], "cache_key": key, "cached": True}
+
+    content = await call_ai_api(prompt, max_tokens=4000, db=db, config=ai_config, priority=PRIORITY_LEAD_ANALYSIS)
+    if content:
+        ttl = routing.cache_ttl_seconds if routing is not None else None
+        await ai_response_cache.set(key, {"content": content}, ttl=ttl)
+    return {"content": content, "cache_key": key, "cached": False}
+
+
 async def analyze_lead_background(contact_id: int):
     """Função de background para analisar lead"""
     from app.core.database import AsyncSessionLocal
@@ -164,12 +196,14 @@ RESPONDA APENAS EM TEXTO ESTRUTURADO (NÃO JSON), no seguinte formato:
 
 Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não encontrar informações específicas, indique claramente."""
 
+            cache_key = None
             try:
-                # Chamar IA para análise
-                ai_response = await call_ai_api(analysis_prompt, max_tokens=4000, db=db_session, config=ai_config)
+                # Chamar IA para análise (servida do cache se o lead não mudou)
+                ai_response = await run_lead_analysis(db_session, analysis_prompt, ai_config)
+                cache_key = ai_response["cache_key"]
                 
                 # Processar resposta estruturada (não JSON)
-                full_analysis = ai_response.strip()
+                full_analysis = ai_response["content"].strip()
                 
                 # Remover markdown code blocks se houver
                 if full_analysis.startswith("```"):
@@ -306,7 +340,8 @@ Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não
                     "potential_value": potential_value,
                     "full_analysis": full_analysis,
                     "ai_model": ai_config.model_name,
-                    "provider": ai_config.provider
+                    "provider": ai_config.provider,
+                    "cached": ai_response["cached"]
                 }
                 analysis.ai_model_used = f"{ai_config.provider}/{ai_config.model_name}"
                 analysis.analysis_status = "completed"
@@ -315,6 +350,9 @@ Seja EXTREMAMENTE detalhado e use informações REAIS quando possível. Se não
                 await db_session.commit()
                 
             except Exception as e:
+                if cache_key:
+                    # Uma resposta que não pôde ser processada não deve ser servida de novo
+                    await ai_response_cache.discard(cache_key)
                 analysis.analysis_status = "error"
                 analysis.error_message = str(e)
                 await db_session.commit()
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Optional
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.opportunity import Opportunity
 from app.models.user import User
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.api.pagination import keyset_page, finish_page, MAX_PAGE_SIZE
+from app.models.search import OPPORTUNITY_TRIGRAM_COLUMNS
+from app.services.crm_search import substring_filter
 from pydantic import BaseModel
 from datetime import datetime, date
 from decimal import Decimal
@@ -42,18 +45,42 @@ class OpportunityResponse(OpportunityBase):
 
 @router.get("/", response_model=List[OpportunityResponse])
 async def list_opportunities(
-    db: AsyncSession = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
-    skip: int = 0,
-    limit: int = 100
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    stage: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    contact_id: Optional[int] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    q: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True)
 ):
+    """
+    Lista oportunidades da mais nova para a mais antiga, paginando por cursor:
+    o cursor da próxima página vem no cabeçalho X-Next-Cursor.
+    """
     query = select(Opportunity)
     if get_user_role_str(current_user) == "vendedor":
         query = query.where(Opportunity.owner_id == current_user.id)
-    
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    opportunities = result.scalars().all()
+    elif owner_id is not None:
+        query = query.where(Opportunity.owner_id == owner_id)
+
+    if stage:
+        query = query.where(Opportunity.stage == stage)
+    if contact_id is not None:
+        query = query.where(Opportunity.contact_id == contact_id)
+    if created_from:
+        query = query.where(Opportunity.created_at >= created_from)
+    if created_to:
+        query = query.where(Opportunity.created_at < created_to)
+    if q:
+        query = query.where(substring_filter(Opportunity, OPPORTUNITY_TRIGRAM_COLUMNS, q))
+
+    result = await db.execute(keyset_page(query, Opportunity, limit, cursor, skip))
+    opportunities = finish_page(result.scalars().all(), limit, response)
     return [OpportunityResponse.model_validate(opp) for opp in opportunities]
 
 @router.post("/", response_model=OpportunityResponse)
@@ -0,0 +1,92 @@
+"""
+Paginação por cursor (keyset) para as listagens do CRM.
+
+Cada listagem tem uma chave de ordenação (SortKey) terminada no id - por padrão
+(created_at DESC, id DESC) - e a próxima página começa logo após a última linha
+retornada, via comparação de tupla: o custo não cresce com a profundidade da
+página, ao contrário de OFFSET, e as páginas ficam estáveis quando registros
+são inseridos no meio da navegação. As colunas da chave não podem ser NULL
+(a comparação de tupla pularia essas linhas): colunas anuláveis entram com
+COALESCE, com o mesmo valor na consulta, no cursor e no índice.
+
+O cursor é opaco para o cliente (base64 dos valores da chave) e volta no
+cabeçalho X-Next-Cursor; o corpo continua sendo a lista de itens.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date, datetime, time
+from typing import Any, Callable, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class SortKey:
+    """Ordenação de uma listagem: expressões SQL (a última única, o id) e os mesmos valores lidos de uma linha"""
+    columns: Sequence[Any]
+    values: Callable[[Any], tuple]
+    descending: bool = True
+
+
+def created_at_key(model) -> SortKey:
+    """Mais novos primeiro: (created_at DESC, id DESC)"""
+    return SortKey((model.created_at, model.id), lambda row: (row.created_at, row.id))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    encoded = [v.isoformat() if isinstance(v, (date, time)) else v for v in values]
+    payload = json.dumps({"k": encoded}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, key: SortKey) -> tuple:
+    """Valores da chave no cursor, convertidos para os tipos das colunas"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        encoded = json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+        if len(encoded) != len(key.columns):
+            raise ValueError("cursor de outra listagem")
+        values = []
+        for column, value in zip(key.columns, encoded):
+            python_type = column.type.python_type
+            if python_type in (datetime, date, time):
+                values.append(python_type.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return tuple(values)
+    except (ValueError, KeyError, TypeError, AttributeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="Cursor de paginação inválido")
+
+
+def keyset_page(
+    query: Select, model, limit: int, cursor: Optional[str] = None, skip: int = 0, key: SortKey = None
+) -> Select:
+    """
+    Aplica a ordenação da chave (padrão: created_at, id decrescentes) e o cursor à consulta.
+    Busca limit + 1 linhas: a linha extra só indica que existe próxima página.
+    `skip` (OFFSET) é mantido para clientes antigos e ignorado quando há cursor.
+    """
+    key = key or created_at_key(model)
+    order = [column.desc() if key.descending else column.asc() for column in key.columns]
+    query = query.order_by(*order).limit(limit + 1)
+    if cursor:
+        row, after = tuple_(*key.columns), tuple_(*decode_cursor(cursor, key))
+        return query.where(row < after if key.descending else row > after)
+    if skip:
+        query = query.offset(skip)
+    return query
+
+
+def finish_page(rows: list, limit: int, response: Response, key: SortKey = None) -> list:
+    """Corta a linha extra e publica o cursor da próxima página (se houver)"""
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    values = key.values(rows[-1]) if key else (rows[-1].created_at, rows[-1].id)
+    response.headers[NEXT_CURSOR_HEADER] = encode_cursor(values)
+    return rows
@@ -4,6 +4,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from app.api.dependencies import get_current_user
 from app.models.user import User
 from app.schemas.site_files import FileNode, FileContentResponse, FileSaveRequest
+from app.services.blob_store import write_file
+from app.services.site_store import site_store
 from typing import List
 from pathlib import Path
 
@@ -74,6 +76,30 @@ def build_file_tree(base_path: Path, relative_root: str = "") -> List[FileNode]:
         return []
     return tree
 
+def build_manifest_tree(manifest) -> List[FileNode]:
+    """Mesma árvore de build_file_tree, montada a partir do manifesto do site (sem percorrer o disco)"""
+    root: dict = {}
+    for rel_path, entry in manifest.files.items():
+        parts = rel_path.split("/")
+        if any(part.startswith(".") and part != ".env" for part in parts):
+            continue
+        node = root
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+        node[parts[-1]] = entry.size
+
+    def to_nodes(children: dict, relative_root: str) -> List[FileNode]:
+        nodes = []
+        for name in sorted(children, key=lambda x: (not isinstance(children[x], dict), x.lower())):
+            rel_path = f"{relative_root}/{name}" if relative_root else name
+            if isinstance(children[name], dict):
+                nodes.append(FileNode(name=name, path=rel_path, type="directory", children=to_nodes(children[name], rel_path)))
+            else:
+                nodes.append(FileNode(name=name, path=rel_path, type="file", size=children[name]))
+        return nodes
+
+    return to_nodes(root, "")
+
 @router.get("", response_model=List[FileNode])
 async def list_files(
     project_id: int,
@@ -86,7 +112,10 @@ async def list_files(
         # Se não existir, retorna lista vazia ou cria?
         # Por enquanto lista vazia, o worker que cria a pasta
         return []
-        
+    
+    manifest = site_store.manifest(project_id)
+    if manifest is not None:
+        return build_manifest_tree(manifest)
     return build_file_tree(project_dir)
 
 @router.get("/content", response_model=FileContentResponse)
@@ -128,12 +157,11 @@ async def save_file_content(
         project_dir = Path(os.path.abspath(str(project_dir)))
     full_path = validate_path(project_dir, data.path)
     
-    # Garantir que diretório pai existe
-    full_path.parent.mkdir(parents=True, exist_ok=True)
-    
     try:
-        with open(full_path, "w", encoding="utf-8") as f:
-            f.write(data.content)
+        # Novo inode: o arquivo pode ser um hardlink compartilhado com o template store
+        write_file(str(full_path), data.content)
+        # Mantém o manifesto do site em dia (sem manifesto, não faz nada)
+        site_store.update(project_id, str(project_dir), [os.path.relpath(full_path, project_dir.resolve())])
         return {"message": "Arquivo salvo com sucesso"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
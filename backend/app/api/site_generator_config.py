@@ -16,6 +16,8 @@ from app.schemas.configuration import (
 )
 from app.schemas.storage import StorageConfigCreate, StorageConfigResponse
 from app.services.config_service import ConfigService
+from app.services.system_config_cache import system_config_cache
+from app.core.http_clients import http_clients
 from app.models.configuration import IntegrationType, ServerType, DeployServer, IntegrationConfig
 
 router = APIRouter()
@@ -31,8 +33,7 @@ async def get_integrations_by_type(
     """Get all configs for a specific integration type"""
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
     result = await db.execute(
         select(IntegrationConfig).where(
@@ -43,9 +44,7 @@ async def get_integrations_by_type(
     configs = result.scalars().all()
     
     # Decrypt secrets for display (frontend needs to see them to edit)
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -68,7 +67,6 @@ async def get_integrations_by_type(
                 print(msg, file=sys.stderr, flush=True)
     finally:
         sync_db.close()
-        sync_engine.dispose()
     
     msg = f"[GET INTEGRATIONS] Returning {len(configs)} configs for {type.value}"
     logger.info(msg)
@@ -84,8 +82,7 @@ async def create_integration_config(
     """Create or update integration config"""
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
     # Check if config already exists
     result = await db.execute(
@@ -97,9 +94,7 @@ async def create_integration_config(
     existing = result.scalar_one_or_none()
     
     # Create sync session for ConfigService encryption (temporary workaround)
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -115,6 +110,7 @@ async def create_integration_config(
                 existing.description = config.description
             existing.updated_at = datetime.utcnow()
             await db.commit()
+            await system_config_cache.invalidate()
             await db.refresh(existing)
             return existing
         else:
@@ -127,11 +123,11 @@ async def create_integration_config(
             )
             db.add(new_config)
             await db.commit()
+            await system_config_cache.invalidate()
             await db.refresh(new_config)
             return new_config
     finally:
         sync_db.close()
-        sync_engine.dispose()
 
 @router.put("/config/integrations/{id}", response_model=IntegrationConfigResponse)
 async def update_integration_config(
@@ -153,12 +149,9 @@ async def update_integration_config(
     
     # Create sync session for encryption
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -171,7 +164,6 @@ async def update_integration_config(
                 config.value = config_update.value
     finally:
         sync_db.close()
-        sync_engine.dispose()
             
     if config_update.is_secret is not None:
         config.is_secret = config_update.is_secret
@@ -181,6 +173,7 @@ async def update_integration_config(
         config.is_active = config_update.is_active
         
     await db.commit()
+    await system_config_cache.invalidate()
     await db.refresh(config)
     return config
 
@@ -205,13 +198,10 @@ async def create_deploy_server(
     """Create deploy server"""
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
     # Create sync session for encryption
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -242,7 +232,6 @@ async def create_deploy_server(
         return new_server
     finally:
         sync_db.close()
-        sync_engine.dispose()
 
 # --- Storage Configuration (S3/R2) ---
 
@@ -273,15 +262,12 @@ async def create_storage_config(
     """Create storage configuration"""
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
     provider_type = IntegrationType.CLOUDFLARE_R2 if config.provider == "cloudflare_r2" else IntegrationType.AWS_S3
     
     # Create sync session for encryption
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -320,9 +306,9 @@ async def create_storage_config(
             await set_config_async("region", config.region, False)
         
         await db.commit()
+        await system_config_cache.invalidate()
     finally:
         sync_db.close()
-        sync_engine.dispose()
     
     # Return simplified response
     return StorageConfigResponse(
@@ -349,17 +335,13 @@ async def test_storage_connection(
     
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
-    import httpx
+    from app.core.database import get_sync_engine
     
     provider_type = IntegrationType.CLOUDFLARE_R2 if provider == "cloudflare_r2" else IntegrationType.AWS_S3
     logger.info(f"🧪 [STORAGE TEST] Provider type: {provider_type.value}")
     
     # Get config
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -456,7 +438,6 @@ async def test_storage_connection(
         return {"success": False, "error": f"Test failed: {error_msg}"}
     finally:
         sync_db.close()
-        sync_engine.dispose()
 
 # --- Cloudflare Pages Configuration ---
 
@@ -471,13 +452,10 @@ async def configure_cloudflare_pages(
     """Configure Cloudflare Pages"""
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
+    from app.core.database import get_sync_engine
     
     # Create sync session for encryption
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -512,9 +490,9 @@ async def configure_cloudflare_pages(
         await set_config_async("project_template", project_template, False)
         
         await db.commit()
+        await system_config_cache.invalidate()
     finally:
         sync_db.close()
-        sync_engine.dispose()
     
     return {"success": True, "message": "Cloudflare Pages configured"}
 
@@ -529,14 +507,10 @@ async def test_cloudflare_pages(
     
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
-    import httpx
+    from app.core.database import get_sync_engine
     
     # Get config
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -575,7 +549,7 @@ async def test_cloudflare_pages(
         logger.info(f"🧪 [CLOUDFLARE PAGES TEST] Testing API connection for account: {account_id}")
         
         # Test Cloudflare Pages API
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}/pages/projects"
             logger.info(f"🧪 [CLOUDFLARE PAGES TEST] Calling: {url}")
             
@@ -613,7 +587,6 @@ async def test_cloudflare_pages(
         return {"success": False, "error": f"Test failed: {error_msg}"}
     finally:
         sync_db.close()
-        sync_engine.dispose()
 
 @router.post("/config/integrations/{type}/test")
 async def test_integration(
@@ -627,14 +600,10 @@ async def test_integration(
     
     from app.services.config_service import ConfigService
     from sqlalchemy.orm import sessionmaker
-    from sqlalchemy import create_engine
-    from app.core.config import settings
-    import httpx
+    from app.core.database import get_sync_engine
     
     # Get config
-    sync_db_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
-    sync_engine = create_engine(sync_db_url)
-    SyncSession = sessionmaker(bind=sync_engine)
+    SyncSession = sessionmaker(bind=get_sync_engine())
     sync_db = SyncSession()
     
     try:
@@ -657,7 +626,7 @@ async def test_integration(
                 logger.warning("🧪 [INTEGRATION TEST] Missing GitHub API token")
                 return {"success": False, "error": "Missing GitHub API token"}
             
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("github") as client:
                 logger.info("🧪 [INTEGRATION TEST] Calling GitHub API: https://api.github.com/user")
                 response = await client.get(
                     "https://api.github.com/user",
@@ -690,7 +659,7 @@ async def test_integration(
                 logger.warning(f"🧪 [INTEGRATION TEST] Missing configuration. Token: {bool(api_token)}, Account ID: {bool(account_id)}")
                 return {"success": False, "error": "Missing API token or Account ID"}
             
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("cloudflare") as client:
                 url = f"https://api.cloudflare.com/client/v4/accounts/{account_id}"
                 logger.info(f"🧪 [INTEGRATION TEST] Calling: {url}")
                 response = await client.get(
@@ -736,7 +705,7 @@ async def test_integration(
                 logger.warning(f"🧪 [INTEGRATION TEST] Missing configuration. Token: {bool(base_token)}, Zone ID: {bool(zone_id)}")
                 return {"success": False, "error": "Missing API token or Zone ID"}
             
-            async with httpx.AsyncClient() as client:
+            async with http_clients.client("cloudflare") as client:
                 url = f"https://api.cloudflare.com/client/v4/zones/{zone_id}"
                 logger.info(f"🧪 [INTEGRATION TEST] Calling: {url}")
                 response = await client.get(
@@ -768,4 +737,3 @@ async def test_integration(
         return {"success": False, "error": f"Test failed: {error_msg}"}
     finally:
         sync_db.close()
-        sync_engine.dispose()
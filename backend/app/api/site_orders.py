@@ -11,16 +11,19 @@ from typing import Optional, List
 from datetime import datetime, timedelta
 
 from app.core.database import get_db
+from app.core.auth import create_access_token, verify_token
+from app.core.config import settings
 from app.models.user import User
 from app.models.site_order import (
     SiteOrder, SiteOrderStatus, SiteOnboarding, SiteAddon, 
     SiteOrderAddon, SiteTemplate, SiteNiche, SiteTone, SiteCTA
 )
 from app.models.site_deliverable import SiteDeliverable, DeliverableType, DeliverableStatus
-from app.api.dependencies import get_current_user, require_admin
+from app.api.dependencies import get_current_user, get_user_from_payload, require_admin
 from app.api.site_customers import create_customer_account
 from app.services.email_service import email_service
 from app.services.site_generator_service import SiteGeneratorService
+from app.services.site_store import site_store
 from app.services.ai_service import AIService
 from app.services.stripe_service import StripeService
 from app.repositories.order_repository import OrderRepository
@@ -28,6 +31,7 @@ from app.repositories.catalog_repository import CatalogRepository
 from fastapi import Request
 import stripe
 import json
+import asyncio
 
 
 router = APIRouter(prefix="/site-orders", tags=["site-orders"])
@@ -449,57 +453,46 @@ async def auto_start_stuck_orders(
     current_user: User = Depends(require_admin)
 ):
     """
-    Automatically start generation for orders that are BUILDING with completed onboarding
-    but haven't started generation yet. This ensures the system is fully automatic.
+    Requests generation for orders that are BUILDING with completed onboarding but
+    were never dispatched (e.g. orders from before the generation outbox). Orders
+    whose generation is already queued or running are left alone.
     """
-    from sqlalchemy.orm import selectinload
-    from app.tasks.site_generation import generate_site_task
     import logging
+    from app.services.generation_dispatch import request_generation, dispatch
     
     logger = logging.getLogger(__name__)
     
-    # Find orders that are BUILDING with completed onboarding but not generating
+    # Only orders that have an onboarding row
     result = await db.execute(
         select(SiteOrder)
-        .options(selectinload(SiteOrder.onboarding))
+        .join(SiteOnboarding, SiteOnboarding.order_id == SiteOrder.id)
         .where(SiteOrder.status == SiteOrderStatus.BUILDING)
         .where(SiteOrder.onboarding_completed_at.isnot(None))
     )
     stuck_orders = result.scalars().all()
     
-    started = []
-    errors = []
-    
+    requested = []
     for order in stuck_orders:
-        if order.onboarding:  # Only if onboarding exists
-            try:
-                # Update status to GENERATING
-                order.status = SiteOrderStatus.GENERATING
-                order.admin_notes = f"Auto-started generation (was stuck in BUILDING). Original: {order.admin_notes or 'N/A'}"
-                await db.commit()
-                
-                # Start generation
-                celery_task = generate_site_task.delay(order.id, resume=True)
-                started.append({
-                    "order_id": order.id,
-                    "task_id": celery_task.id,
-                    "customer_email": order.customer_email
-                })
-                logger.info(f"✅ Auto-started generation for stuck order {order.id} (task: {celery_task.id})")
-            except Exception as e:
-                errors.append({
-                    "order_id": order.id,
-                    "error": str(e)
-                })
-                logger.error(f"❌ Failed to auto-start order {order.id}: {e}", exc_info=True)
-                await db.rollback()
+        if await request_generation(db, order.id):
+            order.status = SiteOrderStatus.GENERATING
+            order.admin_notes = f"Auto-started generation (was stuck in BUILDING). Original: {order.admin_notes or 'N/A'}"
+            requested.append(order)
+    await db.commit()
+    
+    sent = await dispatch(db, [order.id for order in requested])
+    task_ids = {item["order_id"]: item["task_id"] for item in sent}
+    started = [
+        {"order_id": order.id, "task_id": task_ids.get(order.id), "customer_email": order.customer_email}
+        for order in requested
+    ]
+    logger.info(f"✅ Requested generation for {len(requested)} stuck order(s), {len(sent)} enqueued now")
     
     return {
         "success": True,
         "started_count": len(started),
-        "errors_count": len(errors),
+        "errors_count": 0,
         "started_orders": started,
-        "errors": errors,
+        "errors": [],
         "message": f"Auto-started generation for {len(started)} stuck orders"
     }
 
@@ -563,7 +556,7 @@ async def check_empty_generations(
     
     for order in generating_orders:
         target_dir = service._get_target_dir(order.id)
-        stage_info = service._check_stage_files(target_dir)
+        stage_info = service._check_stage_files(target_dir, order.id)
         
         # Consider empty if no files or very few files (< 5)
         if stage_info["files_count"] < 5:
@@ -601,9 +594,8 @@ async def reset_empty_generations(
     """Reset all orders in GENERATING status that have no generated files and automatically start generation"""
     import os
     import shutil
-    import threading
     import logging
-    from app.services.site_generator_service import SiteGeneratorService
+    from app.services.generation_dispatch import request_generation, dispatch
     
     logger = logging.getLogger(__name__)
     
@@ -617,64 +609,65 @@ async def reset_empty_generations(
     
     reset_orders = []
     errors = []
-    auto_started = []
-    
-    # Import Celery task
-    from app.tasks.site_generation import generate_site_task
+    requested = []
     
+    service = SiteGeneratorService(db)
     for order in generating_orders:
-        # Use static path calculation to avoid session conflicts
-        target_dir = os.path.abspath(os.path.join(os.getcwd(), "generated_sites", f"project_{order.id}"))
-        
-        # Check stage files manually
-        stage_info = {"current_stage": "none", "stages": {}, "files_count": 0}
-        if os.path.exists(target_dir):
-            files_count = 0
-            for root, dirs, files in os.walk(target_dir):
-                files_count += len(files)
-            stage_info["files_count"] = files_count
-            if files_count > 0:
-                stage_info["current_stage"] = "phase_2"
+        target_dir = service._get_target_dir(order.id)
+        files_count = service._check_stage_files(target_dir, order.id)["files_count"]
         
         # Consider empty if no files or very few files (< 5)
-        if stage_info["files_count"] < 5:
-            try:
-                # Remove directory if it exists
-                if os.path.exists(target_dir):
-                    shutil.rmtree(target_dir)
-                
-                # Reset status to BUILDING
-                order.status = SiteOrderStatus.BUILDING
-                order.admin_notes = f"Auto-reset: Generation had {stage_info['files_count']} files (too few). Auto-starting generation..."
-                await db.commit()
-                
-                reset_orders.append({
-                    "order_id": order.id,
-                    "customer_name": order.customer_name,
-                    "files_removed": stage_info["files_count"]
-                })
-                
-                # Automatically start generation if onboarding is complete
-                if order.onboarding:
-                    celery_task = generate_site_task.delay(order.id, resume=True)
-                    auto_started.append(order.id)
-                    logger.info(f"Enqueued Celery task {celery_task.id} for order {order.id} after bulk reset")
-                
-            except Exception as e:
-                errors.append({
-                    "order_id": order.id,
-                    "error": str(e)
-                })
+        if files_count >= 5:
+            continue
+        
+        # The generation request is armed before the cleanup (a worker holding the
+        # order's lease is still writing these files) and undone if the cleanup fails,
+        # so the sweep never dispatches onto a half-deleted directory
+        savepoint = await db.begin_nested()
+        if order.onboarding and not await request_generation(db, order.id):
+            await savepoint.rollback()
+            continue
+        
+        try:
+            # Remove directory if it exists
+            if os.path.exists(target_dir):
+                shutil.rmtree(target_dir)
+            site_store.remove(order.id)
+        except Exception as e:
+            await savepoint.rollback()
+            errors.append({
+                "order_id": order.id,
+                "error": str(e)
+            })
+            continue
+        await savepoint.commit()
+        
+        # Reset status to BUILDING
+        order.status = SiteOrderStatus.BUILDING
+        order.admin_notes = f"Auto-reset: Generation had {files_count} files (too few). Auto-starting generation..."
+        reset_orders.append({
+            "order_id": order.id,
+            "customer_name": order.customer_name,
+            "files_removed": files_count
+        })
+        if order.onboarding:
+            requested.append(order.id)
+    
+    # Resets and their generation requests are committed together, then dispatched
+    await db.commit()
+    sent = await dispatch(db, requested)
+    auto_started = [item["order_id"] for item in sent]
+    logger.info(f"Reset {len(reset_orders)} empty generation(s), enqueued {len(auto_started)}")
     
     return {
         "success": True,
         "reset_count": len(reset_orders),
         "errors_count": len(errors),
-        "auto_started_count": len(auto_started),
+        "auto_started_count": len(requested),
         "reset_orders": reset_orders,
-        "auto_started_orders": auto_started,
+        "auto_started_orders": requested,
         "errors": errors,
-        "message": f"Reset {len(reset_orders)} orders and automatically started generation for {len(auto_started)} orders"
+        "message": f"Reset {len(reset_orders)} orders and automatically started generation for {len(requested)} orders"
     }
 
 @router.get("/{order_id}")
@@ -732,33 +725,39 @@ async def trigger_build(
     if not order.onboarding:
         raise HTTPException(status_code=400, detail="Onboarding not completed")
     
+    from app.services.generation_dispatch import request_generation, dispatch
+    
+    # Pedido de geração gravado junto com o status (outbox); não duplica uma geração em andamento
+    if not await request_generation(db, order_id):
+        return {
+            "message": "Build already in progress",
+            "order_id": order_id,
+            "task_id": None,
+            "status": "running"
+        }
+    
     # Atualiza status para em geração
     order.status = SiteOrderStatus.GENERATING
     await db.commit()
     
-    # Enqueue Celery task instead of threading
-    from app.tasks.site_generation import generate_site_task
-    import logging
-    
-    logger = logging.getLogger(__name__)
-    
-    celery_task = generate_site_task.delay(order_id, resume=True)
-    logger.info(f"Enqueued Celery task {celery_task.id} for order {order_id}")
+    sent = await dispatch(db, [order_id])
     
     return {
         "message": "Build started",
         "order_id": order_id,
-        "task_id": celery_task.id,
+        "task_id": sent[0]["task_id"] if sent else None,
         "status": "queued"
     }
 
 @router.get("/{order_id}/logs")
 async def get_order_logs(
     order_id: int,
+    after_id: Optional[int] = Query(None, ge=0, description="Return only logs with id greater than this cursor"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    """Retorna os logs de geração para um pedido"""
+    """Retorna os logs de geração para um pedido (use after_id para buscar apenas os novos)"""
     repo = OrderRepository(db)
     
     # Verify order exists first
@@ -766,7 +765,126 @@ async def get_order_logs(
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
         
-    return await repo.get_logs(order_id)
+    return await repo.get_logs(order_id, after_id=after_id, limit=limit)
+
+
+LOG_STREAM_BATCH_SIZE = 500
+LOG_STREAM_KEEPALIVE_SECONDS = 15.0
+LOG_STREAM_TOKEN_SCOPE = "order_logs"
+
+
+@router.post("/{order_id}/logs/stream-token")
+async def create_log_stream_token(
+    order_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Emite um token curto para abrir o stream de logs deste pedido.
+    EventSource não envia o header Authorization, então o token vai na query string;
+    ele só vale para o stream deste pedido e expira em poucos minutos.
+    """
+    repo = OrderRepository(db)
+    order = await repo.get_by_id(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    expires_in = settings.GENERATION_LOG_STREAM_TOKEN_SECONDS
+    token = create_access_token(
+        data={
+            "user_id": current_user.id,
+            "tv": current_user.token_version or 0,
+            "scope": LOG_STREAM_TOKEN_SCOPE,
+            "order_id": order_id,
+        },
+        expires_delta=timedelta(seconds=expires_in)
+    )
+    return {"token": token, "expires_in": expires_in}
+
+
+async def get_log_stream_user(
+    order_id: int,
+    request: Request,
+    token: Optional[str] = Query(None, description="Token from POST /{order_id}/logs/stream-token"),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Autentica o stream pelo token de escopo na query string ou, sem ele, pelo header Authorization"""
+    if not token:
+        return await get_current_user(request, db)
+
+    payload = verify_token(token)
+    if (
+        not payload
+        or payload.get("scope") != LOG_STREAM_TOKEN_SCOPE
+        or payload.get("order_id") != order_id
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+    return await get_user_from_payload(db, payload)
+
+
+def _format_sse(log: dict) -> str:
+    """Serialize a log row as a Server-Sent Event (id = log id, for Last-Event-ID resume)"""
+    data = json.dumps(log, default=str, ensure_ascii=False)
+    return f"id: {log['id']}\nevent: log\ndata: {data}\n\n"
+
+
+@router.get("/{order_id}/logs/stream")
+async def stream_order_logs(
+    order_id: int,
+    request: Request,
+    after_id: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_log_stream_user)
+):
+    """
+    Stream de logs de geração via Server-Sent Events.
+    Envia o histórico uma vez e depois apenas as novas linhas (acordado por LISTEN/NOTIFY).
+    Clientes reconectando com Last-Event-ID recebem somente o que perderam.
+    Navegadores autenticam com ?token= (ver POST /{order_id}/logs/stream-token).
+    """
+    from fastapi.responses import StreamingResponse
+    from app.services.generation_log_stream import generation_log_notifier
+
+    repo = OrderRepository(db)
+    order = await repo.get_by_id(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    # Don't pin a pooled connection for the lifetime of the stream
+    await db.close()
+
+    cursor = after_id or 0
+    if last_event_id and last_event_id.strip().isdigit():
+        cursor = max(cursor, int(last_event_id.strip()))
+
+    async def event_stream():
+        nonlocal cursor
+        async with generation_log_notifier.subscribe(order_id) as new_logs:
+            yield "retry: 3000\n\n"
+            while True:
+                # Clear before reading so a NOTIFY arriving mid-query is not lost
+                new_logs.clear()
+                while True:
+                    logs = await repo.get_logs(order_id, after_id=cursor, limit=LOG_STREAM_BATCH_SIZE)
+                    for log in logs:
+                        cursor = log["id"]
+                        yield _format_sse(log)
+                    if len(logs) < LOG_STREAM_BATCH_SIZE:
+                        break
+
+                if await request.is_disconnected():
+                    break
+                try:
+                    await asyncio.wait_for(new_logs.wait(), timeout=LOG_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keep proxies from closing the connection; also acts as a polling fallback
+                    yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.patch("/{order_id}/status")
 async def update_order_status(
@@ -835,19 +953,26 @@ async def reset_generation(
     if not order.onboarding:
         raise HTTPException(status_code=400, detail="Onboarding not completed")
     
+    from app.services.generation_dispatch import request_generation, dispatch
+    
+    # A reset is a forced regeneration: don't reuse cached AI responses.
+    # Requested before touching the files, which a running worker may still be writing
+    if not await request_generation(db, order_id, bypass_ai_cache=True):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Generation is already queued or running for this order"
+        )
+    
     # Get target directory (use absolute path consistent with volume mount)
     base_dir = os.getenv("SITES_BASE_DIR", "/app/generated_sites")
     target_dir = os.path.join(base_dir, f"project_{order_id}")
     
     # Check if directory exists and has files
-    has_files = False
-    files_count = 0
-    if os.path.exists(target_dir):
-        for root, dirs, files in os.walk(target_dir):
-            files_count += len(files)
-        has_files = files_count > 0
+    files_count = SiteGeneratorService(db)._check_stage_files(target_dir, order_id)["files_count"]
+    has_files = files_count > 0
     
-    # Remove directory if it exists
+    # Remove directory if it exists (its manifest goes with it; the blobs are left to garbage collection)
+    site_store.remove(order_id)
     if os.path.exists(target_dir):
         try:
             shutil.rmtree(target_dir)
@@ -864,11 +989,10 @@ async def reset_generation(
     order.admin_notes = f"Generation reset. Previous attempt had {files_count} files. Auto-starting generation..."
     await db.commit()
     
-    # Automatically trigger generation after reset using Celery
-    from app.tasks.site_generation import generate_site_task
-    
-    celery_task = generate_site_task.delay(order_id, resume=True)
-    logger.info(f"Enqueued Celery task {celery_task.id} for order {order_id} after reset")
+    # Automatically trigger generation after reset (the sweep sends it if this fails)
+    sent = await dispatch(db, [order_id])
+    task_id = sent[0]["task_id"] if sent else None
+    logger.info(f"Enqueued Celery task {task_id} for order {order_id} after reset")
     
     return {
         "success": True,
@@ -879,6 +1003,6 @@ async def reset_generation(
         "new_status": order.status.value,
         "error": error_msg,
         "auto_generation_started": True,
-        "task_id": celery_task.id,
+        "task_id": task_id,
         "message": "Generation reset and automatically started"
     }
@@ -11,6 +11,7 @@ from app.core.database import get_db
 from app.models.user import User
 from app.models.system_config import SystemConfig, DEFAULT_CONFIGS
 from app.api.dependencies import get_current_user, require_admin
+from app.services.system_config_cache import system_config_cache
 
 
 router = APIRouter(prefix="/system-config", tags=["system-config"])
@@ -79,6 +80,47 @@ async def list_categories(
     return [row[0] for row in result.all()]
 
 
+@router.get("/http-clients")
+async def get_http_client_metrics(
+    current_user: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    """Connection reuse, TLS handshakes and pool wait per outbound upstream (this process)"""
+    from app.core.http_clients import http_clients
+    return http_clients.metrics()
+
+
+@router.get("/db-pool")
+async def get_db_pool_metrics(
+    current_user: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    """Conexões em uso, overflow e espera por conexão nos pools de escrita e leitura (este processo)"""
+    from app.core.config import settings
+    from app.core.database import engine, read_engine, pool_metrics
+    return {
+        "write": pool_metrics(engine),
+        "read": pool_metrics(read_engine),
+        "read_replica": bool(settings.DATABASE_READ_URL),
+    }
+
+
+@router.get("/snapshot")
+async def get_config_snapshot_info(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    """Version and age of this process's cached config snapshot (no values)"""
+    import time
+    snapshot = await system_config_cache.get(db)
+    return {
+        "version": snapshot.version,
+        "updated_at": snapshot.updated_at.isoformat() if snapshot.updated_at else None,
+        "age_seconds": round(time.monotonic() - snapshot.loaded_at, 3),
+        "ttl_seconds": system_config_cache.ttl,
+        "keys": len(snapshot.values),
+        "integrations": sorted(snapshot.integrations),
+    }
+
+
 @router.get("/by-category/{category}")
 async def get_configs_by_category(
     category: str,
@@ -145,6 +187,7 @@ async def update_config(
     
     config.value = update.value
     await db.commit()
+    await system_config_cache.invalidate()
     
     return {"message": f"Config '{key}' updated successfully"}
 
@@ -169,6 +212,8 @@ async def bulk_update_configs(
             updated.append(key)
     
     await db.commit()
+    if updated:
+        await system_config_cache.invalidate()
     
     return {"message": f"Updated {len(updated)} configs", "keys": updated}
 
@@ -201,6 +246,8 @@ async def seed_default_configs(
             created.append(config_data["key"])
     
     await db.commit()
+    if created:
+        await system_config_cache.invalidate()
     
     return {"message": f"Seeded {len(created)} new configs", "keys": created}
 
@@ -209,34 +256,18 @@ async def seed_default_configs(
 
 async def get_config_value(db: AsyncSession, key: str) -> Optional[Any]:
     """Get a config value (internal use, no auth required)"""
-    result = await db.execute(
-        select(SystemConfig).where(SystemConfig.key == key)
-    )
-    config = result.scalar_one_or_none()
-    
-    if config:
-        return config.get_value()
-    return None
+    snapshot = await system_config_cache.get(db)
+    return snapshot.values.get(key)
 
 
 async def get_stripe_config(db: AsyncSession) -> Dict[str, Any]:
     """Get all Stripe config values"""
-    result = await db.execute(
-        select(SystemConfig).where(SystemConfig.category == "stripe")
-    )
-    configs = result.scalars().all()
-    
-    return {c.key: c.get_value() for c in configs}
+    return (await system_config_cache.get(db)).category("stripe")
 
 
 async def get_email_config(db: AsyncSession) -> Dict[str, Any]:
     """Get all Email config values"""
-    result = await db.execute(
-        select(SystemConfig).where(SystemConfig.category == "email")
-    )
-    configs = result.scalars().all()
-    
-    return {c.key: c.get_value() for c in configs}
+    return (await system_config_cache.get(db)).category("email")
 
 
 # ============== Public endpoint for external sites ==============
@@ -266,15 +297,13 @@ async def get_public_configs(
         "site_delivery_days",
     ]
     
-    result = await db.execute(
-        select(SystemConfig).where(SystemConfig.key.in_(allowed_keys))
-    )
-    configs = result.scalars().all()
+    snapshot = await system_config_cache.get(db)
     
     return [
         PublicConfigResponse(
-            key=c.key,
-            value=c.value  # Return actual value for these specific keys
+            key=key,
+            value=snapshot.raw_values[key]  # Return actual value for these specific keys
         )
-        for c in configs
+        for key in allowed_keys
+        if key in snapshot.raw_values
     ]
@@ -6,6 +6,7 @@ from app.core.database import get_db
 from app.models.user import User, UserRole
 from app.schemas.user import UserResponse, UserCreate, UserUpdate
 from app.api.dependencies import get_current_user, get_user_role_str
+from app.services.user_principal_cache import user_principal_cache
 
 router = APIRouter()
 
@@ -73,3 +74,67 @@ async def create_user(
     
     return UserResponse.model_validate(user)
 
+
+@router.put("/{user_id}", response_model=UserResponse)
+async def update_user(
+    user_id: int,
+    user_data: UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Apenas admin pode alterar usuários
+    role_str = get_user_role_str(current_user)
+    if role_str.lower() != "admin":
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    update_data = user_data.model_dump(exclude_unset=True)
+    if "email" in update_data and update_data["email"] != user.email:
+        existing = await db.execute(select(User).where(User.email == update_data["email"]))
+        if existing.scalar_one_or_none():
+            raise HTTPException(status_code=400, detail="Email já cadastrado")
+    if update_data.get("role") is not None:
+        update_data["role"] = update_data["role"].value
+    
+    # Mudança de role ou desativação derruba os tokens já emitidos
+    revoke = (
+        ("role" in update_data and update_data["role"] != user.role) or
+        (update_data.get("is_active") is False and user.is_active)
+    )
+    for field, value in update_data.items():
+        setattr(user, field, value)
+    if revoke:
+        user.token_version = (user.token_version or 0) + 1
+    
+    await db.commit()
+    await db.refresh(user)
+    await user_principal_cache.invalidate(user.id)
+    
+    return UserResponse.model_validate(user)
+
+@router.post("/{user_id}/revoke-tokens", response_model=UserResponse)
+async def revoke_user_tokens(
+    user_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Invalida todos os tokens do usuário (ele precisa fazer login de novo)"""
+    role_str = get_user_role_str(current_user)
+    if role_str.lower() != "admin" and current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Acesso negado")
+    
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
+    
+    user.token_version = (user.token_version or 0) + 1
+    await db.commit()
+    await db.refresh(user)
+    await user_principal_cache.invalidate(user.id)
+    
+    return UserResponse.model_validate(user)
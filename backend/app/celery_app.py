@@ -16,7 +16,7 @@ try:
         "innexar_crm",
         broker=redis_url,
         backend=redis_url,
-        include=["app.tasks.site_generation", "app.tasks.auto_start_stuck_orders"]
+        include=["app.tasks.site_generation", "app.tasks.generation_dispatch", "app.tasks.dashboard_rollups", "app.tasks.site_store"]
     )
 except ImportError:
     # Celery not installed - this is OK for backend that only enqueues
@@ -59,13 +59,40 @@ if celery_app:
     
     # Periodic task schedule (Celery Beat)
     beat_schedule={
-        'auto-start-stuck-orders': {
-            'task': 'app.tasks.auto_start_stuck_orders.check_and_start_stuck_orders',
-            'schedule': 120.0,  # Run every 2 minutes
+        'sweep-generation-dispatches': {
+            'task': 'app.tasks.generation_dispatch.sweep_generation_dispatches',
+            'schedule': settings.GENERATION_DISPATCH_SWEEP_INTERVAL,
+        },
+        'reconcile-dashboard-rollups': {
+            'task': 'app.tasks.dashboard_rollups.reconcile_dashboard_rollups',
+            'schedule': settings.DASHBOARD_ROLLUP_RECONCILE_INTERVAL,
+        },
+        'collect-site-store-garbage': {
+            'task': 'app.tasks.site_store.collect_site_store_garbage',
+            'schedule': settings.SITE_STORE_GC_INTERVAL,
         },
     },
     )
 
+    from celery.signals import worker_process_init, worker_process_shutdown
+
+    @worker_process_init.connect
+    def _start_worker_runtime(**kwargs):
+        # Threads and event loops don't survive fork; start them in each pool process
+        from app.core.worker_runtime import worker_runtime
+        from app.services import dashboard_rollups
+        worker_runtime.start()
+        # Task code that touches contacts/opportunities/activities keeps the rollups current too
+        dashboard_rollups.install()
+        # Template manifests and blobs: loaded from the store, indexed only if a template changed
+        from app.services.template_store import template_store
+        template_store.warm()
+
+    @worker_process_shutdown.connect
+    def _stop_worker_runtime(**kwargs):
+        from app.core.worker_runtime import worker_runtime
+        worker_runtime.shutdown()
+
 if __name__ == "__main__":
     if celery_app:
         celery_app.start()
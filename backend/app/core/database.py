@@ -1,19 +1,122 @@
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import create_engine, exc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
 
-# Garantir que a URL usa asyncpg
-database_url = settings.DATABASE_URL
-if not database_url.startswith("postgresql+asyncpg://"):
-    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
-    database_url = database_url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
-
-engine = create_async_engine(
-    database_url,
-    echo=True,
-    future=True,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_reset_on_return='commit'  # Reset connections on return to pool
+
+def _asyncpg_url(url: str) -> str:
+    # Garantir que a URL usa asyncpg
+    if not url.startswith("postgresql+asyncpg://"):
+        url = url.replace("postgresql://", "postgresql+asyncpg://")
+        url = url.replace("postgresql+psycopg2://", "postgresql+asyncpg://")
+    return url
+
+
+database_url = _asyncpg_url(settings.DATABASE_URL)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    QueuePool que mede quanto tempo as requisições esperam por uma conexão livre.
+    Só a espera na fila conta como espera; abrir uma conexão nova (cold start,
+    overflow) é medido à parte em connect_ms.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = {
+            "checkouts": 0, "waits": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "timeouts": 0,
+            "connects": 0, "connect_errors": 0, "connect_ms_total": 0.0, "connect_ms_max": 0.0,
+        }
+        queue_get = self._pool.get
+
+        def timed_get(block=True, timeout=None):
+            started = time.perf_counter()
+            try:
+                return queue_get(block, timeout)
+            finally:
+                waited_ms = (time.perf_counter() - started) * 1000
+                stats = self.wait_stats
+                # Abaixo de 1ms a conexão estava livre no pool
+                if waited_ms >= 1.0:
+                    stats["waits"] += 1
+                stats["wait_ms_total"] += waited_ms
+                stats["wait_ms_max"] = max(stats["wait_ms_max"], waited_ms)
+
+        self._pool.get = timed_get
+
+    def _do_get(self):
+        self.wait_stats["checkouts"] += 1
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats["timeouts"] += 1
+            raise
+
+    def _create_connection(self):
+        started = time.perf_counter()
+        stats = self.wait_stats
+        try:
+            return super()._create_connection()
+        except Exception:
+            stats["connect_errors"] += 1
+            raise
+        finally:
+            connect_ms = (time.perf_counter() - started) * 1000
+            stats["connects"] += 1
+            stats["connect_ms_total"] += connect_ms
+            stats["connect_ms_max"] = max(stats["connect_ms_max"], connect_ms)
+
+    def recreate(self):
+        # dispose() recria o pool; manter as estatísticas acumuladas
+        new_pool = super().recreate()
+        new_pool.wait_stats = self.wait_stats
+        return new_pool
+
+
+def make_engine(url: str, statement_timeout_ms: int, application_name: str, **overrides):
+    """
+    Engine assíncrona com o perfil de produção vindo de Settings: pool, reciclagem,
+    cache de prepared statements do asyncpg e statement_timeout no servidor.
+    """
+    server_settings = {"application_name": application_name}
+    if statement_timeout_ms:
+        server_settings["statement_timeout"] = str(int(statement_timeout_ms))
+    options = dict(
+        echo=settings.DB_ECHO,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=True,  # Verify connections before using
+        # Só desfaz a transação pendente (rollback é o padrão seguro; commit confirmaria lixo)
+        pool_reset_on_return="rollback",
+        connect_args={
+            # 0 desliga os caches (necessário atrás de PgBouncer em modo transaction)
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+    )
+    options.update(overrides)
+    return create_async_engine(_asyncpg_url(url), **options)
+
+
+# Escrita (e leitura por padrão)
+engine = make_engine(database_url, settings.DB_STATEMENT_TIMEOUT_MS, "innexar-crm-api")
+
+# Leitura: réplica quando DATABASE_READ_URL está definida; senão o primário com timeout de leitura
+read_engine = make_engine(
+    settings.DATABASE_READ_URL or database_url,
+    settings.DB_READ_STATEMENT_TIMEOUT_MS,
+    "innexar-crm-api-read",
+    pool_size=settings.DB_READ_POOL_SIZE,
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -22,6 +125,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False
 )
 
+ReadSessionLocal = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
 async def get_db():
@@ -31,3 +140,58 @@ async def get_db():
         finally:
             await session.close()
 
+async def get_read_db():
+    """
+    Sessão para endpoints só de leitura (listagens, busca, dashboard): vai para a
+    réplica quando configurada, então pode estar alguns instantes atrasada.
+    """
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+_sync_engine = None
+
+def get_sync_engine():
+    """Engine síncrona compartilhada (serviços que usam Session), criada uma vez por processo"""
+    global _sync_engine
+    if _sync_engine is None:
+        sync_url = settings.DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://")
+        _sync_engine = create_engine(
+            sync_url,
+            echo=settings.DB_ECHO,
+            pool_size=5,
+            max_overflow=10,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=True,
+        )
+    return _sync_engine
+
+
+def pool_metrics(target=None) -> Dict[str, Any]:
+    """Estado do pool: conexões em uso, overflow, espera por conexão e tempo de conexão (este processo)"""
+    pool = (target or engine).pool
+    stats: Optional[Dict[str, Any]] = getattr(pool, "wait_stats", None)
+    metrics: Dict[str, Any] = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool._max_overflow,
+        "timeout_s": pool.timeout(),
+    }
+    if stats is not None:
+        metrics.update(
+            checkouts=stats["checkouts"],
+            waits=stats["waits"],
+            timeouts=stats["timeouts"],
+            wait_ms_avg=round(stats["wait_ms_total"] / stats["checkouts"], 2) if stats["checkouts"] else 0.0,
+            wait_ms_max=round(stats["wait_ms_max"], 2),
+            connects=stats["connects"],
+            connect_errors=stats["connect_errors"],
+            connect_ms_avg=round(stats["connect_ms_total"] / stats["connects"], 2) if stats["connects"] else 0.0,
+            connect_ms_max=round(stats["connect_ms_max"], 2),
+        )
+    return metrics
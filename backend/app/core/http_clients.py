@@ -0,0 +1,235 @@
+"""
+Shared HTTP clients
+Per-process registry of long-lived httpx.AsyncClient instances, one per upstream,
+so outbound calls reuse keep-alive (and HTTP/2 where available) connections
+instead of paying a TCP+TLS handshake per request.
+
+Usage:
+    async with http_clients.client("github") as client:
+        await client.get(...)
+
+The context manager does NOT close the client; the registry owns its lifecycle
+(FastAPI startup/shutdown, Celery task/worker hooks).
+"""
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+@dataclass(frozen=True)
+class UpstreamProfile:
+    """Connection limits and default timeouts for one upstream"""
+    timeout: httpx.Timeout
+    limits: httpx.Limits
+    http2: bool = True
+
+
+UPSTREAMS: Dict[str, UpstreamProfile] = {
+    # Hosted LLM APIs (OpenAI, Anthropic, Gemini, Grok, DeepSeek, Cohere, Workers AI)
+    "ai": UpstreamProfile(
+        timeout=httpx.Timeout(120.0, connect=30.0),
+        limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=120.0),
+    ),
+    # Self-hosted Ollama (plain HTTP through a tunnel); same 120s as its per-call clients had
+    "ollama": UpstreamProfile(
+        timeout=httpx.Timeout(120.0),
+        limits=httpx.Limits(max_connections=10, max_keepalive_connections=10, keepalive_expiry=300.0),
+        http2=False,
+    ),
+    "github": UpstreamProfile(
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=20, keepalive_expiry=60.0),
+    ),
+    # api.cloudflare.com (Pages + DNS)
+    "cloudflare": UpstreamProfile(
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0),
+    ),
+    # Anything else (webhooks, admin connectivity tests)
+    "default": UpstreamProfile(
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0),
+        http2=False,
+    ),
+}
+
+
+@dataclass
+class UpstreamMetrics:
+    requests: int = 0
+    new_connections: int = 0
+    reused_connections: int = 0
+    tls_handshakes: int = 0
+    pool_wait_total_ms: float = 0.0
+    pool_wait_max_ms: float = 0.0
+    errors: int = 0
+    created_at: float = field(default_factory=time.time)
+
+    def as_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": self.reused_connections,
+            "reuse_ratio": round(self.reused_connections / self.requests, 3) if self.requests else None,
+            "tls_handshakes": self.tls_handshakes,
+            "pool_wait_avg_ms": round(self.pool_wait_total_ms / self.requests, 2) if self.requests else 0.0,
+            "pool_wait_max_ms": round(self.pool_wait_max_ms, 2),
+            "errors": self.errors,
+        }
+
+
+class _InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the pooled transport and uses httpcore's trace extension to tell new
+    connections (connect_tcp fired) from reused ones, and to time how long a
+    request waited for a pool slot before its first network activity.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, metrics: UpstreamMetrics):
+        self._transport = transport
+        self._metrics = metrics
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        metrics = self._metrics
+        started = time.perf_counter()
+        state = {"new": False, "waited": False}
+        user_trace = request.extensions.get("trace")
+
+        async def trace(event_name: str, info: dict) -> None:
+            if event_name == "connection.connect_tcp.started":
+                state["new"] = True
+            elif event_name == "connection.start_tls.started":
+                metrics.tls_handshakes += 1
+            if not state["waited"] and (
+                event_name == "connection.connect_tcp.started"
+                or event_name.endswith("send_request_headers.started")
+            ):
+                state["waited"] = True
+                wait_ms = (time.perf_counter() - started) * 1000
+                metrics.pool_wait_total_ms += wait_ms
+                metrics.pool_wait_max_ms = max(metrics.pool_wait_max_ms, wait_ms)
+            if user_trace is not None:
+                await user_trace(event_name, info)
+
+        request.extensions["trace"] = trace
+        metrics.requests += 1
+        try:
+            return await self._transport.handle_async_request(request)
+        except Exception:
+            metrics.errors += 1
+            raise
+        finally:
+            if state["new"]:
+                metrics.new_connections += 1
+            elif state["waited"]:
+                metrics.reused_connections += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class HTTPClientRegistry:
+    """Keyed, loop-aware registry of shared AsyncClients"""
+
+    def __init__(self, upstreams: Dict[str, UpstreamProfile] = None):
+        self._upstreams = upstreams or UPSTREAMS
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._metrics: Dict[str, UpstreamMetrics] = {name: UpstreamMetrics() for name in self._upstreams}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._response_hooks: List[Callable[[httpx.Response], Awaitable[None]]] = []
+
+    def get(self, name: str = "default") -> httpx.AsyncClient:
+        """Shared client for an upstream (created lazily on the running loop)"""
+        if name not in self._upstreams:
+            name = "default"
+        self._check_loop()
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._build(name)
+            self._clients[name] = client
+        return client
+
+    @asynccontextmanager
+    async def client(self, name: str = "default") -> AsyncIterator[httpx.AsyncClient]:
+        """Drop-in replacement for `async with httpx.AsyncClient() as client` that keeps the client open"""
+        yield self.get(name)
+
+    def add_response_hook(self, hook: Callable[[httpx.Response], Awaitable[None]]) -> None:
+        """Run an async callback on every response of every shared client (e.g. rate-limit tracking)"""
+        if hook not in self._response_hooks:
+            self._response_hooks.append(hook)
+
+    async def startup(self) -> None:
+        """Eagerly create every client on the current loop"""
+        for name in self._upstreams:
+            self.get(name)
+        logger.info(f"HTTP client registry ready ({', '.join(self._upstreams)}; http2={HTTP2_AVAILABLE})")
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for name, client in clients.items():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Error closing HTTP client '{name}': {e}")
+        self._loop = None
+
+    def reset(self) -> None:
+        """Forget clients without closing them (e.g. in a freshly forked worker process)"""
+        self._clients = {}
+        self._loop = None
+
+    def metrics(self) -> Dict[str, dict]:
+        return {
+            name: {
+                **m.as_dict(),
+                "open": name in self._clients and not self._clients[name].is_closed,
+                "http2": self._upstreams[name].http2 and HTTP2_AVAILABLE,
+            }
+            for name, m in self._metrics.items()
+        }
+
+    def _check_loop(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._loop is not loop:
+            if self._loop is not None and self._clients:
+                # Connections belong to a loop that is gone; they cannot be reused or closed here
+                logger.debug("Event loop changed, discarding HTTP clients from the previous loop")
+                self._clients = {}
+            self._loop = loop
+
+    async def _run_response_hooks(self, response: httpx.Response) -> None:
+        for hook in self._response_hooks:
+            try:
+                await hook(response)
+            except Exception as e:
+                logger.warning(f"HTTP response hook {hook!r} failed: {e}")
+
+    def _build(self, name: str) -> httpx.AsyncClient:
+        profile = self._upstreams[name]
+        http2 = profile.http2 and HTTP2_AVAILABLE
+        transport = httpx.AsyncHTTPTransport(limits=profile.limits, http2=http2)
+        return httpx.AsyncClient(
+            timeout=profile.timeout,
+            transport=_InstrumentedTransport(transport, self._metrics[name]),
+            event_hooks={"response": [self._run_response_hooks]},
+        )
+
+
+http_clients = HTTPClientRegistry()
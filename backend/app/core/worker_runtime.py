@@ -0,0 +1,125 @@
+"""
+Celery worker runtime
+One long-lived asyncio event loop per worker process, running in a background
+thread, plus the loop-bound resources tasks share: the async database engine,
+the HTTP client registry, the generation log sink and the AI config cache
+listener.
+
+Tasks submit coroutines instead of creating their own loop:
+
+    result = worker_runtime.run(_generate())
+
+Because every task in the process runs on the same loop, pooled DB and HTTP
+connections are reused across tasks and nothing created by one task is awaited
+from another loop ("Future attached to a different loop").
+
+Started on worker_process_init (see app/celery_app.py); run() also starts it
+lazily for pools that don't send that signal (solo/threads) and after a fork.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerRuntime:
+    """Per-process event loop thread and the shared async resources bound to it"""
+
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.engine = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Create the loop thread and the worker engine (idempotent per process)"""
+        with self._start_lock:
+            if self.running:
+                return
+            from app.core.database import AsyncSessionLocal, ReadSessionLocal, make_engine
+            from app.core.http_clients import http_clients
+            from app.services.ai_config_cache import ai_config_cache
+            from app.services.system_config_cache import system_config_cache
+
+            # Anything inherited from the parent process belongs to a loop that isn't running here
+            http_clients.reset()
+
+            self.loop = asyncio.new_event_loop()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run_loop, name="worker-event-loop", daemon=True)
+            self._thread.start()
+
+            # Smaller pool than the API: a prefork process runs one task at a time
+            self.engine = make_engine(
+                settings.DATABASE_URL,
+                settings.WORKER_DB_STATEMENT_TIMEOUT_MS,
+                "innexar-crm-worker",
+                pool_size=settings.WORKER_DB_POOL_SIZE,
+                max_overflow=settings.WORKER_DB_MAX_OVERFLOW,
+            )
+            # Code that opens AsyncSessionLocal()/ReadSessionLocal() inside tasks shares this engine
+            AsyncSessionLocal.configure(bind=self.engine)
+            ReadSessionLocal.configure(bind=self.engine)
+
+            self._submit(http_clients.startup()).result()
+            ai_config_cache.start_listener()
+            system_config_cache.start_listener()
+            logger.info(f"[Worker] Event loop runtime started in process {self._pid}")
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the worker loop and wait for its result"""
+        if not self.running:
+            self.start()
+        future = self._submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeouts, Celery's SoftTimeLimitExceeded, errors: don't leave the coroutine running
+            future.cancel()
+            raise
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Flush logs, close clients and pools, then stop the loop"""
+        if not self.running:
+            return
+        from app.core.http_clients import http_clients
+        from app.services.generation_log_sink import generation_log_sink
+
+        async def _close():
+            await generation_log_sink.aclose()
+            await http_clients.aclose()
+            if self.engine is not None:
+                await self.engine.dispose()
+
+        try:
+            self._submit(_close()).result(timeout)
+        except Exception as e:
+            logger.warning(f"[Worker] Error while shutting down the event loop runtime: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+        self.engine = None
+        logger.info(f"[Worker] Event loop runtime stopped in process {self._pid}")
+
+    def _submit(self, coro: Coroutine):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+
+worker_runtime = WorkerRuntime()
@@ -58,6 +58,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Rotas
@@ -105,7 +106,31 @@ app.include_router(admin_tickets_router, prefix="/api/tickets", tags=["admin-tic
 
 @app.on_event("startup")
 async def startup_event():
+    from app.core.http_clients import http_clients
+    from app.services.ai_config_cache import ai_config_cache
+    from app.services import dashboard_rollups
+    from app.services.user_principal_cache import user_principal_cache
+    from app.services.system_config_cache import system_config_cache
+    from app.services.mail_queue import mail_queue
     await init_db()
+    dashboard_rollups.install()
+    await http_clients.startup()
+    ai_config_cache.start_listener()
+    user_principal_cache.start_listener()
+    system_config_cache.start_listener()
+    if settings.MAIL_QUEUE_ENABLED:
+        mail_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    from app.services.generation_log_sink import generation_log_sink
+    from app.services.generation_log_stream import generation_log_notifier
+    from app.core.http_clients import http_clients
+    from app.services.mail_queue import mail_queue
+    await mail_queue.aclose()
+    await generation_log_sink.aclose()
+    await generation_log_notifier.aclose()
+    await http_clients.aclose()
 
 @app.get("/")
 async def root():
@@ -23,6 +23,10 @@ from app.models.configuration import (
     IntegrationConfig, DeployServer, IntegrationType, ServerType
 )
 from app.models.ai_config import AITaskRouting
+from app.models.dashboard_rollup import DashboardRollup
+from app.models.generation_dispatch import GenerationDispatch, GenerationDispatchStatus
+from app.models.generation_checkpoint import GenerationCheckpoint, GenerationStage
+from app.models.outbound_email import OutboundEmail, OutboundEmailStatus
 
 __all__ = [
     "User", "Contact", "Opportunity", "Activity", 
@@ -39,7 +43,11 @@ __all__ = [
     "SupportTicket", "TicketMessage", "CustomerNotification",
     "TicketStatus", "TicketPriority",
     "IntegrationConfig", "DeployServer", "AITaskRouting",
-    "IntegrationType", "ServerType"
+    "IntegrationType", "ServerType",
+    "DashboardRollup",
+    "GenerationDispatch", "GenerationDispatchStatus",
+    "GenerationCheckpoint", "GenerationStage",
+    "OutboundEmail", "OutboundEmailStatus"
 ]
 
 
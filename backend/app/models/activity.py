@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Date, Time
+from sqlalchemy import Column, Index, Integer, String, DateTime, ForeignKey, Text, Date, Time, func, literal_column
 from sqlalchemy.orm import relationship
 from app.core.database import Base
 from datetime import datetime
@@ -15,6 +15,12 @@ class ActivityStatus(str, enum.Enum):
     COMPLETED = "completed"
     CANCELLED = "cancelled"
 
+# Agenda: por vencimento, atividades sem data/hora por último (como NULLS LAST do ORDER BY).
+# Literais (não parâmetros) para a consulta bater com a expressão dos índices.
+DUE_DATE_LAST = literal_column("'9999-12-31'::date", Date)
+DUE_TIME_LAST = literal_column("'23:59:59.999999'::time", Time)
+
+
 class Activity(Base):
     __tablename__ = "activities"
     
@@ -29,7 +35,7 @@ class Activity(Base):
     opportunity_id = Column(Integer, ForeignKey("opportunities.id"), nullable=True)
     project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # chave da paginação por cursor
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
@@ -38,3 +44,19 @@ class Activity(Base):
     project = relationship("Project", back_populates="activities")
     owner = relationship("User", back_populates="activities")
 
+    # Listagem paginada por cursor na ordem da agenda (due_order, id); (created_at, id) para as mais recentes
+    __table_args__ = (
+        Index("ix_activities_created_at_id", "created_at", "id"),
+        Index("ix_activities_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_activities_due_id", func.coalesce(due_date, DUE_DATE_LAST), func.coalesce(due_time, DUE_TIME_LAST), id),
+        Index(
+            "ix_activities_owner_due_id",
+            owner_id, func.coalesce(due_date, DUE_DATE_LAST), func.coalesce(due_time, DUE_TIME_LAST), id,
+        ),
+    )
+
+    @classmethod
+    def due_order(cls) -> tuple:
+        """Expressões da ordem da agenda (as mesmas dos índices ix_activities_*due_id)"""
+        return func.coalesce(cls.due_date, DUE_DATE_LAST), func.coalesce(cls.due_time, DUE_TIME_LAST), cls.id
+
@@ -67,6 +67,10 @@ class AITaskRouting(Base):
     temperature = Column(Float, default=0.7)
     max_tokens = Column(Integer, default=4000)
     
+    # Response cache (opt-in, only for deterministic tasks)
+    cache_enabled = Column(Boolean, default=False)
+    cache_ttl_seconds = Column(Integer, nullable=True)  # None = AI_RESPONSE_CACHE_DEFAULT_TTL
+    
     # Relationships
     primary_config = relationship("AIConfig", foreign_keys=[primary_config_id])
     fallback_config = relationship("AIConfig", foreign_keys=[fallback_config_id])
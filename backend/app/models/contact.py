@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Computed, Index, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.models.search import CONTACT_SEARCH_VECTOR, CONTACT_TRIGRAM_COLUMNS, install_search_ddl
 from datetime import datetime
 
 class Contact(Base):
@@ -25,8 +27,10 @@ class Contact(Base):
     source = Column(String)  # Origem do lead (website, landing_page, referral, etc.)
     contact_metadata = Column(Text)  # JSON com informações adicionais (checklist, etc.) - renomeado de 'metadata' pois é palavra reservada
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # chave da paginação por cursor
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Mantida pelo Postgres e só usada nas buscas (fora do mapeamento, ver __mapper_args__)
+    search_vector = Column(TSVECTOR, Computed(CONTACT_SEARCH_VECTOR, persisted=True))
     
     # Relationships
     owner = relationship("User", back_populates="contacts")
@@ -35,3 +39,13 @@ class Contact(Base):
     projects = relationship("Project", back_populates="contact")
     lead_analysis = relationship("LeadAnalysis", back_populates="contact", uselist=False)
 
+    # Listagens paginadas por cursor em (created_at, id), com e sem filtro
+    __table_args__ = (
+        Index("ix_contacts_created_at_id", "created_at", "id"),
+        Index("ix_contacts_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_contacts_status_created_at_id", "status", "created_at", "id"),
+    )
+    # Não carregar nem devolver (RETURNING) o tsvector em cada INSERT/SELECT do ORM
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
+install_search_ddl(Contact.__table__, CONTACT_TRIGRAM_COLUMNS)
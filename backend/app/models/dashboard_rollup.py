@@ -0,0 +1,19 @@
+"""
+Rollups pré-calculados do dashboard (por vendedor; os totais globais são a soma)
+"""
+from sqlalchemy import Column, Integer, SmallInteger, String, DateTime, Numeric
+from app.core.database import Base
+from datetime import datetime
+
+# owner_id das linhas de controle da tabela (ex.: marcador de backfill); nenhum usuário tem id 0
+GLOBAL_OWNER_ID = 0
+
+class DashboardRollup(Base):
+    """Uma parcela de um contador do dashboard: o contador (owner_id, metric) é a soma dos shards"""
+    __tablename__ = "dashboard_rollups"
+    
+    owner_id = Column(Integer, primary_key=True)  # users.id, ou GLOBAL_OWNER_ID
+    metric = Column(String(100), primary_key=True)  # contacts, opportunities, opportunity_value, pending_activities, stage:<estágio>
+    shard = Column(SmallInteger, primary_key=True, default=0)  # escritas concorrentes caem em linhas diferentes
+    value = Column(Numeric(16, 2), nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,38 @@
+"""
+Checkpoints do pipeline de geração de sites: uma linha por pedido por etapa concluída
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON
+from app.core.database import Base
+from datetime import datetime
+
+
+class GenerationStage:
+    """Etapas do pipeline de generate_site, na ordem em que rodam"""
+    TEMPLATE_COPIED = "template_copied"
+    PLACEHOLDERS_RENDERED = "placeholders_rendered"
+    AI_CONTENT_APPLIED = "ai_content_applied"  # Conteúdo da IA no template, ou os arquivos da geração completa
+    GITHUB_COMMITTED = "github_committed"
+    R2_UPLOADED = "r2_uploaded"
+    PAGES_CREATED = "pages_created"
+    DNS_DONE = "dns_done"
+
+    ORDER = (
+        TEMPLATE_COPIED, PLACEHOLDERS_RENDERED, AI_CONTENT_APPLIED,
+        GITHUB_COMMITTED, R2_UPLOADED, PAGES_CREATED, DNS_DONE,
+    )
+
+
+class GenerationCheckpoint(Base):
+    """
+    Etapa concluída de uma geração e o hash das entradas com que rodou.
+
+    Um retry pula a etapa enquanto o hash das entradas atuais for o mesmo;
+    output guarda o que a etapa produziu (URLs, ids) para as etapas seguintes.
+    """
+    __tablename__ = "generation_checkpoints"
+
+    order_id = Column(Integer, ForeignKey("site_orders.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(String(40), primary_key=True)  # GenerationStage
+    input_hash = Column(String(64), nullable=False)  # sha256 das entradas da etapa
+    output = Column(JSON, nullable=True)
+    completed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
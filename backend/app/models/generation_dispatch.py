@@ -0,0 +1,51 @@
+"""
+Outbox e lease da geração de sites: uma linha por pedido
+"""
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index, text
+from app.core.database import Base
+from datetime import datetime
+
+
+class GenerationDispatchStatus:
+    """Estados de uma linha de generation_dispatches"""
+    PENDING = "pending"  # Gravada junto com a mudança do pedido, aguardando envio ao Celery
+    QUEUED = "queued"  # Task enviada ao broker, aguardando um worker
+    RUNNING = "running"  # Um worker tem o lease e renova o heartbeat
+    DONE = "done"
+    FAILED = "failed"  # Tentativas esgotadas
+
+    ACTIVE = (PENDING, QUEUED, RUNNING)
+
+
+class GenerationDispatch(Base):
+    """
+    Pedido de geração (outbox) e o lease do worker que o executa.
+
+    lease_expires_at é o prazo da etapa atual: quando envia (pending), até quando
+    um worker deve pegar a task (queued) ou até quando o heartbeat vale (running).
+    Linhas ativas vencidas são reenviadas pela varredura periódica.
+    """
+    __tablename__ = "generation_dispatches"
+
+    order_id = Column(Integer, ForeignKey("site_orders.id", ondelete="CASCADE"), primary_key=True)
+    status = Column(String(20), nullable=False, default=GenerationDispatchStatus.PENDING)
+    bypass_ai_cache = Column(Boolean, nullable=False, default=False)
+    attempts = Column(Integer, nullable=False, default=0)
+
+    task_id = Column(String(64), nullable=True)  # Celery task id do envio atual
+    lease_owner = Column(String(255), nullable=True)  # host:pid do worker
+    lease_expires_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        # Varredura: só as linhas ativas, pelo prazo
+        Index(
+            "ix_generation_dispatches_active_lease",
+            "lease_expires_at",
+            postgresql_where=text("status IN ('pending', 'queued', 'running')"),
+        ),
+    )
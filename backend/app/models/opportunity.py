@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Numeric, Date
+from sqlalchemy import Column, Computed, Index, Integer, String, DateTime, ForeignKey, Numeric, Date
+from sqlalchemy.dialects.postgresql import TSVECTOR
 from sqlalchemy.orm import relationship
 from app.core.database import Base
+from app.models.search import OPPORTUNITY_SEARCH_VECTOR, OPPORTUNITY_TRIGRAM_COLUMNS, install_search_ddl
 from datetime import datetime
 
 class Opportunity(Base):
@@ -14,8 +16,10 @@ class Opportunity(Base):
     probability = Column(Integer, default=0)  # 0-100
     expected_close_date = Column(Date)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # chave da paginação por cursor
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Mantida pelo Postgres e só usada nas buscas (fora do mapeamento, ver __mapper_args__)
+    search_vector = Column(TSVECTOR, Computed(OPPORTUNITY_SEARCH_VECTOR, persisted=True))
     
     # Relationships
     contact = relationship("Contact", back_populates="opportunities")
@@ -23,3 +27,13 @@ class Opportunity(Base):
     activities = relationship("Activity", back_populates="opportunity")
     projects = relationship("Project", back_populates="opportunity")
 
+    # Listagens paginadas por cursor em (created_at, id), com e sem filtro
+    __table_args__ = (
+        Index("ix_opportunities_created_at_id", "created_at", "id"),
+        Index("ix_opportunities_owner_created_at_id", "owner_id", "created_at", "id"),
+        Index("ix_opportunities_stage_created_at_id", "stage", "created_at", "id"),
+    )
+    # Não carregar nem devolver (RETURNING) o tsvector em cada INSERT/SELECT do ORM
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
+install_search_ddl(Opportunity.__table__, OPPORTUNITY_TRIGRAM_COLUMNS)
@@ -0,0 +1,41 @@
+"""
+Fila persistente de e-mails de saída
+"""
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, text
+from app.core.database import Base
+from datetime import datetime
+
+
+class OutboundEmailStatus:
+    """Estados de uma linha de outbound_emails"""
+    PENDING = "pending"  # Aguardando envio (ou nova tentativa em next_attempt_at)
+    SENT = "sent"
+    FAILED = "failed"  # Recusado pelo servidor ou tentativas esgotadas
+
+
+class OutboundEmail(Base):
+    """E-mail gravado para envio assíncrono pelo app/services/mail_queue.py"""
+    __tablename__ = "outbound_emails"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(320), nullable=False)
+    subject = Column(String(998), nullable=False)
+    html_content = Column(Text, nullable=False)
+    text_content = Column(Text, nullable=True)
+
+    status = Column(String(20), nullable=False, default=OutboundEmailStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # O sender só lê as pendentes, pela próxima tentativa
+        Index(
+            "ix_outbound_emails_pending_next_attempt",
+            "next_attempt_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+    )
@@ -0,0 +1,64 @@
+"""
+Objetos de busca no Postgres: extensões unaccent/pg_trgm, a função imutável
+f_unaccent (unaccent() não é IMMUTABLE, então não pode ser usada direto em
+colunas geradas e índices) e os índices GIN de texto e trigramas.
+
+Usado pelos modelos (create_all em bancos novos) e pela migração
+migrations/add_search_indexes.py (bancos existentes).
+"""
+from sqlalchemy import DDL, event
+
+from app.core.database import Base
+
+SEARCH_SETUP_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+    AS $func$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $func$
+    """,
+]
+
+# Nomes, e-mails e empresas não são prosa: configuração 'simple' (sem stemming),
+# sem acentos e em minúsculas; o nome pesa mais no ranking
+CONTACT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, f_unaccent(coalesce(name, ''))), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, f_unaccent(coalesce(company, '') || ' ' || coalesce(email, ''))), 'B')"
+)
+OPPORTUNITY_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple'::regconfig, f_unaccent(coalesce(name, ''))), 'A')"
+)
+
+# Expressões indexadas por trigramas; as consultas precisam usar exatamente estas
+CONTACT_TRIGRAM_COLUMNS = ("name", "email", "company")
+OPPORTUNITY_TRIGRAM_COLUMNS = ("name",)
+
+
+def trigram_expression(column: str) -> str:
+    return f"f_unaccent(lower({column}))"
+
+
+def search_index_sql(table: str, trigram_columns) -> list:
+    statements = [
+        f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)"
+    ]
+    for column in trigram_columns:
+        statements.append(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_{column}_trgm ON {table} "
+            f"USING gin ({trigram_expression(column)} gin_trgm_ops)"
+        )
+    return statements
+
+
+def _register(target, when: str, statements: list) -> None:
+    for statement in statements:
+        event.listen(target, when, DDL(statement).execute_if(dialect="postgresql"))
+
+
+def install_search_ddl(table, trigram_columns) -> None:
+    """Cria os índices de busca logo após a tabela, quando criada via create_all"""
+    _register(table, "after_create", search_index_sql(table.name, trigram_columns))
+
+
+_register(Base.metadata, "before_create", SEARCH_SETUP_SQL)
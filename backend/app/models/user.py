@@ -25,6 +25,8 @@ class User(Base):
         """Retorna o role como enum para compatibilidade"""
         return UserRole(self.role) if isinstance(self.role, str) else self.role
     is_active = Column(Boolean, default=True)
+    # Incrementado para revogar todos os tokens já emitidos (claim "tv" do JWT)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
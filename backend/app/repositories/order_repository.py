@@ -64,23 +64,30 @@ class OrderRepository:
         )
         return result.scalar_one_or_none()
 
-    async def get_logs(self, order_id: int) -> List[dict]:
-        """Get logs for a specific order"""
+    async def get_logs(self, order_id: int, after_id: Optional[int] = None, limit: Optional[int] = None) -> List[dict]:
+        """
+        Get logs for a specific order, oldest first.
+        after_id is an exclusive cursor (log id) so pollers only fetch new rows.
+        """
         from sqlalchemy import text
         from app.core.database import AsyncSessionLocal
         
+        # Log ids are assigned in insert order, so they double as a stable cursor
+        query = """
+            SELECT id, step, message, status, details, created_at 
+            FROM site_generation_logs 
+            WHERE order_id = :oid AND id > :after_id
+            ORDER BY id ASC
+        """
+        params = {"oid": order_id, "after_id": after_id or 0}
+        if limit:
+            query += " LIMIT :limit"
+            params["limit"] = limit
+        
         # Use a separate session to avoid conflicts with ongoing operations
         try:
             async with AsyncSessionLocal() as log_session:
-                result = await log_session.execute(
-                    text("""
-                        SELECT id, step, message, status, details, created_at 
-                        FROM site_generation_logs 
-                        WHERE order_id = :oid 
-                        ORDER BY created_at ASC
-                    """),
-                    {"oid": order_id}
-                )
+                result = await log_session.execute(text(query), params)
                 logs = []
                 for row in result:
                     # Handle details which might be JSONB or text
@@ -0,0 +1,173 @@
+"""
+AI Config Cache
+In-process TTL cache of AI provider configs and task routing rules, so chat
+messages and generation steps don't hit ai_configs/ai_task_routing on every call.
+
+Writes through the admin endpoints call `await ai_config_cache.invalidate()`,
+which clears the local copy and publishes on a Redis channel. Every API and
+Celery process runs a listener thread (see start_listener) that clears its own
+copy when a message arrives; the TTL bounds staleness if Redis is unreachable.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.ai_config import AIConfig, AIModelStatus, AITaskRouting
+from app.services.redis_invalidation import RedisInvalidationListener, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel used to broadcast invalidations across processes
+INVALIDATION_CHANNEL = "ai_config_invalidate"
+
+
+@dataclass(frozen=True)
+class AIConfigSnapshot:
+    """Detached, read-only copy of an AIConfig row (safe to share across sessions/loops)"""
+    id: int
+    name: str
+    provider: str
+    model_name: str
+    api_key: Optional[str]
+    base_url: Optional[str]
+    is_active: bool
+    is_default: bool
+    status: str
+    priority: int
+    config: Optional[Dict[str, Any]]
+
+    @classmethod
+    def from_model(cls, c: AIConfig) -> "AIConfigSnapshot":
+        return cls(
+            id=c.id,
+            name=c.name,
+            provider=c.provider,
+            model_name=c.model_name,
+            api_key=c.api_key,
+            base_url=c.base_url,
+            is_active=bool(c.is_active),
+            is_default=bool(c.is_default),
+            status=c.status,
+            priority=c.priority or 0,
+            config=dict(c.config) if c.config else None,
+        )
+
+
+@dataclass(frozen=True)
+class AIRoutingSnapshot:
+    """Detached copy of an AITaskRouting row"""
+    task_type: str
+    primary_config_id: int
+    fallback_config_id: Optional[int]
+    temperature: float
+    max_tokens: int
+    cache_enabled: bool = False
+    cache_ttl_seconds: Optional[int] = None
+
+    @classmethod
+    def from_model(cls, r: AITaskRouting) -> "AIRoutingSnapshot":
+        return cls(
+            task_type=r.task_type,
+            primary_config_id=r.primary_config_id,
+            fallback_config_id=r.fallback_config_id,
+            temperature=r.temperature if r.temperature is not None else 0.7,
+            max_tokens=r.max_tokens or 4000,
+            cache_enabled=bool(r.cache_enabled),
+            cache_ttl_seconds=r.cache_ttl_seconds,
+        )
+
+
+_State = Tuple[Dict[int, AIConfigSnapshot], Dict[str, AIRoutingSnapshot], float]
+
+
+class AIConfigCache:
+    """Process-wide cache of AI configs and routing rules"""
+
+    def __init__(self, ttl: float = None, redis_url: str = None):
+        self.ttl = ttl if ttl is not None else settings.AI_CONFIG_CACHE_TTL
+        self._redis_url = redis_url or settings.REDIS_URL
+        self._state: Optional[_State] = None
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self._version = 0
+        self._listener: Optional[RedisInvalidationListener] = None
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    async def get_config(self, db: AsyncSession, config_id: int) -> Optional[AIConfigSnapshot]:
+        configs, _, _ = await self._get_state(db)
+        return configs.get(config_id)
+
+    async def get_routing(self, db: AsyncSession, task_type: str) -> Optional[AIRoutingSnapshot]:
+        _, routing, _ = await self._get_state(db)
+        return routing.get(task_type)
+
+    async def get_active_config(self, db: AsyncSession) -> Optional[AIConfigSnapshot]:
+        """Active default config with the highest priority, else any active config"""
+        configs, _, _ = await self._get_state(db)
+        active = [
+            c for c in configs.values()
+            if c.is_active and c.status == AIModelStatus.ACTIVE.value
+        ]
+        if not active:
+            return None
+        defaults = [c for c in active if c.is_default]
+        return max(defaults or active, key=lambda c: c.priority)
+
+    # ------------------------------------------------------------------ #
+    # Invalidation
+    # ------------------------------------------------------------------ #
+
+    def invalidate_local(self) -> None:
+        self._version += 1
+        self._state = None
+
+    async def invalidate(self) -> None:
+        """Drop the cache here and tell every other process to do the same"""
+        self.invalidate_local()
+        await publish_invalidation(INVALIDATION_CHANNEL, "1", "AI config", self._redis_url)
+
+    def start_listener(self) -> None:
+        """Start the background thread that applies invalidations published by other processes"""
+        if self._listener is None:
+            self._listener = RedisInvalidationListener(
+                INVALIDATION_CHANNEL,
+                on_message=lambda data: self.invalidate_local(),
+                on_reconnect=self.invalidate_local,
+                name="ai-config-invalidation",
+                redis_url=self._redis_url,
+            )
+        self._listener.start()
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    async def _get_state(self, db: AsyncSession) -> _State:
+        state = self._state
+        if state is not None and time.monotonic() - state[2] < self.ttl:
+            return state
+
+        version = self._version
+        state = await self._load(db)
+        if version == self._version:
+            self._state = state
+        return state
+
+    async def _load(self, db: AsyncSession) -> _State:
+        configs = (await db.execute(select(AIConfig))).scalars().all()
+        routing = (await db.execute(select(AITaskRouting))).scalars().all()
+        return (
+            {c.id: AIConfigSnapshot.from_model(c) for c in configs},
+            {r.task_type: AIRoutingSnapshot.from_model(r) for r in routing},
+            time.monotonic(),
+        )
+
+
+ai_config_cache = AIConfigCache()
@@ -0,0 +1,155 @@
+"""
+AI Response Cache
+Two-tier cache (in-process LRU + Redis) for responses of deterministic AI tasks,
+so Celery retries, resumed generations and repeated analyses don't pay for the
+same 60-300s model call twice.
+
+Caching is opt-in per task type (AITaskRouting.cache_enabled / cache_ttl_seconds).
+Keys hash (provider, model, temperature, system instruction, normalized prompt),
+so whitespace-only differences in f-string prompts still hit.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ai:response:"
+
+# Seconds to skip Redis after a connection error (the memory tier keeps working)
+REDIS_RETRY_AFTER = 30.0
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join((text or "").split())
+
+
+class AIResponseCache:
+    """Process-wide LRU in front of a shared Redis tier"""
+
+    def __init__(self, max_entries: int = None, default_ttl: int = None, redis_url: str = None):
+        self.max_entries = max_entries or settings.AI_RESPONSE_CACHE_MAX_ENTRIES
+        self.default_ttl = default_ttl or settings.AI_RESPONSE_CACHE_DEFAULT_TTL
+        self._redis_url = redis_url or settings.REDIS_URL
+        self._memory: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+        self.stats = {
+            "memory_hits": 0,
+            "redis_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "discarded": 0,
+            "redis_errors": 0,
+        }
+
+    @staticmethod
+    def make_key(provider: str, model: str, temperature: Optional[float], system: Optional[str], prompt: str) -> str:
+        prompt_hash = hashlib.sha256(_normalize(prompt).encode("utf-8")).hexdigest()
+        parts = [
+            provider,
+            model,
+            round(float(temperature or 0.0), 3),
+            _normalize(system),
+            prompt_hash,
+        ]
+        return KEY_PREFIX + hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return value
+            del self._memory[key]
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                raw = await client.get(key)
+                if raw:
+                    stored = json.loads(raw)
+                    self._remember(key, stored["value"], stored["expires_at"])
+                    self.stats["redis_hits"] += 1
+                    return stored["value"]
+            except Exception as e:
+                self._redis_failed(e)
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: int = None) -> None:
+        ttl = int(ttl or self.default_ttl)
+        expires_at = time.time() + ttl
+        self._remember(key, value, expires_at)
+        self.stats["stores"] += 1
+
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.set(key, json.dumps({"value": value, "expires_at": expires_at}), ex=ttl)
+            except Exception as e:
+                self._redis_failed(e)
+
+    async def discard(self, key: str) -> None:
+        """Drop a cached response (e.g. the caller found it unusable)"""
+        self._memory.pop(key, None)
+        self.stats["discarded"] += 1
+        client = self._get_redis()
+        if client is not None:
+            try:
+                await client.delete(key)
+            except Exception as e:
+                self._redis_failed(e)
+
+    def record_bypass(self) -> None:
+        self.stats["bypassed"] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["memory_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+        }
+
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _get_redis(self):
+        """redis.asyncio clients are loop-bound; rebuild when the running loop changes"""
+        if time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(
+                self._redis_url,
+                socket_connect_timeout=2,
+                socket_timeout=5,
+            )
+            self._loop = loop
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        self.stats["redis_errors"] += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"AI response cache: Redis unavailable, using memory only for {REDIS_RETRY_AFTER:.0f}s: {error}")
+
+
+ai_response_cache = AIResponseCache()
@@ -0,0 +1,424 @@
+"""
+AI Scheduler
+Cross-process admission control for AI provider calls, so a burst of background
+work (lead analyses, site generations) can't saturate a provider and starve the
+interactive chats.
+
+State lives in Redis, per AIConfig:
+- a waiting queue ordered by priority class, then arrival; every waiter has a deadline
+- leases for in-flight calls (concurrency cap), reclaimed if a process dies mid-call
+- token buckets for requests/min and tokens/min
+- a cool-down set from Retry-After when the provider answers 429/503
+
+Limits come from AIConfig.config ("max_concurrency", "rate_limit_rpm",
+"rate_limit_tpm"), falling back to DEFAULT_LIMITS. If Redis is unreachable calls
+go through unscheduled rather than failing.
+
+Usage:
+    async with ai_scheduler.slot(config, PRIORITY_INTERACTIVE, estimate_tokens(prompt, max_tokens=1000)):
+        ...call the provider...
+"""
+import asyncio
+import email.utils
+import logging
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.core.http_clients import http_clients
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "ai:sched:"
+
+# Keys expire if a provider stops being used
+KEY_TTL_MS = 3600 * 1000
+
+# Seconds to skip Redis after a connection error
+REDIS_RETRY_AFTER = 30.0
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_LEAD_ANALYSIS = "lead_analysis"
+PRIORITY_SITE_GENERATION = "site_generation"
+
+
+@dataclass(frozen=True)
+class PriorityClass:
+    rank: int  # Lower is admitted first
+    max_wait: float  # Seconds a call may wait for admission before giving up
+
+
+PRIORITY_CLASSES: Dict[str, PriorityClass] = {
+    PRIORITY_INTERACTIVE: PriorityClass(rank=0, max_wait=20.0),
+    PRIORITY_LEAD_ANALYSIS: PriorityClass(rank=1, max_wait=300.0),
+    PRIORITY_SITE_GENERATION: PriorityClass(rank=2, max_wait=900.0),
+}
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    max_concurrency: int = 8  # 0 = unlimited
+    rpm: int = 0  # Requests per minute, 0 = unlimited
+    tpm: int = 0  # Tokens per minute, 0 = unlimited
+
+
+DEFAULT_LIMITS: Dict[str, ProviderLimits] = {
+    # A single self-hosted GPU box
+    "ollama": ProviderLimits(max_concurrency=2),
+}
+
+
+class AISchedulerTimeout(Exception):
+    """The provider had no capacity before the caller's deadline"""
+
+
+# Admission attempt for one ticket; returns {1, 0} when admitted, {0, wait_ms} to retry
+# later (wait_ms = 0: poll), {-1, 0} if the ticket is no longer queued (deadline passed).
+# KEYS: queue, waiting, inflight, buckets, cooldown
+# ARGV: ticket, now_ms, rpm, tpm, max_concurrency, lease_ms, key_ttl_ms
+ACQUIRE_SCRIPT = """
+local ticket = ARGV[1]
+local now = tonumber(ARGV[2])
+local rpm = tonumber(ARGV[3])
+local tpm = tonumber(ARGV[4])
+local max_concurrency = tonumber(ARGV[5])
+local lease_ms = tonumber(ARGV[6])
+local key_ttl_ms = tonumber(ARGV[7])
+
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+
+-- Walk the head of the queue, dropping waiters whose deadline passed (their process gave up or died)
+local rank, cost, head_cost = nil, 0, 0
+local live = 0
+for _, t in ipairs(redis.call('ZRANGE', KEYS[1], 0, 99)) do
+  local deadline, c = 0, 0
+  local meta = redis.call('HGET', KEYS[2], t)
+  if meta then
+    local d, cc = string.match(meta, '^(%d+):(%d+)$')
+    if d then deadline, c = tonumber(d), tonumber(cc) end
+  end
+  if deadline < now then
+    redis.call('ZREM', KEYS[1], t)
+    redis.call('HDEL', KEYS[2], t)
+  else
+    if live == 0 then head_cost = c end
+    if t == ticket then
+      rank, cost = live, c
+      break
+    end
+    live = live + 1
+  end
+end
+if rank == nil then
+  if redis.call('ZSCORE', KEYS[1], ticket) then return {0, 0} end
+  return {-1, 0}
+end
+
+local cooldown = redis.call('PTTL', KEYS[5])
+if cooldown > 0 then return {0, cooldown} end
+
+if max_concurrency > 0 and rank >= max_concurrency - redis.call('ZCARD', KEYS[3]) then
+  return {0, 0}
+end
+
+-- Waiters behind the head leave the head's share in the buckets so a large
+-- high-priority request is not starved by a stream of small ones
+local function bucket(name, capacity, need, reserve)
+  if capacity <= 0 then return nil, 0 end
+  local level = tonumber(redis.call('HGET', KEYS[4], name) or capacity)
+  local ts = tonumber(redis.call('HGET', KEYS[4], name .. ':ts') or now)
+  level = math.min(capacity, level + math.max(0, now - ts) * capacity / 60000)
+  need = math.min(need + reserve, capacity)
+  if level >= need then return level, 0 end
+  return level, math.ceil((need - level) * 60000 / capacity)
+end
+
+local reserve_req, reserve_tok = 0, 0
+if rank > 0 then reserve_req, reserve_tok = 1, head_cost end
+local req_level, req_wait = bucket('req', rpm, 1, reserve_req)
+local tok_level, tok_wait = bucket('tok', tpm, cost, reserve_tok)
+local wait = math.max(req_wait, tok_wait)
+if wait > 0 then return {0, wait} end
+
+if req_level then redis.call('HSET', KEYS[4], 'req', req_level - 1, 'req:ts', now) end
+if tok_level then redis.call('HSET', KEYS[4], 'tok', tok_level - math.min(cost, tpm), 'tok:ts', now) end
+
+redis.call('ZREM', KEYS[1], ticket)
+redis.call('HDEL', KEYS[2], ticket)
+redis.call('ZADD', KEYS[3], now + lease_ms, ticket)
+for i = 1, 4 do redis.call('PEXPIRE', KEYS[i], key_ttl_ms) end
+return {1, 0}
+"""
+
+
+def estimate_tokens(*texts: Optional[str], max_tokens: int = 0) -> int:
+    """Rough prompt + completion size (~4 characters per token)"""
+    return sum(len(t or "") for t in texts) // 4 + (max_tokens or 0)
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    """Seconds to back off, from Retry-After (seconds or HTTP date) or OpenAI's retry-after-ms"""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Slot:
+    """An admitted call; collects the provider's back-off request while it runs"""
+
+    def __init__(self, config_id: int, ticket: str):
+        self.config_id = config_id
+        self.ticket = ticket
+        self.active = True
+        self.retry_after: Optional[float] = None
+
+    def observe(self, response: httpx.Response) -> None:
+        if response.status_code == 429:
+            self.retry_after = parse_retry_after(response) or settings.AI_SCHEDULER_DEFAULT_BACKOFF
+        elif response.status_code == 503:
+            self.retry_after = parse_retry_after(response)
+
+
+# Slot of the provider call running in this task, so the shared HTTP clients'
+# response hook can attribute 429s to the right config
+_current_slot: ContextVar[Optional[_Slot]] = ContextVar("ai_scheduler_slot", default=None)
+
+
+class AIScheduler:
+    """Redis-backed per-config admission control with priority classes"""
+
+    def __init__(self, redis_url: str = None, enabled: bool = None):
+        self._redis_url = redis_url or settings.REDIS_URL
+        self.enabled = settings.AI_SCHEDULER_ENABLED if enabled is None else enabled
+        self._redis = None
+        self._script = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+        self.stats = {
+            "admitted": 0,
+            "queued": 0,
+            "wait_total_ms": 0.0,
+            "wait_max_ms": 0.0,
+            "timeouts": 0,
+            "rate_limited": 0,
+            "failovers": 0,
+            "unscheduled": 0,
+        }
+
+    def limits_for(self, config) -> ProviderLimits:
+        defaults = DEFAULT_LIMITS.get(config.provider, ProviderLimits())
+        options = getattr(config, "config", None) or {}
+        return ProviderLimits(
+            max_concurrency=int(options.get("max_concurrency", defaults.max_concurrency)),
+            rpm=int(options.get("rate_limit_rpm", defaults.rpm)),
+            tpm=int(options.get("rate_limit_tpm", defaults.tpm)),
+        )
+
+    @asynccontextmanager
+    async def slot(self, config, priority: str = PRIORITY_INTERACTIVE, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        """
+        Wait for capacity on `config`, then run the body holding a slot.
+        Raises AISchedulerTimeout if the priority class's max wait passes first.
+        """
+        config_id = getattr(config, "id", None)
+        if not self.enabled or config_id is None:
+            yield
+            return
+
+        slot = await self._acquire(config, priority, estimated_tokens)
+        if slot is None:
+            yield
+            return
+
+        # Not reset with a token: streamed bodies may finish in another task/context
+        _current_slot.set(slot)
+        try:
+            yield
+        except httpx.HTTPStatusError as e:
+            if slot.retry_after is None:
+                slot.observe(e.response)
+            raise
+        finally:
+            slot.active = False
+            await self._release(slot)
+
+    async def should_fail_over(self, config_id: int) -> bool:
+        """True when the config is cooling down or its queue is too deep to wait on"""
+        client = self._get_redis()
+        if not self.enabled or client is None:
+            return False
+        keys = self._keys(config_id)
+        try:
+            depth, cooldown = await client.zcard(keys[0]), await client.pttl(keys[4])
+        except Exception as e:
+            self._redis_failed(e)
+            return False
+        if cooldown > 0 or depth >= settings.AI_SCHEDULER_FAILOVER_QUEUE_DEPTH:
+            self.stats["failovers"] += 1
+            return True
+        return False
+
+    async def status(self, config_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Queue depth, in-flight calls and remaining cool-down per config"""
+        client = self._get_redis()
+        if client is None:
+            return {}
+        now_ms = int(time.time() * 1000)
+        result = {}
+        try:
+            for config_id in config_ids:
+                keys = self._keys(config_id)
+                result[config_id] = {
+                    "queued": await client.zcard(keys[0]),
+                    "in_flight": await client.zcount(keys[2], now_ms, "+inf"),
+                    "cooldown_ms": max(0, await client.pttl(keys[4])),
+                }
+        except Exception as e:
+            self._redis_failed(e)
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "enabled": self.enabled}
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    @staticmethod
+    def _keys(config_id: int) -> List[str]:
+        base = f"{KEY_PREFIX}{config_id}:"
+        return [base + name for name in ("queue", "waiting", "inflight", "buckets", "cooldown")]
+
+    async def _acquire(self, config, priority: str, estimated_tokens: int) -> Optional[_Slot]:
+        client = self._get_redis()
+        if client is None:
+            self.stats["unscheduled"] += 1
+            return None
+
+        priority_class = PRIORITY_CLASSES.get(priority, PRIORITY_CLASSES[PRIORITY_SITE_GENERATION])
+        limits = self.limits_for(config)
+        keys = self._keys(config.id)
+        ticket = uuid.uuid4().hex
+        started = time.time()
+        deadline = started + priority_class.max_wait
+        lease_ms = settings.AI_SCHEDULER_LEASE_SECONDS * 1000
+
+        try:
+            pipe = client.pipeline(transaction=True)
+            pipe.zadd(keys[0], {ticket: priority_class.rank * 1e13 + int(started * 1000)})
+            pipe.hset(keys[1], ticket, f"{int(deadline * 1000)}:{int(estimated_tokens)}")
+            pipe.pexpire(keys[0], KEY_TTL_MS)
+            pipe.pexpire(keys[1], KEY_TTL_MS)
+            await pipe.execute()
+
+            queued = False
+            while True:
+                admitted, wait_ms = await self._script(
+                    keys=keys,
+                    args=[ticket, int(time.time() * 1000), limits.rpm, limits.tpm, limits.max_concurrency, lease_ms, KEY_TTL_MS],
+                )
+                if admitted == 1:
+                    self._record_wait((time.time() - started) * 1000)
+                    return _Slot(config.id, ticket)
+
+                remaining = deadline - time.time()
+                if admitted == -1 or remaining <= 0 or wait_ms / 1000 > remaining:
+                    raise AISchedulerTimeout(
+                        f"AI provider {config.provider}/{config.model_name} busy: no capacity within {priority_class.max_wait:.0f}s"
+                    )
+                if not queued:
+                    queued = True
+                    self.stats["queued"] += 1
+
+                poll = settings.AI_SCHEDULER_POLL_INTERVAL * random.uniform(0.5, 1.5)
+                await asyncio.sleep(min(max(wait_ms / 1000, poll), remaining))
+        except AISchedulerTimeout:
+            self.stats["timeouts"] += 1
+            await self._abandon(keys, ticket)
+            raise
+        except asyncio.CancelledError:
+            await self._abandon(keys, ticket)
+            raise
+        except Exception as e:
+            self._redis_failed(e)
+            self.stats["unscheduled"] += 1
+            return None
+
+    async def _release(self, slot: _Slot) -> None:
+        client = self._get_redis()
+        if client is None:
+            return
+        keys = self._keys(slot.config_id)
+        try:
+            await client.zrem(keys[2], slot.ticket)
+            if slot.retry_after:
+                self.stats["rate_limited"] += 1
+                cooldown_ms = int(slot.retry_after * 1000)
+                if cooldown_ms > await client.pttl(keys[4]):
+                    await client.set(keys[4], "1", px=cooldown_ms)
+                logger.warning(f"AI config {slot.config_id} rate limited, pausing admissions for {slot.retry_after:.1f}s")
+        except Exception as e:
+            self._redis_failed(e)
+
+    async def _abandon(self, keys: List[str], ticket: str) -> None:
+        try:
+            await self._redis.zrem(keys[0], ticket)
+            await self._redis.hdel(keys[1], ticket)
+        except Exception:
+            # The next admission attempt purges it once its deadline passes
+            pass
+
+    async def _observe_response(self, response: httpx.Response) -> None:
+        slot = _current_slot.get()
+        if slot is not None and slot.active:
+            slot.observe(response)
+
+    def _record_wait(self, wait_ms: float) -> None:
+        self.stats["admitted"] += 1
+        self.stats["wait_total_ms"] += wait_ms
+        self.stats["wait_max_ms"] = max(self.stats["wait_max_ms"], wait_ms)
+
+    def _get_redis(self):
+        """redis.asyncio clients are loop-bound; rebuild when the running loop changes"""
+        if time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(
+                self._redis_url,
+                socket_connect_timeout=2,
+                socket_timeout=5,
+            )
+            self._script = self._redis.register_script(ACQUIRE_SCRIPT)
+            self._loop = loop
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"AI scheduler: Redis unavailable, calls run unscheduled for {REDIS_RETRY_AFTER:.0f}s: {error}")
+
+
+ai_scheduler = AIScheduler()
+http_clients.add_response_hook(ai_scheduler._observe_response)
@@ -3,11 +3,14 @@ AI Service Wrapper
 Handles interactions with multiple AI providers (OpenAI, Anthropic, etc.)
 using dynamic configuration and task routing.
 """
-from typing import Dict, Any, Optional
-from sqlalchemy import select
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.models.ai_config import AITaskRouting, AIConfig
+from app.core.http_clients import http_clients
+from app.services.ai_config_cache import ai_config_cache, AIConfigSnapshot, AIRoutingSnapshot
+from app.services.ai_response_cache import ai_response_cache
+from app.services.ai_scheduler import ai_scheduler, estimate_tokens, PRIORITY_SITE_GENERATION
 import httpx
 import json
 import logging
@@ -15,21 +18,65 @@ import traceback
 
 logger = logging.getLogger(__name__)
 
+# OpenAI-compatible providers and the base URL that overrides config.base_url (None = use config)
+OPENAI_COMPATIBLE_BASE_URLS = {
+    "openai": None,
+    "grok": "https://api.x.ai/v1",
+    "deepseek": "https://api.deepseek.com",
+    "mistral": "https://api.mistral.ai/v1",
+}
+
+
+@asynccontextmanager
+async def _open_stream(client: httpx.AsyncClient, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+    """POST with a streamed body; error responses are read fully so raise_for_status has the text"""
+    async with client.stream("POST", url, **kwargs) as resp:
+        if resp.is_error:
+            await resp.aread()
+            resp.raise_for_status()
+        yield resp
+
+
+async def _iter_sse_data(resp: httpx.Response) -> AsyncIterator[str]:
+    """Yield the data payload of each Server-Sent Event (OpenAI, Anthropic, Gemini, Workers AI)"""
+    data_lines = []
+    async for line in resp.aiter_lines():
+        if not line:
+            if data_lines:
+                yield "\n".join(data_lines)
+                data_lines = []
+            continue
+        if line.startswith("data:"):
+            value = line[5:]
+            data_lines.append(value[1:] if value.startswith(" ") else value)
+    if data_lines:
+        yield "\n".join(data_lines)
+
+
+async def _iter_ndjson(resp: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one object per line of a newline-delimited JSON stream (Ollama, Cohere)"""
+    async for line in resp.aiter_lines():
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
 class AIService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, priority: str = PRIORITY_SITE_GENERATION):
         self.db = db
+        # Scheduling class for provider calls (see ai_scheduler.PRIORITY_CLASSES)
+        self.priority = priority
 
-    async def get_routing_for_task(self, task_type: str) -> Optional[AITaskRouting]:
-        """Get routing rules for a specific task"""
-        result = await self.db.execute(select(AITaskRouting).where(AITaskRouting.task_type == task_type))
-        return result.scalar_one_or_none()
+    async def get_routing_for_task(self, task_type: str) -> Optional[AIRoutingSnapshot]:
+        """Get routing rules for a specific task (cached, see ai_config_cache)"""
+        return await ai_config_cache.get_routing(self.db, task_type)
 
-    async def get_config(self, config_id: int) -> Optional[AIConfig]:
+    async def get_config(self, config_id: int) -> Optional[AIConfigSnapshot]:
         """Public helper to load a config by id."""
         return await self._get_config(config_id)
 
-    async def _get_config(self, config_id: int) -> Optional[AIConfig]:
-        return await self.db.get(AIConfig, config_id)
+    async def _get_config(self, config_id: int) -> Optional[AIConfigSnapshot]:
+        return await ai_config_cache.get_config(self.db, config_id)
 
     async def validate_task(self, task_type: str) -> Dict[str, Any]:
         """Validates that a task has routing and usable primary config."""
@@ -71,33 +118,79 @@ class AIService:
 
         return {"ok": True}
 
-    async def generate(self, task_type: str, prompt: str, system_instruction: str = None, context: Dict[str, Any] = None) -> Dict[str, Any]:
+    async def generate(
+        self,
+        task_type: str,
+        prompt: str,
+        system_instruction: str = None,
+        context: Dict[str, Any] = None,
+        bypass_cache: bool = False,
+    ) -> Dict[str, Any]:
         """
         Main entry point for generation.
         1. Checks routing for task_type
         2. Selects provider
-        3. Calls provider
+        3. Serves from the response cache when the task opted in (unless bypass_cache)
+        4. Calls provider
+
+        Cacheable responses carry "cache_key" (and "cached": True on hits) so callers
+        can ai_response_cache.discard() content they end up rejecting.
         """
         routing = await self.get_routing_for_task(task_type)
         if not routing:
             raise ValueError(f"No routing rules defined for task: {task_type}")
 
-        # Try primary
+        first, second = await self._provider_order(routing)
         try:
-            return await self._call_provider(routing.primary_config_id, prompt, system_instruction, routing.temperature)
+            return await self._call_routed(routing, first, prompt, system_instruction, bypass_cache)
         except Exception as e:
-            logger.error(f"Primary provider failed for {task_type}: {e}")
-            if routing.fallback_config_id:
+            logger.error(f"Provider {first} failed for {task_type}: {e}")
+            if second:
                 logger.info(f"Retrying with fallback provider for {task_type}")
-                return await self._call_provider(routing.fallback_config_id, prompt, system_instruction, routing.temperature)
+                return await self._call_routed(routing, second, prompt, system_instruction, bypass_cache)
             raise e
 
+    async def _provider_order(self, routing: AIRoutingSnapshot):
+        """(first, second) config ids: the fallback goes first while the primary is saturated or cooling down"""
+        primary, fallback = routing.primary_config_id, routing.fallback_config_id
+        if fallback and await ai_scheduler.should_fail_over(primary):
+            logger.info(f"Primary provider {primary} for {routing.task_type} is saturated, trying fallback {fallback} first")
+            return fallback, primary
+        return primary, fallback
+
+    async def _call_routed(self, routing: AIRoutingSnapshot, config_id: int, prompt: str, system: str, bypass_cache: bool) -> Dict[str, Any]:
+        """Calls the provider through the response cache when the routing rule enables it"""
+        if not routing.cache_enabled:
+            return await self._call_provider(config_id, prompt, system, routing.temperature)
+
+        config = await self._get_config(config_id)
+        if not config:
+            raise ValueError(f"AI Config {config_id} not found")
+
+        key = ai_response_cache.make_key(config.provider, config.model_name, routing.temperature, system, prompt)
+        if bypass_cache:
+            ai_response_cache.record_bypass()
+        else:
+            cached = await ai_response_cache.get(key)
+            if cached is not None:
+                logger.info(f"AI response cache hit for task {routing.task_type} ({config.provider}/{config.model_name})")
+                return {**cached, "cached": True, "cache_key": key}
+
+        response = await self._call_provider(config_id, prompt, system, routing.temperature)
+        if response and response.get("content"):
+            await ai_response_cache.set(key, response, ttl=routing.cache_ttl_seconds)
+        return {**response, "cache_key": key}
+
     async def _call_provider(self, config_id: int, prompt: str, system: str, temperature: float) -> Dict[str, Any]:
         """Dispatches the call to the appropriate provider logic."""
         config = await self._get_config(config_id)
         if not config:
             raise ValueError(f"AI Config {config_id} not found")
 
+        async with ai_scheduler.slot(config, self.priority, estimate_tokens(prompt, system, max_tokens=4096)):
+            return await self._dispatch(config, prompt, system, temperature)
+
+    async def _dispatch(self, config, prompt: str, system: str, temperature: float) -> Dict[str, Any]:
         if config.provider == "openai":
             return await self._call_openai(config, prompt, system, temperature)
         elif config.provider == "anthropic":
@@ -117,7 +210,8 @@ class AIService:
         else:
             raise ValueError(f"Provider {config.provider} not implemented in AIService yet.")
 
-    async def _call_cloudflare(self, config, prompt, system, temperature):
+    @staticmethod
+    def _cloudflare_url(config) -> str:
         # Config example:
         # base_url="https://api.cloudflare.com/client/v4/accounts/{ID}/ai/run"
         # model="@cf/meta/llama-3-8b-instruct"
@@ -145,7 +239,10 @@ class AIService:
             else:
                 model_name = f"@cf/{model_name}"
         
-        url = f"{base}/{model_name}"
+        return f"{base}/{model_name}"
+
+    async def _call_cloudflare(self, config, prompt, system, temperature):
+        url = self._cloudflare_url(config)
         
         headers = {
             "Authorization": f"Bearer {config.api_key}",
@@ -161,12 +258,12 @@ class AIService:
         # Cloudflare models can take time for large code generation tasks
         # Use explicit Timeout object to ensure it's applied correctly
         timeout = httpx.Timeout(300.0, connect=30.0)  # 5 min total, 30s connect
-        async with httpx.AsyncClient(timeout=timeout) as client:
+        async with http_clients.client("ai") as client:
             try:
                 resp = await client.post(url, headers=headers, json={
                     "messages": messages,
                     "max_tokens": 4096
-                })
+                }, timeout=timeout)
                 resp.raise_for_status()
                 data = resp.json()
                 # Cloudflare response format: { "success": true, "result": { "response": "..." } }
@@ -202,7 +299,7 @@ class AIService:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        async with http_clients.client("ai") as client:
             resp = await client.post(url, headers=headers, json={
                 "model": config.model_name,
                 "messages": messages,
@@ -220,7 +317,7 @@ class AIService:
             "anthropic-version": "2023-06-01",
             "Content-Type": "application/json"
         }
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        async with http_clients.client("ai") as client:
             resp = await client.post(url, headers=headers, json={
                 "model": config.model_name,
                 "system": system,
@@ -245,7 +342,7 @@ class AIService:
         
         contents.append({"role": "user", "parts": [{"text": prompt}]})
 
-        async with httpx.AsyncClient(timeout=120.0) as client:
+        async with http_clients.client("ai") as client:
             resp = await client.post(url, json={
                 "contents": contents,
                 "generationConfig": {
@@ -259,7 +356,7 @@ class AIService:
 
     async def _call_ollama(self, config, prompt, system, temperature):
          url = (config.base_url or "http://localhost:11434") + "/api/generate"
-         async with httpx.AsyncClient(timeout=120.0) as client:
+         async with http_clients.client("ollama") as client:
             resp = await client.post(url, json={
                 "model": config.model_name,
                 "system": system,
@@ -291,8 +388,256 @@ class AIService:
          if system:
              body["preamble"] = system
              
-         async with httpx.AsyncClient(timeout=120.0) as client:
+         async with http_clients.client("ai") as client:
             resp = await client.post(url, headers=headers, json=body)
             resp.raise_for_status()
             data = resp.json()
             return {"content": data["text"]}
+
+    # ------------------------------------------------------------------ #
+    # Streaming
+    # ------------------------------------------------------------------ #
+
+    async def stream(
+        self,
+        task_type: str,
+        prompt: str,
+        system_instruction: str = None,
+        bypass_cache: bool = False,
+        meta: Dict[str, Any] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of generate(): yields text deltas as the provider emits them.
+        The fallback provider is only tried if the primary fails before its first delta.
+
+        Goes through the response cache like generate() (same keys): a hit is replayed as
+        a single delta and a stream that completes is stored. When given, `meta` receives
+        "cache_key" (and "cached": True on hits) so callers can discard what they reject.
+        """
+        routing = await self.get_routing_for_task(task_type)
+        if not routing:
+            raise ValueError(f"No routing rules defined for task: {task_type}")
+
+        first, second = await self._provider_order(routing)
+        started = False
+        try:
+            async for delta in self._stream_routed(routing, first, prompt, system_instruction, bypass_cache, meta):
+                started = True
+                yield delta
+        except Exception as e:
+            if started or not second:
+                raise
+            logger.error(f"Provider {first} failed to stream for {task_type}: {e}")
+            logger.info(f"Retrying stream with fallback provider for {task_type}")
+            async for delta in self._stream_routed(routing, second, prompt, system_instruction, bypass_cache, meta):
+                yield delta
+
+    async def _stream_routed(
+        self, routing: AIRoutingSnapshot, config_id: int, prompt: str, system: str, bypass_cache: bool, meta: Optional[Dict[str, Any]]
+    ) -> AsyncIterator[str]:
+        """Streams from one provider through the response cache when the routing rule enables it"""
+        config = await self._get_config(config_id)
+        if not config:
+            raise ValueError(f"AI Config {config_id} not found")
+        if not routing.cache_enabled:
+            async for delta in self.stream_with_config(config, prompt, system, routing.temperature):
+                yield delta
+            return
+
+        key = ai_response_cache.make_key(config.provider, config.model_name, routing.temperature, system, prompt)
+        if meta is not None:
+            meta["cache_key"] = key
+        if bypass_cache:
+            ai_response_cache.record_bypass()
+        else:
+            cached = await ai_response_cache.get(key)
+            if cached is not None and cached.get("content"):
+                logger.info(f"AI response cache hit for task {routing.task_type} ({config.provider}/{config.model_name})")
+                if meta is not None:
+                    meta["cached"] = True
+                yield cached["content"]
+                return
+
+        parts = []
+        async for delta in self.stream_with_config(config, prompt, system, routing.temperature):
+            parts.append(delta)
+            yield delta
+        if parts:
+            await ai_response_cache.set(key, {"content": "".join(parts)}, ttl=routing.cache_ttl_seconds)
+
+    async def stream_with_config(
+        self,
+        config,
+        prompt: str,
+        system: str = None,
+        temperature: float = 0.7,
+        max_tokens: int = None,
+    ) -> AsyncIterator[str]:
+        """Stream from a specific provider config, normalising SSE/NDJSON protocols into text deltas"""
+        provider = config.provider
+        if provider in OPENAI_COMPATIBLE_BASE_URLS:
+            deltas = self._stream_openai(config, prompt, system, temperature, max_tokens, OPENAI_COMPATIBLE_BASE_URLS[provider])
+        elif provider == "anthropic":
+            deltas = self._stream_anthropic(config, prompt, system, temperature, max_tokens)
+        elif provider == "google":
+            deltas = self._stream_google(config, prompt, system, temperature, max_tokens)
+        elif provider == "ollama":
+            deltas = self._stream_ollama(config, prompt, system, temperature, max_tokens)
+        elif provider == "cohere":
+            deltas = self._stream_cohere(config, prompt, system, temperature, max_tokens)
+        elif provider == "cloudflare":
+            deltas = self._stream_cloudflare(config, prompt, system, temperature, max_tokens)
+        else:
+            raise ValueError(f"Provider {provider} does not support streaming in AIService yet.")
+
+        async with ai_scheduler.slot(config, self.priority, estimate_tokens(prompt, system, max_tokens=max_tokens or 4096)):
+            async for delta in deltas:
+                if delta:
+                    yield delta
+
+    async def _stream_openai(self, config, prompt, system, temperature, max_tokens=None, base_url=None):
+        url = (base_url or config.base_url or "https://api.openai.com/v1") + "/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        }
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+        body = {
+            "model": config.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "stream": True
+        }
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+
+        async with http_clients.client("ai") as client:
+            async with _open_stream(client, url, headers=headers, json=body) as resp:
+                async for data in _iter_sse_data(resp):
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or []
+                    if choices:
+                        yield (choices[0].get("delta") or {}).get("content")
+
+    async def _stream_anthropic(self, config, prompt, system, temperature, max_tokens=None):
+        url = "https://api.anthropic.com/v1/messages"
+        headers = {
+            "x-api-key": config.api_key,
+            "anthropic-version": "2023-06-01",
+            "Content-Type": "application/json"
+        }
+        body = {
+            "model": config.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "max_tokens": max_tokens or 4096,
+            "stream": True
+        }
+        if system:
+            body["system"] = system
+
+        async with http_clients.client("ai") as client:
+            async with _open_stream(client, url, headers=headers, json=body) as resp:
+                async for data in _iter_sse_data(resp):
+                    event = json.loads(data)
+                    if event.get("type") == "content_block_delta":
+                        yield event["delta"].get("text")
+                    elif event.get("type") == "message_stop":
+                        break
+                    elif event.get("type") == "error":
+                        raise ValueError(f"Anthropic stream error: {event.get('error')}")
+
+    async def _stream_google(self, config, prompt, system, temperature, max_tokens=None):
+        url = f"https://generativelanguage.googleapis.com/v1/models/{config.model_name}:streamGenerateContent"
+        contents = []
+        if system:
+            contents.append({"role": "user", "parts": [{"text": f"System Instruction: {system}"}]})
+            contents.append({"role": "model", "parts": [{"text": "Understood."}]})
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        generation_config = {"temperature": temperature}
+        if max_tokens:
+            generation_config["maxOutputTokens"] = max_tokens
+
+        async with http_clients.client("ai") as client:
+            async with _open_stream(
+                client, url,
+                params={"alt": "sse", "key": config.api_key},
+                json={"contents": contents, "generationConfig": generation_config}
+            ) as resp:
+                async for data in _iter_sse_data(resp):
+                    for candidate in json.loads(data).get("candidates") or []:
+                        for part in (candidate.get("content") or {}).get("parts") or []:
+                            yield part.get("text")
+
+    async def _stream_ollama(self, config, prompt, system, temperature, max_tokens=None):
+        url = (config.base_url or "http://localhost:11434") + "/api/generate"
+        options = {"temperature": temperature}
+        if max_tokens:
+            options["num_predict"] = max_tokens
+
+        async with http_clients.client("ollama") as client:
+            async with _open_stream(client, url, json={
+                "model": config.model_name,
+                "system": system,
+                "prompt": prompt,
+                "stream": True,
+                "options": options
+            }) as resp:
+                async for chunk in _iter_ndjson(resp):
+                    if chunk.get("error"):
+                        raise ValueError(f"Ollama stream error: {chunk['error']}")
+                    yield chunk.get("response")
+                    if chunk.get("done"):
+                        break
+
+    async def _stream_cohere(self, config, prompt, system, temperature, max_tokens=None):
+        url = "https://api.cohere.com/v1/chat"
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json",
+            "X-Client-Name": "Innexar-CRM"
+        }
+        body = {
+            "model": config.model_name,
+            "message": prompt,
+            "temperature": temperature,
+            "stream": True
+        }
+        if system:
+            body["preamble"] = system
+        if max_tokens:
+            body["max_tokens"] = max_tokens
+
+        async with http_clients.client("ai") as client:
+            async with _open_stream(client, url, headers=headers, json=body) as resp:
+                async for event in _iter_ndjson(resp):
+                    if event.get("event_type") == "text-generation":
+                        yield event.get("text")
+                    elif event.get("event_type") == "stream-end":
+                        break
+
+    async def _stream_cloudflare(self, config, prompt, system, temperature, max_tokens=None):
+        url = self._cloudflare_url(config)
+        headers = {
+            "Authorization": f"Bearer {config.api_key}",
+            "Content-Type": "application/json"
+        }
+        messages = []
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+
+        async with http_clients.client("ai") as client:
+            async with _open_stream(client, url, headers=headers, json={
+                "messages": messages,
+                "max_tokens": max_tokens or 4096,
+                "stream": True
+            }) as resp:
+                async for data in _iter_sse_data(resp):
+                    if data == "[DONE]":
+                        break
+                    yield json.loads(data).get("response")
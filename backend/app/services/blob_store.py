@@ -0,0 +1,200 @@
+"""
+Blob Store
+Content-addressed files on local disk: each distinct content is stored once,
+read-only, under objects/<2 hex>/<sha256>, and placed into working trees as a
+reflink (copy-on-write clone), a hardlink or, failing both, a plain copy.
+
+The store must live on the same filesystem as the trees it materializes into
+for reflinks and hardlinks to work (by default it sits under SITES_BASE_DIR).
+
+A hardlinked file shares its inode with the blob: writing into it in place
+would change the blob and every other tree that links it. Code that rewrites
+files in a materialized tree goes through write_file(), which swaps in a new
+inode instead.
+"""
+import errno
+import hashlib
+import logging
+import os
+import shutil
+import stat
+from typing import Optional, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# ioctl(dest_fd, FICLONE, src_fd): Linux reflink on btrfs, XFS (reflink=1), overlayfs over those, ...
+FICLONE = 0x40049409
+
+_CHUNK = 1024 * 1024
+
+MODES = ("auto", "reflink", "hardlink", "copy")
+
+
+def default_root() -> str:
+    base_dir = os.getenv("SITES_BASE_DIR", "/app/generated_sites")
+    return settings.BLOB_STORE_DIR or os.path.join(base_dir, ".store")
+
+
+def file_digest(path: str) -> Tuple[str, int]:
+    """sha256 hex and size of a file"""
+    h = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+            size += len(chunk)
+    return h.hexdigest(), size
+
+
+def write_file(path: str, content: Union[str, bytes]) -> None:
+    """
+    Write a file in a materialized tree by swapping in a new inode: never writes
+    through a hardlink into the store, and readers never see it half-written.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    if isinstance(content, str):
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(content)
+    else:
+        with open(tmp, "wb") as f:
+            f.write(content)
+    os.replace(tmp, path)
+
+
+class BlobStore:
+    """Content-addressed blobs plus the reflink/hardlink/copy placement of them"""
+
+    def __init__(self, root: str = None, mode: str = None):
+        self.root = root or default_root()
+        self.mode = mode or settings.BLOB_MATERIALIZE_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown materialize mode {self.mode!r}, expected one of {MODES}")
+        # Learned on first use in "auto": which of reflink/hardlink this filesystem supports
+        self._reflink_ok: Optional[bool] = None
+        self._hardlink_ok: Optional[bool] = None
+        self.stats = {"stored": 0, "deduplicated": 0, "reflinked": 0, "hardlinked": 0, "copied": 0}
+
+    # ------------------------------------------------------------------ #
+    # Storing
+    # ------------------------------------------------------------------ #
+
+    def path(self, digest: str, executable: bool = False) -> str:
+        # Executable blobs are kept apart: a hardlink shares its mode with every other link
+        name = f"{digest}.x" if executable else digest
+        return os.path.join(self.root, "objects", digest[:2], name)
+
+    def has(self, digest: str, executable: bool = False) -> bool:
+        return os.path.exists(self.path(digest, executable))
+
+    def put_file(self, src: str, digest: str = None, executable: bool = None) -> str:
+        """Store a file's content (once) and return its digest"""
+        if digest is None:
+            digest, _ = file_digest(src)
+        if executable is None:
+            executable = bool(os.stat(src).st_mode & stat.S_IXUSR)
+        dest = self.path(digest, executable)
+        if os.path.exists(dest):
+            self.stats["deduplicated"] += 1
+            return digest
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        shutil.copyfile(src, tmp)
+        self._seal(tmp, executable)
+        os.replace(tmp, dest)
+        self.stats["stored"] += 1
+        return digest
+
+    def put_bytes(self, data: bytes, executable: bool = False) -> str:
+        """Store a content given in memory and return its digest"""
+        digest = hashlib.sha256(data).hexdigest()
+        dest = self.path(digest, executable)
+        if os.path.exists(dest):
+            self.stats["deduplicated"] += 1
+            return digest
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        self._seal(tmp, executable)
+        os.replace(tmp, dest)
+        self.stats["stored"] += 1
+        return digest
+
+    # ------------------------------------------------------------------ #
+    # Materializing
+    # ------------------------------------------------------------------ #
+
+    def materialize(self, digest: str, dest: str, executable: bool = False) -> str:
+        """
+        Place a blob at dest (replacing whatever is there) and return how:
+        "reflinked", "hardlinked" or "copied".
+        """
+        src = self.path(digest, executable)
+        if os.path.lexists(dest):
+            os.unlink(dest)
+        if self.mode in ("auto", "reflink") and self._reflink_ok is not False:
+            try:
+                self._reflink(src, dest, executable)
+                self._reflink_ok = True
+                return self._count("reflinked")
+            except OSError as e:
+                if self.mode == "reflink" or not _unsupported(e):
+                    raise
+                self._reflink_ok = False
+        if self.mode in ("auto", "hardlink") and self._hardlink_ok is not False:
+            try:
+                os.link(src, dest)
+                self._hardlink_ok = True
+                return self._count("hardlinked")
+            except OSError as e:
+                if self.mode == "hardlink" or not _unsupported(e):
+                    raise
+                self._hardlink_ok = False
+                logger.warning(f"Blob store at {self.root} can't hardlink into {os.path.dirname(dest)}, copying: {e}")
+        copy_private(src, dest, executable)
+        return self._count("copied")
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _count(self, how: str) -> str:
+        self.stats[how] += 1
+        return how
+
+    @staticmethod
+    def _seal(path: str, executable: bool) -> None:
+        os.chmod(path, 0o555 if executable else 0o444)
+
+    @staticmethod
+    def _reflink(src: str, dest: str, executable: bool) -> None:
+        import fcntl
+        with open(src, "rb") as s:
+            fd = os.open(dest, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o755 if executable else 0o644)
+            try:
+                fcntl.ioctl(fd, FICLONE, s.fileno())
+            except OSError:
+                os.close(fd)
+                os.unlink(dest)
+                raise
+            os.close(fd)
+
+
+def copy_private(src: str, dest: str, executable: bool = False) -> None:
+    """A writable copy of its own (for files that will be modified)"""
+    shutil.copyfile(src, dest)
+    os.chmod(dest, 0o755 if executable else 0o644)
+
+
+def _unsupported(error: OSError) -> bool:
+    # Filesystem can't do it (or not across these two paths): fall back instead of failing
+    return error.errno in (
+        errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY,
+        errno.EPERM, errno.EMLINK, errno.ENOSYS,
+    )
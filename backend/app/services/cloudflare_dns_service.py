@@ -2,11 +2,11 @@
 Cloudflare DNS Service
 Handles DNS record management for subdomains
 """
-import httpx
 import logging
 from typing import Optional, Dict, Any, List
 from sqlalchemy.orm import Session
 from app.services.config_service import ConfigService
+from app.core.http_clients import http_clients
 from app.models.configuration import IntegrationType
 
 logger = logging.getLogger(__name__)
@@ -58,7 +58,7 @@ class CloudflareDNSService:
         """
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/zones/{self._zone_id}/dns_records"
             
             payload = {
@@ -97,7 +97,7 @@ class CloudflareDNSService:
         """Get DNS record by name"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/zones/{self._zone_id}/dns_records"
             params = {
                 "name": subdomain,
@@ -125,7 +125,7 @@ class CloudflareDNSService:
         """Update an existing DNS record"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/zones/{self._zone_id}/dns_records/{record_id}"
             
             payload = {
@@ -161,7 +161,7 @@ class CloudflareDNSService:
         """Delete a DNS record"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/zones/{self._zone_id}/dns_records/{record_id}"
             
             response = await client.delete(
@@ -184,7 +184,7 @@ class CloudflareDNSService:
         """List all DNS records in the zone"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/zones/{self._zone_id}/dns_records"
             params = {}
             if record_type:
@@ -2,11 +2,11 @@
 Cloudflare Pages Service
 Handles deployment to Cloudflare Pages
 """
-import httpx
 import logging
 from typing import Optional, Dict, Any
 from sqlalchemy.orm import Session
 from app.services.config_service import ConfigService
+from app.core.http_clients import http_clients
 from app.models.configuration import IntegrationType
 
 logger = logging.getLogger(__name__)
@@ -57,7 +57,7 @@ class CloudflarePagesService:
         """
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/accounts/{self._account_id}/pages/projects"
             
             payload = {
@@ -102,7 +102,7 @@ class CloudflarePagesService:
         self._load_config()
         
         # First, get upload token
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             # Get upload token
             token_url = f"https://api.cloudflare.com/client/v4/accounts/{self._account_id}/pages/projects/{project_name}/upload-tokens"
             token_response = await client.post(
@@ -141,7 +141,7 @@ class CloudflarePagesService:
         """Get project information"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/accounts/{self._account_id}/pages/projects/{project_name}"
             
             response = await client.get(
@@ -164,7 +164,7 @@ class CloudflarePagesService:
         """List all Pages projects"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             url = f"https://api.cloudflare.com/client/v4/accounts/{self._account_id}/pages/projects"
             
             response = await client.get(
@@ -211,7 +211,7 @@ class CloudflarePagesService:
         """
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with http_clients.client("cloudflare") as client:
             # First, we need to get the GitHub connection ID
             # This requires OAuth setup, but we can use the API to configure it
             url = f"https://api.cloudflare.com/client/v4/accounts/{self._account_id}/pages/projects/{project_name}"
@@ -2,11 +2,18 @@
 Cloudflare R2 Service
 Handles file upload/download to Cloudflare R2 storage
 """
+import asyncio
 import boto3
+import hashlib
 import logging
-from typing import Optional, Dict, Any, BinaryIO
+import mimetypes
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, BinaryIO, Iterable, List, Tuple
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.services.config_service import ConfigService
 from app.models.configuration import IntegrationType
 
@@ -93,6 +100,93 @@ class CloudflareR2Service:
             logger.error(f"❌ Failed to upload file {key}: {error_code} - {e}")
             raise Exception(f"Failed to upload file: {error_code} - {str(e)}")
     
+    def upload_files(self, files: Iterable[Tuple[str, str, Optional[str]]], max_workers: int = None) -> List[Dict[str, Any]]:
+        """
+        Upload many local files concurrently (boto3 in a thread pool)
+        
+        Files larger than R2_MULTIPART_THRESHOLD go up as multipart uploads. Objects
+        whose ETag already matches the local MD5 (or multipart ETag) are skipped,
+        based on one list_objects_v2 listing of the files' common prefix.
+        
+        Args:
+            files: (key, local_path, content_type) tuples; content_type may be None (guessed)
+            max_workers: Parallel uploads (default: R2_UPLOAD_CONCURRENCY)
+            
+        Returns:
+            One dict per file: key, path, status ("uploaded", "skipped" or "error"), size, etag, error
+        """
+        self._load_config()
+        files = list(files)
+        if not files:
+            return []
+        
+        transfer_config = TransferConfig(
+            multipart_threshold=settings.R2_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.R2_MULTIPART_CHUNKSIZE,
+            # Parallelism comes from the outer pool; keep each transfer to one thread
+            use_threads=False,
+        )
+        
+        prefix = os.path.commonprefix([key for key, _, _ in files])
+        try:
+            remote_etags = self._list_etags(prefix)
+        except Exception as e:
+            logger.warning(f"Could not list R2 objects under '{prefix}', uploading everything: {e}")
+            remote_etags = {}
+        
+        def upload_one(item: Tuple[str, str, Optional[str]]) -> Dict[str, Any]:
+            key, path, content_type = item
+            result = {"key": key, "path": path, "status": "error", "size": None, "etag": None, "error": None}
+            try:
+                result["size"] = os.path.getsize(path)
+                local_etag = self._local_etag(path, result["size"])
+                result["etag"] = local_etag
+                if remote_etags.get(key) == local_etag:
+                    result["status"] = "skipped"
+                    return result
+                
+                extra_args = {"ContentType": content_type or mimetypes.guess_type(path)[0] or "application/octet-stream"}
+                self._s3_client.upload_file(path, self._bucket_name, key, ExtraArgs=extra_args, Config=transfer_config)
+                result["status"] = "uploaded"
+            except Exception as e:
+                result["error"] = str(e)
+                logger.error(f"❌ Failed to upload file {key}: {e}")
+            return result
+        
+        with ThreadPoolExecutor(max_workers=max_workers or settings.R2_UPLOAD_CONCURRENCY, thread_name_prefix="r2-upload") as pool:
+            results = list(pool.map(upload_one, files))
+        
+        counts = {status: sum(1 for r in results if r["status"] == status) for status in ("uploaded", "skipped", "error")}
+        logger.info(f"✅ R2 batch upload: {counts['uploaded']} uploaded, {counts['skipped']} unchanged, {counts['error']} failed")
+        return results
+    
+    async def upload_files_async(self, files: Iterable[Tuple[str, str, Optional[str]]], max_workers: int = None) -> List[Dict[str, Any]]:
+        """upload_files() without blocking the event loop"""
+        return await asyncio.to_thread(self.upload_files, list(files), max_workers)
+    
+    def _list_etags(self, prefix: str) -> Dict[str, str]:
+        """Key -> ETag (without quotes) for every object under prefix"""
+        etags = {}
+        paginator = self._s3_client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self._bucket_name, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                etags[obj["Key"]] = obj["ETag"].strip('"')
+        return etags
+    
+    @staticmethod
+    def _local_etag(path: str, size: int) -> str:
+        """ETag S3/R2 would report for this file when uploaded with our TransferConfig"""
+        chunk_size = settings.R2_MULTIPART_CHUNKSIZE
+        if size < settings.R2_MULTIPART_THRESHOLD:
+            with open(path, "rb") as f:
+                return hashlib.md5(f.read()).hexdigest()
+        
+        part_digests = []
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                part_digests.append(hashlib.md5(chunk).digest())
+        return f"{hashlib.md5(b''.join(part_digests)).hexdigest()}-{len(part_digests)}"
+    
     def upload_file_from_path(self, key: str, file_path: str, content_type: str = None) -> Dict[str, Any]:
         """
         Upload a file from local path to R2
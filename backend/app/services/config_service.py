@@ -10,6 +10,7 @@ import os
 import json
 from app.models.configuration import IntegrationConfig, DeployServer, IntegrationType, ServerType
 from app.core.config import settings
+from app.services.system_config_cache import system_config_cache
 from datetime import datetime
 
 class ConfigService:
@@ -79,10 +80,16 @@ class ConfigService:
             
         self.db.commit()
         self.db.refresh(config)
+        # Only this process; the async endpoints also broadcast the change
+        system_config_cache.invalidate_local()
         return config
 
     def get_config(self, type: IntegrationType, key: str) -> Optional[str]:
         """Get a single config value (decrypted)"""
+        snapshot = system_config_cache.peek()
+        if snapshot is not None:
+            return snapshot.integration(type).get(key)
+
         stmt = select(IntegrationConfig).where(
             IntegrationConfig.integration_type == type,
             IntegrationConfig.key == key,
@@ -99,6 +106,10 @@ class ConfigService:
 
     def get_all_by_type(self, type: IntegrationType) -> Dict[str, Any]:
         """Get all configs for a type as a dict"""
+        snapshot = system_config_cache.peek()
+        if snapshot is not None:
+            return snapshot.integration(type)
+
         stmt = select(IntegrationConfig).where(
             IntegrationConfig.integration_type == type,
             IntegrationConfig.is_active == True
@@ -0,0 +1,145 @@
+"""
+CRM Search
+Ranked contact/opportunity search on Postgres: prefix full-text matching on the
+generated search_vector columns (GIN) plus pg_trgm similarity on unaccented,
+lower-cased name/email/company (GIN trigram indexes) for typos and partial names.
+
+Both sides are accent- and case-insensitive: the indexed expressions go through
+f_unaccent(lower(...)) in the database and the query is normalized the same way
+here, so "joao conceicao" finds "João Conceição". See app/models/search.py for
+the DDL.
+"""
+import re
+import unicodedata
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.contact import Contact
+from app.models.opportunity import Opportunity
+from app.models.search import (
+    CONTACT_TRIGRAM_COLUMNS,
+    OPPORTUNITY_TRIGRAM_COLUMNS,
+    trigram_expression,
+)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+MAX_TERMS = 8
+
+
+def normalize(text: str) -> str:
+    """Lower-case and strip diacritics, matching f_unaccent(lower(...)) for Portuguese text"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def prefix_tsquery(text: str) -> Optional[str]:
+    """
+    tsquery text matching every term as a prefix ("joao:* & silv:*"), or None if the
+    input has no searchable terms. Only word characters survive, so user input can
+    never inject tsquery operators.
+    """
+    terms = _TOKEN.findall(normalize(text))[:MAX_TERMS]
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def substring_filter(model, columns: Sequence[str], text: str):
+    """
+    Accent/case-insensitive substring match on the trigram-indexed expressions,
+    for the plain listings' `q` filter (keeps their created_at ordering).
+    """
+    escaped = normalize(text).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    table = model.__table__.name
+    return or_(*[
+        literal_column(trigram_expression(f"{table}.{column}")).like(f"%{escaped}%")
+        for column in columns
+    ])
+
+
+def _search(model, trigram_columns: Sequence[str], text: str, filters: list, limit: int):
+    normalized = normalize(text).strip()
+    tsquery_text = prefix_tsquery(text)
+    if not normalized or tsquery_text is None:
+        return None
+
+    table = model.__table__
+    tsquery = func.to_tsquery(literal_column("'simple'::regconfig"), tsquery_text)
+    # Same text as the trigram index expressions, so the planner can use them
+    trigram_exprs = [literal_column(trigram_expression(f"{table.name}.{c}")) for c in trigram_columns]
+
+    similarity = func.greatest(*[func.coalesce(func.similarity(expr, normalized), 0) for expr in trigram_exprs])
+    score = (func.ts_rank(table.c.search_vector, tsquery) + similarity).label("score")
+
+    return (
+        select(model, score)
+        .where(
+            or_(table.c.search_vector.op("@@")(tsquery), *[expr.op("%")(normalized) for expr in trigram_exprs]),
+            *filters,
+        )
+        .order_by(score.desc(), model.id.desc())
+        .limit(limit)
+    )
+
+
+async def search_contacts(
+    db: AsyncSession,
+    text: str,
+    owner_id: Optional[int] = None,
+    status: Optional[str] = None,
+    limit: int = 20,
+) -> List[Tuple[Contact, float]]:
+    """Contacts matching `text`, best first, with their score"""
+    filters = []
+    if owner_id is not None:
+        filters.append(Contact.owner_id == owner_id)
+    if status:
+        filters.append(Contact.status == status)
+    query = _search(Contact, CONTACT_TRIGRAM_COLUMNS, text, filters, limit)
+    if query is None:
+        return []
+    result = await db.execute(query)
+    return [(contact, float(score)) for contact, score in result.all()]
+
+
+async def find_contact_by_name(db: AsyncSession, name: str, owner_id: Optional[int] = None) -> Optional[Contact]:
+    """
+    The contact whose name is `name` up to case and accents (the most recent one
+    if several are), or None. Unlike search_contacts, never a merely similar name:
+    for callers that attach records to the contact they find.
+    """
+    normalized = normalize(name).strip()
+    if not normalized:
+        return None
+    query = (
+        select(Contact)
+        .where(literal_column(trigram_expression("contacts.name")) == normalized)
+        .order_by(Contact.id.desc())
+        .limit(1)
+    )
+    if owner_id is not None:
+        query = query.where(Contact.owner_id == owner_id)
+    result = await db.execute(query)
+    return result.scalars().first()
+
+
+async def search_opportunities(
+    db: AsyncSession,
+    text: str,
+    owner_id: Optional[int] = None,
+    stage: Optional[str] = None,
+    limit: int = 20,
+) -> List[Tuple[Opportunity, float]]:
+    """Opportunities matching `text`, best first, with their score"""
+    filters = []
+    if owner_id is not None:
+        filters.append(Opportunity.owner_id == owner_id)
+    if stage:
+        filters.append(Opportunity.stage == stage)
+    query = _search(Opportunity, OPPORTUNITY_TRIGRAM_COLUMNS, text, filters, limit)
+    if query is None:
+        return []
+    result = await db.execute(query)
+    return [(opportunity, float(score)) for opportunity, score in result.all()]
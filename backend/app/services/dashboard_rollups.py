@@ -0,0 +1,234 @@
+"""
+Dashboard Rollups
+Keeps dashboard_rollups (per-owner counters) in step with contacts,
+opportunities and activities, so the dashboard reads a handful of rows instead of
+scanning the three tables.
+
+- Incremental: an after_flush listener on every ORM Session turns the flushed
+  inserts/updates/deletes into counter deltas and upserts them in the same
+  transaction. Every API path that writes through the ORM (CRUD routers,
+  ai_actions, webhooks, external) is covered without per-endpoint code.
+- Sharded: each session adds its deltas to one of DASHBOARD_ROLLUP_SHARDS rows
+  per counter, so concurrent writers for the same owner (a burst of webhook
+  leads) rarely wait on each other's row lock. Readers sum the shards, and the
+  admin totals are the sum over all owners: there is no global row to contend on.
+- Reconciliation: reconcile() recomputes everything from the base tables; the
+  Celery beat task runs it periodically to correct drift from raw SQL, scripts
+  or bugs. It also writes the backfill marker: until it has run once, readers
+  can't trust the counters and use the base tables.
+"""
+import logging
+import random
+from collections import defaultdict
+from decimal import Decimal
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, func, inspect, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.activity import Activity
+from app.models.contact import Contact
+from app.core.config import settings
+from app.models.dashboard_rollup import GLOBAL_OWNER_ID, DashboardRollup
+from app.models.opportunity import Opportunity
+
+logger = logging.getLogger(__name__)
+
+METRIC_CONTACTS = "contacts"
+METRIC_OPPORTUNITIES = "opportunities"
+METRIC_OPPORTUNITY_VALUE = "opportunity_value"
+METRIC_PENDING_ACTIVITIES = "pending_activities"
+# (GLOBAL_OWNER_ID, METRIC_BACKFILLED) exists once reconcile() filled the table from the base tables
+METRIC_BACKFILLED = "_backfilled"
+STAGE_PREFIX = "stage:"
+NO_STAGE = "sem_estagio"
+
+Deltas = Dict[Tuple[int, str], Decimal]
+
+_TRACKED = (Contact, Opportunity, Activity)
+_TRACKED_ATTRS = {
+    Contact: ("owner_id",),
+    Opportunity: ("owner_id", "stage", "value"),
+    Activity: ("owner_id", "status"),
+}
+
+
+def stage_metric(stage: Optional[str]) -> str:
+    return STAGE_PREFIX + (stage or NO_STAGE)
+
+
+def _contributions(model, values: Dict[str, object]) -> Dict[str, Decimal]:
+    """Counters one row adds to its owner's rollup"""
+    if model is Contact:
+        return {METRIC_CONTACTS: Decimal(1)}
+    if model is Opportunity:
+        return {
+            METRIC_OPPORTUNITIES: Decimal(1),
+            METRIC_OPPORTUNITY_VALUE: Decimal(values["value"] or 0),
+            stage_metric(values["stage"]): Decimal(1),
+        }
+    if values["status"] == "pending":
+        return {METRIC_PENDING_ACTIVITIES: Decimal(1)}
+    return {}
+
+
+def _values(obj, model, old: bool) -> Dict[str, object]:
+    """
+    Tracked attributes as they are now, or as they were before this flush. The
+    old value of a changed attribute is in its history because the attributes
+    are tracked with active_history (see install()); an unchanged one is current.
+    """
+    state = inspect(obj)
+    values = {}
+    for attr in _TRACKED_ATTRS[model]:
+        history = state.attrs[attr].history
+        if old and history.deleted:
+            values[attr] = history.deleted[0]
+        else:
+            values[attr] = getattr(obj, attr)
+    return values
+
+
+def _apply(deltas: Deltas, model, values: Dict[str, object], sign: int) -> None:
+    owner_id = values["owner_id"]
+    if owner_id is None:
+        return
+    for metric, amount in _contributions(model, values).items():
+        deltas[(owner_id, metric)] += sign * amount
+
+
+def collect_deltas(session: Session) -> Deltas:
+    """Counter changes implied by the objects being flushed"""
+    deltas: Deltas = defaultdict(Decimal)
+    deleted_values = session.info.pop(_DELETED_VALUES, {})
+    for obj in session.new:
+        if isinstance(obj, _TRACKED):
+            _apply(deltas, type(obj), _values(obj, type(obj), old=False), +1)
+    for obj in session.deleted:
+        if isinstance(obj, _TRACKED):
+            values = deleted_values.get(id(obj)) or _values(obj, type(obj), old=True)
+            _apply(deltas, type(obj), values, -1)
+    for obj in session.dirty:
+        if not isinstance(obj, _TRACKED) or obj in session.deleted:
+            continue
+        model = type(obj)
+        if not any(inspect(obj).attrs[attr].history.has_changes() for attr in _TRACKED_ATTRS[model]):
+            continue
+        _apply(deltas, model, _values(obj, model, old=True), -1)
+        _apply(deltas, model, _values(obj, model, old=False), +1)
+    return {key: amount for key, amount in deltas.items() if amount}
+
+
+_DELETED_VALUES = "dashboard_rollups.deleted_values"  # session.info key
+_SHARD = "dashboard_rollups.shard"  # session.info key
+
+
+def _before_flush(session: Session, flush_context, instances) -> None:
+    # A deleted row can't be read back after the flush: snapshot what it counted for
+    # (loading expired attributes while the row still exists)
+    session.info[_DELETED_VALUES] = {
+        id(obj): _values(obj, type(obj), old=True)
+        for obj in session.deleted
+        if isinstance(obj, _TRACKED)
+    }
+
+
+def _after_flush(session: Session, flush_context) -> None:
+    deltas = collect_deltas(session)
+    if not deltas:
+        return
+    # One shard per session: a transaction only ever locks rows of its own shard,
+    # sorted so concurrent transactions on the same shard lock them in the same order
+    shard = session.info.setdefault(_SHARD, random.randrange(max(1, settings.DASHBOARD_ROLLUP_SHARDS)))
+    rows = [
+        {"owner_id": owner_id, "metric": metric, "shard": shard, "value": amount, "updated_at": func.now()}
+        for (owner_id, metric), amount in sorted(deltas.items())
+    ]
+    stmt = pg_insert(DashboardRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DashboardRollup.owner_id, DashboardRollup.metric, DashboardRollup.shard],
+        set_={"value": DashboardRollup.value + stmt.excluded.value, "updated_at": func.now()},
+    )
+    session.connection().execute(stmt)
+
+
+def _keep_old_value(target, value, oldvalue, initiator) -> None:
+    """No-op: registered with active_history so the value being replaced is loaded into the history"""
+
+
+def track_old_values() -> None:
+    """Load the value a tracked attribute is replacing, even if it was expired or never loaded"""
+    for model, attrs in _TRACKED_ATTRS.items():
+        for attr in attrs:
+            column = getattr(model, attr)
+            if not event.contains(column, "set", _keep_old_value):
+                event.listen(column, "set", _keep_old_value, active_history=True)
+
+
+def install() -> None:
+    """Register the incremental-maintenance listeners (idempotent)"""
+    track_old_values()
+    if not event.contains(Session, "before_flush", _before_flush):
+        event.listen(Session, "before_flush", _before_flush)
+    if not event.contains(Session, "after_flush", _after_flush):
+        event.listen(Session, "after_flush", _after_flush)
+
+
+async def compute_rollups(db: AsyncSession) -> Deltas:
+    """Counters recomputed from the base tables"""
+    truth: Deltas = defaultdict(Decimal)
+
+    def add(owner_id, metric, amount):
+        truth[(owner_id, metric)] += Decimal(amount or 0)
+
+    contacts = await db.execute(select(Contact.owner_id, func.count(Contact.id)).group_by(Contact.owner_id))
+    for owner_id, count in contacts.all():
+        add(owner_id, METRIC_CONTACTS, count)
+
+    opportunities = await db.execute(
+        select(Opportunity.owner_id, Opportunity.stage, func.count(Opportunity.id), func.sum(Opportunity.value))
+        .group_by(Opportunity.owner_id, Opportunity.stage)
+    )
+    for owner_id, stage, count, value in opportunities.all():
+        add(owner_id, METRIC_OPPORTUNITIES, count)
+        add(owner_id, METRIC_OPPORTUNITY_VALUE, value)
+        add(owner_id, stage_metric(stage), count)
+
+    pending = await db.execute(
+        select(Activity.owner_id, func.count(Activity.id))
+        .where(Activity.status == "pending")
+        .group_by(Activity.owner_id)
+    )
+    for owner_id, count in pending.all():
+        add(owner_id, METRIC_PENDING_ACTIVITIES, count)
+
+    return {key: amount for key, amount in truth.items() if amount}
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """
+    Rewrite dashboard_rollups from the base tables (one shard per counter) and
+    mark it backfilled; returns how many counters were wrong. The table lock
+    makes concurrent writers wait, so no increment is lost in between.
+    """
+    await db.execute(text("LOCK TABLE dashboard_rollups IN SHARE ROW EXCLUSIVE MODE"))
+    current: Deltas = defaultdict(Decimal)
+    for row in (await db.execute(select(DashboardRollup))).scalars().all():
+        current[(row.owner_id, row.metric)] += row.value
+    current = {key: amount for key, amount in current.items() if amount}
+    truth = await compute_rollups(db)
+    truth[(GLOBAL_OWNER_ID, METRIC_BACKFILLED)] = Decimal(1)
+
+    drift = sum(1 for key in set(current) | set(truth) if current.get(key, 0) != truth.get(key, 0))
+    if drift:
+        await db.execute(delete(DashboardRollup))
+        if truth:
+            await db.execute(pg_insert(DashboardRollup).values([
+                {"owner_id": owner_id, "metric": metric, "shard": 0, "value": amount, "updated_at": func.now()}
+                for (owner_id, metric), amount in sorted(truth.items())
+            ]))
+        logger.warning(f"Dashboard rollups: corrected {drift} drifted counters")
+    await db.commit()
+    return drift
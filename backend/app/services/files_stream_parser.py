@@ -0,0 +1,355 @@
+"""
+Files Stream Parser
+Incremental parser for the {"files": [{"path": ..., "content": ...}, ...]} JSON
+the coding model produces, fed with the text deltas of a provider stream.
+
+Each entry of the "files" array is returned by feed() as soon as its object
+closes, so files can be written while the model is still generating, and
+entries are not kept once returned. Text around the root value (markdown
+fences, prose) is ignored: a "{" or "[" only becomes the root once the first
+file entry comes out of it (or it closes as a {"files": ...} object). Until
+then its text is kept, and a parse error resumes the search for the root right
+after it, so brackets in a preamble ("Sure [see below]:") are skipped.
+
+It is lenient where models typically go wrong: trailing commas, raw control
+characters and unknown escapes inside strings, and unescaped quotes inside a
+string (a quote only closes the string when followed by , : } ] or the end of
+input). If the stream stops in the middle of the array, close() recovers the
+last entry when its path and content both arrived, and otherwise reports the
+path of the truncated entry.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_WS = " \t\r\n"
+_STRING_STOP = re.compile(r'["\\]')
+_SCALAR = re.compile(r'[^\s,:\]\}]+')
+_SCALARS = {"true": True, "false": False, "null": None}
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+# Parser states
+_SEEK = "seek"  # before the root value
+_VALUE = "value"
+_KEY_OR_END = "key_or_end"  # after "{" or "," in an object
+_COLON = "colon"
+_VALUE_OR_END = "value_or_end"  # after "[" or "," in an array
+_AFTER_VALUE = "after_value"
+_STRING = "string"
+_DONE = "done"
+
+
+class FilesStreamError(ValueError):
+    """The stream is not (even leniently) the expected JSON; pos is the offset in the whole stream"""
+
+    def __init__(self, message: str, pos: int):
+        super().__init__(f"{message} (at char {pos})")
+        self.pos = pos
+
+
+class _Frame:
+    __slots__ = ("container", "key", "is_files")
+
+    def __init__(self, container, is_files: bool = False):
+        self.container = container
+        self.key: Optional[str] = None  # object frames: key of the value being parsed
+        self.is_files = is_files
+
+
+class FilesStreamParser:
+    """Feed it text deltas, get back the file entries completed by each one"""
+
+    def __init__(self, files_key: str = "files"):
+        self.files_key = files_key
+        self.root: Any = None  # the root value once parsed, without the files (already emitted)
+        self.truncated: Optional[str] = None  # path (or "") of an entry cut off by the end of the stream
+        self.stats = {"chars": 0, "files": 0, "invalid": 0, "recovered": 0}
+        self._buf = ""
+        self._offset = 0  # stream offset of _buf[0]
+        self._pos = 0  # where scanning resumes in _buf
+        self._root_start: Optional[int] = None  # _buf index of a root candidate not confirmed yet
+        self._rejected: Optional[FilesStreamError] = None  # why the first candidate was dropped
+        self._state = _SEEK
+        self._stack: List[_Frame] = []
+        self._parts: List[str] = []  # pieces of the string being read
+        self._is_key = False
+        self._has_surrogates = False
+        self._ready: List[Dict[str, Any]] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a delta; returns the file entries it completed"""
+        self.stats["chars"] += len(chunk)
+        self._buf += chunk
+        self._run(final=False)
+        return self._take()
+
+    def close(self) -> List[Dict[str, Any]]:
+        """End of stream: returns what was still pending (a recovered trailing entry)"""
+        self._run(final=True)
+        if self._state == _SEEK:
+            # A malformed answer is more likely than brackets in prose only: report its error
+            raise self._rejected or FilesStreamError("No JSON object found in the AI output", self._offset)
+        if self._state != _DONE:
+            self._recover()
+        return self._take()
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    # ------------------------------------------------------------------ #
+    # Scanner
+    # ------------------------------------------------------------------ #
+
+    def _run(self, final: bool) -> None:
+        while True:
+            try:
+                self._scan(final)
+                break
+            except FilesStreamError as e:
+                if self._root_start is None:
+                    raise
+                self._rejected = self._rejected or e
+                # The candidate wasn't the answer's JSON (a bracket in the preamble): look further on
+                self._restart()
+
+        if self._state == _DONE:
+            # Text after the root is dropped
+            self._offset += len(self._buf)
+            self._buf, self._pos = "", 0
+            return
+        # Keep only the unconsumed tail (an incomplete token or escape), or all of an unconfirmed root
+        cut = self._pos if self._root_start is None else self._root_start
+        self._buf = self._buf[cut:]
+        self._offset += cut
+        self._pos -= cut
+        if self._root_start is not None:
+            self._root_start = 0
+
+    def _restart(self) -> None:
+        self._pos = self._root_start + 1
+        self._root_start = None
+        self._state = _SEEK
+        self._stack = []
+        self._parts = []
+        self.root = None
+        self.stats["invalid"] = 0
+
+    def _scan(self, final: bool) -> None:
+        buf, pos, n = self._buf, self._pos, len(self._buf)
+        while pos < n and self._state != _DONE:
+            state = self._state
+            if state == _STRING:
+                pos = self._scan_string(buf, pos, final)
+                if pos < 0:
+                    pos = -pos - 1
+                    break
+                continue
+
+            c = buf[pos]
+            if state == _SEEK:
+                start = min((i for i in (buf.find("{", pos), buf.find("[", pos)) if i >= 0), default=-1)
+                if start < 0:
+                    pos = n
+                    break
+                pos = start
+                self._root_start = start
+                self._state = _VALUE
+                continue
+            if c in _WS:
+                pos += 1
+                continue
+
+            if state == _VALUE or state == _VALUE_OR_END:
+                if state == _VALUE_OR_END and c == "]":
+                    pos += 1
+                    self._end_container(list, pos)
+                elif c == "{":
+                    pos += 1
+                    self._stack.append(_Frame({}))
+                    self._state = _KEY_OR_END
+                elif c == "[":
+                    pos += 1
+                    self._stack.append(_Frame([], is_files=self._opens_files()))
+                    self._state = _VALUE_OR_END
+                elif c == '"':
+                    pos += 1
+                    self._start_string(is_key=False)
+                else:
+                    match = _SCALAR.match(buf, pos)
+                    if match is None:
+                        raise FilesStreamError(f"Expected a value, got {c!r}", self._offset + pos)
+                    if match.end() == n and not final:
+                        break  # the token may continue in the next delta
+                    token = match.group()
+                    if token in _SCALARS:
+                        value = _SCALARS[token]
+                    else:
+                        try:
+                            value = json.loads(token)
+                        except ValueError:
+                            raise FilesStreamError(f"Unexpected {token[:20]!r}", self._offset + pos)
+                    pos = match.end()
+                    self._complete(value)
+            elif state == _KEY_OR_END:
+                if c == "}":
+                    pos += 1
+                    self._end_container(dict, pos)
+                elif c == '"':
+                    pos += 1
+                    self._start_string(is_key=True)
+                else:
+                    raise FilesStreamError(f"Expected a key, got {c!r}", self._offset + pos)
+            elif state == _COLON:
+                if c != ":":
+                    raise FilesStreamError(f"Expected ':', got {c!r}", self._offset + pos)
+                pos += 1
+                self._state = _VALUE
+            elif state == _AFTER_VALUE:
+                frame = self._stack[-1]
+                if c == ",":
+                    pos += 1
+                    self._state = _KEY_OR_END if isinstance(frame.container, dict) else _VALUE_OR_END
+                elif c in "}]":
+                    pos += 1
+                    self._end_container(dict if c == "}" else list, pos)
+                else:
+                    raise FilesStreamError(f"Expected ',' or a closing bracket, got {c!r}", self._offset + pos)
+        self._pos = pos
+
+    def _scan_string(self, buf: str, pos: int, final: bool) -> int:
+        """
+        Read string content from pos; returns the position after it, or
+        -(pos + 1) when more input is needed to go on.
+        """
+        n = len(buf)
+        match = _STRING_STOP.search(buf, pos)
+        if match is None:
+            self._parts.append(buf[pos:])
+            return n
+        stop = match.start()
+        if stop > pos:
+            self._parts.append(buf[pos:stop])
+
+        if buf[stop] == "\\":
+            if stop + 1 >= n:
+                return -(stop + 1) if not final else n
+            esc = buf[stop + 1]
+            if esc == "u":
+                hex_digits = buf[stop + 2:stop + 6]
+                if len(hex_digits) < 4 and not final:
+                    return -(stop + 1)
+                try:
+                    code = int(hex_digits, 16)
+                except ValueError:
+                    # Not an escape after all: keep it as written
+                    self._parts.append("\\u")
+                    return stop + 2
+                if 0xD800 <= code <= 0xDFFF:
+                    self._has_surrogates = True
+                self._parts.append(chr(code))
+                return stop + 6
+            # Unknown escapes (\' from JS habits) keep the escaped character
+            self._parts.append(_ESCAPES.get(esc, esc))
+            return stop + 2
+
+        # A quote: it closes the string only if followed by a delimiter
+        after = stop + 1
+        while after < n and buf[after] in _WS:
+            after += 1
+        if after == n and not final:
+            return -(stop + 1)
+        if after < n and buf[after] not in ",:}]":
+            self._parts.append('"')
+            return stop + 1
+        self._end_string()
+        return stop + 1
+
+    # ------------------------------------------------------------------ #
+    # Values
+    # ------------------------------------------------------------------ #
+
+    def _start_string(self, is_key: bool) -> None:
+        self._parts = []
+        self._is_key = is_key
+        self._has_surrogates = False
+        self._state = _STRING
+
+    def _end_string(self) -> None:
+        value = "".join(self._parts)
+        self._parts = []
+        if self._has_surrogates:
+            value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        if self._is_key:
+            self._stack[-1].key = value
+            self._state = _COLON
+        else:
+            self._complete(value)
+
+    def _opens_files(self) -> bool:
+        """Whether the array about to open is the files list (root["files"], or a bare root array)"""
+        if not self._stack:
+            return True
+        return len(self._stack) == 1 and self._stack[0].key == self.files_key
+
+    def _end_container(self, kind, pos: int) -> None:
+        frame = self._stack[-1]
+        if not isinstance(frame.container, kind):
+            raise FilesStreamError("Mismatched closing bracket", self._offset + pos - 1)
+        self._stack.pop()
+        self._complete(frame.container)
+
+    def _complete(self, value: Any) -> None:
+        if not self._stack:
+            if self._root_start is not None and not self._is_files_root(value):
+                raise FilesStreamError("Not the files JSON", self._offset + self._root_start)
+            self._root_start = None
+            self.root = value
+            self._state = _DONE
+            return
+        frame = self._stack[-1]
+        if frame.is_files:
+            self._emit(value)
+        elif isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+        self._state = _AFTER_VALUE
+
+    def _is_files_root(self, value: Any) -> bool:
+        """Whether a root value that closed without a file entry is still the answer (an empty one)"""
+        if isinstance(value, dict):
+            return self.files_key in value
+        return isinstance(value, list) and not self.stats["invalid"]
+
+    def _emit(self, entry: Any) -> None:
+        if isinstance(entry, dict) and isinstance(entry.get("path"), str) and isinstance(entry.get("content"), str):
+            self._root_start = None  # a file came out of it: this is the root
+            self._ready.append(entry)
+            self.stats["files"] += 1
+        else:
+            self.stats["invalid"] += 1
+
+    def _recover(self) -> None:
+        """The stream ended inside the root value: salvage the entry being parsed, if whole"""
+        for i, frame in enumerate(self._stack[:-1]):
+            if not frame.is_files:
+                continue
+            entry = self._stack[i + 1].container
+            if not isinstance(entry, dict):
+                break
+            if isinstance(entry.get("path"), str) and isinstance(entry.get("content"), str):
+                self._emit(entry)
+                self.stats["recovered"] += 1
+            else:
+                self.truncated = entry.get("path") if isinstance(entry.get("path"), str) else ""
+            break
+        else:
+            if self._stack and self._stack[-1].is_files and self._state != _AFTER_VALUE:
+                # Cut inside a string or scalar directly in the list
+                self.truncated = ""
+        self._state = _DONE
+
+    def _take(self) -> List[Dict[str, Any]]:
+        ready, self._ready = self._ready, []
+        return ready
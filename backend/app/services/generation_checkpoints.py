@@ -0,0 +1,113 @@
+"""
+Generation Checkpoints
+Persisted per-stage state of generate_site (generation_checkpoints): when a
+stage finishes it records the hash of the inputs it ran with and what it
+produced. A retry skips every stage whose recorded hash matches the hash of its
+current inputs, so a run that died during the integrations redoes only the
+integrations that hadn't finished instead of regenerating the site:
+
+    checkpoints = await GenerationCheckpoints.load(order_id)
+    stage_hash = input_hash(template_name, signature)
+    if checkpoints.reusable(GenerationStage.TEMPLATE_COPIED, stage_hash) is None:
+        ...  # run the stage
+        await checkpoints.complete(GenerationStage.TEMPLATE_COPIED, stage_hash)
+
+Stages that build on another include its hash in their own inputs. Reads and
+writes use their own short sessions: integration stages run concurrently and
+must not share the generator's session. A checkpoint that can't be written
+only costs a redo on the next run, so write errors are logged, not raised.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.models.generation_checkpoint import GenerationCheckpoint, GenerationStage
+
+logger = logging.getLogger(__name__)
+
+_table = GenerationCheckpoint.__table__
+
+
+def input_hash(*inputs: Any) -> str:
+    """Stable sha256 of a stage's inputs (any JSON-serialisable values)"""
+    encoded = json.dumps(inputs, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _default_session_factory():
+    from app.core.database import AsyncSessionLocal
+    return AsyncSessionLocal()
+
+
+class GenerationCheckpoints:
+    """The checkpoints of one order, loaded once per generation run"""
+
+    def __init__(self, order_id: int, rows: Dict[str, Dict[str, Any]] = None, session_factory: Callable = None):
+        self.order_id = order_id
+        self._rows = rows or {}  # stage -> {"input_hash", "output"}
+        self._session_factory = session_factory or _default_session_factory
+
+    @classmethod
+    async def load(cls, order_id: int, session_factory: Callable = None) -> "GenerationCheckpoints":
+        checkpoints = cls(order_id, session_factory=session_factory)
+        try:
+            async with checkpoints._session_factory() as db:
+                result = await db.execute(
+                    select(GenerationCheckpoint).where(GenerationCheckpoint.order_id == order_id)
+                )
+                for row in result.scalars().all():
+                    checkpoints._rows[row.stage] = {"input_hash": row.input_hash, "output": row.output or {}}
+        except Exception as e:
+            # Without checkpoints every stage runs, as before they existed
+            logger.warning(f"[Checkpoints] Could not load checkpoints of order {order_id}: {e}")
+        return checkpoints
+
+    @property
+    def completed(self) -> list:
+        """Stages with a checkpoint, in pipeline order"""
+        return [stage for stage in GenerationStage.ORDER if stage in self._rows]
+
+    def reusable(self, stage: str, stage_hash: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The stage's recorded output if it completed with these inputs, else None"""
+        row = self._rows.get(stage)
+        if stage_hash is None or row is None or row["input_hash"] != stage_hash:
+            return None
+        return dict(row["output"])
+
+    async def complete(self, stage: str, stage_hash: Optional[str], output: Dict[str, Any] = None) -> None:
+        """Record the stage as done with these inputs (no-op without a hash)"""
+        if stage_hash is None:
+            return
+        output = output or {}
+        values = dict(input_hash=stage_hash, output=output, completed_at=datetime.utcnow())
+        stmt = pg_insert(_table).values(order_id=self.order_id, stage=stage, **values)
+        stmt = stmt.on_conflict_do_update(index_elements=[_table.c.order_id, _table.c.stage], set_=values)
+        try:
+            async with self._session_factory() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"[Checkpoints] Could not record {stage} for order {self.order_id}: {e}")
+            return
+        self._rows[stage] = {"input_hash": stage_hash, "output": output}
+
+    async def clear(self, stages: Iterable[str] = None) -> None:
+        """Forget some stages (all by default), so the next run redoes them"""
+        stages = list(stages) if stages is not None else None
+        stmt = delete(GenerationCheckpoint).where(GenerationCheckpoint.order_id == self.order_id)
+        if stages is not None:
+            stmt = stmt.where(GenerationCheckpoint.stage.in_(stages))
+        try:
+            async with self._session_factory() as db:
+                await db.execute(stmt)
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"[Checkpoints] Could not clear checkpoints of order {self.order_id}: {e}")
+        for stage in list(self._rows):
+            if stages is None or stage in stages:
+                del self._rows[stage]
@@ -0,0 +1,288 @@
+"""
+Generation Dispatch
+Event-driven site generation. A caller that needs an order generated writes its
+outbox row (generation_dispatches) in the same transaction as the order change,
+then dispatch() sends it to Celery right after the commit:
+
+    if await request_generation(db, order.id):
+        ...
+    await db.commit()
+    await dispatch(db, [order.id])
+
+If the process dies between the commit and the send, or the broker is down, the
+row stays due and the periodic sweep (app/tasks/generation_dispatch.py) sends it.
+
+Workers hold a lease on the row while generating and renew it with a heartbeat
+(GenerationLease); when a worker crashes the lease expires and the sweep queues
+the order again. Every dispatch gets a fresh Celery task id and only the task
+carrying it can take the lease, so duplicate or stale messages are skipped
+instead of generating the same site twice. A worker whose lease was taken over
+(or expired while its heartbeat couldn't reach the database) stops at the next
+lease.check() instead of going on writing the site the new holder is generating.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.generation_dispatch import GenerationDispatch, GenerationDispatchStatus as Status
+
+logger = logging.getLogger(__name__)
+
+_table = GenerationDispatch.__table__
+
+
+async def request_generation(db: AsyncSession, order_id: int, bypass_ai_cache: bool = False) -> bool:
+    """
+    Arm the order's outbox row in the caller's transaction (not committed here).
+    Returns False, changing nothing, while a previous dispatch is still live, so
+    repeated clicks and overlapping callers never queue a second generation.
+    """
+    now = datetime.utcnow()
+    armed = dict(
+        status=Status.PENDING,
+        attempts=0,
+        task_id=None,
+        lease_owner=None,
+        lease_expires_at=now,
+        heartbeat_at=None,
+        last_error=None,
+        updated_at=now,
+    )
+    stmt = pg_insert(_table).values(order_id=order_id, bypass_ai_cache=bypass_ai_cache, created_at=now, **armed)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[_table.c.order_id],
+        set_=dict(
+            armed,
+            # A still-pending request keeps asking for a fresh generation if any caller did
+            bypass_ai_cache=or_(
+                and_(_table.c.status == Status.PENDING, _table.c.bypass_ai_cache),
+                stmt.excluded.bypass_ai_cache,
+            ),
+        ),
+        where=or_(_table.c.status.notin_(Status.ACTIVE), _table.c.lease_expires_at < now),
+    ).returning(_table.c.order_id)
+    result = await db.execute(stmt)
+    return result.scalar_one_or_none() is not None
+
+
+async def dispatch(db: AsyncSession, order_ids: Optional[Sequence[int]] = None, limit: int = 100) -> List[Dict]:
+    """
+    Claim the due rows (all of them, or only `order_ids`) and send them to Celery.
+    Commits the claim before sending, so a worker never sees a task its row doesn't
+    know about yet. Returns [{"order_id", "task_id"}] for what was sent.
+    """
+    from app.tasks.site_generation import generate_site_task
+
+    if order_ids is not None and not order_ids:
+        return []
+    now = datetime.utcnow()
+    query = (
+        select(GenerationDispatch)
+        .where(GenerationDispatch.status.in_(Status.ACTIVE), GenerationDispatch.lease_expires_at <= now)
+        .order_by(GenerationDispatch.lease_expires_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    if order_ids is not None:
+        query = query.where(GenerationDispatch.order_id.in_(list(order_ids)))
+    rows = (await db.execute(query)).scalars().all()
+
+    claimed = []
+    for row in rows:
+        if row.status == Status.RUNNING:
+            logger.warning(f"[Dispatch] Lease on order {row.order_id} held by {row.lease_owner} expired, re-queueing")
+        elif row.status == Status.QUEUED:
+            logger.warning(f"[Dispatch] No worker picked up task {row.task_id} for order {row.order_id}, re-sending")
+        if row.attempts >= settings.GENERATION_MAX_ATTEMPTS:
+            row.status = Status.FAILED
+            row.lease_expires_at = None
+            row.last_error = row.last_error or f"Gave up after {row.attempts} dispatches"
+            logger.error(f"[Dispatch] ❌ Order {row.order_id} failed after {row.attempts} dispatches")
+            continue
+        row.status = Status.QUEUED
+        row.attempts += 1
+        row.task_id = str(uuid.uuid4())
+        row.lease_owner = None
+        row.lease_expires_at = now + timedelta(seconds=settings.GENERATION_QUEUE_TIMEOUT)
+        claimed.append((row.order_id, row.task_id, row.bypass_ai_cache))
+    await db.commit()
+
+    sent = []
+    unsent = []
+    for order_id, task_id, bypass_ai_cache in claimed:
+        try:
+            generate_site_task.apply_async(
+                args=[order_id],
+                kwargs={"resume": True, "bypass_ai_cache": bypass_ai_cache},
+                task_id=task_id,
+            )
+            sent.append({"order_id": order_id, "task_id": task_id})
+            logger.info(f"[Dispatch] ✅ Enqueued task {task_id} for order {order_id}")
+        except Exception as e:
+            unsent.append(task_id)
+            logger.error(f"[Dispatch] ❌ Failed to enqueue order {order_id}, the sweep will retry: {e}")
+
+    if unsent:
+        # Broker unavailable: not the order's fault, so don't spend an attempt on it
+        await db.execute(
+            update(GenerationDispatch)
+            .where(GenerationDispatch.task_id.in_(unsent), GenerationDispatch.status == Status.QUEUED)
+            .values(
+                status=Status.PENDING,
+                attempts=GenerationDispatch.attempts - 1,
+                lease_expires_at=now,
+                updated_at=now,
+            )
+        )
+        await db.commit()
+    return sent
+
+
+class GenerationLeaseLost(Exception):
+    """The worker no longer holds the order's generation lease"""
+
+
+class GenerationLease:
+    """A worker's hold on an order's generation, renewed by a heartbeat while it runs"""
+
+    def __init__(self, order_id: int, task_id: str):
+        self.order_id = order_id
+        self.task_id = task_id
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.lost = False
+        self._valid_until = 0.0  # monotonic deadline of the last lease we know was written
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def acquire(self) -> bool:
+        """
+        Take the lease if this task is the order's current dispatch and nobody is
+        running it (or its holder stopped heartbeating). An order with no row yet,
+        e.g. a task queued before the outbox existed, is adopted.
+        """
+        from app.core.database import AsyncSessionLocal
+
+        now = datetime.utcnow()
+        leased = dict(
+            status=Status.RUNNING,
+            task_id=self.task_id,
+            lease_owner=self.owner,
+            lease_expires_at=now + timedelta(seconds=settings.GENERATION_LEASE_SECONDS),
+            heartbeat_at=now,
+            updated_at=now,
+        )
+        stmt = pg_insert(_table).values(order_id=self.order_id, attempts=1, created_at=now, **leased)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[_table.c.order_id],
+            set_=leased,
+            where=and_(
+                _table.c.task_id == self.task_id,
+                or_(
+                    _table.c.status == Status.QUEUED,
+                    and_(_table.c.status == Status.RUNNING, _table.c.lease_expires_at < now),
+                ),
+            ),
+        ).returning(_table.c.order_id)
+        started = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            acquired = (await db.execute(stmt)).scalar_one_or_none() is not None
+            await db.commit()
+        if acquired:
+            self._valid_until = started + settings.GENERATION_LEASE_SECONDS
+            self._heartbeat = asyncio.create_task(self._beat())
+        return acquired
+
+    async def release(self, error: Optional[str] = None, retry_in: Optional[float] = None) -> None:
+        """
+        Stop the heartbeat and record the outcome: done, queued again for this
+        task's own Celery retry in `retry_in` seconds, or failed.
+        """
+        from app.core.database import AsyncSessionLocal
+
+        self.stop()
+        now = datetime.utcnow()
+        if error is None:
+            values = dict(status=Status.DONE, lease_expires_at=None, last_error=None)
+        elif retry_in is not None:
+            # Same task id, so the retry can take the lease; the sweep steps in if it never runs
+            values = dict(
+                status=Status.QUEUED,
+                lease_owner=None,
+                lease_expires_at=now + timedelta(seconds=retry_in + settings.GENERATION_QUEUE_TIMEOUT),
+                last_error=error,
+            )
+        else:
+            values = dict(status=Status.FAILED, lease_expires_at=None, last_error=error)
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(self._own_row(update(GenerationDispatch)).values(updated_at=now, **values))
+                await db.commit()
+        except Exception as e:
+            # The lease just expires and the sweep decides what happens next
+            logger.warning(f"[Dispatch] Could not release lease on order {self.order_id}: {e}")
+
+    def check(self) -> None:
+        """
+        Raise GenerationLeaseLost unless the lease is still ours: called between
+        generation stages so a worker that lost it stops writing.
+        """
+        if not self.lost and time.monotonic() >= self._valid_until:
+            # Renewals kept failing until the lease ran out: the sweep may have re-queued the order
+            self.lost = True
+        if self.lost:
+            raise GenerationLeaseLost(f"Lost the generation lease on order {self.order_id} (task {self.task_id})")
+
+    def stop(self) -> None:
+        """Stop renewing without recording an outcome (the lease expires on its own)"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    def _own_row(self, stmt):
+        return stmt.where(
+            GenerationDispatch.order_id == self.order_id,
+            GenerationDispatch.task_id == self.task_id,
+            GenerationDispatch.status == Status.RUNNING,
+        )
+
+    async def _renew(self) -> bool:
+        from app.core.database import AsyncSessionLocal
+
+        now = datetime.utcnow()
+        started = time.monotonic()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                self._own_row(update(GenerationDispatch))
+                .values(
+                    lease_expires_at=now + timedelta(seconds=settings.GENERATION_LEASE_SECONDS),
+                    heartbeat_at=now,
+                )
+                .returning(GenerationDispatch.order_id)
+            )
+            renewed = result.scalar_one_or_none() is not None
+            await db.commit()
+        if renewed:
+            self._valid_until = started + settings.GENERATION_LEASE_SECONDS
+        return renewed
+
+    async def _beat(self) -> None:
+        interval = max(1.0, settings.GENERATION_LEASE_SECONDS / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self._renew():
+                    self.lost = True
+                    logger.warning(f"[Dispatch] Lost the lease on order {self.order_id} (task {self.task_id})")
+                    return
+            except Exception as e:
+                # Keep trying: the lease is still valid until it expires
+                logger.warning(f"[Dispatch] Heartbeat failed for order {self.order_id}: {e}")
@@ -0,0 +1,271 @@
+"""
+Generation Log Sink
+Buffers site generation log entries in memory and writes them in batches to
+site_generation_logs through a long-lived asyncpg pool (one per process).
+
+If the database is unavailable, entries are spilled to a local JSONL file and
+replayed on the next successful flush. Every committed batch also issues a
+pg_notify on NOTIFY_CHANNEL so other processes can stream new rows, and
+listeners registered with subscribe() receive the persisted entries in-process.
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import asyncpg
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Postgres channel notified with the order_id whenever new log rows are committed
+NOTIFY_CHANNEL = "site_generation_logs"
+
+LogListener = Callable[[List[Dict[str, Any]]], Awaitable[None]]
+
+INSERT_JSONB_SQL = """
+    INSERT INTO site_generation_logs (order_id, step, message, status, details, created_at)
+    VALUES ($1, $2, $3, $4, $5::jsonb, $6)
+"""
+
+INSERT_TEXT_SQL = """
+    INSERT INTO site_generation_logs (order_id, step, message, status, details, created_at)
+    VALUES ($1, $2, $3, $4, $5, $6)
+"""
+
+
+def asyncpg_dsn(database_url: str) -> str:
+    """Convert a SQLAlchemy URL into a plain DSN accepted by asyncpg"""
+    for prefix in ("postgresql+asyncpg://", "postgresql+psycopg2://"):
+        if database_url.startswith(prefix):
+            return "postgresql://" + database_url[len(prefix):]
+    return database_url
+
+
+def _serialize_details(details: Optional[dict]) -> Optional[str]:
+    if not details:
+        return None
+    try:
+        return json.dumps(details, default=str)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Could not serialize details for log: {e}")
+        return json.dumps({"error": "Could not serialize details"})
+
+
+class GenerationLogSink:
+    """Process-wide batched writer for site_generation_logs"""
+
+    def __init__(
+        self,
+        database_url: str = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        spill_path: str = None,
+        pool_max_size: int = None,
+    ):
+        self._dsn = asyncpg_dsn(database_url or settings.DATABASE_URL)
+        self.batch_size = batch_size or settings.GENERATION_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.GENERATION_LOG_FLUSH_INTERVAL
+        self.spill_path = spill_path or settings.GENERATION_LOG_SPILL_PATH
+        self.pool_max_size = pool_max_size or settings.GENERATION_LOG_POOL_SIZE
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._listeners: List[LogListener] = []
+        self._pool = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        # None = unknown, True = details column accepts ::jsonb, False = plain text
+        self._jsonb_details: Optional[bool] = None
+
+    # ------------------------------------------------------------------ #
+    # Public API
+    # ------------------------------------------------------------------ #
+
+    def subscribe(self, listener: LogListener) -> None:
+        """Register an async callback invoked with each persisted batch"""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: LogListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    async def emit(self, order_id: int, step: str, message: str, status: str = "info", details: dict = None) -> None:
+        """Queue a log entry; flushes immediately once the batch is full"""
+        self._bind_loop()
+        self._buffer.append({
+            "order_id": order_id,
+            "step": step,
+            "message": message,
+            "status": status,
+            "details": _serialize_details(details),
+            "created_at": datetime.utcnow(),
+        })
+        logger.info(f"[{order_id}] {step}: {message} (status: {status})")
+
+        if len(self._buffer) >= self.batch_size:
+            await self.flush()
+        elif self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> int:
+        """Write every buffered entry to the database (or the spill file). Returns rows written."""
+        self._bind_loop()
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            batch, self._buffer = self._buffer, []
+
+            try:
+                await self._write(batch)
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} generation log(s) to database: {e}", exc_info=True)
+                self._spill(batch)
+                return 0
+
+            replayed = await self._replay_spill()
+
+        await self._notify(replayed + batch)
+        return len(batch)
+
+    async def aclose(self) -> None:
+        """Flush pending entries and release the pool (call at the end of a task/process)"""
+        if self._loop is None:
+            return
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+        await self.flush()
+        if self._pool is not None:
+            try:
+                await self._pool.close()
+            except Exception as e:
+                logger.warning(f"Error closing generation log pool: {e}")
+        self._pool = None
+        self._flusher = None
+        self._loop = None
+        self._lock = None
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _bind_loop(self) -> None:
+        """Pools and locks are loop-bound; rebuild them if the running loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None and self._buffer:
+            # Previous loop died with entries still buffered - keep them on disk
+            self._spill(self._buffer)
+            self._buffer = []
+        if self._pool is not None:
+            # Its connections belong to the old loop and can't be awaited from this one
+            try:
+                self._pool.terminate()
+            except Exception as e:
+                logger.warning(f"Error terminating generation log pool of a previous event loop: {e}")
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._pool = None
+        self._flusher = None
+
+    async def _get_pool(self):
+        if self._pool is None:
+            self._pool = await asyncpg.create_pool(
+                self._dsn,
+                min_size=1,
+                max_size=self.pool_max_size,
+            )
+        return self._pool
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+        except asyncio.CancelledError:
+            pass
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        rows = [
+            (e["order_id"], e["step"], e["message"], e["status"], e["details"], e["created_at"])
+            for e in batch
+        ]
+        order_ids = sorted({e["order_id"] for e in batch})
+        pool = await self._get_pool()
+        async with pool.acquire() as conn:
+            if self._jsonb_details is not False:
+                try:
+                    async with conn.transaction():
+                        await conn.executemany(INSERT_JSONB_SQL, rows)
+                        await self._notify_channel(conn, order_ids)
+                    self._jsonb_details = True
+                    return
+                except (asyncpg.PostgresError, asyncpg.DataError) as jsonb_error:
+                    if self._jsonb_details is True:
+                        raise
+                    logger.info(f"details column rejected ::jsonb, falling back to text: {jsonb_error}")
+                    self._jsonb_details = False
+            async with conn.transaction():
+                await conn.executemany(INSERT_TEXT_SQL, rows)
+                await self._notify_channel(conn, order_ids)
+
+    @staticmethod
+    async def _notify_channel(conn, order_ids: List[int]) -> None:
+        """Wake up LISTENers (SSE streams in API processes); delivered on commit"""
+        for order_id in order_ids:
+            await conn.execute("SELECT pg_notify($1, $2)", NOTIFY_CHANNEL, str(order_id))
+
+    def _spill(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for entry in batch:
+                    f.write(json.dumps({**entry, "created_at": entry["created_at"].isoformat()}) + "\n")
+            logger.warning(f"Spilled {len(batch)} generation log(s) to {self.spill_path}")
+        except Exception as e:
+            logger.error(f"Failed to spill {len(batch)} generation log(s) to {self.spill_path}, dropping them: {e}")
+            for entry in batch:
+                logger.error(f"[{entry['order_id']}] {entry['step']}: {entry['message']} (status: {entry['status']}, not persisted)")
+
+    async def _replay_spill(self) -> List[Dict[str, Any]]:
+        """Re-insert entries spilled while the database was down; returns what was written"""
+        if not os.path.exists(self.spill_path):
+            return []
+        entries: List[Dict[str, Any]] = []
+        replay_path = f"{self.spill_path}.replay"
+        try:
+            os.replace(self.spill_path, replay_path)
+            with open(replay_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entry["created_at"] = datetime.fromisoformat(entry["created_at"])
+                    entries.append(entry)
+            if entries:
+                await self._write(entries)
+                logger.info(f"Replayed {len(entries)} spilled generation log(s)")
+            os.remove(replay_path)
+            return entries
+        except Exception as e:
+            logger.warning(f"Could not replay spilled generation logs (will retry later): {e}")
+            # Put the entries back so the next flush retries them
+            if os.path.exists(replay_path):
+                with open(replay_path, "r", encoding="utf-8") as src, open(self.spill_path, "a", encoding="utf-8") as dst:
+                    dst.write(src.read())
+                os.remove(replay_path)
+            return []
+
+    async def _notify(self, batch: List[Dict[str, Any]]) -> None:
+        for listener in list(self._listeners):
+            try:
+                await listener(batch)
+            except Exception as e:
+                logger.warning(f"Generation log listener failed: {e}")
+
+
+generation_log_sink = GenerationLogSink()
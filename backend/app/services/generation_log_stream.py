@@ -0,0 +1,86 @@
+"""
+Generation Log Stream
+Keeps a single LISTEN connection per API process on the channel fed by the
+generation log sink and wakes up every SSE stream waiting on that order.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import asyncpg
+
+from app.core.config import settings
+from app.services.generation_log_sink import NOTIFY_CHANNEL, asyncpg_dsn
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationLogNotifier:
+    """Fans Postgres NOTIFY messages out to per-order asyncio events"""
+
+    def __init__(self, database_url: str = None):
+        self._dsn = asyncpg_dsn(database_url or settings.DATABASE_URL)
+        self._conn: Optional[asyncpg.Connection] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._waiters: Dict[int, Set[asyncio.Event]] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, order_id: int) -> AsyncIterator[asyncio.Event]:
+        """
+        Yields an event that is set whenever new logs are committed for the order.
+        If LISTEN cannot be established, the event is simply never set and callers
+        fall back to their polling timeout.
+        """
+        event = asyncio.Event()
+        self._waiters.setdefault(order_id, set()).add(event)
+        try:
+            await self._ensure_listening()
+            yield event
+        finally:
+            waiters = self._waiters.get(order_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    self._waiters.pop(order_id, None)
+
+    async def aclose(self) -> None:
+        if self._conn is not None and not self._conn.is_closed():
+            try:
+                await self._conn.close()
+            except Exception as e:
+                logger.warning(f"Error closing generation log LISTEN connection: {e}")
+        self._conn = None
+
+    async def _ensure_listening(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._conn is not None and not self._conn.is_closed():
+                return
+            try:
+                self._conn = await asyncpg.connect(self._dsn)
+                await self._conn.add_listener(NOTIFY_CHANNEL, self._on_notify)
+                self._conn.add_termination_listener(self._on_terminate)
+                logger.info(f"Listening for generation logs on channel '{NOTIFY_CHANNEL}'")
+            except Exception as e:
+                self._conn = None
+                logger.warning(f"Could not LISTEN for generation logs, streams will poll: {e}")
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        try:
+            order_id = int(payload)
+        except (TypeError, ValueError):
+            return
+        for event in self._waiters.get(order_id, ()):
+            event.set()
+
+    def _on_terminate(self, conn) -> None:
+        # Next subscribe() reconnects; wake everyone so they re-check the table meanwhile
+        self._conn = None
+        for waiters in self._waiters.values():
+            for event in waiters:
+                event.set()
+
+
+generation_log_notifier = GenerationLogNotifier()
@@ -5,8 +5,12 @@ Handles repository creation, commits, and branch management
 import httpx
 import logging
 import base64
-from typing import Optional, Dict, Any, List
+import asyncio
+import hashlib
+from typing import Optional, Dict, Any, List, Mapping
 from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.http_clients import http_clients
 from app.services.config_service import ConfigService
 from app.models.configuration import IntegrationType
 
@@ -20,6 +24,7 @@ class GitHubService:
         self._api_token = None
         self._organization = None
         self._default_branch = None
+        self._api_url = None
         
     def _load_config(self):
         """Load GitHub configuration"""
@@ -30,6 +35,7 @@ class GitHubService:
         self._api_token = configs.get("api_token")
         self._organization = configs.get("organization")
         self._default_branch = configs.get("default_branch", "main")
+        self._api_url = configs.get("api_url")
         
         if not self._api_token:
             raise ValueError("GitHub API token not configured")
@@ -43,10 +49,8 @@ class GitHubService:
         }
     
     def _get_base_url(self) -> str:
-        """Get base API URL (supports GitHub Enterprise)"""
-        # For now, use standard GitHub API
-        # Can be extended to support GitHub Enterprise
-        return "https://api.github.com"
+        """Get base API URL (supports GitHub Enterprise via the 'api_url' config key)"""
+        return (self._api_url or "https://api.github.com").rstrip("/")
     
     async def create_repository(self, repo_name: str, private: bool = False, description: str = None) -> Dict[str, Any]:
         """
@@ -62,7 +66,7 @@ class GitHubService:
         """
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with self._http_client() as client:
             if self._organization:
                 # Create in organization
                 url = f"{self._get_base_url()}/orgs/{self._organization}/repos"
@@ -107,7 +111,7 @@ class GitHubService:
         """Get repository information"""
         self._load_config()
         
-        async with httpx.AsyncClient() as client:
+        async with self._http_client() as client:
             if self._organization:
                 url = f"{self._get_base_url()}/repos/{self._organization}/{repo_name}"
             else:
@@ -159,7 +163,7 @@ class GitHubService:
         # Encode content to base64
         content_b64 = base64.b64encode(content).decode('utf-8')
         
-        async with httpx.AsyncClient() as client:
+        async with self._http_client() as client:
             # First, check if file exists
             if self._organization:
                 repo_path = f"{self._organization}/{repo_name}"
@@ -216,7 +220,10 @@ class GitHubService:
                 logger.error(f"❌ Failed to create/update file {file_path}: {error_msg}")
                 raise Exception(f"Failed to create/update file: {error_msg}")
     
-    async def commit_files(self, repo_name: str, files: Dict[str, bytes], message: str, branch: str = None) -> Dict[str, Any]:
+    async def commit_files(
+        self, repo_name: str, files: Mapping[str, bytes], message: str, branch: str = None, bulk: bool = True,
+        blob_shas: Dict[str, str] = None, file_modes: Dict[str, str] = None
+    ) -> Dict[str, Any]:
         """
         Commit multiple files at once
         
@@ -225,6 +232,14 @@ class GitHubService:
             files: Dict mapping file paths to file contents (bytes)
             message: Commit message
             branch: Branch name (default: default_branch from config)
+            bulk: Build a single commit via the Git Data API (blobs -> tree -> commit -> ref).
+                  When False, falls back to one Contents API PUT (and one commit) per file.
+            blob_shas: Known git blob sha per path (e.g. from a site manifest). With bulk, files
+                  are then compared to the remote tree without reading them, so a lazy
+                  mapping only reads the contents that changed.
+            file_modes: Git file mode per path ("100755" for executables, "100644" otherwise).
+                  With bulk, paths without one keep the mode they have in the remote tree
+                  (100644 for new files).
             
         Returns:
             Dict with commit information
@@ -234,6 +249,9 @@ class GitHubService:
         if not branch:
             branch = self._default_branch
         
+        if bulk:
+            return await self._commit_files_bulk(repo_name, files, message, branch, blob_shas, file_modes)
+        
         results = []
         for file_path, content in files.items():
             try:
@@ -252,6 +270,206 @@ class GitHubService:
             "succeeded": success_count
         }
     
+    @staticmethod
+    def git_blob_sha(content: bytes) -> str:
+        """SHA-1 git assigns to a blob with this content (matches tree entries' sha)"""
+        return hashlib.sha1(b"blob %d\0" % len(content) + content).hexdigest()
+    
+    def _http_client(self):
+        """Shared keep-alive client for api.github.com (not closed on exit)"""
+        return http_clients.client("github")
+    
+    async def _get_repo_path(self, client: httpx.AsyncClient, repo_name: str) -> str:
+        """Resolve owner/repo for the configured organization or the token's user"""
+        if self._organization:
+            return f"{self._organization}/{repo_name}"
+        user_response = await client.get(
+            f"{self._get_base_url()}/user",
+            headers=self._get_headers(),
+            timeout=10.0
+        )
+        if user_response.status_code != 200:
+            raise Exception("Failed to get GitHub user info")
+        return f"{user_response.json().get('login')}/{repo_name}"
+    
+    def _raise_for_github_error(self, response: httpx.Response, action: str):
+        error_data = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        error_msg = error_data.get("message", "Unknown error") if isinstance(error_data, dict) else str(error_data)
+        logger.error(f"❌ Failed to {action}: {error_msg}")
+        raise Exception(f"Failed to {action}: {error_msg}")
+    
+    async def _get_branch_head(self, client: httpx.AsyncClient, repo_path: str, branch: str) -> Optional[Dict[str, str]]:
+        """
+        Returns {"commit": sha, "tree": sha} for the branch head, or None if the
+        branch (or the whole repository) is still empty.
+        """
+        base = f"{self._get_base_url()}/repos/{repo_path}/git"
+        ref_response = await client.get(f"{base}/ref/heads/{branch}", headers=self._get_headers())
+        if ref_response.status_code in (404, 409):
+            return None
+        if ref_response.status_code != 200:
+            self._raise_for_github_error(ref_response, f"get branch {branch}")
+        commit_sha = ref_response.json()["object"]["sha"]
+        
+        commit_response = await client.get(f"{base}/commits/{commit_sha}", headers=self._get_headers())
+        if commit_response.status_code != 200:
+            self._raise_for_github_error(commit_response, f"get commit {commit_sha}")
+        return {"commit": commit_sha, "tree": commit_response.json()["tree"]["sha"]}
+    
+    async def _get_remote_blobs(self, client: httpx.AsyncClient, repo_path: str, tree_sha: str) -> Dict[str, Dict[str, str]]:
+        """Map path -> {"sha", "mode"} for every file in a tree"""
+        response = await client.get(
+            f"{self._get_base_url()}/repos/{repo_path}/git/trees/{tree_sha}",
+            headers=self._get_headers(),
+            params={"recursive": "1"}
+        )
+        if response.status_code != 200:
+            self._raise_for_github_error(response, f"get tree {tree_sha}")
+        data = response.json()
+        if data.get("truncated"):
+            # Too large to list in one call; upload everything rather than risk skipping
+            logger.warning(f"Tree {tree_sha} listing truncated, skipping incremental diff")
+            return {}
+        return {
+            entry["path"]: {"sha": entry["sha"], "mode": entry.get("mode", "100644")}
+            for entry in data.get("tree", []) if entry.get("type") == "blob"
+        }
+    
+    async def _commit_files_bulk(
+        self, repo_name: str, files: Mapping[str, bytes], message: str, branch: str, blob_shas: Dict[str, str] = None,
+        file_modes: Dict[str, str] = None
+    ) -> Dict[str, Any]:
+        """
+        Single-commit upload through the Git Data API.
+        Blobs are created concurrently (bounded by GITHUB_BLOB_CONCURRENCY) and files
+        whose git blob sha already matches the remote tree are skipped, so re-runs
+        only upload what changed. A file whose content matches but whose mode
+        (executable bit) differs gets a tree entry for the existing blob. If any blob fails, no commit is made and the
+        branch stays where it was: a partial tree would be built and published.
+        """
+        async with self._http_client() as client:
+            repo_path = await self._get_repo_path(client, repo_name)
+            base = f"{self._get_base_url()}/repos/{repo_path}/git"
+            
+            head = await self._get_branch_head(client, repo_path, branch)
+            bootstrapped = None
+            if head is None and files:
+                # The Git Data API rejects writes to an empty repository; seed it with
+                # one file through the Contents API so there is a commit to build on.
+                bootstrapped = sorted(files, key=lambda p: len(files[p]))[0]
+                await self.create_or_update_file(repo_name, bootstrapped, files[bootstrapped], message, branch)
+                head = await self._get_branch_head(client, repo_path, branch)
+                if head is None:
+                    raise Exception(f"Failed to initialize branch {branch} in {repo_name}")
+            
+            remote_blobs = await self._get_remote_blobs(client, repo_path, head["tree"]) if head else {}
+            
+            def local_sha(path: str) -> str:
+                if blob_shas and path in blob_shas:
+                    return blob_shas[path]
+                return self.git_blob_sha(files[path])
+            
+            def mode(path: str) -> str:
+                if file_modes and path in file_modes:
+                    return file_modes[path]
+                return remote_blobs.get(path, {}).get("mode", "100644")
+            
+            changed, retagged, skipped = [], [], []
+            for path in files:
+                remote = remote_blobs.get(path)
+                if remote is None or remote["sha"] != local_sha(path):
+                    changed.append(path)
+                elif remote["mode"] != mode(path):
+                    retagged.append(path)
+                else:
+                    skipped.append(path)
+            
+            semaphore = asyncio.Semaphore(settings.GITHUB_BLOB_CONCURRENCY)
+            
+            async def create_blob(path: str, content: bytes) -> Dict[str, Any]:
+                async with semaphore:
+                    try:
+                        response = await client.post(
+                            f"{base}/blobs",
+                            headers=self._get_headers(),
+                            json={"content": base64.b64encode(content).decode("utf-8"), "encoding": "base64"}
+                        )
+                        if response.status_code != 201:
+                            self._raise_for_github_error(response, f"create blob for {path}")
+                        return {"file": path, "success": True, "sha": response.json()["sha"]}
+                    except Exception as e:
+                        return {"file": path, "success": False, "error": str(e)}
+            
+            blob_results = await asyncio.gather(*(create_blob(p, files[p]) for p in changed))
+            failed = [r for r in blob_results if not r["success"]]
+            uploaded = [r for r in blob_results if r["success"]] if not failed else []
+            tree_entries = [{"path": r["file"], "sha": r["sha"]} for r in uploaded]
+            tree_entries.extend({"path": path, "sha": remote_blobs[path]["sha"]} for path in retagged)
+            
+            commit_sha = head["commit"] if head else None
+            if failed:
+                logger.error(
+                    f"❌ {len(failed)} blob(s) failed to upload to {repo_name}, branch {branch} not updated: "
+                    f"{failed[0]['file']}: {failed[0]['error']}"
+                )
+            elif tree_entries:
+                tree_response = await client.post(
+                    f"{base}/trees",
+                    headers=self._get_headers(),
+                    json={
+                        "base_tree": head["tree"],
+                        "tree": [
+                            {"path": e["path"], "mode": mode(e["path"]), "type": "blob", "sha": e["sha"]}
+                            for e in tree_entries
+                        ]
+                    }
+                )
+                if tree_response.status_code != 201:
+                    self._raise_for_github_error(tree_response, "create tree")
+                
+                commit_response = await client.post(
+                    f"{base}/commits",
+                    headers=self._get_headers(),
+                    json={
+                        "message": message,
+                        "tree": tree_response.json()["sha"],
+                        "parents": [head["commit"]]
+                    }
+                )
+                if commit_response.status_code != 201:
+                    self._raise_for_github_error(commit_response, "create commit")
+                commit_sha = commit_response.json()["sha"]
+                
+                ref_response = await client.patch(
+                    f"{base}/refs/heads/{branch}",
+                    headers=self._get_headers(),
+                    json={"sha": commit_sha, "force": False}
+                )
+                if ref_response.status_code != 200:
+                    self._raise_for_github_error(ref_response, f"update branch {branch}")
+        
+        results = list(blob_results)
+        results.extend({"file": path, "success": True, "mode_changed": True} for path in retagged if not failed)
+        results.extend({"file": path, "success": True, "skipped": True} for path in skipped)
+        success_count = sum(1 for r in results if r.get("success"))
+        if not failed:
+            logger.info(
+                f"✅ Committed {len(uploaded)} changed file(s) to {repo_name} in one commit "
+                f"({len(skipped)} unchanged)"
+            )
+        
+        return {
+            "success": not failed,
+            "error": f"{len(failed)} file(s) failed to upload, nothing committed" if failed else None,
+            "files": results,
+            "total": len(files),
+            "succeeded": success_count,
+            "uploaded": len(uploaded),
+            "skipped": len(skipped),
+            "bootstrapped": bootstrapped,
+            "commit_sha": commit_sha
+        }
+    
     async def create_branch(self, repo_name: str, branch_name: str, from_branch: str = None) -> Dict[str, Any]:
         """Create a new branch"""
         self._load_config()
@@ -259,7 +477,7 @@ class GitHubService:
         if not from_branch:
             from_branch = self._default_branch
         
-        async with httpx.AsyncClient() as client:
+        async with self._http_client() as client:
             if self._organization:
                 repo_path = f"{self._organization}/{repo_name}"
             else:
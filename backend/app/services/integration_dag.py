@@ -0,0 +1,72 @@
+"""
+Integration DAG
+Runs the post-generation integration stages (GitHub, R2, Pages, DNS) as a small
+dependency graph: every stage starts as soon as the stages it depends on have
+finished, so independent ones overlap.
+
+Failures stay non-fatal per stage: a failed stage is reported through `on_error`
+and its dependents still run (they check the shared deployment_info for what
+their dependencies produced, as the sequential version did).
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IntegrationStage:
+    name: str
+    label: str  # Human-readable name for progress logs
+    run: Callable[[], Awaitable[Optional[str]]]  # Returns a status ("skipped", ...) or None for "success"
+    after: Tuple[str, ...] = ()
+
+
+async def run_dag(
+    stages: Sequence[IntegrationStage],
+    on_error: Callable[[IntegrationStage, Exception], Awaitable[None]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the stages and return per-stage timing:
+    {name: {"status", "started_ms", "duration_ms", "error"?}}, with started_ms
+    relative to the start of the DAG.
+
+    Stages must be listed after the stages they depend on (this rules out cycles).
+    """
+    tasks: Dict[str, asyncio.Task] = {}
+    timings: Dict[str, Dict[str, Any]] = {}
+    dag_started = time.perf_counter()
+
+    async def _run(stage: IntegrationStage) -> None:
+        if stage.after:
+            await asyncio.gather(*(tasks[name] for name in stage.after))
+        started = time.perf_counter()
+        entry: Dict[str, Any] = {"started_ms": round((started - dag_started) * 1000)}
+        try:
+            entry["status"] = await stage.run() or "success"
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e)
+            if on_error is not None:
+                try:
+                    await on_error(stage, e)
+                except Exception:
+                    logger.exception(f"Error handler failed for integration stage {stage.name}")
+        entry["duration_ms"] = round((time.perf_counter() - started) * 1000)
+        timings[stage.name] = entry
+
+    declared = set()
+    for stage in stages:
+        missing = [name for name in stage.after if name not in declared]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown or later stages: {missing}")
+        declared.add(stage.name)
+
+    for stage in stages:
+        tasks[stage.name] = asyncio.create_task(_run(stage), name=f"integration:{stage.name}")
+
+    await asyncio.gather(*tasks.values())
+    return {stage.name: timings[stage.name] for stage in stages}
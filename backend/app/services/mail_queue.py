@@ -0,0 +1,316 @@
+"""
+Mail Queue
+Outbound email without blocking request handlers on SMTP. EmailService.send_email
+commits the message to outbound_emails and returns; a sender task in each API
+process drains the table over one long-lived, authenticated SMTP session
+(aiosmtplib), sending a whole batch per session, and retries transient failures
+with exponential backoff.
+
+- Durable: a message is committed before send_email returns, so a crash or an
+  SMTP outage only delays it. Delivery is at-least-once: a crash between the
+  server accepting a message and its row being marked sent resends it.
+- Multi-process: senders claim due rows with FOR UPDATE SKIP LOCKED and hold the
+  lock while sending, so API workers share the queue without double sends.
+- Latency: submit() wakes the sender of its own process; mail queued elsewhere
+  (e.g. Celery workers) is picked up within MAIL_QUEUE_POLL_INTERVAL.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Dict, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.outbound_email import OutboundEmail, OutboundEmailStatus as Status
+
+logger = logging.getLogger(__name__)
+
+
+def build_message(from_name: str, from_email: str, to_email: str, subject: str,
+                  html_content: str, text_content: Optional[str] = None) -> MIMEMultipart:
+    """multipart/alternative message: plain text fallback (if any) plus the HTML version"""
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = f"{from_name} <{from_email}>"
+    msg["To"] = to_email
+    if text_content:
+        msg.attach(MIMEText(text_content, "plain"))
+    msg.attach(MIMEText(html_content, "html"))
+    return msg
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next try after `attempts` failures"""
+    return min(settings.MAIL_QUEUE_RETRY_MAX, settings.MAIL_QUEUE_RETRY_BASE * 2 ** max(0, attempts - 1))
+
+
+def is_message_error(error: Exception) -> bool:
+    """The server rejected this message; the session itself is still usable"""
+    import aiosmtplib
+    return isinstance(error, (
+        aiosmtplib.SMTPRecipientsRefused,
+        aiosmtplib.SMTPRecipientRefused,
+        aiosmtplib.SMTPSenderRefused,
+        aiosmtplib.SMTPDataError,
+    ))
+
+
+def is_permanent(error: Exception) -> bool:
+    """5xx for the recipients or the content won't succeed on retry"""
+    import aiosmtplib
+    if isinstance(error, aiosmtplib.SMTPRecipientsRefused):
+        return all(refused.code >= 500 for refused in error.recipients)
+    if isinstance(error, (aiosmtplib.SMTPRecipientRefused, aiosmtplib.SMTPDataError)):
+        return error.code >= 500
+    # Sender refusals are usually configuration: keep retrying until it's fixed
+    return False
+
+
+class SMTPSession:
+    """One authenticated SMTP connection, reused across messages until it idles out or drops"""
+
+    def __init__(self, host: str, port: int, username: str = None, password: str = None,
+                 start_tls: bool = None, timeout: float = None, idle_timeout: float = None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.start_tls = settings.SMTP_STARTTLS if start_tls is None else start_tls
+        self.timeout = timeout or settings.SMTP_TIMEOUT
+        self.idle_timeout = idle_timeout or settings.SMTP_IDLE_TIMEOUT
+        self.connects = 0
+        self._client = None
+        self._last_used = 0.0
+
+    async def send(self, message) -> None:
+        """Send one message, connecting first if needed; a reused session that dropped is retried once"""
+        import aiosmtplib
+
+        reused = await self._ensure_connected()
+        try:
+            await self._client.send_message(message)
+        except aiosmtplib.SMTPServerDisconnected:
+            await self.close()
+            if not reused:
+                raise
+            await self._ensure_connected()
+            await self._client.send_message(message)
+        self._last_used = time.monotonic()
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is None:
+            return
+        try:
+            if client.is_connected:
+                await client.quit()
+        except Exception:
+            client.close()
+
+    async def _ensure_connected(self) -> bool:
+        """True if the open session was reused, False if a new one was opened"""
+        import aiosmtplib
+
+        if (
+            self._client is not None
+            and self._client.is_connected
+            and time.monotonic() - self._last_used < self.idle_timeout
+        ):
+            return True
+        await self.close()
+        # 465 is implicit TLS; anything else upgrades with STARTTLS unless disabled
+        use_tls = self.port == 465
+        client = aiosmtplib.SMTP(
+            hostname=self.host,
+            port=self.port,
+            timeout=self.timeout,
+            use_tls=use_tls,
+            start_tls=False if use_tls else self.start_tls,
+        )
+        await client.connect()
+        if self.username and self.password:
+            await client.login(self.username, self.password)
+        self._client = client
+        self._last_used = time.monotonic()
+        self.connects += 1
+        logger.info(f"Mail queue: SMTP session opened to {self.host}:{self.port}")
+        return False
+
+
+class MailQueue:
+    """Durable outbound mail: submit() persists, the sender task delivers"""
+
+    def __init__(self, batch_size: int = None, poll_interval: float = None):
+        self.batch_size = batch_size or settings.MAIL_QUEUE_BATCH_SIZE
+        self.poll_interval = poll_interval or settings.MAIL_QUEUE_POLL_INTERVAL
+        self._session: Optional[SMTPSession] = None
+        self._session_key: Optional[Tuple] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"sent": 0, "retried": 0, "failed": 0}
+
+    async def submit(self, to_email: str, subject: str, html_content: str,
+                     text_content: Optional[str] = None) -> int:
+        """Persist a message for delivery and return its id"""
+        from app.core.database import AsyncSessionLocal
+
+        email = OutboundEmail(
+            to_email=to_email,
+            subject=subject,
+            html_content=html_content,
+            text_content=text_content,
+            status=Status.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.utcnow(),
+        )
+        async with AsyncSessionLocal() as db:
+            db.add(email)
+            await db.commit()
+        self.wake()
+        return email.id
+
+    def wake(self) -> None:
+        """Have this process's sender look at the queue now instead of at the next poll"""
+        if self._wake is not None and self._loop is asyncio.get_running_loop():
+            self._wake.set()
+
+    def start(self) -> None:
+        """Start the sender task on the running loop (API startup)"""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        """Stop the sender and close the SMTP session (unsent mail stays queued)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._wake = None
+        self._loop = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def drain(self) -> int:
+        """Send one batch of due messages; returns how many rows were processed"""
+        from app.core.database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(OutboundEmail)
+                .where(OutboundEmail.status == Status.PENDING, OutboundEmail.next_attempt_at <= datetime.utcnow())
+                .order_by(OutboundEmail.next_attempt_at, OutboundEmail.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            emails = result.scalars().all()
+            if not emails:
+                return 0
+            # The row locks are held while sending, so no other sender picks these up
+            await self.deliver(emails)
+            await db.commit()
+        return len(emails)
+
+    async def deliver(self, emails: Sequence[OutboundEmail]) -> None:
+        """Send the messages over the shared SMTP session and record each outcome on its row"""
+        try:
+            session, config = await self._get_session()
+        except Exception as e:
+            for email in emails:
+                self._record_failure(email, e, permanent=False)
+            return
+
+        for index, email in enumerate(emails):
+            message = build_message(
+                config.from_name,
+                config.from_email,
+                email.to_email,
+                email.subject,
+                email.html_content,
+                email.text_content,
+            )
+            try:
+                await session.send(message)
+            except Exception as e:
+                if is_message_error(e):
+                    self._record_failure(email, e, permanent=is_permanent(e))
+                    continue
+                # Connection, login or timeout: the rest of the batch would fail the same way
+                await session.close()
+                for pending in emails[index:]:
+                    self._record_failure(pending, e, permanent=False)
+                return
+            email.status = Status.SENT
+            email.attempts += 1
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+            self.stats["sent"] += 1
+            logger.info(f"Mail queue: sent #{email.id} to {email.to_email}")
+
+    def metrics(self) -> Dict[str, int]:
+        return {**self.stats, "smtp_connects": self._session.connects if self._session else 0}
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _record_failure(self, email: OutboundEmail, error: Exception, permanent: bool) -> None:
+        email.attempts += 1
+        email.last_error = str(error)[:2000]
+        if permanent or email.attempts >= settings.MAIL_QUEUE_MAX_ATTEMPTS:
+            email.status = Status.FAILED
+            self.stats["failed"] += 1
+            logger.error(f"Mail queue: giving up on #{email.id} to {email.to_email} after {email.attempts} attempt(s): {error}")
+            return
+        delay = retry_delay(email.attempts)
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        self.stats["retried"] += 1
+        logger.warning(f"Mail queue: #{email.id} to {email.to_email} failed, retrying in {delay:.0f}s: {error}")
+
+    async def _get_session(self):
+        """The SMTP session and settings from the current config snapshot (a new session if they changed)"""
+        from app.services.email_service import email_service
+        from app.services.system_config_cache import system_config_cache
+
+        config = email_service.smtp_config(await system_config_cache.get())
+        key = (config.host, config.port, config.user, config.password)
+        if self._session is None or key != self._session_key:
+            if self._session is not None:
+                await self._session.close()
+            self._session = SMTPSession(config.host, config.port, config.user, config.password)
+            self._session_key = key
+        return self._session, config
+
+    async def _run(self) -> None:
+        backoff = 1.0
+        while True:
+            # Cleared before draining so a submit() during the drain triggers another round
+            self._wake.clear()
+            try:
+                processed = await self.drain()
+                backoff = 1.0
+            except Exception as e:
+                logger.error(f"Mail queue: drain failed, retrying in {backoff:.0f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60.0)
+                continue
+            if processed >= self.batch_size:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+mail_queue = MailQueue()
@@ -8,6 +8,7 @@ from app.repositories.order_repository import OrderRepository
 from app.api.site_customers import create_customer_account
 from app.services.email_service import email_service
 from app.services.site_generator_service import SiteGeneratorService
+from app.services.generation_dispatch import request_generation, dispatch
 from app.models.site_order import SiteOrder, SiteOrderStatus, SiteOnboarding
 from app.models.site_customer import SiteCustomer
 
@@ -52,20 +53,13 @@ class OnboardingService:
         # 4. Handle Customer Account
         await self._handle_customer_account(order, onboarding_data)
         
+        # 5. Request AI Generation in the same transaction (outbox) - AUTOMATIC AND MANDATORY
+        await request_generation(self.db, order.id)
+        
         await self.db.commit()
         
-        # 5. Trigger AI Generation (Background) - AUTOMATIC AND MANDATORY
-        try:
-            self._trigger_ai_generation(order.id)
-            generation_started = True
-            logger.info(f"✅ AI generation AUTOMATICALLY triggered for order {order.id} after onboarding completion")
-        except Exception as e:
-            logger.error(f"❌ CRITICAL: Failed to trigger AI generation for order {order.id}: {e}", exc_info=True)
-            # Don't revert status - keep as GENERATING and log the error
-            # The auto-start-stuck-orders endpoint will catch this
-            generation_started = False
-            # Still commit the order status change
-            await self.db.commit()
+        # 6. Send it to the workers now; if this fails the periodic sweep sends it
+        generation_started = await self._trigger_ai_generation(order.id)
         
         return {
             "message": "Onboarding submitted successfully",
@@ -112,18 +106,14 @@ class OnboardingService:
                 }
             )
 
-    def _trigger_ai_generation(self, order_id: int):
-        """Triggers AI generation using Celery task queue."""
-        import logging
-        from app.tasks.site_generation import generate_site_task
-        
-        logger = logging.getLogger(__name__)
-        
+    async def _trigger_ai_generation(self, order_id: int) -> bool:
+        """Dispatches the order's pending generation request to the Celery workers."""
         try:
-            # Enqueue Celery task instead of threading
-            celery_task = generate_site_task.delay(order_id, resume=True)
-            logger.info(f"✅ Enqueued Celery task {celery_task.id} for AI generation of order {order_id}")
-            return celery_task
+            sent = await dispatch(self.db, [order_id])
         except Exception as e:
-            logger.error(f"❌ Failed to enqueue Celery task for order {order_id}: {e}", exc_info=True)
-            raise
+            logger.error(f"❌ Failed to dispatch AI generation for order {order_id}, the sweep will retry: {e}", exc_info=True)
+            await self.db.rollback()
+            return False
+        if sent:
+            logger.info(f"✅ AI generation AUTOMATICALLY triggered for order {order_id} (task {sent[0]['task_id']})")
+        return bool(sent)
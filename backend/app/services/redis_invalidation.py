@@ -0,0 +1,113 @@
+"""
+Redis Invalidation
+Cross-process invalidation for the in-process caches (AI configs, system
+configs, user principals): a write publishes on the cache's Redis channel and
+every API and Celery process runs a listener thread that applies it locally.
+
+    listener = RedisInvalidationListener(
+        "ai_config_invalidate", on_message=lambda data: cache.invalidate_local(),
+        on_reconnect=cache.invalidate_local, name="ai-config-invalidation",
+    )
+    listener.start()
+    ...
+    await publish_invalidation("ai_config_invalidate", "1", "AI config")
+
+The listener reconnects with exponential backoff and calls on_reconnect after
+every (re)subscribe, since anything published while it was disconnected was
+missed. Each connection attempt closes its client and pubsub before the next
+one. A failed publish is only logged: other processes then rely on their TTL.
+"""
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = 60.0
+
+
+async def publish_invalidation(channel: str, message: str, label: str, redis_url: str = None) -> None:
+    """Publish an invalidation on a channel; failures are logged, not raised"""
+    try:
+        import redis.asyncio as aioredis
+        client = aioredis.from_url(redis_url or settings.REDIS_URL)
+        try:
+            await client.publish(channel, message)
+        finally:
+            await client.close()
+    except Exception as e:
+        logger.warning(f"Could not broadcast {label} invalidation (other processes rely on TTL): {e}")
+
+
+class RedisInvalidationListener:
+    """Daemon thread applying the invalidations published on one Redis channel"""
+
+    def __init__(
+        self,
+        channel: str,
+        on_message: Callable[[Any], None],
+        on_reconnect: Callable[[], None],
+        name: str,
+        redis_url: str = None,
+    ):
+        self.channel = channel
+        self.name = name
+        self._on_message = on_message
+        self._on_reconnect = on_reconnect
+        self._redis_url = redis_url or settings.REDIS_URL
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._backoff = 1.0
+
+    def start(self) -> None:
+        """Start the thread (no-op if it is already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop reconnecting; the current connection ends at its next error or message"""
+        self._stopped.set()
+
+    def is_alive(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _listen_forever(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self._listen_once()
+            except Exception as e:
+                logger.warning(f"{self.name} listener disconnected, retrying in {self._backoff:.0f}s: {e}")
+                self._stopped.wait(self._backoff)
+                self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+
+    def _listen_once(self) -> None:
+        """One connection: subscribe, apply messages until it drops, then close it"""
+        import redis
+
+        client = redis.Redis.from_url(self._redis_url)
+        pubsub = None
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(self.channel)
+            # Anything published while we were disconnected was missed
+            self._on_reconnect()
+            self._backoff = 1.0
+            for message in pubsub.listen():
+                if self._stopped.is_set():
+                    return
+                self._on_message(message["data"])
+            if not self._stopped.is_set():
+                raise ConnectionError("subscription ended")
+        finally:
+            for resource in (pubsub, client):
+                if resource is None:
+                    continue
+                try:
+                    resource.close()
+                except Exception as e:
+                    logger.debug(f"{self.name}: error closing Redis connection: {e}")
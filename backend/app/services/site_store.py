@@ -0,0 +1,284 @@
+"""
+Site Store
+Per-order manifests of the generated sites over the blob store.
+
+When a generation finishes writing an order's tree (SITES_BASE_DIR/project_{id}),
+commit() stores every file as a content-addressed blob and replaces it with a
+link to that blob: files shared across sites (template assets, identical
+renders) exist on disk once. The order's manifest (path -> digest, size, mode,
+git blob sha) is the record of what the site contains. Stage checks, empty-
+generation checks and the file tree API read it instead of walking the
+directory, and the GitHub upload diffs its git shas against the remote tree,
+reading only the blobs that changed.
+
+The tree stays on disk because the build and deploy steps work on a directory.
+A tree without a manifest (generation still writing, or generated before the
+store existed) is still read by walking it.
+
+collect_garbage() removes blobs no manifest references (after a grace period,
+so blobs written by a commit still in progress survive) and the manifests of
+orders that no longer exist.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+from app.core.config import settings
+from app.services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+_CHUNK = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SiteFile:
+    digest: str  # sha256 of the content (the blob's name)
+    size: int
+    mode: str  # git file mode: "100644" or "100755"
+    git_sha: str  # sha1 of the git blob, to diff against a GitHub tree without reading the file
+
+    @property
+    def executable(self) -> bool:
+        return self.mode == "100755"
+
+
+@dataclass
+class SiteManifest:
+    order_id: int
+    committed_at: str
+    files: Dict[str, SiteFile] = field(default_factory=dict)  # "/"-separated path -> file
+
+    @property
+    def files_count(self) -> int:
+        return len(self.files)
+
+    @property
+    def total_size(self) -> int:
+        return sum(f.size for f in self.files.values())
+
+    @property
+    def content_hash(self) -> str:
+        """sha256 over every path, mode and digest: equal exactly when the sites are the same"""
+        h = hashlib.sha256()
+        for path in sorted(self.files):
+            entry = self.files[path]
+            h.update(f"{path}\0{entry.mode}\0{entry.digest}\n".encode())
+        return h.hexdigest()
+
+
+def hash_file(path: str):
+    """(sha256 hex, git blob sha1, size) in one read"""
+    size = os.path.getsize(path)
+    sha256 = hashlib.sha256()
+    git = hashlib.sha1(b"blob %d\0" % size)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                break
+            sha256.update(chunk)
+            git.update(chunk)
+    return sha256.hexdigest(), git.hexdigest(), size
+
+
+class BlobContents(Mapping):
+    """path -> bytes for a manifest, read from the blob store only when asked"""
+
+    def __init__(self, blobs: BlobStore, files: Mapping[str, SiteFile]):
+        self._blobs = blobs
+        self._files = files
+
+    def __getitem__(self, path: str) -> bytes:
+        entry = self._files[path]
+        with open(self._blobs.path(entry.digest, entry.executable), "rb") as f:
+            return f.read()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+class SiteStore:
+    """Manifests of the generated sites, backed by the shared blob store"""
+
+    def __init__(self, blobs: BlobStore = None):
+        self._blobs = blobs
+
+    @property
+    def blobs(self) -> BlobStore:
+        if self._blobs is None:
+            from app.services.template_store import template_store
+            # Same store as the templates, so template files and sites share blobs
+            self._blobs = template_store.blobs
+        return self._blobs
+
+    # ------------------------------------------------------------------ #
+    # Manifests
+    # ------------------------------------------------------------------ #
+
+    def commit(self, order_id: int, target_dir: str) -> SiteManifest:
+        """Store the order's tree as blobs, link the tree to them and save its manifest"""
+        files: Dict[str, SiteFile] = {}
+        for root, dirs, filenames in os.walk(target_dir):
+            dirs.sort()
+            for name in sorted(filenames):
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    continue
+                rel = os.path.relpath(path, target_dir).replace(os.sep, "/")
+                files[rel] = self._store(path)
+        manifest = SiteManifest(order_id, datetime.utcnow().isoformat(), files)
+        self._save(manifest)
+        logger.info(f"Committed site {order_id}: {manifest.files_count} files, {manifest.total_size} bytes")
+        return manifest
+
+    def update(self, order_id: int, target_dir: str, paths: Iterable[str]) -> Optional[SiteManifest]:
+        """Re-store some files of a committed tree (after an edit); no-op if it has no manifest"""
+        manifest = self.manifest(order_id)
+        if manifest is None:
+            return None
+        for rel in paths:
+            rel = rel.strip("/").replace(os.sep, "/")
+            path = os.path.join(target_dir, rel)
+            if os.path.isfile(path):
+                manifest.files[rel] = self._store(path)
+            else:
+                manifest.files.pop(rel, None)
+        manifest.committed_at = datetime.utcnow().isoformat()
+        self._save(manifest)
+        return manifest
+
+    def manifest(self, order_id: int) -> Optional[SiteManifest]:
+        try:
+            with open(self._manifest_path(order_id), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return SiteManifest(
+            order_id=data["order_id"],
+            committed_at=data["committed_at"],
+            files={path: SiteFile(**entry) for path, entry in data["files"].items()},
+        )
+
+    def remove(self, order_id: int) -> None:
+        """Forget the order's manifest (its tree is being deleted or regenerated)"""
+        try:
+            os.unlink(self._manifest_path(order_id))
+        except FileNotFoundError:
+            pass
+
+    def contents(self, manifest: SiteManifest, paths: Iterable[str] = None) -> BlobContents:
+        files = manifest.files if paths is None else {p: manifest.files[p] for p in paths}
+        return BlobContents(self.blobs, files)
+
+    # ------------------------------------------------------------------ #
+    # Garbage collection
+    # ------------------------------------------------------------------ #
+
+    def collect_garbage(self, live_order_ids: Iterable[int] = None, grace_seconds: float = None) -> Dict[str, int]:
+        """
+        Delete blobs no manifest references, and (given the ids of the orders that
+        still exist) the manifests of deleted orders. Blobs younger than the grace
+        period are kept: a commit writes its blobs before its manifest. Trees that
+        link a deleted blob keep their copy (a hardlink outlives the store's name).
+        """
+        grace = settings.SITE_STORE_GC_GRACE if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace
+        stats = {"manifests_removed": 0, "blobs_kept": 0, "blobs_removed": 0, "bytes_freed": 0}
+
+        live = set(live_order_ids) if live_order_ids is not None else None
+        referenced = set()
+        sites_dir = os.path.join(self.blobs.root, "sites")
+        for name in _listdir(sites_dir):
+            if not name.endswith(".json"):
+                continue
+            order_id = int(name[:-5]) if name[:-5].isdigit() else None
+            if live is not None and order_id is not None and order_id not in live:
+                os.unlink(os.path.join(sites_dir, name))
+                stats["manifests_removed"] += 1
+                continue
+            manifest = self.manifest(order_id) if order_id is not None else None
+            if manifest is None:
+                continue
+            referenced.update(f.digest for f in manifest.files.values())
+
+        templates_dir = os.path.join(self.blobs.root, "templates")
+        for name in _listdir(templates_dir):
+            try:
+                with open(os.path.join(templates_dir, name), encoding="utf-8") as f:
+                    referenced.update(entry["digest"] for entry in json.load(f)["files"])
+            except (OSError, ValueError, KeyError):
+                # Unreadable template manifest: don't risk deleting its blobs
+                logger.warning(f"Skipping garbage collection, unreadable template manifest {name}")
+                return stats
+
+        objects_dir = os.path.join(self.blobs.root, "objects")
+        for prefix in _listdir(objects_dir):
+            prefix_dir = os.path.join(objects_dir, prefix)
+            for name in _listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                digest = name.split(".", 1)[0]
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if (digest in referenced and not name.endswith(".tmp")) or st.st_mtime > cutoff:
+                    stats["blobs_kept"] += 1
+                    continue
+                os.unlink(path)
+                stats["blobs_removed"] += 1
+                stats["bytes_freed"] += st.st_size
+        logger.info(f"Site store garbage collection: {stats}")
+        return stats
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _store(self, path: str) -> SiteFile:
+        digest, git_sha, size = hash_file(path)
+        executable = bool(os.stat(path).st_mode & 0o100)
+        blob = self.blobs.path(digest, executable)
+        if not (os.path.exists(blob) and os.path.samefile(blob, path)):
+            self.blobs.put_file(path, digest, executable)
+            # The tree now points at the shared blob instead of holding its own copy
+            self.blobs.materialize(digest, path, executable)
+        return SiteFile(digest, size, "100755" if executable else "100644", git_sha)
+
+    def _manifest_path(self, order_id: int) -> str:
+        return os.path.join(self.blobs.root, "sites", f"{int(order_id)}.json")
+
+    def _save(self, manifest: SiteManifest) -> None:
+        path = self._manifest_path(manifest.order_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": MANIFEST_VERSION,
+                "order_id": manifest.order_id,
+                "committed_at": manifest.committed_at,
+                "files": {p: asdict(entry) for p, entry in manifest.files.items()},
+            }, f)
+        os.replace(tmp, path)
+
+
+def _listdir(path: str) -> List[str]:
+    try:
+        return os.listdir(path)
+    except FileNotFoundError:
+        return []
+
+
+site_store = SiteStore()
@@ -1,13 +1,6 @@
 import stripe
-import os
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.models.system_config import SystemConfig
-from app.core.database import AsyncSessionLocal
-
-# Default fallback (from env or hardcoded logic if needed, but we prefer DB)
-DEFAULT_STRIPE_KEY = os.getenv("STRIPE_SECRET_KEY")
-DEFAULT_STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+from app.services.system_config_cache import system_config_cache
 
 class StripeService:
     def __init__(self, db: AsyncSession = None):
@@ -16,25 +9,11 @@ class StripeService:
         self.webhook_secret = None
 
     async def _load_config(self):
-        """Load Stripe configuration from database."""
-        if not self.db:
-            # Create a new session if one wasn't provided
-            async with AsyncSessionLocal() as session:
-                await self._load_from_session(session)
-        else:
-            await self._load_from_session(self.db)
+        """Load Stripe configuration from the cached config snapshot (env as fallback)."""
+        config = (await system_config_cache.get(self.db)).stripe
+        self.api_key = config.secret_key
+        self.webhook_secret = config.webhook_secret
 
-    async def _load_from_session(self, session: AsyncSession):
-        result = await session.execute(
-            select(SystemConfig).where(
-                SystemConfig.key.in_(["stripe_secret_key", "stripe_webhook_secret", "stripe_enabled"])
-            )
-        )
-        configs = {row.key: row for row in result.scalars().all()}
-        
-        self.api_key = configs.get("stripe_secret_key").value if configs.get("stripe_secret_key") else DEFAULT_STRIPE_KEY
-        self.webhook_secret = configs.get("stripe_webhook_secret").value if configs.get("stripe_webhook_secret") else DEFAULT_STRIPE_WEBHOOK_SECRET
-        
         # Set the key globally for stripe library
         if self.api_key:
             stripe.api_key = self.api_key
@@ -0,0 +1,229 @@
+"""
+System Config Cache
+Process-wide, typed snapshot of system_configs (Stripe, email, site, general)
+and the active integration_configs, loaded in one async round trip and shared
+by every request, task and service in the process instead of ad-hoc queries
+(and the blocking psycopg2 connect the email service used to do).
+
+Snapshots are immutable and versioned: `snapshot.version` increases on every
+reload in this process and `snapshot.updated_at` is the newest row change, so a
+caller can tell whether the configuration moved between two reads.
+
+Writes through the admin endpoints call `await system_config_cache.invalidate()`,
+which drops the local snapshot and publishes on a Redis channel; every API and
+Celery process runs a listener thread (see start_listener) that drops its own.
+The TTL bounds staleness if Redis is unreachable.
+"""
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.configuration import IntegrationConfig
+from app.models.system_config import SystemConfig
+from app.services.redis_invalidation import RedisInvalidationListener, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel used to broadcast invalidations across processes
+INVALIDATION_CHANNEL = "system_config_invalidate"
+
+_load_sequence = itertools.count(1)
+
+
+@dataclass(frozen=True)
+class SMTPConfig:
+    """SMTP settings: system_configs first, then environment, then defaults"""
+    host: str
+    port: int
+    user: str
+    password: str
+    from_email: str
+    from_name: str
+
+    @classmethod
+    def from_values(cls, values: Mapping[str, Any]) -> "SMTPConfig":
+        def pick(key: str, env: str, default: str) -> str:
+            value = values.get(key)
+            return str(value) if value not in (None, "") else os.getenv(env, default)
+
+        return cls(
+            host=pick("smtp_host", "SMTP_HOST", "smtp.gmail.com"),
+            port=int(pick("smtp_port", "SMTP_PORT", "587")),
+            user=pick("smtp_user", "SMTP_USER", ""),
+            password=pick("smtp_password", "SMTP_PASSWORD", ""),
+            from_email=pick("smtp_from_email", "FROM_EMAIL", "team@innexar.com"),
+            from_name=pick("smtp_from_name", "FROM_NAME", "Innexar"),
+        )
+
+
+@dataclass(frozen=True)
+class StripeConfig:
+    """Stripe keys: system_configs first, then environment"""
+    secret_key: Optional[str]
+    publishable_key: Optional[str]
+    webhook_secret: Optional[str]
+    enabled: bool
+
+    @classmethod
+    def from_values(cls, values: Mapping[str, Any]) -> "StripeConfig":
+        return cls(
+            secret_key=values.get("stripe_secret_key") or os.getenv("STRIPE_SECRET_KEY"),
+            publishable_key=values.get("stripe_publishable_key") or os.getenv("STRIPE_PUBLISHABLE_KEY"),
+            webhook_secret=values.get("stripe_webhook_secret") or os.getenv("STRIPE_WEBHOOK_SECRET"),
+            enabled=bool(values.get("stripe_enabled")),
+        )
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Read-only view of the configuration at one point in time"""
+    version: int
+    loaded_at: float
+    updated_at: Optional[datetime]
+    values: Mapping[str, Any] = field(default_factory=dict)  # key -> typed value (SystemConfig.get_value)
+    raw_values: Mapping[str, Optional[str]] = field(default_factory=dict)  # key -> stored string
+    categories: Mapping[str, Mapping[str, Any]] = field(default_factory=dict)
+    integrations: Mapping[str, Mapping[str, str]] = field(default_factory=dict)  # type -> key -> decrypted value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.values.get(key)
+        return default if value is None else value
+
+    def category(self, name: str) -> Dict[str, Any]:
+        return dict(self.categories.get(name, {}))
+
+    def integration(self, integration_type) -> Dict[str, str]:
+        """Active integration_configs of a type (IntegrationType or its value), secrets decrypted"""
+        return dict(self.integrations.get(getattr(integration_type, "value", integration_type), {}))
+
+    @property
+    def smtp(self) -> SMTPConfig:
+        return SMTPConfig.from_values(self.values)
+
+    @property
+    def stripe(self) -> StripeConfig:
+        return StripeConfig.from_values(self.values)
+
+
+class SystemConfigCache:
+    """Process-wide cache of the configuration snapshot"""
+
+    def __init__(self, ttl: float = None, redis_url: str = None):
+        self.ttl = ttl if ttl is not None else settings.SYSTEM_CONFIG_CACHE_TTL
+        self._redis_url = redis_url or settings.REDIS_URL
+        self._snapshot: Optional[ConfigSnapshot] = None
+        # Bumped on every invalidation so a load that raced with a write is not stored
+        self._generation = 0
+        self._listener: Optional[RedisInvalidationListener] = None
+
+    # ------------------------------------------------------------------ #
+    # Reads
+    # ------------------------------------------------------------------ #
+
+    async def get(self, db: AsyncSession = None) -> ConfigSnapshot:
+        """Current snapshot, loading it (with `db`, or a new session) when missing or expired"""
+        snapshot = self.peek()
+        if snapshot is not None:
+            return snapshot
+
+        generation = self._generation
+        if db is not None:
+            snapshot = await self._load(db)
+        else:
+            from app.core.database import AsyncSessionLocal
+            async with AsyncSessionLocal() as session:
+                snapshot = await self._load(session)
+        if generation == self._generation:
+            self._snapshot = snapshot
+        return snapshot
+
+    def peek(self) -> Optional[ConfigSnapshot]:
+        """The cached snapshot if it's still fresh, without any I/O (for sync callers)"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+            return snapshot
+        return None
+
+    # ------------------------------------------------------------------ #
+    # Invalidation
+    # ------------------------------------------------------------------ #
+
+    def invalidate_local(self) -> None:
+        self._generation += 1
+        self._snapshot = None
+
+    async def invalidate(self) -> None:
+        """Drop the snapshot here and tell every other process to do the same"""
+        self.invalidate_local()
+        await publish_invalidation(INVALIDATION_CHANNEL, "1", "system config", self._redis_url)
+
+    def start_listener(self) -> None:
+        """Start the background thread that applies invalidations published by other processes"""
+        if self._listener is None:
+            self._listener = RedisInvalidationListener(
+                INVALIDATION_CHANNEL,
+                on_message=lambda data: self.invalidate_local(),
+                on_reconnect=self.invalidate_local,
+                name="system-config-invalidation",
+                redis_url=self._redis_url,
+            )
+        self._listener.start()
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    async def _load(self, db: AsyncSession) -> ConfigSnapshot:
+        configs = (await db.execute(select(SystemConfig))).scalars().all()
+        integrations = (
+            await db.execute(select(IntegrationConfig).where(IntegrationConfig.is_active == True))
+        ).scalars().all()
+        return build_snapshot(configs, integrations)
+
+
+def build_snapshot(configs, integrations) -> ConfigSnapshot:
+    """Snapshot from SystemConfig and active IntegrationConfig rows"""
+    values: Dict[str, Any] = {}
+    raw_values: Dict[str, Optional[str]] = {}
+    categories: Dict[str, Dict[str, Any]] = {}
+    stamps = []
+    for c in configs:
+        values[c.key] = c.get_value()
+        raw_values[c.key] = c.value
+        categories.setdefault(c.category, {})[c.key] = values[c.key]
+        stamps.append(c.updated_at)
+
+    decrypted: Dict[str, Dict[str, str]] = {}
+    if integrations:
+        from app.services.config_service import ConfigService
+        try:
+            cipher = ConfigService(None)
+        except ValueError as e:
+            logger.warning(f"Integration configs not cached, no encryption key: {e}")
+        else:
+            for c in integrations:
+                value = cipher.decrypt_value(c.value) if c.is_secret else c.value
+                decrypted.setdefault(c.integration_type, {})[c.key] = value
+                stamps.append(c.updated_at)
+
+    stamps = [s for s in stamps if s is not None]
+    return ConfigSnapshot(
+        version=next(_load_sequence),
+        loaded_at=time.monotonic(),
+        updated_at=max(stamps) if stamps else None,
+        values=values,
+        raw_values=raw_values,
+        categories=categories,
+        integrations=decrypted,
+    )
+
+
+system_config_cache = SystemConfigCache()
@@ -0,0 +1,334 @@
+"""
+Template Renderer
+Fills the {{PLACEHOLDER}} tags of a site template in a single pass per file.
+
+Each template file is parsed once per process into a node list (literal text,
+variables, sections) and cached by path, mtime and size, so thousands of orders
+rendering the same template only pay for the parse once. Rendering walks the
+node list with the order's context; files without tags are never opened after
+the first parse and are left exactly as copied.
+
+Tags (names are UPPER_SNAKE; JSX like `style={{ opacity: 0 }}` is not a tag):
+
+    {{NAME}}                 value, escaped for where it sits in the file
+    {{#NAME}} ... {{/NAME}}  body once if NAME is truthy, once per item if it's a
+                             list (dict items add their keys to the scope), else dropped
+    {{#NAME}}                (never closed) renders the NAME partial per item
+
+Escaping is decided at parse time from the file type and the tag's position:
+string literals in JS/TS (quote-aware, including multi-line template literals), JSX
+attribute values and text, JSON strings and CSS values. Unknown variables are
+left as they are, like the old str.replace pass did.
+"""
+import html
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.services.blob_store import write_file
+
+logger = logging.getLogger(__name__)
+
+RENDERED_EXTENSIONS = ('.tsx', '.ts', '.js', '.jsx', '.json', '.css', '.md')
+
+_TAG = re.compile(r"\{\{([#/]?)([A-Z][A-Z0-9_]*)\}\}")
+
+_KINDS = {
+    ".ts": "js",
+    ".js": "js",
+    ".tsx": "jsx",
+    ".jsx": "jsx",
+    ".json": "json",
+    ".css": "css",
+    ".md": "text",
+}
+
+# Node types: (TEXT, str) | (VAR, name, escape, tag) | (SECTION, name, children, closed)
+TEXT, VAR, SECTION = 0, 1, 2
+
+Nodes = Tuple[tuple, ...]
+
+
+# ---------------------------------------------------------------------- #
+# Escaping
+# ---------------------------------------------------------------------- #
+
+def _raw(value: str) -> str:
+    return value
+
+
+def _js_string(quote: str) -> Callable[[str], str]:
+    def escape(value: str) -> str:
+        value = (
+            value.replace("\\", "\\\\")
+            .replace(quote, "\\" + quote)
+            .replace("\r", "")
+            .replace("\n", "\\n")
+            .replace("\u2028", "\\u2028")
+            .replace("\u2029", "\\u2029")
+        )
+        if quote == "`":
+            value = value.replace("${", "\\${")
+        return value
+    return escape
+
+
+def _jsx_attribute(value: str) -> str:
+    # JSX attribute strings have no backslash escapes, only HTML entities
+    return value.replace("&", "&amp;").replace('"', "&quot;")
+
+
+def _jsx_text(value: str) -> str:
+    return html.escape(value, quote=False).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def _json_string(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)[1:-1]
+
+
+_CSS_UNSAFE = re.compile(r"[^\w#%(),./ +-]")
+
+
+def _css_value(value: str) -> str:
+    # Colours and lengths: anything that could close the declaration or the rule is dropped
+    return _CSS_UNSAFE.sub("", value)
+
+
+_ESCAPERS = {
+    "'": _js_string("'"),
+    '"': _js_string('"'),
+    "`": _js_string("`"),
+}
+
+
+class _QuoteScanner:
+    """
+    Which string quote is open at a position, scanning the file forward once
+    (tags are looked up in order). ' and " strings end with their line, template
+    literals (`) span lines; in JS/TS comments are skipped, so an apostrophe in
+    one opens nothing.
+    """
+
+    def __init__(self, text: str, comments: bool = False):
+        self.text = text
+        self.comments = comments
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pos = 0
+        self._quote: Optional[str] = None
+        self._start = -1
+        self._comment: Optional[str] = None
+
+    def open_at(self, pos: int) -> Tuple[Optional[str], int]:
+        """The quote open at `pos` and where it starts"""
+        if pos < self._pos:
+            self._reset()
+        text = self.text
+        i, quote, start, comment = self._pos, self._quote, self._start, self._comment
+        while i < pos:
+            c = text[i]
+            if comment:
+                if comment == "//" and c == "\n":
+                    comment = None
+                elif comment == "/*" and text.startswith("*/", i):
+                    comment = None
+                    i += 2
+                    continue
+            elif quote:
+                if c == "\\":
+                    i += 2
+                    continue
+                if c == quote or (c == "\n" and quote != "`"):
+                    quote = None
+            elif c in "'\"`":
+                quote, start = c, i
+            elif self.comments and text.startswith(("//", "/*"), i):
+                comment = text[i:i + 2]
+                i += 2
+                continue
+            i += 1
+        self._pos, self._quote, self._start, self._comment = i, quote, start, comment
+        return quote, start
+
+
+def escaper_for(kind: str, text: str, pos: int, scanner: _QuoteScanner = None) -> Callable[[str], str]:
+    """How a value placed at `pos` of a `kind` file must be escaped"""
+    if kind == "css":
+        return _css_value
+    scanner = scanner or _QuoteScanner(text, comments=kind in ("js", "jsx"))
+    if kind == "json":
+        quote, _ = scanner.open_at(pos)
+        return _json_string if quote == '"' else _raw
+    if kind in ("js", "jsx"):
+        quote, start = scanner.open_at(pos)
+        if quote is None:
+            # Bare in a .tsx/.jsx file is JSX text (or a number, which escaping leaves alone)
+            return _jsx_text if kind == "jsx" else _raw
+        if kind == "jsx" and quote == '"' and text[:start].rstrip().endswith("="):
+            return _jsx_attribute
+        return _ESCAPERS[quote]
+    return _raw
+
+
+# ---------------------------------------------------------------------- #
+# Parsing and rendering
+# ---------------------------------------------------------------------- #
+
+def parse(text: str, kind: str) -> Optional[Nodes]:
+    """Node list for a template file, or None if it has no tags"""
+    root: List[tuple] = []
+    # Open sections: (name, children, parent)
+    stack: List[Tuple[str, List[tuple], List[tuple]]] = []
+    current = root
+    last = 0
+    found = False
+    scanner = _QuoteScanner(text, comments=kind in ("js", "jsx"))
+    for match in _TAG.finditer(text):
+        found = True
+        marker, name = match.group(1), match.group(2)
+        start, end = match.start(), match.end()
+        if marker:
+            # A section tag alone on its line takes the whole line with it
+            line_start = text.rfind("\n", 0, start) + 1
+            line_end = text.find("\n", end)
+            line_end = len(text) if line_end < 0 else line_end + 1
+            if line_start >= last and not text[line_start:start].strip() and not text[end:line_end].strip():
+                start, end = line_start, line_end
+        if start > last:
+            current.append((TEXT, text[last:start]))
+        last = end
+        if marker == "#":
+            stack.append((name, [], current))
+            current = stack[-1][1]
+        elif marker == "/":
+            if stack and stack[-1][0] == name:
+                name, children, parent = stack.pop()
+                parent.append((SECTION, name, tuple(children), True))
+                current = parent
+            # A stray closing tag renders as nothing
+        else:
+            current.append((VAR, name, escaper_for(kind, text, start, scanner), match.group(0)))
+    if not found:
+        return None
+    if last < len(text):
+        current.append((TEXT, text[last:]))
+
+    # Never closed: the tag stands alone and what followed it belongs to the parent
+    while stack:
+        name, children, parent = stack.pop()
+        parent.append((SECTION, name, (), False))
+        parent.extend(children)
+    return tuple(root)
+
+
+_MISSING = object()
+
+
+def _lookup(scopes: Sequence[Mapping[str, Any]], name: str) -> Any:
+    for scope in reversed(scopes):
+        if name in scope:
+            return scope[name]
+    return _MISSING
+
+
+class TemplateRenderer:
+    """Parses template files once per process and renders them per order"""
+
+    def __init__(self):
+        # path -> (mtime_ns, size, nodes or None)
+        self._files: Dict[str, Tuple[int, int, Optional[Nodes]]] = {}
+        # (kind, source) -> nodes, for partials
+        self._partials: Dict[Tuple[str, str], Nodes] = {}
+        self.stats = {"parsed": 0, "reused": 0, "written": 0}
+
+    def render_tree(self, source_dir: str, target_dir: str, context: Mapping[str, Any],
+                    partials: Mapping[str, str] = None) -> int:
+        """
+        Render every template file under source_dir into the same relative path
+        under target_dir (a copy of it). Only files that contain tags are
+        written. Returns how many were.
+        """
+        written = 0
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = [d for d in dirs if d != "node_modules"]
+            for file in files:
+                if not file.endswith(RENDERED_EXTENSIONS):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    nodes = self.compile(path)
+                    if nodes is None:
+                        continue
+                    kind = _KINDS[os.path.splitext(file)[1]]
+                    content = self.render(nodes, context, partials, kind)
+                    write_file(os.path.join(target_dir, os.path.relpath(path, source_dir)), content)
+                    written += 1
+                except Exception as e:
+                    logger.warning(f"Failed to render template file {path}: {e}")
+        self.stats["written"] += written
+        return written
+
+    def compile(self, path: str) -> Optional[Nodes]:
+        """Cached node list for a file (None if it has no tags); re-parsed when it changes"""
+        st = os.stat(path)
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            self.stats["reused"] += 1
+            return cached[2]
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        nodes = parse(text, _KINDS[os.path.splitext(path)[1]])
+        self._files[path] = (st.st_mtime_ns, st.st_size, nodes)
+        self.stats["parsed"] += 1
+        return nodes
+
+    def render(self, nodes: Nodes, context: Mapping[str, Any],
+               partials: Mapping[str, str] = None, kind: str = "text") -> str:
+        out: List[str] = []
+        self._render(nodes, [context], partials or {}, kind, out)
+        return "".join(out)
+
+    def clear(self) -> None:
+        self._files.clear()
+        self._partials.clear()
+
+    def _partial(self, kind: str, source: str) -> Nodes:
+        key = (kind, source)
+        nodes = self._partials.get(key)
+        if nodes is None:
+            nodes = parse(source, kind) or ((TEXT, source),)
+            self._partials[key] = nodes
+        return nodes
+
+    def _render(self, nodes: Nodes, scopes: List[Mapping[str, Any]], partials: Mapping[str, str],
+                kind: str, out: List[str]) -> None:
+        for node in nodes:
+            if node[0] == TEXT:
+                out.append(node[1])
+            elif node[0] == VAR:
+                value = _lookup(scopes, node[1])
+                if value is _MISSING:
+                    out.append(node[3])
+                elif value is not None:
+                    out.append(node[2](str(value)))
+            else:
+                _, name, children, closed = node
+                value = _lookup(scopes, name)
+                if value is _MISSING or not value:
+                    continue
+                if not closed:
+                    if name not in partials:
+                        continue
+                    children = self._partial(kind, partials[name])
+                if isinstance(value, (list, tuple)):
+                    for item in value:
+                        item_scopes = scopes + [item] if isinstance(item, Mapping) else scopes
+                        self._render(children, item_scopes, partials, kind, out)
+                elif closed:
+                    self._render(children, scopes, partials, kind, out)
+
+
+template_renderer = TemplateRenderer()
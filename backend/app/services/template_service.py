@@ -4,10 +4,14 @@ Manages template selection and customization for site generation.
 """
 import os
 import json
+import logging
 import shutil
 from pathlib import Path
 from typing import Dict, Optional, List
 from app.models.site_order import SiteOnboarding
+from app.services.blob_store import write_file
+
+logger = logging.getLogger(__name__)
 
 class TemplateService:
     """Service for managing and applying templates"""
@@ -58,15 +62,28 @@ class TemplateService:
     
     def copy_template_base(self, template_name: str, target_dir: str) -> bool:
         """
-        Copies template base files to target directory.
+        Materializes template base files into target directory.
+        
+        Files without placeholders are reflinked/hardlinked from the template
+        store; only the ones the renderer rewrites are copied. Falls back to a
+        full copy if the store can't be used.
         
         Returns True if successful, False otherwise.
         """
+        from app.services.template_store import template_store
+        
         template_path = self.get_template_path(template_name)
         
         if not template_path.exists():
             return False
         
+        try:
+            placed = template_store.materialize(template_name, target_dir)
+            logger.info(f"Materialized template {template_name} into {target_dir}: {placed}")
+            return True
+        except Exception as e:
+            logger.warning(f"Template store unavailable for {template_name}, copying instead: {e}")
+        
         try:
             # Copy entire template structure
             if os.path.exists(target_dir):
@@ -156,8 +173,7 @@ class TemplateService:
                     if "hero_subtitle" in content:
                         page_content = page_content.replace("{{HERO_SUBTITLE}}", content["hero_subtitle"])
                     
-                    with open(page_path, "w", encoding="utf-8") as f:
-                        f.write(page_content)
+                    write_file(page_path, page_content)
             
             # Apply file-specific changes
             if "customizations" in customizations:
@@ -0,0 +1,223 @@
+"""
+Template Store
+Per-template manifests over the blob store, used to materialize a template's
+base tree into an order's directory without copying it.
+
+A manifest lists every file of templates/<name>/base with its content digest,
+mode and whether it contains placeholders. Materializing an order's tree
+reflinks or hardlinks the untouched files from the blob store and only copies
+the ones the renderer rewrites. Manifests are built once (hashing the template
+and storing its blobs) and saved next to the blobs, keyed by a stat signature
+of the template tree, so other processes and later runs reuse them until a
+template file changes.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.services.blob_store import BlobStore, copy_private, file_digest
+from app.services.template_renderer import RENDERED_EXTENSIONS, template_renderer
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class TemplateFile:
+    path: str  # relative to the template base, "/"-separated
+    digest: str
+    size: int
+    executable: bool
+    rendered: bool  # contains placeholders: gets a private copy
+
+
+@dataclass(frozen=True)
+class TemplateManifest:
+    name: str
+    signature: str
+    dirs: Tuple[str, ...]
+    files: Tuple[TemplateFile, ...]
+
+    @property
+    def rendered_paths(self) -> List[str]:
+        return [f.path for f in self.files if f.rendered]
+
+    @property
+    def total_size(self) -> int:
+        return sum(f.size for f in self.files)
+
+
+def _walk(base: str):
+    """(dirs, [(rel path, abs path, stat)]) of a tree, following copytree's view of it"""
+    dirs, files = [], []
+    for root, dirnames, filenames in os.walk(base):
+        dirnames.sort()
+        for d in dirnames:
+            dirs.append(os.path.relpath(os.path.join(root, d), base).replace(os.sep, "/"))
+        for name in sorted(filenames):
+            path = os.path.join(root, name)
+            files.append((os.path.relpath(path, base).replace(os.sep, "/"), path, os.stat(path)))
+    return dirs, files
+
+
+def _signature(dirs, files) -> str:
+    h = hashlib.sha256()
+    for d in dirs:
+        h.update(f"d {d}\n".encode())
+    for rel, _, st in files:
+        h.update(f"f {rel} {st.st_size} {st.st_mtime_ns} {st.st_mode & 0o777}\n".encode())
+    return h.hexdigest()
+
+
+class TemplateStore:
+    """Manifests of the site templates and materialization of their base trees"""
+
+    def __init__(self, blobs: BlobStore = None, templates_dir: str = None):
+        self._blobs = blobs
+        self._templates_dir = templates_dir
+        self._manifests: Dict[str, TemplateManifest] = {}
+
+    @property
+    def blobs(self) -> BlobStore:
+        if self._blobs is None:
+            self._blobs = BlobStore()
+        return self._blobs
+
+    @property
+    def templates_dir(self) -> str:
+        if self._templates_dir is None:
+            from app.services.template_service import TemplateService
+            self._templates_dir = str(TemplateService.TEMPLATES_BASE_DIR)
+        return self._templates_dir
+
+    def base_dir(self, name: str) -> str:
+        return os.path.join(self.templates_dir, name, "base")
+
+    def manifest(self, name: str) -> Optional[TemplateManifest]:
+        """The template's manifest, rebuilt only when a file under its base changed"""
+        base = self.base_dir(name)
+        if not os.path.isdir(base):
+            return None
+        dirs, files = _walk(base)
+        signature = _signature(dirs, files)
+
+        cached = self._manifests.get(name)
+        if cached is not None and cached.signature == signature:
+            return cached
+        manifest = self._read_saved(name, signature)
+        if manifest is None:
+            manifest = self._build(name, base, signature, dirs, files)
+            self._save(manifest)
+        self._manifests[name] = manifest
+        return manifest
+
+    def warm(self) -> Dict[str, int]:
+        """Build (or load) every template's manifest; {name: files}"""
+        warmed = {}
+        if not os.path.isdir(self.templates_dir):
+            return warmed
+        for name in sorted(os.listdir(self.templates_dir)):
+            try:
+                manifest = self.manifest(name)
+            except Exception as e:
+                logger.warning(f"Could not index template {name}: {e}")
+                continue
+            if manifest is not None:
+                warmed[name] = len(manifest.files)
+        return warmed
+
+    def materialize(self, name: str, target_dir: str) -> Dict[str, int]:
+        """
+        Replace target_dir with the template's base tree: placeholder files are
+        copied (the renderer rewrites them), everything else comes from the blob
+        store. Returns counts per placement ("reflinked", "hardlinked", "copied").
+        """
+        manifest = self.manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"Template {name} not found in {self.templates_dir}")
+
+        if os.path.exists(target_dir):
+            shutil.rmtree(target_dir)
+        os.makedirs(target_dir)
+        for d in manifest.dirs:
+            os.makedirs(os.path.join(target_dir, d), exist_ok=True)
+
+        placed = {"reflinked": 0, "hardlinked": 0, "copied": 0}
+        for f in manifest.files:
+            dest = os.path.join(target_dir, f.path)
+            if not self.blobs.has(f.digest, f.executable):
+                # Blob removed behind our back (e.g. a manual cleanup): store it again
+                self.blobs.put_file(os.path.join(self.base_dir(name), f.path), f.digest, f.executable)
+            if f.rendered:
+                copy_private(self.blobs.path(f.digest, f.executable), dest, f.executable)
+                placed["copied"] += 1
+            else:
+                placed[self.blobs.materialize(f.digest, dest, f.executable)] += 1
+        return placed
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    def _build(self, name: str, base: str, signature: str, dirs, files) -> TemplateManifest:
+        entries = []
+        for rel, path, st in files:
+            digest, size = file_digest(path)
+            executable = bool(st.st_mode & stat.S_IXUSR)
+            self.blobs.put_file(path, digest, executable)
+            rendered = (
+                rel.endswith(RENDERED_EXTENSIONS)
+                and "node_modules" not in rel.split("/")
+                and template_renderer.compile(path) is not None
+            )
+            entries.append(TemplateFile(rel, digest, size, executable, rendered))
+        manifest = TemplateManifest(name, signature, tuple(dirs), tuple(entries))
+        logger.info(
+            f"Indexed template {name}: {len(entries)} files, "
+            f"{len(manifest.rendered_paths)} with placeholders, {manifest.total_size} bytes"
+        )
+        return manifest
+
+    def _manifest_path(self, name: str) -> str:
+        return os.path.join(self.blobs.root, "templates", f"{name}.json")
+
+    def _read_saved(self, name: str, signature: str) -> Optional[TemplateManifest]:
+        try:
+            with open(self._manifest_path(name), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != MANIFEST_VERSION or data.get("signature") != signature:
+            return None
+        return TemplateManifest(
+            name=name,
+            signature=signature,
+            dirs=tuple(data["dirs"]),
+            files=tuple(TemplateFile(**entry) for entry in data["files"]),
+        )
+
+    def _save(self, manifest: TemplateManifest) -> None:
+        path = self._manifest_path(manifest.name)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": MANIFEST_VERSION,
+                    "signature": manifest.signature,
+                    "dirs": list(manifest.dirs),
+                    "files": [asdict(entry) for entry in manifest.files],
+                }, f)
+            os.replace(tmp, path)
+        except OSError as e:
+            # Still usable from memory; the next process just indexes again
+            logger.warning(f"Could not save manifest for template {manifest.name}: {e}")
+
+
+template_store = TemplateStore()
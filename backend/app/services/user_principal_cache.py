@@ -0,0 +1,233 @@
+"""
+User Principal Cache
+Short-TTL cache of the authenticated user behind get_current_user, so the many
+parallel calls a CRM page makes don't each run SELECT users WHERE id = ?.
+
+Entries are keyed by (user_id, token_version): the token carries the version
+it was issued with ("tv" claim) and bumping users.token_version makes every
+older token miss the cache and fail the version check against the fresh row.
+
+- Memory tier: per-process LRU, bounded by USER_CACHE_TTL.
+- Redis tier (optional, USER_CACHE_REDIS): shares loaded principals across API
+  workers so a cold worker doesn't go to Postgres either.
+- Invalidation: user writes (users.py) call `await user_principal_cache.invalidate(id)`,
+  which drops the user here and in Redis and publishes the id so every other
+  process drops its copy too (see start_listener).
+
+Cached principals never include password_hash.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.models.user import User
+from app.services.redis_invalidation import RedisInvalidationListener, publish_invalidation
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "auth:user:"
+INVALIDATION_CHANNEL = "user_principal_invalidate"
+
+# Seconds to skip Redis after a connection error (the memory tier keeps working)
+REDIS_RETRY_AFTER = 30.0
+
+_FIELDS = ("id", "email", "name", "role", "is_active", "token_version", "created_at", "updated_at")
+_DATETIME_FIELDS = ("created_at", "updated_at")
+
+_Key = Tuple[int, int]
+
+
+def _to_principal(user: User) -> Dict[str, Any]:
+    principal = {field: getattr(user, field) for field in _FIELDS}
+    principal["token_version"] = principal["token_version"] or 0
+    return principal
+
+
+def _to_user(principal: Dict[str, Any]) -> User:
+    """
+    Detached User carrying the cached columns: endpoints read attributes as before,
+    and attaching it to a relationship merges it instead of INSERTing a new row.
+    """
+    user = User(**principal)
+    make_transient_to_detached(user)
+    return user
+
+
+class UserPrincipalCache:
+    """Process-wide LRU of authenticated users, optionally backed by Redis"""
+
+    def __init__(self, ttl: float = None, max_entries: int = None, use_redis: bool = None, redis_url: str = None):
+        self.ttl = ttl if ttl is not None else settings.USER_CACHE_TTL
+        self.max_entries = max_entries or settings.USER_CACHE_MAX_ENTRIES
+        self.use_redis = settings.USER_CACHE_REDIS if use_redis is None else use_redis
+        self._redis_url = redis_url or settings.REDIS_URL
+        self._memory: "OrderedDict[_Key, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # Bumped per user on invalidation so a load that raced with a write is not stored
+        self._generations: Dict[int, int] = {}
+        # The listener thread invalidates while request handlers read
+        self._lock = threading.Lock()
+        self._redis = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_down_until = 0.0
+        self._listener: Optional[RedisInvalidationListener] = None
+        self.stats = {"memory_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0, "redis_errors": 0}
+
+    async def get_user(self, db: AsyncSession, user_id: int, token_version: int = 0) -> Optional[User]:
+        """
+        The user for a verified token, or None if it doesn't exist, is inactive
+        or the token was issued before the user's current token_version.
+        """
+        principal = await self._get(db, user_id, token_version)
+        if principal is None or not principal["is_active"] or principal["token_version"] != token_version:
+            return None
+        return _to_user(principal)
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop the user here, in Redis and (via pub/sub) in every other process"""
+        self.invalidate_local(user_id)
+        client = self._get_redis() if self.use_redis else None
+        if client is not None:
+            try:
+                await client.delete(KEY_PREFIX + str(user_id))
+            except Exception as e:
+                self._redis_failed(e)
+        await publish_invalidation(INVALIDATION_CHANNEL, str(user_id), "user", self._redis_url)
+
+    def invalidate_local(self, user_id: Optional[int] = None) -> None:
+        """Drop one user (or everyone, with no id) from this process"""
+        with self._lock:
+            self.stats["invalidations"] += 1
+            if user_id is None:
+                self._generations = {uid: gen + 1 for uid, gen in self._generations.items()}
+                self._memory.clear()
+                return
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            for key in [key for key in self._memory if key[0] == user_id]:
+                del self._memory[key]
+
+    def start_listener(self) -> None:
+        """Start the background thread that applies invalidations published by other processes"""
+        if self._listener is None:
+            self._listener = RedisInvalidationListener(
+                INVALIDATION_CHANNEL,
+                on_message=self._on_invalidation,
+                on_reconnect=self.invalidate_local,
+                name="user-principal-invalidation",
+                redis_url=self._redis_url,
+            )
+        self._listener.start()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats["memory_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = self.stats["memory_hits"] + self.stats["redis_hits"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+        }
+
+    # ------------------------------------------------------------------ #
+    # Internals
+    # ------------------------------------------------------------------ #
+
+    async def _get(self, db: AsyncSession, user_id: int, token_version: int) -> Optional[Dict[str, Any]]:
+        key = (user_id, token_version)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, principal = entry
+                if expires_at > time.monotonic():
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return principal
+                del self._memory[key]
+            generation = self._generations.get(user_id, 0)
+
+        principal = await self._redis_get(user_id)
+        if principal is not None:
+            self.stats["redis_hits"] += 1
+        else:
+            self.stats["misses"] += 1
+            user = (await db.execute(select(User).where(User.id == user_id))).scalar_one_or_none()
+            if user is None:
+                return None
+            principal = _to_principal(user)
+            await self._redis_set(user_id, principal)
+
+        with self._lock:
+            if generation == self._generations.get(user_id, 0):
+                self._memory[key] = (time.monotonic() + self.ttl, principal)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+        return principal
+
+    async def _redis_get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        client = self._get_redis() if self.use_redis else None
+        if client is None:
+            return None
+        try:
+            raw = await client.get(KEY_PREFIX + str(user_id))
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+        if not raw:
+            return None
+        principal = json.loads(raw)
+        for field in _DATETIME_FIELDS:
+            if principal.get(field):
+                principal[field] = datetime.fromisoformat(principal[field])
+        return principal
+
+    async def _redis_set(self, user_id: int, principal: Dict[str, Any]) -> None:
+        client = self._get_redis() if self.use_redis else None
+        if client is None:
+            return
+        stored = {
+            field: value.isoformat() if isinstance(value, datetime) else value
+            for field, value in principal.items()
+        }
+        try:
+            await client.set(KEY_PREFIX + str(user_id), json.dumps(stored), ex=max(1, int(self.ttl)))
+        except Exception as e:
+            self._redis_failed(e)
+
+    def _get_redis(self):
+        """redis.asyncio clients are loop-bound; rebuild when the running loop changes"""
+        if time.monotonic() < self._redis_down_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            import redis.asyncio as aioredis
+            self._redis = aioredis.from_url(
+                self._redis_url,
+                socket_connect_timeout=1,
+                socket_timeout=1,
+            )
+            self._loop = loop
+        return self._redis
+
+    def _redis_failed(self, error: Exception) -> None:
+        self.stats["redis_errors"] += 1
+        self._redis_down_until = time.monotonic() + REDIS_RETRY_AFTER
+        logger.warning(f"User cache: Redis unavailable, using memory only for {REDIS_RETRY_AFTER:.0f}s: {error}")
+
+    def _on_invalidation(self, data) -> None:
+        """A user id published by another process (anything else drops everyone)"""
+        try:
+            self.invalidate_local(int(data))
+        except (TypeError, ValueError):
+            self.invalidate_local()
+
+
+user_principal_cache = UserPrincipalCache()
@@ -0,0 +1,26 @@
+"""
+Periodic reconciliation of the dashboard rollup counters
+"""
+import logging
+from app.celery_app import celery_app
+from app.core.database import AsyncSessionLocal
+from app.core.worker_runtime import worker_runtime
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.dashboard_rollups.reconcile_dashboard_rollups")
+def reconcile_dashboard_rollups():
+    """
+    Recomputes dashboard_rollups from contacts/opportunities/activities and fixes
+    any counter that drifted (writes that bypassed the ORM, manual SQL, bugs).
+    """
+    from app.services.dashboard_rollups import reconcile
+
+    async def _reconcile():
+        async with AsyncSessionLocal() as db:
+            return await reconcile(db)
+
+    drift = worker_runtime.run(_reconcile())
+    logger.info(f"[Dashboard Rollups] Reconciled, {drift} counter(s) corrected")
+    return {"drift": drift}
@@ -0,0 +1,30 @@
+"""
+Periodic sweep of the site generation outbox
+"""
+import logging
+from app.celery_app import celery_app
+from app.core.database import AsyncSessionLocal
+from app.core.worker_runtime import worker_runtime
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.generation_dispatch.sweep_generation_dispatches")
+def sweep_generation_dispatches():
+    """
+    Sends the generation requests that are due: outbox rows nobody dispatched
+    (process died after commit, broker down), queued tasks no worker picked up in
+    time and running tasks whose worker stopped heartbeating.
+    
+    Only reads the active rows through their lease index, so it's cheap to run often.
+    """
+    from app.services.generation_dispatch import dispatch
+
+    async def _sweep():
+        async with AsyncSessionLocal() as db:
+            return await dispatch(db)
+
+    sent = worker_runtime.run(_sweep())
+    if sent:
+        logger.info(f"[Dispatch] Sweep re-sent {len(sent)} generation(s): {[s['order_id'] for s in sent]}")
+    return {"sent": len(sent), "orders": [s["order_id"] for s in sent]}
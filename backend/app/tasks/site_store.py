@@ -0,0 +1,29 @@
+"""
+Periodic garbage collection of the generated-site blob store
+"""
+import logging
+from app.celery_app import celery_app
+from app.core.database import AsyncSessionLocal
+from app.core.worker_runtime import worker_runtime
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name="app.tasks.site_store.collect_site_store_garbage")
+def collect_site_store_garbage():
+    """
+    Drops the manifests of deleted orders and the blobs no site or template
+    manifest references anymore (older than SITE_STORE_GC_GRACE).
+    """
+    from sqlalchemy import select
+    from app.models.site_order import SiteOrder
+    from app.services.site_store import site_store
+
+    async def _live_order_ids():
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(SiteOrder.id))
+            return [row[0] for row in result.all()]
+
+    stats = site_store.collect_garbage(worker_runtime.run(_live_order_ids()))
+    logger.info(f"[Site Store] Garbage collected: {stats}")
+    return stats
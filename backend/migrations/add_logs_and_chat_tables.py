@@ -40,6 +40,8 @@ async def run_migration():
             );
         """))
         await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_site_generation_logs_order_id ON site_generation_logs(order_id);"))
+        # Composite index for cursor reads (after_id) used by the logs endpoint and SSE stream
+        await conn.execute(text("CREATE INDEX IF NOT EXISTS ix_site_generation_logs_order_id_id ON site_generation_logs(order_id, id);"))
         print("✓ Table site_generation_logs created")
         
         # 2. Chat Threads (Context for AI Chat in IDE)
@@ -31,3 +31,6 @@ CREATE TABLE IF NOT EXISTS chat_messages (
     created_at TIMESTAMP DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS ix_chat_messages_thread_id ON chat_messages(thread_id);
+
+-- Cursor reads for generation logs (GET /site-orders/{id}/logs?after_id=, SSE stream)
+CREATE INDEX IF NOT EXISTS ix_site_generation_logs_order_id_id ON site_generation_logs(order_id, id);
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Authenticated request-path benchmark: GET /api/users/me through the ASGI app,
+with get_current_user reading users on every request (cache off) against the
+user principal cache (cache on). Sequential latency plus a "page load" burst of
+--burst parallel requests, which is how the CRM frontend calls the API.
+
+    DATABASE_URL=postgresql+asyncpg://.../innexar_crm_bench \
+        python scripts/benchmarks/auth_benchmark.py --runs 500 --burst 12
+
+See common.py for the scratch-database requirement.
+"""
+import argparse
+import asyncio
+import time
+
+from common import create_schema, measure, print_table, require_bench_database, seed_crm
+
+
+async def main(runs, burst):
+    require_bench_database()
+    await create_schema()
+    await seed_crm(1_000)
+
+    import httpx
+    from app.core.auth import create_access_token
+    from app.core.config import settings
+    from app.main import app
+    from app.services.user_principal_cache import user_principal_cache
+
+    token = create_access_token({"sub": "bench-2@example.com", "user_id": 2, "role": "vendedor", "tv": 0})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    rows = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def one():
+            response = await client.get("/api/users/me", headers=headers)
+            response.raise_for_status()
+
+        async def page():
+            await asyncio.gather(*(one() for _ in range(burst)))
+
+        for label, enabled in (("no cache", False), ("principal cache", True)):
+            settings.USER_CACHE_ENABLED = enabled
+            user_principal_cache.invalidate_local()
+            single = await measure(one, runs)
+            started = time.perf_counter()
+            burst_stats = await measure(page, max(1, runs // burst))
+            rows.append([
+                label,
+                f"{single['p50']:.2f}", f"{single['p95']:.2f}",
+                f"{burst_stats['p50']:.2f}", f"{burst_stats['p95']:.2f}",
+            ])
+            print(f"{label}: done in {time.perf_counter() - started:.1f}s")
+
+    print_table(
+        f"GET /api/users/me latency in ms ({runs} sequential runs, bursts of {burst})",
+        rows,
+        ["auth path", "request p50", "request p95", "burst p50", "burst p95"],
+    )
+    print(f"\nCache counters: {user_principal_cache.metrics()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--burst", type=int, default=12)
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.burst))
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Dashboard latency benchmark: the previous per-stage query loop (~11 sequential
+round trips) against app.api.dashboard.build_dashboard (one aggregation query,
+with the two lists fetched concurrently), on seeded datasets.
+
+    DATABASE_URL=postgresql+asyncpg://.../innexar_crm_bench \
+        python scripts/benchmarks/dashboard_benchmark.py --sizes 10000 100000 1000000
+
+See common.py for the scratch-database requirement.
+"""
+import argparse
+import asyncio
+from decimal import Decimal
+
+from common import create_schema, measure, print_table, require_bench_database, seed_crm
+
+
+async def legacy_dashboard(db, owner_id):
+    """The pre-aggregation implementation, kept here as the baseline"""
+    from sqlalchemy import and_, func, select
+    from app.models.activity import Activity
+    from app.models.contact import Contact
+    from app.models.opportunity import Opportunity
+
+    def owned(column):
+        return [column == owner_id] if owner_id is not None else []
+
+    await db.scalar(select(func.count(Contact.id)).where(*owned(Contact.owner_id)))
+    await db.scalar(select(func.count(Opportunity.id)).where(*owned(Opportunity.owner_id)))
+    await db.scalar(select(func.sum(Opportunity.value)).where(*owned(Opportunity.owner_id))) or Decimal("0")
+    await db.scalar(select(func.count(Activity.id)).where(and_(Activity.status == "pending", *owned(Activity.owner_id))))
+    for stage in ["qualificacao", "proposta", "negociacao", "fechado", "perdido"]:
+        await db.scalar(
+            select(func.count(Opportunity.id)).where(and_(Opportunity.stage == stage, *owned(Opportunity.owner_id)))
+        )
+    (await db.execute(
+        select(Activity).where(*owned(Activity.owner_id)).order_by(Activity.created_at.desc()).limit(10)
+    )).scalars().all()
+    (await db.execute(
+        select(Opportunity).where(*owned(Opportunity.owner_id)).order_by(Opportunity.value.desc()).limit(5)
+    )).scalars().all()
+
+
+async def main(sizes, runs):
+    require_bench_database()
+    await create_schema()
+
+    from app.api.dashboard import build_dashboard
+    from app.core.database import AsyncSessionLocal
+
+    rows = []
+    for size in sizes:
+        print(f"Seeding {size:,} opportunities...")
+        await seed_crm(size)
+
+        for view, owner_id in (("vendedor", 2), ("admin", None)):
+            async with AsyncSessionLocal() as db:
+                legacy = await measure(lambda: legacy_dashboard(db, owner_id), runs)
+                current = await measure(lambda: build_dashboard(db, owner_id), runs)
+            rows.append([
+                f"{size:,}", view,
+                f"{legacy['p50']:.1f}", f"{legacy['p95']:.1f}",
+                f"{current['p50']:.1f}", f"{current['p95']:.1f}",
+                f"{legacy['p50'] / current['p50']:.1f}x",
+            ])
+
+    print_table(
+        f"Dashboard latency in ms ({runs} runs each)",
+        rows,
+        ["opportunities", "view", "legacy p50", "legacy p95", "new p50", "new p95", "speedup"],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.runs))
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Listing pagination benchmark: deep OFFSET pages against cursor (keyset) pages,
+both ordered by (created_at DESC, id DESC), on a seeded opportunities table.
+
+    DATABASE_URL=postgresql+asyncpg://.../innexar_crm_bench \
+        python scripts/benchmarks/listing_benchmark.py --rows 1000000 --depths 1 100 1000 5000
+
+Depth is the page number at --page-size rows per page; for the cursor variant the
+cursor of the row right before that page is computed once up front, as a client
+would have it from the previous response. See common.py for the scratch-database
+requirement.
+"""
+import argparse
+import asyncio
+
+from common import create_schema, measure, print_table, require_bench_database, seed_crm
+
+
+async def main(rows, depths, page_size, runs, owner_id):
+    require_bench_database()
+    await create_schema()
+
+    from sqlalchemy import select
+    from app.api.pagination import encode_cursor, keyset_page
+    from app.core.database import AsyncSessionLocal
+    from app.models.opportunity import Opportunity
+
+    print(f"Seeding {rows:,} opportunities...")
+    await seed_crm(rows)
+
+    def base_query():
+        query = select(Opportunity)
+        if owner_id is not None:
+            query = query.where(Opportunity.owner_id == owner_id)
+        return query
+
+    results = []
+    async with AsyncSessionLocal() as db:
+        for depth in depths:
+            skip = (depth - 1) * page_size
+
+            cursor = None
+            if skip:
+                boundary = (await db.execute(
+                    base_query()
+                    .order_by(Opportunity.created_at.desc(), Opportunity.id.desc())
+                    .offset(skip - 1).limit(1)
+                )).scalar_one_or_none()
+                if boundary is None:
+                    print(f"Skipping page {depth}: past the end of the data")
+                    continue
+                cursor = encode_cursor(boundary.created_at, boundary.id)
+
+            async def offset_page():
+                return (await db.execute(keyset_page(base_query(), Opportunity, page_size, skip=skip))).all()
+
+            async def cursor_page():
+                return (await db.execute(keyset_page(base_query(), Opportunity, page_size, cursor=cursor))).all()
+
+            offset = await measure(offset_page, runs)
+            keyset = await measure(cursor_page, runs)
+            results.append([
+                f"{depth:,}", f"{skip:,}",
+                f"{offset['p50']:.1f}", f"{offset['p95']:.1f}",
+                f"{keyset['p50']:.1f}", f"{keyset['p95']:.1f}",
+                f"{offset['p50'] / keyset['p50']:.1f}x",
+            ])
+
+    scope = f"owner {owner_id}" if owner_id is not None else "all owners"
+    print_table(
+        f"Opportunity listing latency in ms, {rows:,} rows, {scope}, {page_size}/page ({runs} runs each)",
+        results,
+        ["page", "offset", "offset p50", "offset p95", "cursor p50", "cursor p95", "speedup"],
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--owner-id", type=int, default=None, help="Benchmark the vendedor view for this owner")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.depths, args.page_size, args.runs, args.owner_id))
@@ -0,0 +1,106 @@
+"""
+Tests for the in-process AI config/routing cache
+"""
+import time
+import pytest
+
+from app.services.ai_config_cache import AIConfigCache, AIConfigSnapshot, AIRoutingSnapshot
+
+
+def _config(id, priority=0, is_default=False, is_active=True, status="active"):
+    return AIConfigSnapshot(
+        id=id, name=f"cfg-{id}", provider="openai", model_name="gpt", api_key="k", base_url=None,
+        is_active=is_active, is_default=is_default, status=status, priority=priority, config=None,
+    )
+
+
+class FakeLoader:
+    """Replaces AIConfigCache._load so tests count 'queries' without a database"""
+
+    def __init__(self, configs, routing=None):
+        self.configs = configs
+        self.routing = routing or {}
+        self.loads = 0
+
+    async def __call__(self, db):
+        self.loads += 1
+        return (
+            {c.id: c for c in self.configs},
+            dict(self.routing),
+            time.monotonic(),
+        )
+
+
+@pytest.fixture
+def cache():
+    return AIConfigCache(ttl=60, redis_url="redis://invalid-host:1")
+
+
+class TestAIConfigCache:
+
+    @pytest.mark.asyncio
+    async def test_reads_are_served_from_memory(self, cache):
+        loader = FakeLoader(
+            [_config(1)],
+            {"coding": AIRoutingSnapshot("coding", 1, None, 0.2, 4000)},
+        )
+        cache._load = loader
+
+        for _ in range(5):
+            assert (await cache.get_routing(None, "coding")).primary_config_id == 1
+            assert (await cache.get_config(None, 1)).name == "cfg-1"
+
+        assert loader.loads == 1
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads_even_without_redis(self, cache):
+        loader = FakeLoader([_config(1)])
+        cache._load = loader
+        await cache.get_config(None, 1)
+
+        loader.configs = [_config(1), _config(2)]
+        await cache.invalidate()
+
+        assert await cache.get_config(None, 2) is not None
+        assert loader.loads == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_reloaded(self, cache):
+        cache.ttl = 0
+        loader = FakeLoader([_config(1)])
+        cache._load = loader
+
+        await cache.get_config(None, 1)
+        await cache.get_config(None, 1)
+
+        assert loader.loads == 2
+
+    @pytest.mark.asyncio
+    async def test_active_config_prefers_default_then_priority(self, cache):
+        cache._load = FakeLoader([
+            _config(1, priority=10),
+            _config(2, priority=1, is_default=True),
+            _config(3, priority=5, is_default=True),
+            _config(4, priority=99, is_default=True, status="error"),
+        ])
+        assert (await cache.get_active_config(None)).id == 3
+
+        cache.invalidate_local()
+        cache._load = FakeLoader([_config(1, priority=1), _config(2, priority=7), _config(3, is_active=False, priority=50)])
+        assert (await cache.get_active_config(None)).id == 2
+
+    @pytest.mark.asyncio
+    async def test_load_racing_with_invalidation_is_not_stored(self, cache):
+        loader = FakeLoader([_config(1)])
+
+        async def racing_load(db):
+            state = await loader(db)
+            cache.invalidate_local()  # an admin write lands while we were querying
+            return state
+
+        cache._load = racing_load
+        await cache.get_config(None, 1)
+        cache._load = loader
+        await cache.get_config(None, 1)
+
+        assert loader.loads == 2
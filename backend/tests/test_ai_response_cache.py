@@ -0,0 +1,158 @@
+"""
+Tests for the two-tier AI response cache and its use in AIService routing and
+lead analysis
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from app.api import lead_analysis
+from app.services.ai_config_cache import AIRoutingSnapshot
+from app.services.ai_response_cache import AIResponseCache
+from app.services.ai_service import AIService
+
+
+@pytest.fixture
+def cache():
+    # Unreachable Redis: the memory tier must keep working on its own
+    return AIResponseCache(max_entries=2, default_ttl=60, redis_url="redis://invalid-host:1")
+
+
+class TestAIResponseCache:
+
+    def test_key_ignores_whitespace_but_not_parameters(self):
+        key = AIResponseCache.make_key("openai", "gpt", 0.2, "Sys", "Crie  um site\n  para X")
+        assert key == AIResponseCache.make_key("openai", "gpt", 0.2, " Sys ", "Crie um site para X")
+        assert key != AIResponseCache.make_key("openai", "gpt", 0.7, "Sys", "Crie um site para X")
+        assert key != AIResponseCache.make_key("anthropic", "gpt", 0.2, "Sys", "Crie um site para X")
+
+    @pytest.mark.asyncio
+    async def test_lru_evicts_least_recently_used(self, cache):
+        await cache.set("a", {"content": "A"})
+        await cache.set("b", {"content": "B"})
+        assert await cache.get("a") == {"content": "A"}
+        await cache.set("c", {"content": "C"})
+
+        assert await cache.get("b") is None
+        assert await cache.get("a") is not None
+        assert await cache.get("c") is not None
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_miss(self, cache):
+        await cache.set("a", {"content": "A"}, ttl=-1)
+        assert await cache.get("a") is None
+        assert cache.metrics()["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_discard_removes_entry(self, cache):
+        await cache.set("a", {"content": "A"})
+        await cache.discard("a")
+        assert await cache.get("a") is None
+
+
+class TestAIServiceRoutedCache:
+
+    def _service(self, monkeypatch, cache):
+        config = SimpleNamespace(provider="openai", model_name="gpt")
+        calls = []
+
+        async def get_config(config_id):
+            return config
+
+        async def call_provider(config_id, prompt, system, temperature):
+            calls.append(prompt)
+            return {"content": f"resposta {len(calls)}", "provider": "openai", "model": "gpt"}
+
+        monkeypatch.setattr("app.services.ai_service.ai_response_cache", cache)
+        service = AIService(db=None)
+        monkeypatch.setattr(service, "_get_config", get_config)
+        monkeypatch.setattr(service, "_call_provider", call_provider)
+        return service, calls
+
+    @pytest.mark.asyncio
+    async def test_enabled_task_hits_cache(self, monkeypatch, cache):
+        service, calls = self._service(monkeypatch, cache)
+        routing = AIRoutingSnapshot("coding", 1, None, 0.2, 4000, cache_enabled=True)
+
+        first = await service._call_routed(routing, 1, "prompt", "sys", bypass_cache=False)
+        second = await service._call_routed(routing, 1, "prompt", "sys", bypass_cache=False)
+
+        assert len(calls) == 1
+        assert second["cached"] is True
+        assert second["content"] == first["content"]
+        assert second["cache_key"] == first["cache_key"]
+
+    @pytest.mark.asyncio
+    async def test_bypass_and_disabled_task_call_provider(self, monkeypatch, cache):
+        service, calls = self._service(monkeypatch, cache)
+        enabled = AIRoutingSnapshot("coding", 1, None, 0.2, 4000, cache_enabled=True)
+        disabled = AIRoutingSnapshot("chat", 1, None, 0.2, 4000)
+
+        await service._call_routed(enabled, 1, "prompt", "sys", bypass_cache=False)
+        forced = await service._call_routed(enabled, 1, "prompt", "sys", bypass_cache=True)
+        await service._call_routed(disabled, 1, "prompt", "sys", bypass_cache=False)
+        await service._call_routed(disabled, 1, "prompt", "sys", bypass_cache=False)
+
+        assert len(calls) == 4
+        assert "cached" not in forced
+        assert cache.metrics()["bypassed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_shares_the_cache_with_generate(self, monkeypatch, cache):
+        service, calls = self._service(monkeypatch, cache)
+        routing = AIRoutingSnapshot("coding", 1, None, 0.2, 4000, cache_enabled=True)
+
+        async def stream_with_config(config, prompt, system, temperature):
+            calls.append(prompt)
+            for delta in ("res", "posta"):
+                yield delta
+
+        monkeypatch.setattr(service, "stream_with_config", stream_with_config)
+
+        async def collect(meta):
+            return [d async for d in service._stream_routed(routing, 1, "prompt", "sys", False, meta)]
+
+        first_meta, second_meta = {}, {}
+        assert await collect(first_meta) == ["res", "posta"]
+        assert await collect(second_meta) == ["resposta"]
+        assert second_meta == {"cache_key": first_meta["cache_key"], "cached": True}
+
+        generated = await service._call_routed(routing, 1, "prompt", "sys", bypass_cache=False)
+        assert generated["content"] == "resposta"
+        assert len(calls) == 1
+
+
+class TestLeadAnalysisCache:
+
+    def _patch(self, monkeypatch, cache, routing=None):
+        call_ai_api = AsyncMock(side_effect=lambda prompt, **kwargs: f"análise {call_ai_api.await_count}")
+        monkeypatch.setattr(lead_analysis, "ai_response_cache", cache)
+        monkeypatch.setattr(lead_analysis, "call_ai_api", call_ai_api)
+        monkeypatch.setattr(lead_analysis.ai_config_cache, "get_routing", AsyncMock(return_value=routing))
+        return call_ai_api
+
+    @pytest.mark.asyncio
+    async def test_repeated_analysis_is_served_from_cache(self, monkeypatch, cache):
+        call_ai_api = self._patch(monkeypatch, cache)
+        config = SimpleNamespace(provider="openai", model_name="gpt")
+
+        first = await lead_analysis.run_lead_analysis(None, "Lead: Maria, empresa X", config)
+        second = await lead_analysis.run_lead_analysis(None, "Lead: Maria, empresa X", config)
+        changed = await lead_analysis.run_lead_analysis(None, "Lead: Maria, empresa Y", config)
+
+        assert call_ai_api.await_count == 2
+        assert (first["cached"], second["cached"], changed["cached"]) == (False, True, False)
+        assert second["content"] == first["content"]
+        assert changed["cache_key"] != first["cache_key"]
+
+    @pytest.mark.asyncio
+    async def test_routing_rule_can_disable_the_cache(self, monkeypatch, cache):
+        routing = AIRoutingSnapshot(lead_analysis.LEAD_ANALYSIS_TASK, 1, None, 0.7, 4000)
+        call_ai_api = self._patch(monkeypatch, cache, routing=routing)
+        config = SimpleNamespace(provider="openai", model_name="gpt")
+
+        await lead_analysis.run_lead_analysis(None, "Lead: Maria", config)
+        result = await lead_analysis.run_lead_analysis(None, "Lead: Maria", config)
+
+        assert call_ai_api.await_count == 2
+        assert result["cache_key"] is None
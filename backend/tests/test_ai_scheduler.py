@@ -0,0 +1,175 @@
+"""
+Tests for the AI scheduler: limits, Retry-After and fail-open behaviour offline,
+and the Redis admission script (concurrency cap, RPM/TPM buckets, priority
+classes) when TEST_REDIS_URL points at a scratch Redis (its ai:sched:9001:* keys
+are deleted)
+"""
+import asyncio
+import email.utils
+import os
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.ai_scheduler import (
+    KEY_TTL_MS,
+    AIScheduler,
+    ProviderLimits,
+    _Slot,
+    _current_slot,
+    estimate_tokens,
+    parse_retry_after,
+)
+
+TEST_REDIS_URL = os.getenv("TEST_REDIS_URL")
+
+
+def _config(provider="openai", options=None):
+    return SimpleNamespace(id=1, provider=provider, model_name="m", config=options)
+
+
+class TestAIScheduler:
+
+    def test_parse_retry_after_formats(self):
+        assert parse_retry_after(httpx.Response(429, headers={"retry-after": "12"})) == 12.0
+        assert parse_retry_after(httpx.Response(429, headers={"retry-after-ms": "1500"})) == 1.5
+        date = email.utils.formatdate(time.time() + 30, usegmt=True)
+        assert 25 < parse_retry_after(httpx.Response(429, headers={"retry-after": date})) <= 30
+        assert parse_retry_after(httpx.Response(429)) is None
+
+    def test_limits_come_from_config_then_provider_defaults(self):
+        scheduler = AIScheduler(enabled=False)
+        assert scheduler.limits_for(_config("ollama")).max_concurrency == 2
+        assert scheduler.limits_for(_config("openai", {"rate_limit_rpm": 60, "rate_limit_tpm": 90000})) == ProviderLimits(
+            max_concurrency=8, rpm=60, tpm=90000
+        )
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("a" * 400, None, max_tokens=100) == 200
+
+    @pytest.mark.asyncio
+    async def test_runs_unscheduled_when_redis_is_down(self):
+        scheduler = AIScheduler(redis_url="redis://invalid-host:1", enabled=True)
+        ran = False
+        async with scheduler.slot(_config(), "interactive", 100):
+            ran = True
+        assert ran
+        assert scheduler.stats["unscheduled"] == 1
+
+        # The cool-down skips Redis entirely for the next calls
+        async with scheduler.slot(_config(), "interactive", 100):
+            pass
+        assert scheduler.stats["unscheduled"] == 2
+
+    @pytest.mark.asyncio
+    async def test_response_hook_records_rate_limit_on_current_slot(self):
+        scheduler = AIScheduler(enabled=False)
+        slot = _Slot(config_id=1, ticket="t")
+        _current_slot.set(slot)
+
+        await scheduler._observe_response(httpx.Response(200))
+        assert slot.retry_after is None
+        await scheduler._observe_response(httpx.Response(429, headers={"retry-after": "7"}))
+        assert slot.retry_after == 7.0
+
+        slot.active = False
+        await scheduler._observe_response(httpx.Response(429, headers={"retry-after": "99"}))
+        assert slot.retry_after == 7.0
+
+
+@pytest.mark.skipif(not TEST_REDIS_URL, reason="TEST_REDIS_URL not set")
+class TestAdmissionOnRedis:
+
+    CONFIG_ID = 9001
+    NOW = 1_800_000_000_000
+
+    @pytest.fixture
+    async def scheduler(self):
+        scheduler = AIScheduler(redis_url=TEST_REDIS_URL, enabled=True)
+        client = scheduler._get_redis()
+        keys = scheduler._keys(self.CONFIG_ID)
+        await client.delete(*keys)
+        yield scheduler
+        await client.delete(*keys)
+        await client.close()
+
+    async def _attempt(self, scheduler, ticket, limits, now=None, rank=0, cost=0):
+        """Queue the ticket (if it isn't yet) and run one admission attempt"""
+        now = now or self.NOW
+        client = scheduler._redis
+        keys = scheduler._keys(self.CONFIG_ID)
+        await client.zadd(keys[0], {ticket: rank * 1e13 + now}, nx=True)
+        await client.hset(keys[1], ticket, f"{now + 60_000}:{cost}")
+        return await scheduler._script(
+            keys=keys,
+            args=[ticket, now, limits.rpm, limits.tpm, limits.max_concurrency, 60_000, KEY_TTL_MS],
+        )
+
+    async def test_concurrency_cap(self, scheduler):
+        limits = ProviderLimits(max_concurrency=2)
+
+        assert await self._attempt(scheduler, "a", limits) == [1, 0]
+        assert await self._attempt(scheduler, "b", limits) == [1, 0]
+        assert await self._attempt(scheduler, "c", limits) == [0, 0]
+
+        await scheduler._redis.zrem(scheduler._keys(self.CONFIG_ID)[2], "a")
+        assert await self._attempt(scheduler, "c", limits) == [1, 0]
+
+    async def test_expired_leases_free_their_slot(self, scheduler):
+        limits = ProviderLimits(max_concurrency=1)
+
+        assert await self._attempt(scheduler, "crashed", limits) == [1, 0]
+        assert await self._attempt(scheduler, "next", limits, now=self.NOW + 30_000) == [0, 0]
+        # Lease of 60s: the slot of a process that died mid-call is reclaimed
+        assert await self._attempt(scheduler, "next", limits, now=self.NOW + 61_000) == [1, 0]
+
+    async def test_requests_per_minute_bucket(self, scheduler):
+        limits = ProviderLimits(max_concurrency=0, rpm=2)
+
+        assert await self._attempt(scheduler, "a", limits) == [1, 0]
+        assert await self._attempt(scheduler, "b", limits) == [1, 0]
+        # Empty bucket refills at 2/min: one request in 30s
+        assert await self._attempt(scheduler, "c", limits) == [0, 30_000]
+        assert await self._attempt(scheduler, "c", limits, now=self.NOW + 30_000) == [1, 0]
+
+    async def test_tokens_per_minute_bucket(self, scheduler):
+        limits = ProviderLimits(max_concurrency=0, tpm=1000)
+
+        assert await self._attempt(scheduler, "big", limits, cost=800) == [1, 0]
+        # 200 tokens left, 500 needed: 300 more at 1000/min
+        assert await self._attempt(scheduler, "next", limits, cost=500) == [0, 18_000]
+        assert await self._attempt(scheduler, "next", limits, now=self.NOW + 18_000, cost=500) == [1, 0]
+
+    async def test_interactive_is_admitted_before_earlier_batch_work(self, scheduler):
+        limits = ProviderLimits(max_concurrency=1)
+
+        assert await self._attempt(scheduler, "running", limits) == [1, 0]
+        assert await self._attempt(scheduler, "batch", limits, rank=2) == [0, 0]
+        assert await self._attempt(scheduler, "chat", limits, now=self.NOW + 10, rank=0) == [0, 0]
+
+        await scheduler._redis.zrem(scheduler._keys(self.CONFIG_ID)[2], "running")
+        assert await self._attempt(scheduler, "batch", limits, now=self.NOW + 20) == [0, 0]
+        assert await self._attempt(scheduler, "chat", limits, now=self.NOW + 20) == [1, 0]
+
+    async def test_slot_waits_for_a_release(self, scheduler, monkeypatch):
+        monkeypatch.setattr(settings, "AI_SCHEDULER_POLL_INTERVAL", 0.02)
+        config = SimpleNamespace(id=self.CONFIG_ID, provider="openai", model_name="m", config={"max_concurrency": 1})
+        order = []
+
+        async def second():
+            async with scheduler.slot(config, "site_generation", 100):
+                order.append("second")
+
+        async with scheduler.slot(config, "interactive", 100):
+            waiter = asyncio.create_task(second())
+            await asyncio.sleep(0.2)
+            order.append("first done")
+        await asyncio.wait_for(waiter, 5)
+
+        assert order == ["first done", "second"]
+        assert scheduler.stats["admitted"] == 2 and scheduler.stats["queued"] == 1
+        assert (await scheduler.status([self.CONFIG_ID]))[self.CONFIG_ID]["in_flight"] == 0
+
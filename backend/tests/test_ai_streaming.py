@@ -0,0 +1,107 @@
+"""
+Tests for AIService streaming: each provider protocol is normalised into text deltas
+"""
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from unittest.mock import patch
+
+from app.services.ai_service import AIService
+
+
+def _config(provider, **kwargs):
+    defaults = dict(provider=provider, model_name="test-model", api_key="key", base_url=None, config=None)
+    defaults.update(kwargs)
+    return SimpleNamespace(**defaults)
+
+
+class FakeClients:
+    """Stands in for the shared http_clients registry, answering every request with `handler`"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    @asynccontextmanager
+    async def client(self, name="default"):
+        def record(request):
+            self.requests.append(request)
+            return self.handler(request)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(record)) as client:
+            yield client
+
+
+def _sse(*payloads):
+    return "".join(f"data: {p if isinstance(p, str) else json.dumps(p)}\n\n" for p in payloads)
+
+
+async def _collect(config, fake):
+    with patch("app.services.ai_service.http_clients", fake):
+        return [d async for d in AIService(db=None).stream_with_config(config, "Olá", "Seja breve")]
+
+
+class TestAIServiceStreaming:
+
+    @pytest.mark.asyncio
+    async def test_openai_sse(self):
+        body = _sse(
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "Olá"}}]},
+            {"choices": [{"delta": {"content": ", mundo"}}]},
+            "[DONE]",
+        )
+        fake = FakeClients(lambda r: httpx.Response(200, text=body, headers={"content-type": "text/event-stream"}))
+
+        assert await _collect(_config("grok"), fake) == ["Olá", ", mundo"]
+        sent = json.loads(fake.requests[0].content)
+        assert fake.requests[0].url.host == "api.x.ai"
+        assert sent["stream"] is True
+        assert sent["messages"][0] == {"role": "system", "content": "Seja breve"}
+
+    @pytest.mark.asyncio
+    async def test_anthropic_sse_events(self):
+        body = (
+            "event: message_start\n" + _sse({"type": "message_start", "message": {}})
+            + "event: content_block_delta\n" + _sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Oi"}})
+            + "event: ping\n" + _sse({"type": "ping"})
+            + "event: content_block_delta\n" + _sse({"type": "content_block_delta", "delta": {"type": "text_delta", "text": "!"}})
+            + "event: message_stop\n" + _sse({"type": "message_stop"})
+        )
+        fake = FakeClients(lambda r: httpx.Response(200, text=body))
+
+        assert await _collect(_config("anthropic"), fake) == ["Oi", "!"]
+
+    @pytest.mark.asyncio
+    async def test_ollama_ndjson(self):
+        lines = [
+            {"response": "Bom", "done": False},
+            {"response": " dia", "done": False},
+            {"response": "", "done": True},
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n"
+        fake = FakeClients(lambda r: httpx.Response(200, text=body))
+
+        assert await _collect(_config("ollama", base_url="http://ollama:11434"), fake) == ["Bom", " dia"]
+        assert fake.requests[0].url.path == "/api/generate"
+
+    @pytest.mark.asyncio
+    async def test_cloudflare_builds_model_url(self):
+        body = _sse({"response": "A"}, {"response": "B"}, "[DONE]")
+        fake = FakeClients(lambda r: httpx.Response(200, text=body))
+
+        config = _config("cloudflare", model_name="llama-3-8b-instruct", config={"account_id": "acc"})
+        assert await _collect(config, fake) == ["A", "B"]
+        assert fake.requests[0].url.path == "/client/v4/accounts/acc/ai/run/@cf/meta/llama-3-8b-instruct"
+
+    @pytest.mark.asyncio
+    async def test_error_status_raises_with_body(self):
+        fake = FakeClients(lambda r: httpx.Response(429, json={"error": "rate limited"}))
+
+        with pytest.raises(httpx.HTTPStatusError) as exc:
+            await _collect(_config("openai"), fake)
+        assert exc.value.response.status_code == 429
+        assert "rate limited" in exc.value.response.text
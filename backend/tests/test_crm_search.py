@@ -0,0 +1,100 @@
+"""
+Tests for the CRM search: query normalization offline, and accent-insensitive
+matching against Postgres when TEST_DATABASE_URL points at a scratch database
+(its contacts/opportunities/users tables are recreated).
+"""
+import os
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services.crm_search import find_contact_by_name, normalize, prefix_tsquery
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+class TestQueryNormalization:
+
+    @pytest.mark.parametrize("text,expected", [
+        ("João Conceição", "joao conceicao"),
+        ("ÁGUA Mineral São Tomé", "agua mineral sao tome"),
+        ("Ações & Negócios Ltda.", "acoes & negocios ltda."),
+        ("Pâmela Araújo", "pamela araujo"),
+    ])
+    def test_strips_portuguese_diacritics(self, text, expected):
+        assert normalize(text) == expected
+
+    def test_prefix_tsquery_terms_are_sanitized(self):
+        assert prefix_tsquery("Conceição  Silv") == "conceicao:* & silv:*"
+        assert prefix_tsquery("joão:* | !(drop)") == "joao:* & drop:*"
+        assert prefix_tsquery("  --- ") is None
+
+    @pytest.mark.asyncio
+    async def test_contact_by_name_is_an_exact_normalized_match_scoped_to_the_owner(self):
+        db = AsyncMock()
+        db.execute.return_value = MagicMock()
+
+        await find_contact_by_name(db, "  João Conceição ", owner_id=7)
+
+        query = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+        sql = str(query)
+        assert "f_unaccent(lower(contacts.name)) = %(f_unaccent_lower_contacts_name_1)s" in sql
+        assert "contacts.owner_id = %(owner_id_1)s" in sql
+        assert "similarity" not in sql and "to_tsquery" not in sql
+        assert query.params["f_unaccent_lower_contacts_name_1"] == "joao conceicao"
+        assert query.params["owner_id_1"] == 7
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+class TestSearchOnPostgres:
+
+    @pytest.fixture
+    async def db(self):
+        from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+        from app.core.database import Base
+        from app.models import Contact, Opportunity, User
+
+        engine = create_async_engine(TEST_DATABASE_URL)
+        tables = [User.__table__, Contact.__table__, Opportunity.__table__]
+        async with engine.begin() as conn:
+            await conn.run_sync(lambda sync: Base.metadata.drop_all(sync, tables=tables))
+            await conn.run_sync(lambda sync: Base.metadata.create_all(sync, tables=tables))
+
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            owner = User(email="vendedor@example.com", name="Vendedor", password_hash="x", role="vendedor")
+            session.add(owner)
+            await session.flush()
+            contacts = [
+                Contact(name="João Conceição", email="joao@padaria.com.br", company="Padaria Pão Quente", owner_id=owner.id),
+                Contact(name="Maria Antônia", email="maria@acucar.com", company="Açúcar União", owner_id=owner.id),
+                Contact(name="Pedro Alves", email="pedro@example.com", company="Alves Engenharia", owner_id=owner.id),
+            ]
+            session.add_all(contacts)
+            await session.flush()
+            session.add(Opportunity(name="Site institucional Padaria Pão Quente", contact_id=contacts[0].id, owner_id=owner.id))
+            await session.commit()
+            yield session
+        await engine.dispose()
+
+    async def test_accent_insensitive_in_both_directions(self, db):
+        from app.services.crm_search import search_contacts
+
+        assert [c.name for c, _ in await search_contacts(db, "joao conceicao")] == ["João Conceição"]
+        assert [c.name for c, _ in await search_contacts(db, "ANTÔNIA")] == ["Maria Antônia"]
+        assert [c.name for c, _ in await search_contacts(db, "acucar uniao")] == ["Maria Antônia"]
+
+    async def test_prefix_and_typo_matches_are_ranked(self, db):
+        from app.services.crm_search import search_contacts, search_opportunities
+
+        assert [c.name for c, _ in await search_contacts(db, "concei")] == ["João Conceição"]
+        results = await search_contacts(db, "Pedro Alvez")
+        assert results and results[0][0].name == "Pedro Alves"
+        assert [o.name for o, _ in await search_opportunities(db, "pao quente")] == ["Site institucional Padaria Pão Quente"]
+
+    async def test_contact_by_name_ignores_similar_names(self, db):
+        from app.services.crm_search import find_contact_by_name
+
+        assert (await find_contact_by_name(db, "JOAO CONCEICAO")).name == "João Conceição"
+        assert await find_contact_by_name(db, "João Conceição Filho") is None
+        assert await find_contact_by_name(db, "Pedro Alvez") is None
@@ -0,0 +1,139 @@
+"""
+Tests for the dashboard rollup deltas computed from a flushing session (no
+database, or SQLite for attributes that have to be loaded) and for reading them
+"""
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.schema import CreateTable
+
+import app.models  # noqa: F401 - configures every mapper
+from app.api.dashboard import _load_rollup_stats
+from app.models.activity import Activity
+from app.models.contact import Contact
+from app.models.opportunity import Opportunity
+from app.services import dashboard_rollups
+from app.services.dashboard_rollups import collect_deltas
+
+
+def _persistent(session, obj):
+    """Attach obj as if it had been loaded from the database"""
+    make_transient_to_detached(obj)
+    session.add(obj)
+    return obj
+
+
+class TestCollectDeltas:
+
+    def test_new_rows_count_for_their_owner(self):
+        session = Session()
+        session.add(Contact(id=1, name="Ana", owner_id=7))
+        session.add(Opportunity(id=1, name="Site", owner_id=7, stage="proposta", value=Decimal("1500.00")))
+        session.add(Activity(id=1, type="call", subject="Ligar", status="pending", owner_id=7))
+        session.add(Activity(id=2, type="note", subject="Nota", status="completed", owner_id=7))
+
+        assert collect_deltas(session) == {
+            (7, "contacts"): 1,
+            (7, "opportunities"): 1,
+            (7, "opportunity_value"): Decimal("1500.00"),
+            (7, "stage:proposta"): 1,
+            (7, "pending_activities"): 1,
+        }
+
+    def test_updates_move_counts_between_stages_and_owners(self):
+        session = Session()
+        opp = _persistent(session, Opportunity(id=5, name="Site", owner_id=7, stage="proposta", value=Decimal("100")))
+        opp.stage = "fechado"
+        opp.owner_id = 8
+        opp.value = Decimal("250")
+
+        assert collect_deltas(session) == {
+            (7, "opportunities"): -1,
+            (7, "opportunity_value"): Decimal("-100"),
+            (7, "stage:proposta"): -1,
+            (8, "opportunities"): 1,
+            (8, "opportunity_value"): Decimal("250"),
+            (8, "stage:fechado"): 1,
+        }
+
+    def test_deletes_and_untracked_changes(self):
+        session = Session()
+        activity = _persistent(session, Activity(id=3, type="call", subject="Ligar", status="pending", owner_id=7))
+        contact = _persistent(session, Contact(id=4, name="Ana", owner_id=7))
+        contact.name = "Ana Maria"  # Not a dashboard field
+        session.delete(activity)
+
+        assert collect_deltas(session) == {(7, "pending_activities"): -1}
+
+
+@pytest.fixture
+def sqlite_session():
+    """A session over a real (SQLite) activities table, with the rollup attribute tracking on"""
+    dashboard_rollups.track_old_values()
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        # Without the indexes: the agenda-order ones are Postgres expressions
+        conn.execute(CreateTable(Activity.__table__))
+    with Session(engine) as session:
+        session.add(Activity(id=1, type="call", subject="Ligar", status="pending", owner_id=7))
+        session.commit()
+        yield session
+
+
+class TestExpiredAttributes:
+
+    def test_update_of_an_expired_attribute_subtracts_the_old_value(self, sqlite_session):
+        activity = sqlite_session.get(Activity, 1)
+        sqlite_session.expire(activity)
+        activity.status = "completed"
+
+        assert collect_deltas(sqlite_session) == {(7, "pending_activities"): -1}
+
+    def test_delete_of_an_expired_row_subtracts_what_it_counted_for(self, sqlite_session):
+        flushed = []
+        event.listen(sqlite_session, "before_flush", dashboard_rollups._before_flush)
+        event.listen(sqlite_session, "after_flush", lambda session, ctx: flushed.append(collect_deltas(session)))
+        activity = sqlite_session.get(Activity, 1)
+        sqlite_session.expire(activity)
+        sqlite_session.delete(activity)
+
+        sqlite_session.flush()
+
+        assert flushed == [{(7, "pending_activities"): -1}]
+
+
+def _read_session(rows):
+    db = AsyncMock()
+    result = MagicMock()
+    result.all.return_value = [MagicMock(metric=metric, value=Decimal(value)) for metric, value in rows]
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+class TestRollupStats:
+
+    @pytest.mark.asyncio
+    async def test_counters_without_the_backfill_marker_fall_back_to_the_base_tables(self):
+        # Delta-only rows written before the table was ever reconciled
+        db = _read_session([("contacts", 1), ("pending_activities", 1)])
+
+        assert await _load_rollup_stats(db, None) is None
+
+    @pytest.mark.asyncio
+    async def test_summed_shards_once_backfilled(self):
+        db = _read_session([
+            ("_backfilled", 1), ("contacts", 12), ("opportunities", 3), ("opportunity_value", "2500.00"),
+            ("stage:proposta", 3), ("stage:fechado", 0), ("pending_activities", 4),
+        ])
+
+        stats = await _load_rollup_stats(db, 7)
+
+        assert stats.total_contacts == 12
+        assert stats.total_value == Decimal("2500.00")
+        assert stats.opportunities_by_stage == {"proposta": 3}
+        sql = str(db.execute.await_args.args[0])
+        assert "sum(dashboard_rollups.value)" in sql
+        assert "GROUP BY dashboard_rollups.metric" in sql
@@ -0,0 +1,53 @@
+"""
+Tests for the pool wait instrumentation and metrics in app.core.database
+"""
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.util import greenlet_spawn
+
+from app.core.database import InstrumentedPool, pool_metrics
+
+
+class TestInstrumentedPool:
+
+    async def test_records_checkouts_waits_and_timeouts(self):
+        pool = InstrumentedPool(MagicMock, pool_size=1, max_overflow=0, timeout=0.05)
+
+        held = await greenlet_spawn(pool.connect)
+        with pytest.raises(exc.TimeoutError):
+            await greenlet_spawn(pool.connect)
+
+        metrics = pool_metrics(MagicMock(pool=pool))
+        assert metrics["checked_out"] == 1
+        assert metrics["checkouts"] == 2
+        assert metrics["timeouts"] == 1
+        assert metrics["waits"] == 1
+        assert metrics["wait_ms_max"] >= 40
+        assert metrics["connects"] == 1
+
+        await greenlet_spawn(held.close)
+        assert pool_metrics(MagicMock(pool=pool))["checked_out"] == 0
+
+    async def test_connect_time_is_not_counted_as_wait(self):
+        def slow_connect():
+            time.sleep(0.03)
+            return MagicMock()
+
+        pool = InstrumentedPool(slow_connect, pool_size=1, max_overflow=0)
+        held = await greenlet_spawn(pool.connect)
+
+        metrics = pool_metrics(MagicMock(pool=pool))
+        assert metrics["waits"] == 0
+        assert metrics["wait_ms_max"] < 25
+        assert metrics["connects"] == 1
+        assert metrics["connect_ms_max"] >= 25
+
+        await greenlet_spawn(held.close)
+
+    def test_stats_survive_pool_recreate(self):
+        pool = InstrumentedPool(MagicMock, pool_size=1, max_overflow=0)
+        pool.wait_stats["checkouts"] = 5
+        assert pool.recreate().wait_stats["checkouts"] == 5
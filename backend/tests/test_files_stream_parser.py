@@ -0,0 +1,104 @@
+"""
+Tests for the incremental parser of the AI "files" JSON output, and for the
+streamed full generation that writes its files
+"""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.files_stream_parser import FilesStreamError, FilesStreamParser
+from app.services.site_generator_service import SiteGeneratorService
+
+FILES = [
+    {"path": "package.json", "content": '{"name": "site"}\n'},
+    {"path": "app/page.tsx", "content": "export default () => <h1>Olá \"mundo\" 😀</h1>\n"},
+    {"path": "app/layout.tsx", "content": "const a = '\\\\';\n"},
+]
+
+
+def _parse(text, chunk_size):
+    parser = FilesStreamParser()
+    emitted = []
+    for i in range(0, len(text), chunk_size):
+        emitted.append(parser.feed(text[i:i + chunk_size]))
+    emitted.append(parser.close())
+    return parser, emitted
+
+
+class TestFilesStreamParser:
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 7, 4096])
+    def test_emits_each_file_once_it_closes(self, chunk_size):
+        text = "Aqui está:\n```json\n" + json.dumps({"name": "site", "files": FILES}, indent=2) + "\n```\n"
+
+        parser, emitted = _parse(text, chunk_size)
+
+        assert [f for batch in emitted for f in batch] == FILES
+        assert parser.root == {"name": "site", "files": []}
+        assert parser.truncated is None
+        if chunk_size == 1:
+            # The first file is out long before the stream ends
+            assert sum(len(batch) for batch in emitted[:len(text) // 2]) >= 1
+
+    @pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+    @pytest.mark.parametrize("preamble", [
+        "Sure [see below]:\n```json\n",
+        "Formato {path, content}, em [ordem]:\n",
+        "Lista [1, 2] e {\"nota\": 1} antes:\n",
+    ])
+    def test_brackets_in_the_preamble_are_skipped(self, preamble, chunk_size):
+        text = preamble + json.dumps({"files": FILES}) + "\n```"
+
+        parser, emitted = _parse(text, chunk_size)
+
+        assert [f for batch in emitted for f in batch] == FILES
+        assert parser.root == {"files": []}
+
+    def test_lenient_with_common_model_mistakes(self):
+        text = '{"files": [{"path": "a.js", "content": "say "hi"\n\\\'ok\\\'",},]}'
+
+        parser, emitted = _parse(text, 5)
+
+        assert [f for batch in emitted for f in batch] == [{"path": "a.js", "content": "say \"hi\"\n'ok'"}]
+
+    def test_truncated_stream_keeps_whole_files(self):
+        text = json.dumps({"files": FILES})
+
+        parser, emitted = _parse(text[:-3], 10)  # cut after the last content closed
+        assert [f for batch in emitted for f in batch] == FILES
+        assert parser.stats["recovered"] == 1
+
+        parser, emitted = _parse(text[:-20], 10)  # cut inside the last content
+        assert [f for batch in emitted for f in batch] == FILES[:2]
+        assert parser.truncated == "app/layout.tsx"
+
+    def test_errors(self):
+        with pytest.raises(FilesStreamError, match="No JSON object"):
+            _parse("Desculpe, não posso ajudar.", 4)
+        with pytest.raises(FilesStreamError) as error:
+            _parse('{"files": [{"path": "a"} {"path": "b"}]}', 4)
+        assert error.value.pos == 25
+
+
+class TestStreamSiteFiles:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("cut", [3, 20])  # after the last content closed / inside it
+    async def test_unterminated_answer_is_evicted_from_the_cache(self, tmp_path, cut):
+        text = json.dumps({"files": FILES})[:-cut]
+
+        async def stream(meta=None, **kwargs):
+            meta["cache_key"] = "coding:abc"
+            for i in range(0, len(text), 16):
+                yield text[i:i + 16]
+
+        service = SiteGeneratorService(MagicMock())
+        service.ai = MagicMock(stream=stream)
+        discard = AsyncMock()
+        with patch.object(service, "_log_progress", AsyncMock()), \
+                patch("app.services.ai_response_cache.ai_response_cache.discard", discard):
+            result = await service._stream_site_files(7, str(tmp_path), "prompt")
+
+        discard.assert_awaited_once_with("coding:abc")
+        assert result["written"] == (3 if cut == 3 else 2)
@@ -0,0 +1,95 @@
+"""
+Tests for the generation pipeline checkpoints: recording stages, and skipping
+integrations whose inputs are unchanged (mocked sessions and services)
+"""
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models  # noqa: F401 - configures every mapper
+from app.models.generation_checkpoint import GenerationStage as Stage
+from app.services.generation_checkpoints import GenerationCheckpoints, input_hash
+from app.services.site_generator_service import SiteGeneratorService
+from app.services.site_store import SiteFile, SiteManifest
+
+
+def _session_factory(db):
+    @asynccontextmanager
+    async def factory():
+        yield db
+    return factory
+
+
+class TestGenerationCheckpoints:
+
+    def test_input_hash_is_stable_and_order_sensitive(self):
+        assert input_hash("basic", {"A": 1, "B": [2]}) == input_hash("basic", {"B": [2], "A": 1})
+        assert input_hash("a", "b") != input_hash("b", "a")
+
+    @pytest.mark.asyncio
+    async def test_complete_upserts_and_makes_the_stage_reusable(self):
+        db = AsyncMock()
+        checkpoints = GenerationCheckpoints(7, session_factory=_session_factory(db))
+
+        assert checkpoints.reusable(Stage.TEMPLATE_COPIED, "h1") is None
+        await checkpoints.complete(Stage.TEMPLATE_COPIED, "h1", {"files_count": 3})
+
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (order_id, stage) DO UPDATE" in sql
+        db.commit.assert_awaited_once()
+        assert checkpoints.reusable(Stage.TEMPLATE_COPIED, "h1") == {"files_count": 3}
+        assert checkpoints.reusable(Stage.TEMPLATE_COPIED, "h2") is None
+        assert checkpoints.completed == [Stage.TEMPLATE_COPIED]
+
+    @pytest.mark.asyncio
+    async def test_write_failure_only_costs_a_redo(self):
+        db = AsyncMock()
+        db.execute.side_effect = ConnectionError("database down")
+        checkpoints = GenerationCheckpoints(7, session_factory=_session_factory(db))
+
+        await checkpoints.complete(Stage.GITHUB_COMMITTED, "h1")
+
+        assert checkpoints.reusable(Stage.GITHUB_COMMITTED, "h1") is None
+
+
+class TestCheckpointedIntegrations:
+
+    @pytest.mark.asyncio
+    async def test_unchanged_site_skips_every_integration(self):
+        manifest = SiteManifest(7, "2026-01-01", {"package.json": SiteFile("ab" * 32, 2, "100644", "cd" * 20)})
+        site_hash = manifest.content_hash
+        restored = {
+            Stage.GITHUB_COMMITTED: (input_hash("site-7", site_hash), {"github_clone_url": "https://github.com/acme/site-7.git"}),
+            Stage.R2_UPLOADED: (input_hash(site_hash), {"r2_assets": 4}),
+            Stage.PAGES_CREATED: (
+                input_hash("site-7", "https://github.com/acme/site-7.git"),
+                {"pages_project": "site-7", "pages_url": "https://site-7.pages.dev"},
+            ),
+            Stage.DNS_DONE: (input_hash("site-7"), {"dns_subdomain": "site-7", "dns_target": "site-7.pages.dev", "dns_record_id": "r1"}),
+        }
+        checkpoints = GenerationCheckpoints(
+            7, {stage: {"input_hash": h, "output": out} for stage, (h, out) in restored.items()},
+            session_factory=_session_factory(AsyncMock()),
+        )
+        db = AsyncMock()
+        db.execute.return_value = MagicMock()
+        service = SiteGeneratorService(db)
+        untouchable = MagicMock(side_effect=AssertionError("integration service used"))
+
+        with patch.object(service, "_log_progress", AsyncMock()), \
+                patch("app.services.site_generator_service.site_store.manifest", return_value=manifest), \
+                patch("app.services.site_generator_service.system_config_cache.get", AsyncMock()), \
+                patch("app.services.site_generator_service.get_sync_engine", MagicMock()), \
+                patch("app.services.github_service.GitHubService", untouchable), \
+                patch("app.services.cloudflare_r2_service.CloudflareR2Service", untouchable), \
+                patch("app.services.cloudflare_pages_service.CloudflarePagesService", untouchable), \
+                patch("app.services.cloudflare_dns_service.CloudflareDNSService", untouchable):
+            info = await service._run_integrations(7, "/tmp/project_7", MagicMock(), checkpoints)
+
+        assert info["pages_url"] == "https://site-7.pages.dev"
+        assert info["r2_assets"] == 4
+        assert {name: t["status"] for name, t in info["integration_timings"].items()} == {
+            "github": "checkpoint", "r2": "checkpoint", "pages": "checkpoint", "dns": "checkpoint", "dns_verify": "skipped",
+        }
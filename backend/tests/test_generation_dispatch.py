@@ -0,0 +1,237 @@
+"""
+Tests for the site generation outbox: claiming due rows and sending them to
+Celery, stopping a generation whose lease was lost, and the reset of empty
+generations (mocked session and task, no database or broker)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+import app.models  # noqa: F401 - configures every mapper
+from app.models.generation_dispatch import GenerationDispatch, GenerationDispatchStatus as Status
+from app.services import generation_dispatch
+
+
+def _session(rows):
+    db = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = rows
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+def _row(order_id, status=Status.PENDING, attempts=0):
+    return GenerationDispatch(
+        order_id=order_id,
+        status=status,
+        attempts=attempts,
+        bypass_ai_cache=False,
+        lease_expires_at=datetime.utcnow(),
+    )
+
+
+class TestDispatch:
+
+    @pytest.mark.asyncio
+    async def test_claims_commit_before_sending_with_fresh_task_ids(self):
+        rows = [_row(1), _row(2, status=Status.RUNNING, attempts=1)]
+        db = _session(rows)
+        task = MagicMock()
+        task.apply_async.side_effect = lambda **kwargs: db.commit.assert_awaited_once()
+
+        with patch("app.tasks.site_generation.generate_site_task", task):
+            sent = await generation_dispatch.dispatch(db)
+
+        assert [item["order_id"] for item in sent] == [1, 2]
+        assert all(row.status == Status.QUEUED for row in rows)
+        assert [row.attempts for row in rows] == [1, 2]
+        assert rows[0].task_id != rows[1].task_id
+        assert task.apply_async.call_args.kwargs["task_id"] == rows[1].task_id
+
+    @pytest.mark.asyncio
+    async def test_rows_out_of_attempts_fail_instead_of_sending(self):
+        row = _row(3, status=Status.QUEUED, attempts=5)
+        db = _session([row])
+        task = MagicMock()
+
+        with patch("app.tasks.site_generation.generate_site_task", task), \
+                patch.object(generation_dispatch.settings, "GENERATION_MAX_ATTEMPTS", 5):
+            sent = await generation_dispatch.dispatch(db)
+
+        assert sent == []
+        assert row.status == Status.FAILED
+        task.apply_async.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_broker_failure_leaves_row_due_without_spending_an_attempt(self):
+        db = _session([_row(4)])
+        task = MagicMock()
+        task.apply_async.side_effect = ConnectionError("broker down")
+
+        with patch("app.tasks.site_generation.generate_site_task", task):
+            sent = await generation_dispatch.dispatch(db)
+
+        assert sent == []
+        rollback = db.execute.await_args_list[-1].args[0]
+        sql = str(rollback.compile(dialect=postgresql.dialect()))
+        assert "attempts=(generation_dispatches.attempts - " in sql
+        assert db.commit.await_count == 2
+
+
+class TestRequestGeneration:
+
+    @pytest.mark.asyncio
+    async def test_upsert_only_rearms_finished_or_expired_rows(self):
+        db = AsyncMock()
+        db.execute.return_value.scalar_one_or_none = MagicMock(return_value=None)
+
+        armed = await generation_dispatch.request_generation(db, 9)
+
+        assert armed is False
+        sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (order_id) DO UPDATE" in sql
+        assert "generation_dispatches.status NOT IN" in sql
+        assert "generation_dispatches.lease_expires_at <" in sql
+
+
+def _lost_lease():
+    lease = generation_dispatch.GenerationLease(7, "task-7")
+    lease._valid_until = float("inf")
+    return lease
+
+
+class TestGenerationLease:
+
+    @pytest.mark.asyncio
+    async def test_failed_renewal_marks_the_lease_lost(self):
+        lease = _lost_lease()
+        lease.check()
+
+        with patch.object(lease, "_renew", AsyncMock(return_value=False)), \
+                patch("app.services.generation_dispatch.asyncio.sleep", AsyncMock()):
+            await lease._beat()
+
+        assert lease.lost is True
+        with pytest.raises(generation_dispatch.GenerationLeaseLost):
+            lease.check()
+
+    def test_lease_past_its_deadline_is_lost_even_without_a_failed_renewal(self):
+        lease = generation_dispatch.GenerationLease(7, "task-7")
+        lease._valid_until = 0.0
+
+        with pytest.raises(generation_dispatch.GenerationLeaseLost):
+            lease.check()
+
+
+class TestLeaseLostPipeline:
+
+    @pytest.mark.asyncio
+    async def test_pipeline_stops_before_commit_and_integrations(self, tmp_path):
+        from app.models.site_order import SiteOrderStatus
+        from app.services.site_generator_service import SiteGeneratorService
+
+        lease = _lost_lease()
+        order = MagicMock(id=7, status=SiteOrderStatus.GENERATING)
+        db = AsyncMock()
+        db.execute.return_value = MagicMock()
+        db.execute.return_value.scalar_one_or_none.return_value = order
+        service = SiteGeneratorService(db)
+
+        async def content_while_heartbeat_fails(*args):
+            # The heartbeat runs during the long AI call and finds the row taken over
+            with patch.object(lease, "_renew", AsyncMock(return_value=False)), \
+                    patch("app.services.generation_dispatch.asyncio.sleep", AsyncMock()):
+                await lease._beat()
+            return True
+
+        templates = MagicMock()
+        templates.return_value.template_exists.return_value = True
+        templates.return_value.copy_template_base.return_value = True
+        checkpoints = MagicMock(completed=[], reusable=MagicMock(return_value=None), complete=AsyncMock(), clear=AsyncMock())
+        commit = MagicMock()
+        integrations = AsyncMock()
+        with patch.object(service, "_log_progress", AsyncMock()), \
+                patch.object(service, "_get_target_dir", return_value=str(tmp_path / "project_7")), \
+                patch.object(service, "_template_context", return_value={}), \
+                patch.object(service, "_custom_content_prompt", return_value="prompt"), \
+                patch.object(service, "_replace_template_placeholders"), \
+                patch.object(service, "_generate_custom_content", side_effect=content_while_heartbeat_fails), \
+                patch.object(service, "_run_integrations", integrations), \
+                patch("app.services.site_generator_service.GenerationCheckpoints.load", AsyncMock(return_value=checkpoints)), \
+                patch("app.services.site_generator_service.TemplateService", templates), \
+                patch("app.services.site_generator_service.template_store.manifest", return_value=None), \
+                patch("app.services.site_generator_service.site_store.manifest", return_value=None), \
+                patch("app.services.site_generator_service.site_store.remove"), \
+                patch("app.services.site_generator_service.site_store.commit", commit):
+            with pytest.raises(generation_dispatch.GenerationLeaseLost):
+                await service.generate_site(7, lease=lease)
+
+        templates.return_value.copy_template_base.assert_called_once()
+        commit.assert_not_called()
+        integrations.assert_not_awaited()
+        assert order.status == SiteOrderStatus.GENERATING
+        db.commit.assert_not_awaited()
+
+    def test_task_stops_without_releasing_or_retrying(self):
+        from app.tasks import site_generation
+
+        @asynccontextmanager
+        async def session():
+            yield AsyncMock()
+
+        service = MagicMock()
+        service.return_value.generate_site = AsyncMock(
+            side_effect=generation_dispatch.GenerationLeaseLost("Lost the generation lease on order 7")
+        )
+        with patch.object(generation_dispatch.GenerationLease, "acquire", AsyncMock(return_value=True)), \
+                patch.object(generation_dispatch.GenerationLease, "release", AsyncMock()) as release, \
+                patch.object(site_generation, "AsyncSessionLocal", session), \
+                patch.object(site_generation, "SiteGeneratorService", service), \
+                patch.object(site_generation.generation_log_sink, "flush", AsyncMock()), \
+                patch.object(site_generation.worker_runtime, "run", side_effect=lambda coro: asyncio.run(coro)), \
+                patch.object(site_generation.generate_site_task, "retry") as retry:
+            result = site_generation.generate_site_task.run(7)
+
+        assert result["skipped"] is True
+        release.assert_not_awaited()
+        retry.assert_not_called()
+
+
+class TestResetEmptyGenerations:
+
+    @pytest.mark.asyncio
+    async def test_failed_cleanup_undoes_the_generation_request(self, tmp_path):
+        from app.api import site_orders
+
+        orders = [MagicMock(id=7, onboarding=object()), MagicMock(id=8, onboarding=object())]
+        for order in orders:
+            (tmp_path / str(order.id)).mkdir()
+        savepoints = [MagicMock(rollback=AsyncMock(), commit=AsyncMock()) for _ in orders]
+        db = AsyncMock()
+        db.begin_nested.side_effect = savepoints
+        db.execute.return_value = MagicMock(**{"scalars.return_value.all.return_value": orders})
+        service = MagicMock()
+        service._get_target_dir.side_effect = lambda order_id: str(tmp_path / str(order_id))
+        service._check_stage_files.return_value = {"files_count": 0}
+
+        def rmtree(path):
+            if path.endswith("8"):
+                raise OSError("permission denied")
+
+        with patch.object(site_orders, "SiteGeneratorService", return_value=service), \
+                patch.object(site_orders.site_store, "remove"), \
+                patch("shutil.rmtree", side_effect=rmtree), \
+                patch.object(generation_dispatch, "request_generation", AsyncMock(return_value=True)), \
+                patch.object(generation_dispatch, "dispatch", AsyncMock(return_value=[])) as dispatch:
+            body = await site_orders.reset_empty_generations(db=db, current_user=MagicMock())
+
+        savepoints[0].commit.assert_awaited_once()
+        savepoints[1].rollback.assert_awaited_once()
+        savepoints[1].commit.assert_not_awaited()
+        assert [e["order_id"] for e in body["errors"]] == [8]
+        assert dispatch.await_args.args[1] == [7]
+
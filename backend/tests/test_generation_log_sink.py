@@ -0,0 +1,143 @@
+"""
+Tests for the batched generation log writer: flush thresholds, spilling to
+disk while the database is down and replaying the spill (mocked writes/pool)
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.generation_log_sink import GenerationLogSink
+
+
+def _sink(tmp_path, **kwargs):
+    kwargs.setdefault("batch_size", 3)
+    kwargs.setdefault("flush_interval", 60)
+    return GenerationLogSink(
+        database_url="postgresql+asyncpg://localhost/test",
+        spill_path=str(tmp_path / "spill.jsonl"),
+        **kwargs,
+    )
+
+
+def _messages(write):
+    return [[e["message"] for e in call.args[0]] for call in write.await_args_list]
+
+
+class TestFlushThresholds:
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_written_at_once(self, tmp_path):
+        sink = _sink(tmp_path)
+        write = AsyncMock()
+
+        with patch.object(sink, "_write", write):
+            await sink.emit(7, "STEP", "a")
+            await sink.emit(7, "STEP", "b", details={"n": 1})
+            write.assert_not_awaited()
+            await sink.emit(8, "STEP", "c")
+
+            assert _messages(write) == [["a", "b", "c"]]
+            assert write.await_args.args[0][1]["details"] == '{"n": 1}'
+            await sink.aclose()
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_written_after_the_interval(self, tmp_path):
+        sink = _sink(tmp_path, flush_interval=0.01)
+        write = AsyncMock()
+
+        with patch.object(sink, "_write", write):
+            await sink.emit(7, "STEP", "a")
+            write.assert_not_awaited()
+            await asyncio.sleep(0.05)
+
+            assert _messages(write) == [["a"]]
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_what_is_left(self, tmp_path):
+        sink = _sink(tmp_path)
+        write = AsyncMock()
+        listener = AsyncMock()
+        sink.subscribe(listener)
+
+        with patch.object(sink, "_write", write):
+            await sink.emit(7, "STEP", "a")
+            await sink.aclose()
+
+        assert _messages(write) == [["a"]]
+        assert [e["message"] for e in listener.await_args.args[0]] == ["a"]
+
+
+class TestSpill:
+
+    @pytest.mark.asyncio
+    async def test_failed_write_spills_and_next_flush_replays(self, tmp_path):
+        sink = _sink(tmp_path)
+        spill = tmp_path / "spill.jsonl"
+        listener = AsyncMock()
+        sink.subscribe(listener)
+
+        with patch.object(sink, "_write", AsyncMock(side_effect=OSError("database down"))):
+            await sink.emit(7, "STEP", "a")
+            assert await sink.flush() == 0
+        assert [json.loads(line)["message"] for line in spill.read_text().splitlines()] == ["a"]
+        listener.assert_not_awaited()
+
+        write = AsyncMock()
+        with patch.object(sink, "_write", write):
+            await sink.emit(7, "STEP", "b")
+            assert await sink.flush() == 1
+
+        assert _messages(write) == [["b"], ["a"]]
+        assert not spill.exists()
+        assert [e["message"] for e in listener.await_args.args[0]] == ["a", "b"]
+
+    @pytest.mark.asyncio
+    async def test_failed_replay_keeps_the_spill(self, tmp_path):
+        sink = _sink(tmp_path)
+        spill = tmp_path / "spill.jsonl"
+        sink._spill([{"order_id": 7, "step": "STEP", "message": "a", "status": "info",
+                      "details": None, "created_at": datetime(2026, 1, 1)}])
+
+        write = AsyncMock(side_effect=[None, OSError("database down again")])
+        with patch.object(sink, "_write", write):
+            await sink.emit(7, "STEP", "b")
+            assert await sink.flush() == 1
+
+        assert [json.loads(line)["message"] for line in spill.read_text().splitlines()] == ["a"]
+        assert not (tmp_path / "spill.jsonl.replay").exists()
+
+    @pytest.mark.asyncio
+    async def test_unwritable_spill_is_logged(self, tmp_path, caplog):
+        sink = _sink(tmp_path)
+        sink.spill_path = str(tmp_path)  # a directory: can't be opened for append
+
+        with patch.object(sink, "_write", AsyncMock(side_effect=OSError("database down"))), \
+                caplog.at_level(logging.ERROR, logger="app.services.generation_log_sink"):
+            await sink.emit(7, "STEP", "lost line")
+            await sink.flush()
+
+        assert any(r.levelno == logging.ERROR and "lost line" in r.getMessage() for r in caplog.records)
+
+
+class TestEventLoopChange:
+
+    @pytest.mark.asyncio
+    async def test_pool_of_the_previous_loop_is_terminated(self, tmp_path):
+        sink = _sink(tmp_path)
+        old_pool = MagicMock()
+        sink._loop = object()
+        sink._pool = old_pool
+        sink._buffer = [{"order_id": 7, "step": "STEP", "message": "a", "status": "info",
+                         "details": None, "created_at": datetime(2026, 1, 1)}]
+
+        sink._bind_loop()
+
+        old_pool.terminate.assert_called_once()
+        assert sink._pool is None
+        assert sink._loop is asyncio.get_running_loop()
+        # Entries buffered on the dead loop are kept on disk for the next flush
+        assert (tmp_path / "spill.jsonl").exists() and sink._buffer == []
@@ -0,0 +1,187 @@
+"""
+Tests for the SSE stream of generation logs: resuming from Last-Event-ID, the
+query-string token browsers authenticate with, and the LISTEN/NOTIFY fan-out
+(mocked repository, notifier and asyncpg)
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import site_orders
+from app.api.dependencies import get_current_user
+from app.core.auth import create_access_token
+from app.services.generation_log_stream import GenerationLogNotifier
+
+LOGS = [{"id": i, "step": "STEP", "message": f"line {i}", "status": "info"} for i in range(1, 6)]
+
+
+def _repo(logs):
+    repo = MagicMock()
+    repo.get_by_id = AsyncMock(return_value=SimpleNamespace(id=7))
+
+    async def get_logs(order_id, after_id=None, limit=None):
+        return [log for log in logs if log["id"] > (after_id or 0)][:limit]
+
+    repo.get_logs = AsyncMock(side_effect=get_logs)
+    return repo
+
+
+def _notifier():
+    @asynccontextmanager
+    async def subscribe(order_id):
+        yield asyncio.Event()
+    return SimpleNamespace(subscribe=subscribe)
+
+
+async def _events(response):
+    return [chunk async for chunk in response.body_iterator]
+
+
+def _stream_token(order_id, **claims):
+    data = {"user_id": 1, "tv": 0, "scope": site_orders.LOG_STREAM_TOKEN_SCOPE, "order_id": order_id, **claims}
+    return create_access_token(data, expires_delta=timedelta(minutes=5))
+
+
+class TestStreamOrderLogs:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("last_event_id, after_id, expected", [
+        ("3", None, [4, 5]),
+        (None, 2, [3, 4, 5]),
+        ("4", 2, [5]),  # a reconnect keeps the original URL: the header wins
+        ("abc", None, [1, 2, 3, 4, 5]),
+    ])
+    async def test_replays_only_what_the_client_missed(self, last_event_id, after_id, expected):
+        request = MagicMock(is_disconnected=AsyncMock(return_value=True))
+        db = AsyncMock()
+
+        with patch.object(site_orders, "OrderRepository", return_value=_repo(LOGS)), \
+                patch("app.services.generation_log_stream.generation_log_notifier", _notifier()):
+            response = await site_orders.stream_order_logs(
+                7, request, after_id=after_id, last_event_id=last_event_id, db=db, current_user=MagicMock()
+            )
+            events = await _events(response)
+
+        assert response.media_type == "text/event-stream"
+        db.close.assert_awaited_once()  # no pooled connection held while streaming
+        assert events[0] == "retry: 3000\n\n"
+        assert [int(e.split("\n", 1)[0][len("id: "):]) for e in events[1:]] == expected
+
+    @pytest.mark.asyncio
+    async def test_backlog_is_sent_in_batches(self):
+        logs = [{"id": i, "message": "x"} for i in range(1, 8)]
+        repo = _repo(logs)
+        request = MagicMock(is_disconnected=AsyncMock(return_value=True))
+
+        with patch.object(site_orders, "OrderRepository", return_value=repo), \
+                patch.object(site_orders, "LOG_STREAM_BATCH_SIZE", 3), \
+                patch("app.services.generation_log_stream.generation_log_notifier", _notifier()):
+            response = await site_orders.stream_order_logs(
+                7, request, after_id=None, last_event_id=None, db=AsyncMock(), current_user=MagicMock()
+            )
+            events = await _events(response)
+
+        assert len(events) == 1 + 7
+        assert [call.kwargs["after_id"] for call in repo.get_logs.await_args_list] == [0, 3, 6]
+
+
+class TestLogStreamAuth:
+
+    @pytest.mark.asyncio
+    async def test_scoped_token_in_the_query_string(self):
+        user = MagicMock()
+        with patch.object(site_orders, "get_user_from_payload", AsyncMock(return_value=user)) as load:
+            assert await site_orders.get_log_stream_user(7, MagicMock(), token=_stream_token(7), db=AsyncMock()) is user
+        assert load.await_args.args[1]["order_id"] == 7
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("token", [
+        _stream_token(8),  # another order
+        create_access_token({"user_id": 1, "tv": 0}),  # a full session token never goes in a URL
+        _stream_token(7, scope="other"),
+        "not-a-jwt",
+    ])
+    async def test_rejected_tokens(self, token):
+        with patch.object(site_orders, "get_user_from_payload", AsyncMock()) as load:
+            with pytest.raises(HTTPException) as error:
+                await site_orders.get_log_stream_user(7, MagicMock(), token=token, db=AsyncMock())
+        assert error.value.status_code == 401
+        load.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_scoped_token_is_not_a_session_token(self):
+        request = MagicMock(headers={"authorization": f"Bearer {_stream_token(7)}"})
+        with pytest.raises(HTTPException) as error:
+            await get_current_user(request, AsyncMock())
+        assert error.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_without_token_falls_back_to_the_authorization_header(self):
+        user = MagicMock()
+        request = MagicMock()
+        with patch.object(site_orders, "get_current_user", AsyncMock(return_value=user)) as header_auth:
+            assert await site_orders.get_log_stream_user(7, request, token=None, db=AsyncMock()) is user
+        header_auth.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_issued_token_is_scoped_to_the_order(self):
+        user = SimpleNamespace(id=3, token_version=2)
+        with patch.object(site_orders, "OrderRepository", return_value=_repo([])):
+            body = await site_orders.create_log_stream_token(7, db=AsyncMock(), current_user=user)
+
+        payload = site_orders.verify_token(body["token"])
+        assert payload["scope"] == site_orders.LOG_STREAM_TOKEN_SCOPE
+        assert (payload["order_id"], payload["user_id"], payload["tv"]) == (7, 3, 2)
+        assert body["expires_in"] == site_orders.settings.GENERATION_LOG_STREAM_TOKEN_SECONDS
+
+
+class TestGenerationLogNotifier:
+
+    def _connection(self):
+        conn = MagicMock()
+        conn.is_closed.return_value = False
+        conn.add_listener = AsyncMock()
+        conn.close = AsyncMock()
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_only_the_orders_streams(self):
+        conn = self._connection()
+        notifier = GenerationLogNotifier("postgresql://localhost/test")
+
+        with patch("asyncpg.connect", AsyncMock(return_value=conn)) as connect:
+            async with notifier.subscribe(7) as seven, notifier.subscribe(8) as eight:
+                notifier._on_notify(conn, 1, "channel", "7")
+                notifier._on_notify(conn, 1, "channel", "garbage")
+                assert seven.is_set() and not eight.is_set()
+
+        connect.assert_awaited_once()  # one LISTEN connection shared by every stream
+        conn.add_listener.assert_awaited_once()
+        assert notifier._waiters == {}
+
+    @pytest.mark.asyncio
+    async def test_lost_connection_wakes_everyone_and_reconnects(self):
+        conns = [self._connection(), self._connection()]
+        notifier = GenerationLogNotifier("postgresql://localhost/test")
+
+        with patch("asyncpg.connect", AsyncMock(side_effect=conns)) as connect:
+            async with notifier.subscribe(7) as event:
+                notifier._on_terminate(conns[0])
+                assert event.is_set()
+                async with notifier.subscribe(8):
+                    pass
+
+        assert connect.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_without_listen_streams_still_subscribe(self):
+        notifier = GenerationLogNotifier("postgresql://localhost/test")
+
+        with patch("asyncpg.connect", AsyncMock(side_effect=OSError("connection refused"))):
+            async with notifier.subscribe(7) as event:
+                assert not event.is_set()  # callers fall back to their polling timeout
@@ -0,0 +1,280 @@
+"""
+Tests for GitHubService bulk commits (Git Data API)
+Runs against an in-process fake GitHub server served through httpx.ASGITransport
+"""
+import base64
+import hashlib
+import pytest
+import httpx
+from unittest.mock import patch
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.services.github_service import GitHubService
+
+
+# ============== Fake GitHub ==============
+
+class FakeGitHub:
+    """Minimal in-memory implementation of the endpoints GitHubService uses"""
+
+    def __init__(self):
+        self.blobs = {}      # sha -> bytes
+        self.trees = {}      # sha -> {path: blob_sha}
+        self.tree_modes = {}  # sha -> {path: mode}
+        self.commits = {}    # sha -> {"tree": sha, "parents": [...], "message": str}
+        self.refs = {}       # branch -> commit sha
+        self.calls = {"blobs": 0, "commits": 0, "contents_put": 0, "ref_updates": 0}
+        self.failing_blobs = set()  # contents whose blob upload answers 500
+        self.app = self._build_app()
+
+    @staticmethod
+    def _sha(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    def _store_blob(self, content: bytes) -> str:
+        sha = GitHubService.git_blob_sha(content)
+        self.blobs[sha] = content
+        return sha
+
+    def _store_tree(self, entries: dict, modes: dict = None) -> str:
+        modes = {path: (modes or {}).get(path, "100644") for path in entries}
+        sha = self._sha(repr((sorted(entries.items()), sorted(modes.items()))).encode())
+        self.trees[sha] = dict(entries)
+        self.tree_modes[sha] = modes
+        return sha
+
+    def _store_commit(self, tree: str, parents: list, message: str) -> str:
+        sha = self._sha(f"{tree}{parents}{message}{len(self.commits)}".encode())
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        self.calls["commits"] += 1
+        return sha
+
+    def files(self, branch: str = "main") -> dict:
+        tree = self.trees[self.commits[self.refs[branch]]["tree"]]
+        return {path: self.blobs[sha] for path, sha in tree.items()}
+
+    def modes(self, branch: str = "main") -> dict:
+        return self.tree_modes[self.commits[self.refs[branch]]["tree"]]
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+        gh = self
+
+        @app.get("/repos/{owner}/{repo}/git/ref/heads/{branch}")
+        async def get_ref(owner: str, repo: str, branch: str):
+            if not gh.refs:
+                return JSONResponse({"message": "Git Repository is empty."}, status_code=409)
+            if branch not in gh.refs:
+                return JSONResponse({"message": "Not Found"}, status_code=404)
+            return {"ref": f"refs/heads/{branch}", "object": {"sha": gh.refs[branch]}}
+
+        @app.get("/repos/{owner}/{repo}/git/commits/{sha}")
+        async def get_commit(owner: str, repo: str, sha: str):
+            return {"sha": sha, "tree": {"sha": gh.commits[sha]["tree"]}}
+
+        @app.get("/repos/{owner}/{repo}/git/trees/{sha}")
+        async def get_tree(owner: str, repo: str, sha: str):
+            modes = gh.tree_modes[sha]
+            tree = [{"path": p, "type": "blob", "sha": s, "mode": modes[p]} for p, s in gh.trees[sha].items()]
+            return {"sha": sha, "tree": tree, "truncated": False}
+
+        @app.post("/repos/{owner}/{repo}/git/blobs")
+        async def create_blob(owner: str, repo: str, request: Request):
+            body = await request.json()
+            gh.calls["blobs"] += 1
+            content = base64.b64decode(body["content"])
+            if content in gh.failing_blobs:
+                return JSONResponse({"message": "Server Error"}, status_code=500)
+            sha = gh._store_blob(content)
+            return JSONResponse({"sha": sha}, status_code=201)
+
+        @app.post("/repos/{owner}/{repo}/git/trees")
+        async def create_tree(owner: str, repo: str, request: Request):
+            body = await request.json()
+            entries = dict(gh.trees.get(body.get("base_tree"), {}))
+            modes = dict(gh.tree_modes.get(body.get("base_tree"), {}))
+            for entry in body["tree"]:
+                entries[entry["path"]] = entry["sha"]
+                modes[entry["path"]] = entry["mode"]
+            return JSONResponse({"sha": gh._store_tree(entries, modes)}, status_code=201)
+
+        @app.post("/repos/{owner}/{repo}/git/commits")
+        async def create_commit(owner: str, repo: str, request: Request):
+            body = await request.json()
+            sha = gh._store_commit(body["tree"], body["parents"], body["message"])
+            return JSONResponse({"sha": sha}, status_code=201)
+
+        @app.patch("/repos/{owner}/{repo}/git/refs/heads/{branch}")
+        async def update_ref(owner: str, repo: str, branch: str, request: Request):
+            body = await request.json()
+            gh.calls["ref_updates"] += 1
+            gh.refs[branch] = body["sha"]
+            return {"ref": f"refs/heads/{branch}", "object": {"sha": body["sha"]}}
+
+        @app.get("/repos/{owner}/{repo}/contents/{path:path}")
+        async def get_contents(owner: str, repo: str, path: str, ref: str = "main"):
+            if ref in gh.refs:
+                tree = gh.trees[gh.commits[gh.refs[ref]]["tree"]]
+                if path in tree:
+                    return {"sha": tree[path]}
+            return JSONResponse({"message": "Not Found"}, status_code=404)
+
+        @app.put("/repos/{owner}/{repo}/contents/{path:path}")
+        async def put_contents(owner: str, repo: str, path: str, request: Request):
+            body = await request.json()
+            gh.calls["contents_put"] += 1
+            branch = body["branch"]
+            parent = gh.refs.get(branch)
+            entries = dict(gh.trees[gh.commits[parent]["tree"]]) if parent else {}
+            modes = dict(gh.tree_modes[gh.commits[parent]["tree"]]) if parent else {}
+            entries[path] = gh._store_blob(base64.b64decode(body["content"]))
+            modes[path] = "100644"  # the Contents API always writes regular files
+            sha = gh._store_commit(gh._store_tree(entries, modes), [parent] if parent else [], body["message"])
+            gh.refs[branch] = sha
+            return JSONResponse({"commit": {"sha": sha}, "content": {"path": path}}, status_code=201)
+
+        return app
+
+
+# ============== Fixtures ==============
+
+@pytest.fixture
+def fake_github():
+    return FakeGitHub()
+
+
+@pytest.fixture
+def github_service(fake_github):
+    with patch("app.services.github_service.ConfigService"):
+        service = GitHubService(db=None)
+    service._api_token = "test-token"
+    service._organization = "innexar-sites"
+    service._default_branch = "main"
+    service._api_url = "http://fake-github"
+    service._http_client = lambda: httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_github.app),
+        base_url="http://fake-github"
+    )
+    return service
+
+
+@pytest.fixture
+def project_files():
+    return {
+        "package.json": b'{"name": "site-1"}',
+        "app/page.tsx": b"export default function Page() { return null }",
+        "app/layout.tsx": b"export default function Layout({ children }) { return children }",
+        "components/Header.tsx": b"export const Header = () => null",
+        ".gitignore": b"node_modules\n",
+    }
+
+
+# ============== Tests ==============
+
+class TestGitHubBulkCommit:
+
+    @pytest.mark.asyncio
+    async def test_empty_repo_is_seeded_then_committed_once(self, github_service, fake_github, project_files):
+        """An empty repo gets one seed commit plus one bulk commit for everything else"""
+        result = await github_service.commit_files("site-1", project_files, "Initial commit")
+
+        assert result["success"] is True
+        assert result["succeeded"] == len(project_files)
+        assert fake_github.calls["contents_put"] == 1
+        assert fake_github.calls["commits"] == 2
+        assert fake_github.calls["blobs"] == len(project_files) - 1
+        assert fake_github.files() == project_files
+
+    @pytest.mark.asyncio
+    async def test_rerun_uploads_only_changed_blobs(self, github_service, fake_github, project_files):
+        """Resumed runs skip files whose git blob sha already matches the remote tree"""
+        await github_service.commit_files("site-1", project_files, "Initial commit")
+        blobs_before = fake_github.calls["blobs"]
+
+        updated = {**project_files, "app/page.tsx": b"export default function Page() { return 'hi' }"}
+        result = await github_service.commit_files("site-1", updated, "Update page")
+
+        assert result["uploaded"] == 1
+        assert result["skipped"] == len(project_files) - 1
+        assert fake_github.calls["blobs"] - blobs_before == 1
+        assert fake_github.files() == updated
+
+    @pytest.mark.asyncio
+    async def test_unchanged_files_create_no_commit(self, github_service, fake_github, project_files):
+        """Nothing changed -> no blobs, no commit, ref untouched"""
+        await github_service.commit_files("site-1", project_files, "Initial commit")
+        head_before = fake_github.refs["main"]
+        commits_before = fake_github.calls["commits"]
+
+        result = await github_service.commit_files("site-1", project_files, "No-op")
+
+        assert result["success"] is True
+        assert result["uploaded"] == 0
+        assert result["commit_sha"] == head_before
+        assert fake_github.calls["commits"] == commits_before
+
+    def test_git_blob_sha_matches_git(self):
+        """Same value as `git hash-object` for the content"""
+        assert GitHubService.git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+    @pytest.mark.asyncio
+    async def test_failed_blob_leaves_the_branch_untouched(self, github_service, fake_github, project_files):
+        """One blob upload fails -> no tree, no commit, and the ref is never PATCHed"""
+        await github_service.commit_files("site-1", project_files, "Initial commit")
+        head_before = fake_github.refs["main"]
+        commits_before = fake_github.calls["commits"]
+        ref_updates_before = fake_github.calls["ref_updates"]
+
+        updated = {
+            **project_files,
+            "app/page.tsx": b"export default function Page() { return 'hi' }",
+            "components/Footer.tsx": b"export const Footer = () => null",
+        }
+        fake_github.failing_blobs.add(updated["components/Footer.tsx"])
+        result = await github_service.commit_files("site-1", updated, "Update site")
+
+        assert result["success"] is False
+        assert result["uploaded"] == 0
+        assert "nothing committed" in result["error"]
+        assert result["commit_sha"] == head_before
+        assert fake_github.calls["commits"] == commits_before
+        assert fake_github.calls["ref_updates"] == ref_updates_before
+        assert fake_github.files() == project_files
+
+    @pytest.mark.asyncio
+    async def test_executable_bit_is_committed(self, github_service, fake_github, project_files):
+        """Executables keep 100755, also when only the mode changed or the file seeded the repo"""
+        files = {**project_files, "scripts/deploy.sh": b"#!/bin/sh\nnpm run build\n"}
+        modes = {"scripts/deploy.sh": "100755", ".gitignore": "100755"}  # .gitignore is the seed file
+
+        result = await github_service.commit_files("site-1", files, "Initial commit", file_modes=modes)
+
+        assert result["success"] is True
+        assert fake_github.modes()["scripts/deploy.sh"] == "100755"
+        assert fake_github.modes()[".gitignore"] == "100755"
+        assert fake_github.modes()["package.json"] == "100644"
+
+        # Same content, executable bit dropped: no blob upload, just a new tree entry
+        blobs_before = fake_github.calls["blobs"]
+        result = await github_service.commit_files("site-1", files, "chmod -x", file_modes={"scripts/deploy.sh": "100644"})
+
+        assert result["uploaded"] == 0
+        assert fake_github.calls["blobs"] == blobs_before
+        assert fake_github.modes()["scripts/deploy.sh"] == "100644"
+        # Paths without a mode keep the remote one
+        assert fake_github.modes()[".gitignore"] == "100755"
+        assert fake_github.files() == files
+
+    def test_collected_site_files_carry_their_mode(self, tmp_path):
+        """Trees without a manifest take the mode from the file on disk"""
+        from app.services.site_generator_service import SiteGeneratorService
+
+        (tmp_path / "run.sh").write_bytes(b"#!/bin/sh\n")
+        (tmp_path / "run.sh").chmod(0o755)
+        (tmp_path / "index.html").write_bytes(b"<html></html>")
+
+        files, modes = SiteGeneratorService._collect_site_files(str(tmp_path))
+
+        assert files == {"run.sh": b"#!/bin/sh\n", "index.html": b"<html></html>"}
+        assert modes == {"run.sh": "100755", "index.html": "100644"}
@@ -0,0 +1,169 @@
+"""
+Tests for the shared HTTP client registry: client reuse per upstream and event
+loop, response hooks, and the connection metrics of the instrumented transport
+(httpx.MockTransport and scripted traces, no network)
+"""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from app.core.http_clients import (
+    UPSTREAMS,
+    HTTPClientRegistry,
+    UpstreamMetrics,
+    _InstrumentedTransport,
+)
+
+
+class _TracedTransport(httpx.AsyncBaseTransport):
+    """Fires the given httpcore trace events, then answers (or raises)"""
+
+    def __init__(self, *events, error: Exception = None):
+        self.events = events
+        self.error = error
+
+    async def handle_async_request(self, request):
+        trace = request.extensions["trace"]
+        for event in self.events:
+            await trace(event, {})
+        if self.error:
+            raise self.error
+        return httpx.Response(200)
+
+
+async def _send(transport, metrics, **extensions):
+    request = httpx.Request("GET", "https://api.example.com/", extensions=extensions)
+    return await _InstrumentedTransport(transport, metrics).handle_async_request(request)
+
+
+def _mock_transport(handler):
+    return patch.object(httpx, "AsyncHTTPTransport", lambda **kwargs: httpx.MockTransport(handler))
+
+
+class TestUpstreamProfiles:
+
+    def test_ollama_keeps_the_timeout_of_its_former_per_call_clients(self):
+        assert UPSTREAMS["ollama"].timeout == httpx.Timeout(120.0)
+        assert UPSTREAMS["ollama"].http2 is False
+
+
+class TestHTTPClientRegistry:
+
+    @pytest.mark.asyncio
+    async def test_one_client_per_upstream(self):
+        registry = HTTPClientRegistry()
+
+        github = registry.get("github")
+        assert registry.get("github") is github
+        assert registry.get("unknown") is registry.get("default")
+        assert github.timeout == UPSTREAMS["github"].timeout
+
+        async with registry.client("github") as client:
+            assert client is github
+        assert not github.is_closed  # the registry owns its lifecycle
+
+        await registry.aclose()
+        assert github.is_closed
+        assert registry.get("github") is not github
+
+    def test_clients_of_a_previous_event_loop_are_not_reused(self):
+        registry = HTTPClientRegistry()
+
+        async def get():
+            return registry.get("github")
+
+        first = asyncio.run(get())
+        second = asyncio.run(get())
+
+        assert first is not second
+
+    @pytest.mark.asyncio
+    async def test_response_hooks_run_and_failures_are_contained(self):
+        registry = HTTPClientRegistry()
+        seen = []
+
+        async def broken(response):
+            raise RuntimeError("hook bug")
+
+        async def record(response):
+            seen.append(response.status_code)
+
+        registry.add_response_hook(broken)
+        registry.add_response_hook(record)
+        registry.add_response_hook(record)  # registered once
+
+        with _mock_transport(lambda request: httpx.Response(204)):
+            response = await registry.get("cloudflare").get("https://api.cloudflare.com/client/v4/zones")
+        await registry.aclose()
+
+        assert response.status_code == 204
+        assert seen == [204]
+
+    @pytest.mark.asyncio
+    async def test_metrics_per_upstream(self):
+        registry = HTTPClientRegistry()
+
+        with _mock_transport(lambda request: httpx.Response(200)):
+            client = registry.get("github")
+            await client.get("https://api.github.com/a")
+            await client.get("https://api.github.com/b")
+        metrics = registry.metrics()
+        await registry.aclose()
+
+        assert metrics["github"]["requests"] == 2
+        assert metrics["github"]["open"] is True
+        assert metrics["cloudflare"]["requests"] == 0
+        assert metrics["cloudflare"]["open"] is False
+        assert registry.metrics()["github"]["open"] is False
+
+
+class TestInstrumentedTransport:
+
+    @pytest.mark.asyncio
+    async def test_new_and_reused_connections(self):
+        metrics = UpstreamMetrics()
+
+        await _send(_TracedTransport(
+            "connection.connect_tcp.started",
+            "connection.start_tls.started",
+            "http11.send_request_headers.started",
+        ), metrics)
+        await _send(_TracedTransport("http11.send_request_headers.started"), metrics)
+        await _send(_TracedTransport("http2.send_request_headers.started"), metrics)
+
+        stats = metrics.as_dict()
+        assert (stats["requests"], stats["new_connections"], stats["reused_connections"]) == (3, 1, 2)
+        assert stats["tls_handshakes"] == 1
+        assert stats["reuse_ratio"] == round(2 / 3, 3)
+        assert stats["pool_wait_max_ms"] >= stats["pool_wait_avg_ms"] >= 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_counted_and_raised(self):
+        metrics = UpstreamMetrics()
+
+        with pytest.raises(httpx.ConnectError):
+            await _send(_TracedTransport(
+                "connection.connect_tcp.started", error=httpx.ConnectError("refused"),
+            ), metrics)
+
+        assert metrics.errors == 1
+        assert metrics.new_connections == 1
+
+    @pytest.mark.asyncio
+    async def test_callers_trace_still_receives_events(self):
+        events = []
+
+        async def trace(name, info):
+            events.append(name)
+
+        await _send(_TracedTransport("http11.send_request_headers.started"), UpstreamMetrics(), trace=trace)
+
+        assert events == ["http11.send_request_headers.started"]
+
+    def test_empty_metrics(self):
+        stats = UpstreamMetrics().as_dict()
+
+        assert stats["reuse_ratio"] is None
+        assert stats["pool_wait_avg_ms"] == 0.0
@@ -0,0 +1,68 @@
+"""
+Tests for the integration stage DAG used by SiteGeneratorService._run_integrations
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.integration_dag import IntegrationStage, run_dag
+
+
+def _sleeper(events, name, delay, fail=False):
+    async def run():
+        events.append(("start", name))
+        await asyncio.sleep(delay)
+        events.append(("end", name))
+        if fail:
+            raise RuntimeError(f"{name} broke")
+    return run
+
+
+class TestIntegrationDag:
+
+    @pytest.mark.asyncio
+    async def test_independent_stages_overlap_and_dependents_wait(self):
+        events = []
+        started = time.perf_counter()
+        timings = await run_dag([
+            IntegrationStage("github", "GitHub", _sleeper(events, "github", 0.2)),
+            IntegrationStage("r2", "R2", _sleeper(events, "r2", 0.2)),
+            IntegrationStage("pages", "Pages", _sleeper(events, "pages", 0.05), after=("github",)),
+            IntegrationStage("dns", "DNS", _sleeper(events, "dns", 0.2)),
+        ])
+        elapsed = time.perf_counter() - started
+
+        # Sequential would be 0.65s; the critical path is github -> pages (0.25s)
+        assert elapsed < 0.45
+        assert events.index(("start", "pages")) > events.index(("end", "github"))
+        assert timings["pages"]["started_ms"] >= 190
+        assert {t["status"] for t in timings.values()} == {"success"}
+
+    @pytest.mark.asyncio
+    async def test_failures_are_reported_and_dependents_still_run(self):
+        events, errors = [], []
+
+        async def on_error(stage, e):
+            errors.append((stage.name, str(e)))
+
+        async def skipped():
+            return "skipped"
+
+        timings = await run_dag([
+            IntegrationStage("github", "GitHub", _sleeper(events, "github", 0, fail=True)),
+            IntegrationStage("pages", "Pages", _sleeper(events, "pages", 0), after=("github",)),
+            IntegrationStage("r2", "R2", skipped),
+        ], on_error=on_error)
+
+        assert errors == [("github", "github broke")]
+        assert timings["github"]["status"] == "error"
+        assert timings["pages"]["status"] == "success"
+        assert timings["r2"]["status"] == "skipped"
+
+    @pytest.mark.asyncio
+    async def test_dependencies_must_be_declared_first(self):
+        with pytest.raises(ValueError):
+            await run_dag([
+                IntegrationStage("pages", "Pages", _sleeper([], "pages", 0), after=("github",)),
+            ])
@@ -0,0 +1,159 @@
+"""
+Tests for the queued SMTP sender against a local stand-in server (aiosmtpd)
+"""
+import asyncio
+import socket
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("aiosmtplib")
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+from app.models.outbound_email import OutboundEmail, OutboundEmailStatus as Status
+from app.services.mail_queue import MailQueue, SMTPSession, build_message
+from app.services.system_config_cache import SMTPConfig
+
+
+class RecordingHandler:
+    """Accepts mail, counts SMTP sessions and refuses some recipients"""
+
+    def __init__(self):
+        self.sessions = 0
+        self.messages = []
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("bounce@"):
+            return "550 No such user"
+        if address.startswith("later@"):
+            return "451 Mailbox busy, try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+def _queue(port: int) -> MailQueue:
+    queue = MailQueue(batch_size=10)
+    session = SMTPSession("127.0.0.1", port, start_tls=False, timeout=5)
+    config = SMTPConfig.from_values({"smtp_host": "127.0.0.1", "smtp_port": port})
+
+    async def _get_session():
+        return session, config
+
+    queue._get_session = _get_session
+    return queue
+
+
+def _email(id: int, to_email: str) -> OutboundEmail:
+    return OutboundEmail(
+        id=id,
+        to_email=to_email,
+        subject=f"Pedido #{id}",
+        html_content="<p>Olá</p>",
+        text_content="Olá",
+        status=Status.PENDING,
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+
+
+class TestSMTPSession:
+
+    @pytest.mark.asyncio
+    async def test_messages_share_one_session(self, smtp_server):
+        handler, port = smtp_server
+        queue = _queue(port)
+        emails = [_email(i, f"cliente{i}@example.com") for i in range(1, 4)]
+
+        await queue.deliver(emails)
+        await queue.deliver([_email(4, "cliente4@example.com")])
+
+        assert [e.status for e in emails] == [Status.SENT] * 3
+        assert len(handler.messages) == 4
+        assert handler.sessions == 1
+        assert handler.messages[0].rcpt_tos == ["cliente1@example.com"]
+        assert b"Subject: Pedido #1" in handler.messages[0].original_content
+        await queue.aclose()
+
+    @pytest.mark.asyncio
+    async def test_reconnects_after_idle_or_dropped_session(self, smtp_server):
+        handler, port = smtp_server
+        session = SMTPSession("127.0.0.1", port, start_tls=False, timeout=5, idle_timeout=0.01)
+
+        await session.send(build_message("Innexar", "team@innexar.com", "a@example.com", "1", "<p>1</p>"))
+        await asyncio.sleep(0.05)
+        await session.send(build_message("Innexar", "team@innexar.com", "b@example.com", "2", "<p>2</p>"))
+        session._client.close()
+        await session.send(build_message("Innexar", "team@innexar.com", "c@example.com", "3", "<p>3</p>"))
+
+        assert session.connects == 3
+        assert len(handler.messages) == 3
+        await session.close()
+
+
+class TestDeliver:
+
+    @pytest.mark.asyncio
+    async def test_refusals_are_retried_or_dropped_per_message(self, smtp_server):
+        handler, port = smtp_server
+        queue = _queue(port)
+        ok, busy, bounced = _email(1, "ok@example.com"), _email(2, "later@example.com"), _email(3, "bounce@example.com")
+
+        await queue.deliver([ok, busy, bounced])
+
+        assert ok.status == Status.SENT and ok.sent_at is not None
+        # 4xx: back off and retry later
+        assert busy.status == Status.PENDING
+        assert busy.attempts == 1
+        assert busy.next_attempt_at > datetime.utcnow()
+        assert "451" in busy.last_error
+        # 5xx for the recipient: won't ever succeed
+        assert bounced.status == Status.FAILED
+        assert handler.sessions == 1
+        assert queue.stats == {"sent": 1, "retried": 1, "failed": 1}
+        await queue.aclose()
+
+    @pytest.mark.asyncio
+    async def test_unreachable_server_backs_off_whole_batch(self):
+        queue = _queue(_free_port())
+        emails = [_email(1, "a@example.com"), _email(2, "b@example.com")]
+
+        await queue.deliver(emails)
+
+        assert all(e.status == Status.PENDING and e.attempts == 1 for e in emails)
+        assert all(e.next_attempt_at > datetime.utcnow() for e in emails)
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, monkeypatch):
+        from app.services import mail_queue as module
+        monkeypatch.setattr(module.settings, "MAIL_QUEUE_MAX_ATTEMPTS", 2)
+        queue = _queue(_free_port())
+        email = _email(1, "a@example.com")
+        email.attempts = 1
+
+        await queue.deliver([email])
+
+        assert email.status == Status.FAILED
@@ -171,18 +171,24 @@ class TestOnboardingService:
         mock_result.scalar_one_or_none.return_value = sample_order
         mock_db.execute.return_value = mock_result
         
-        with patch('app.services.onboarding_service.create_customer_account') as mock_create_customer:
+        with patch('app.services.onboarding_service.create_customer_account') as mock_create_customer, \
+                patch('app.services.onboarding_service.request_generation', new_callable=AsyncMock) as mock_request, \
+                patch('app.services.onboarding_service.dispatch', new_callable=AsyncMock) as mock_dispatch:
             mock_customer = MagicMock()
             mock_customer.email = "business@example.com"
             mock_customer.verification_token = "token123"
             mock_create_customer.return_value = (mock_customer, "temppass")
+            mock_dispatch.return_value = [{"order_id": 1, "task_id": "task-1"}]
             
             service = OnboardingService(mock_db, mock_background_tasks)
             result = await service.process_onboarding("cs_test_abc123xyz890", sample_onboarding_data)
             
             assert result["message"] == "Onboarding submitted successfully"
             assert result["generation_started"] == True
+            # Generation request is written in the onboarding transaction, then dispatched
+            mock_request.assert_awaited_once_with(mock_db, sample_order.id)
             mock_db.commit.assert_called_once()
+            mock_dispatch.assert_awaited_once_with(mock_db, [sample_order.id])
 
     @pytest.mark.asyncio
     async def test_process_onboarding_order_not_found(self, mock_db, mock_background_tasks, sample_onboarding_data):
@@ -230,8 +236,12 @@ class TestOnboardingService:
 
     @pytest.mark.asyncio
     async def test_trigger_ai_generation(self, mock_db, mock_background_tasks):
-        """Test AI generation is triggered in background"""
+        """Test a failed dispatch is reported, not raised (the sweep sends it later)"""
         service = OnboardingService(mock_db, mock_background_tasks)
-        service._trigger_ai_generation(1)
         
-        mock_background_tasks.add_task.assert_called_once()
+        with patch('app.services.onboarding_service.dispatch', new_callable=AsyncMock) as mock_dispatch:
+            mock_dispatch.side_effect = ConnectionError("broker down")
+            started = await service._trigger_ai_generation(1)
+        
+        assert started is False
+        mock_db.rollback.assert_awaited_once()
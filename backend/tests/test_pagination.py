@@ -0,0 +1,84 @@
+"""
+Tests for the keyset pagination helpers used by the CRM listings
+"""
+from datetime import date, datetime, time
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import app.models  # noqa: F401 - configures every mapper
+from app.api.activities import DUE_ORDER
+from app.api.pagination import (
+    NEXT_CURSOR_HEADER, created_at_key, decode_cursor, encode_cursor, finish_page, keyset_page,
+)
+from app.models.activity import Activity
+from app.models.opportunity import Opportunity
+
+
+def _sql(query):
+    return str(query.compile(dialect=postgresql.dialect()))
+
+
+class TestPagination:
+
+    def test_cursor_round_trip_is_opaque(self):
+        created_at = datetime(2025, 3, 1, 12, 30, 15, 123456)
+        cursor = encode_cursor((created_at, 42))
+        assert "2025" not in cursor
+        assert decode_cursor(cursor, created_at_key(Opportunity)) == (created_at, 42)
+
+    @pytest.mark.parametrize("cursor", [
+        "garbage",
+        encode_cursor((datetime(2025, 1, 1), 1))[:-3],
+        encode_cursor((date(2025, 1, 1), time(9, 0), 1)),  # from another listing
+    ])
+    def test_invalid_cursor_is_a_400(self, cursor):
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, created_at_key(Opportunity))
+        assert exc.value.status_code == 400
+
+    def test_keyset_page_uses_row_comparison_not_offset(self):
+        cursor = encode_cursor((datetime(2025, 1, 1), 10))
+        sql = _sql(keyset_page(select(Opportunity), Opportunity, 50, cursor=cursor, skip=300))
+        assert "(opportunities.created_at, opportunities.id) < (" in sql
+        assert "ORDER BY opportunities.created_at DESC, opportunities.id DESC" in sql
+        assert "OFFSET" not in sql
+
+    def test_finish_page_sets_next_cursor_only_when_more_rows(self):
+        rows = [SimpleNamespace(created_at=datetime(2025, 1, 3 - i), id=10 - i) for i in range(3)]
+
+        response = Response()
+        assert finish_page(rows, 2, response) == rows[:2]
+        assert decode_cursor(response.headers[NEXT_CURSOR_HEADER], created_at_key(Opportunity)) == (
+            rows[1].created_at, rows[1].id
+        )
+
+        response = Response()
+        assert finish_page(rows, 3, response) == rows
+        assert NEXT_CURSOR_HEADER not in response.headers
+
+
+class TestActivitiesAgendaOrder:
+
+    def test_due_order_keeps_the_agenda_order_with_undated_rows_last(self):
+        cursor = encode_cursor((date(2025, 5, 2), time(14, 0), 8))
+        sql = _sql(keyset_page(select(Activity), Activity, 50, cursor=cursor, key=DUE_ORDER))
+        due_date = "coalesce(activities.due_date, '9999-12-31'::date)"
+        due_time = "coalesce(activities.due_time, '23:59:59.999999'::time)"
+        assert f"ORDER BY {due_date} ASC, {due_time} ASC, activities.id ASC" in sql
+        assert f"({due_date}, {due_time}, activities.id) > (" in sql
+
+    def test_cursor_of_an_undated_activity_round_trips(self):
+        rows = [
+            SimpleNamespace(due_date=date(2025, 5, 2), due_time=None, id=3),
+            SimpleNamespace(due_date=None, due_time=None, id=4),
+            SimpleNamespace(due_date=None, due_time=None, id=5),
+        ]
+
+        response = Response()
+        finish_page(rows, 2, response, key=DUE_ORDER)
+
+        assert decode_cursor(response.headers[NEXT_CURSOR_HEADER], DUE_ORDER) == (date.max, time.max, 4)
@@ -0,0 +1,76 @@
+"""
+Tests for CloudflareR2Service.upload_files against moto's in-memory S3
+"""
+import pytest
+
+moto = pytest.importorskip("moto")
+boto3 = pytest.importorskip("boto3")
+
+from app.core.config import settings
+from app.services.cloudflare_r2_service import CloudflareR2Service
+
+mock_s3 = getattr(moto, "mock_aws", None) or getattr(moto, "mock_s3")
+
+BUCKET = "sites"
+
+
+@pytest.fixture
+def r2(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setenv("SECRET_KEY", "test-secret")
+    # Small threshold so the multipart path is exercised without big fixtures (S3 minimum part size)
+    monkeypatch.setattr(settings, "R2_MULTIPART_THRESHOLD", 5 * 1024 * 1024)
+    monkeypatch.setattr(settings, "R2_MULTIPART_CHUNKSIZE", 5 * 1024 * 1024)
+    with mock_s3():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        service = CloudflareR2Service(db=None)
+        # Skip the database-backed config lookup
+        service._s3_client = client
+        service._bucket_name = BUCKET
+        service._endpoint_url = "https://r2.example"
+        yield service
+
+
+def _files(tmp_path, contents):
+    result = []
+    for name, data in contents.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        result.append((f"sites/1/{name}", str(path), None))
+    return result
+
+
+class TestR2BatchUpload:
+
+    def test_uploads_then_skips_unchanged_files(self, r2, tmp_path):
+        files = _files(tmp_path, {"logo.png": b"png-bytes", "hero.svg": b"<svg/>"})
+
+        first = r2.upload_files(files)
+        assert [r["status"] for r in first] == ["uploaded", "uploaded"]
+        head = r2._s3_client.head_object(Bucket=BUCKET, Key="sites/1/hero.svg")
+        assert head["ContentType"] == "image/svg+xml"
+
+        (tmp_path / "logo.png").write_bytes(b"new-png-bytes")
+        second = r2.upload_files(files)
+        assert {r["key"]: r["status"] for r in second} == {
+            "sites/1/logo.png": "uploaded",
+            "sites/1/hero.svg": "skipped",
+        }
+
+    def test_multipart_etag_matches_and_is_skipped(self, r2, tmp_path):
+        files = _files(tmp_path, {"video.webm": b"x" * (11 * 1024 * 1024)})
+
+        assert r2.upload_files(files)[0]["status"] == "uploaded"
+        remote = r2._list_etags("sites/1/")["sites/1/video.webm"]
+        assert remote.endswith("-3")
+        assert r2.upload_files(files)[0]["status"] == "skipped"
+
+    def test_missing_file_is_reported_per_file(self, r2, tmp_path):
+        files = _files(tmp_path, {"ok.png": b"ok"}) + [("sites/1/gone.png", str(tmp_path / "gone.png"), None)]
+
+        results = {r["key"]: r for r in r2.upload_files(files)}
+        assert results["sites/1/ok.png"]["status"] == "uploaded"
+        assert results["sites/1/gone.png"]["status"] == "error"
+        assert results["sites/1/gone.png"]["error"]
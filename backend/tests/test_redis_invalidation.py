@@ -0,0 +1,149 @@
+"""
+Tests for the shared Redis invalidation listener and publisher (fake Redis
+client; no server needed)
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import redis
+
+from app.services.ai_config_cache import AIConfigCache
+from app.services.redis_invalidation import RedisInvalidationListener, publish_invalidation
+
+
+class FakePubSub:
+    def __init__(self, messages, error=None):
+        self.messages = messages
+        self.error = error
+        self.subscribed = []
+        self.closed = False
+
+    def subscribe(self, channel):
+        self.subscribed.append(channel)
+
+    def listen(self):
+        for data in self.messages:
+            yield {"type": "message", "data": data}
+        if self.error:
+            raise self.error
+
+    def close(self):
+        self.closed = True
+
+
+class FakeRedis:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+        self.closed = False
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self._pubsub
+
+    def close(self):
+        self.closed = True
+
+
+def _listener(events, **kwargs):
+    return RedisInvalidationListener(
+        "cache_invalidate",
+        on_message=lambda data: events.append(("message", data)),
+        on_reconnect=lambda: events.append(("reconnect", None)),
+        name="test-invalidation",
+        redis_url="redis://localhost:6379/0",
+        **kwargs,
+    )
+
+
+class TestRedisInvalidationListener:
+
+    def test_applies_messages_and_closes_the_connection_when_it_drops(self):
+        events = []
+        pubsub = FakePubSub([b"7", b"8"], error=redis.ConnectionError("connection reset"))
+        client = FakeRedis(pubsub)
+        listener = _listener(events)
+
+        with patch("redis.Redis.from_url", return_value=client):
+            with pytest.raises(redis.ConnectionError):
+                listener._listen_once()
+
+        assert pubsub.subscribed == ["cache_invalidate"]
+        assert events == [("reconnect", None), ("message", b"7"), ("message", b"8")]
+        assert pubsub.closed and client.closed
+
+    def test_every_reconnect_uses_a_fresh_client_and_closes_the_old_one(self):
+        events = []
+        listener = _listener(events)
+        clients = [
+            FakeRedis(FakePubSub([], error=redis.ConnectionError("down"))),
+            FakeRedis(FakePubSub([b"1"], error=redis.ConnectionError("down again"))),
+        ]
+        created = iter(clients)
+
+        def from_url(url):
+            client = next(created, None)
+            if client is None:
+                listener.stop()
+                raise redis.ConnectionError("stopped")
+            return client
+
+        with patch("redis.Redis.from_url", side_effect=from_url), \
+                patch.object(listener._stopped, "wait") as wait:
+            listener._listen_forever()
+
+        assert all(c.closed and c._pubsub.closed for c in clients)
+        assert events == [("reconnect", None), ("reconnect", None), ("message", b"1")]
+        # Each successful subscribe resets the backoff; the third attempt never connects
+        assert [call.args[0] for call in wait.call_args_list] == [1.0, 1.0, 2.0]
+
+    def test_backoff_grows_while_redis_is_down(self):
+        listener = _listener([])
+        attempts = []
+
+        def from_url(url):
+            attempts.append(url)
+            if len(attempts) == 4:
+                listener.stop()
+            raise redis.ConnectionError("down")
+
+        with patch("redis.Redis.from_url", side_effect=from_url), \
+                patch.object(listener._stopped, "wait") as wait:
+            listener._listen_forever()
+
+        assert [call.args[0] for call in wait.call_args_list] == [1.0, 2.0, 4.0, 8.0]
+
+
+class TestPublishInvalidation:
+
+    @pytest.mark.asyncio
+    async def test_publishes_and_closes(self):
+        client = MagicMock(publish=AsyncMock(), close=AsyncMock())
+        with patch("redis.asyncio.from_url", return_value=client):
+            await publish_invalidation("cache_invalidate", "7", "test")
+
+        client.publish.assert_awaited_once_with("cache_invalidate", "7")
+        client.close.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_failure_is_only_logged(self):
+        client = MagicMock(publish=AsyncMock(side_effect=redis.ConnectionError("down")), close=AsyncMock())
+        with patch("redis.asyncio.from_url", return_value=client):
+            await publish_invalidation("cache_invalidate", "7", "test")
+
+        client.close.assert_awaited_once()
+
+
+class TestCacheListener:
+
+    def test_ai_config_cache_listener_invalidates(self):
+        cache = AIConfigCache(ttl=60, redis_url="redis://localhost:6379/0")
+        with patch("threading.Thread.start"):
+            cache.start_listener()
+        version = cache._version
+
+        pubsub = FakePubSub([b"1"], error=redis.ConnectionError("down"))
+        with patch("redis.Redis.from_url", return_value=FakeRedis(pubsub)):
+            with pytest.raises(redis.ConnectionError):
+                cache._listener._listen_once()
+
+        assert cache._listener.channel == "ai_config_invalidate"
+        assert cache._version == version + 2  # once on subscribe, once for the message
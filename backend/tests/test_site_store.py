@@ -0,0 +1,69 @@
+"""
+Tests for the generated-site manifests and blob garbage collection
+"""
+import os
+
+import pytest
+
+from app.services.blob_store import BlobStore, write_file
+from app.services.github_service import GitHubService
+from app.services.site_store import SiteStore
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SiteStore(BlobStore(str(tmp_path / "sites" / ".store"), mode="hardlink"))
+
+
+def _site(tmp_path, order_id, hero="Welcome"):
+    target = tmp_path / "sites" / f"project_{order_id}"
+    _write(str(target / "package.json"), '{"name": "site"}')
+    _write(str(target / "app" / "page.tsx"), f"<h1>{hero}</h1>")
+    _write(str(target / "public" / "logo.svg"), "<svg/>")
+    return target
+
+
+class TestSiteStore:
+
+    def test_commit_dedupes_files_across_sites(self, tmp_path, store):
+        first = store.commit(1, str(_site(tmp_path, 1, "One")))
+        store.commit(2, str(_site(tmp_path, 2, "Two")))
+
+        assert sorted(first.files) == ["app/page.tsx", "package.json", "public/logo.svg"]
+        assert store.blobs.stats["stored"] == 4
+        assert os.stat(tmp_path / "sites" / "project_2" / "package.json").st_nlink == 3
+        assert first.files["package.json"].git_sha == GitHubService.git_blob_sha(b'{"name": "site"}')
+
+        reloaded = store.manifest(1)
+        assert reloaded.files == first.files
+        assert store.contents(reloaded)["app/page.tsx"] == b"<h1>One</h1>"
+
+    def test_update_after_an_edit(self, tmp_path, store):
+        target = _site(tmp_path, 1)
+        store.commit(1, str(target))
+
+        write_file(str(target / "app" / "page.tsx"), "<h1>Edited</h1>")
+        os.unlink(target / "public" / "logo.svg")
+        manifest = store.update(1, str(target), ["app/page.tsx", "public/logo.svg"])
+
+        assert "public/logo.svg" not in manifest.files
+        assert store.contents(store.manifest(1))["app/page.tsx"] == b"<h1>Edited</h1>"
+        assert store.update(99, str(target), ["app/page.tsx"]) is None
+
+    def test_garbage_collection(self, tmp_path, store):
+        store.commit(1, str(_site(tmp_path, 1, "One")))
+        store.commit(2, str(_site(tmp_path, 2, "Two")))
+
+        # Fresh blobs survive the grace period even when nothing references them
+        assert store.collect_garbage([2])["blobs_removed"] == 0
+        assert store.manifest(1) is None
+
+        stats = store.collect_garbage([2], grace_seconds=0)
+        assert stats == {"manifests_removed": 0, "blobs_kept": 3, "blobs_removed": 1, "bytes_freed": len("<h1>One</h1>")}
+        assert store.contents(store.manifest(2))["app/page.tsx"] == b"<h1>Two</h1>"
@@ -0,0 +1,133 @@
+"""
+Tests for the process-wide system config snapshot
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from app.models.configuration import IntegrationConfig, IntegrationType
+from app.models.system_config import SystemConfig
+from app.services.config_service import ConfigService
+from app.services.system_config_cache import SystemConfigCache, build_snapshot
+
+
+def _config(key, value, value_type="string", category="general", updated_at=None):
+    return SystemConfig(key=key, value=value, value_type=value_type, category=category, updated_at=updated_at)
+
+
+class FakeLoader:
+    """Replaces SystemConfigCache._load so tests count 'queries' without a database"""
+
+    def __init__(self, configs, integrations=()):
+        self.configs = configs
+        self.integrations = integrations
+        self.loads = 0
+
+    async def __call__(self, db):
+        self.loads += 1
+        return build_snapshot(self.configs, self.integrations)
+
+
+@pytest.fixture
+def cache():
+    return SystemConfigCache(ttl=60, redis_url="redis://invalid-host:1")
+
+
+@pytest.fixture(autouse=True)
+def encryption_key(monkeypatch):
+    from cryptography.fernet import Fernet
+    monkeypatch.setenv("ENCRYPTION_KEY", Fernet.generate_key().decode())
+
+
+class TestBuildSnapshot:
+
+    def test_typed_values_categories_and_typed_settings(self, monkeypatch):
+        monkeypatch.delenv("SMTP_HOST", raising=False)
+        snapshot = build_snapshot([
+            _config("stripe_enabled", "true", "boolean", "stripe"),
+            _config("stripe_secret_key", "sk_test", category="stripe"),
+            _config("smtp_port", "2525", "number", "email"),
+            _config("site_base_price", "399.0", "number", "site", updated_at=datetime(2026, 1, 2)),
+        ], [])
+
+        assert snapshot.get("stripe_enabled") is True
+        assert snapshot.raw_values["site_base_price"] == "399.0"
+        assert snapshot.category("site") == {"site_base_price": 399.0}
+        assert snapshot.stripe.secret_key == "sk_test" and snapshot.stripe.enabled
+        assert snapshot.smtp.port == 2525 and snapshot.smtp.host == "smtp.gmail.com"
+        assert snapshot.updated_at == datetime(2026, 1, 2)
+
+    def test_integrations_are_decrypted_and_served_to_config_service(self, cache, monkeypatch):
+        cipher = ConfigService(None)
+        integrations = [
+            IntegrationConfig(integration_type="github", key="token", value=cipher.encrypt_value("ghp_x"), is_secret=True),
+            IntegrationConfig(integration_type="github", key="org", value="innexar", is_secret=False),
+        ]
+        snapshot = build_snapshot([], integrations)
+        assert snapshot.integration(IntegrationType.GITHUB) == {"token": "ghp_x", "org": "innexar"}
+
+        cache._snapshot = snapshot
+        monkeypatch.setattr("app.services.config_service.system_config_cache", cache)
+        # No session: any query would fail, so these must come from the snapshot
+        assert ConfigService(None).get_config(IntegrationType.GITHUB, "token") == "ghp_x"
+        assert ConfigService(None).get_all_by_type(IntegrationType.GITHUB)["org"] == "innexar"
+
+
+class TestSystemConfigCache:
+
+    async def test_reads_are_served_from_memory(self, cache):
+        loader = FakeLoader([_config("stripe_publishable_key", "pk_test", category="stripe")])
+        cache._load = loader
+
+        for _ in range(5):
+            assert (await cache.get(None)).stripe.publishable_key == "pk_test"
+
+        assert loader.loads == 1
+
+    async def test_invalidate_reloads_with_a_new_version(self, cache):
+        loader = FakeLoader([_config("site_delivery_days", "7", "number", "site")])
+        cache._load = loader
+        first = await cache.get(None)
+
+        loader.configs = [_config("site_delivery_days", "5", "number", "site")]
+        await cache.invalidate()
+        second = await cache.get(None)
+
+        assert second.get("site_delivery_days") == 5
+        assert second.version > first.version
+        assert loader.loads == 2
+
+    async def test_expired_snapshot_is_reloaded(self, cache):
+        cache.ttl = 0
+        loader = FakeLoader([])
+        cache._load = loader
+
+        await cache.get(None)
+        assert cache.peek() is None
+        await cache.get(None)
+
+        assert loader.loads == 2
+
+    async def test_load_racing_with_invalidation_is_not_stored(self, cache):
+        loader = FakeLoader([])
+
+        async def racing_load(db):
+            snapshot = await loader(db)
+            cache.invalidate_local()  # an admin write lands while we were querying
+            return snapshot
+
+        cache._load = racing_load
+        await cache.get(None)
+        assert cache.peek() is None
+
+    async def test_published_invalidation_drops_the_snapshot(self, cache):
+        cache._load = FakeLoader([])
+        await cache.get(None)
+
+        with patch("threading.Thread.start"):
+            cache.start_listener()
+        cache._listener._on_message(b"1")
+
+        assert cache.peek() is None
+        assert cache._listener.channel == "system_config_invalidate"
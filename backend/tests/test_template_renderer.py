@@ -0,0 +1,105 @@
+"""
+Tests for the compiled template renderer
+"""
+import os
+
+import pytest
+
+from app.services.template_renderer import TemplateRenderer, parse
+
+
+@pytest.fixture
+def renderer():
+    return TemplateRenderer()
+
+
+def _render(renderer, text, kind, context, partials=None):
+    return renderer.render(parse(text, kind), context, partials, kind)
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+class TestParseAndRender:
+
+    def test_values_are_escaped_for_their_position(self, renderer):
+        name = "Joe's <Bar> & \"Grill\""
+        context = {"NAME": name}
+
+        assert _render(renderer, "title: '{{NAME}}',", "jsx", context) == "title: 'Joe\\'s <Bar> & \"Grill\"',"
+        assert _render(renderer, 'href={`x:{{NAME}}`}', "jsx", context) == 'href={`x:Joe\'s <Bar> & "Grill"`}'
+        assert _render(renderer, '<a href="{{NAME}}">', "jsx", context) == '<a href="Joe\'s <Bar> &amp; &quot;Grill&quot;">'
+        assert _render(renderer, "<h1>{{NAME}}</h1>", "jsx", context) == "<h1>Joe's &lt;Bar&gt; &amp; \"Grill\"</h1>"
+        assert _render(renderer, '{"name": "{{NAME}}"}', "json", context) == '{"name": "Joe\'s <Bar> & \\"Grill\\""}'
+        assert _render(renderer, "--primary: {{NAME}};", "css", {"NAME": "#fff;} body{"}) == "--primary: #fff body;"
+
+    def test_quotes_are_tracked_across_lines(self, renderer):
+        context = {"NAME": "Joe's `Bar` ${x}"}
+
+        # Inside a multi-line template literal
+        text = "const about = `\n  Welcome to\n  {{NAME}}\n`;\n"
+        assert _render(renderer, text, "js", context) == "const about = `\n  Welcome to\n  Joe's \\`Bar\\` \\${x}\n`;\n"
+        # After a closed multi-line literal and an apostrophe in a comment or JSX text
+        text = "const a = `\n`;\n// don't\n/* it's */\n<p>Don't</p>\n<h1>{{NAME}}</h1>"
+        assert _render(renderer, text, "jsx", context).endswith("<h1>Joe's `Bar` $&#123;x&#125;</h1>")
+        # Several tags in one file, in and out of strings
+        text = "t = `\n{{NAME}}`; s = '{{NAME}}'; {{NAME}}"
+        assert _render(renderer, text, "js", context) == "t = `\nJoe's \\`Bar\\` \\${x}`; s = 'Joe\\'s `Bar` ${x}'; Joe's `Bar` ${x}"
+
+    def test_jsx_double_braces_and_unknown_tags_are_left_alone(self, renderer):
+        text = "<div animate={{ opacity: 1 }}>{{UNKNOWN}}</div>"
+        assert parse("animate={{ opacity: 1 }}", "jsx") is None
+        assert _render(renderer, text, "jsx", {}) == text
+
+    def test_sections(self, renderer):
+        text = "[\n  {{#ITEMS}}\n  '{{LABEL}}',\n  {{/ITEMS}}\n]\n{{#ADDRESS}}<p>{{ADDRESS}}</p>{{/ADDRESS}}{{#OTHER}}x{{/OTHER}}"
+        context = {"ITEMS": [{"LABEL": "a"}, {"LABEL": "b'c"}], "ADDRESS": ""}
+        assert _render(renderer, text, "js", context) == "[\n  'a',\n  'b\\'c',\n]\n"
+        assert _render(renderer, text, "js", dict(context, ADDRESS="Rua 1")) == "[\n  'a',\n  'b\\'c',\n]\n<p>Rua 1</p>"
+
+    def test_unclosed_list_section_renders_its_partial(self, renderer):
+        text = "const services = [\n{{#SERVICES}}\n]\n"
+        partials = {"SERVICES": "  '{{NAME}}',\n"}
+        context = {"SERVICES": [{"NAME": "a"}, {"NAME": "b"}]}
+        assert _render(renderer, text, "js", context, partials) == "const services = [\n  'a',\n  'b',\n]\n"
+
+
+class TestRenderTree:
+
+    def test_parses_once_and_writes_only_files_with_tags(self, renderer, tmp_path):
+        source, target = tmp_path / "template", tmp_path / "site"
+        _write(str(source / "app" / "layout.tsx"), "title: '{{NAME}}'")
+        _write(str(source / "lib" / "utils.ts"), "export const x = 1")
+        _write(str(source / "node_modules" / "pkg" / "index.js"), "'{{NAME}}'")
+
+        for name in ("One", "Two"):
+            _write(str(target / "app" / "layout.tsx"), "title: '{{NAME}}'")
+            _write(str(target / "lib" / "utils.ts"), "export const x = 1")
+            untouched = os.stat(target / "lib" / "utils.ts").st_mtime_ns
+
+            assert renderer.render_tree(str(source), str(target), {"NAME": name}) == 1
+            assert _read(target / "app" / "layout.tsx") == f"title: '{name}'"
+            assert os.stat(target / "lib" / "utils.ts").st_mtime_ns == untouched
+
+        assert renderer.stats["parsed"] == 2
+        assert renderer.stats["reused"] == 2
+
+    def test_changed_template_file_is_parsed_again(self, renderer, tmp_path):
+        source, target = tmp_path / "template", tmp_path / "site"
+        _write(str(source / "page.tsx"), "<h1>{{NAME}}</h1>")
+        _write(str(target / "page.tsx"), "")
+        renderer.render_tree(str(source), str(target), {"NAME": "a"})
+
+        _write(str(source / "page.tsx"), "<h2 id=\"n\">{{NAME}}</h2>")
+        renderer.render_tree(str(source), str(target), {"NAME": "a"})
+
+        assert _read(target / "page.tsx") == "<h2 id=\"n\">a</h2>"
+        assert renderer.stats["parsed"] == 2
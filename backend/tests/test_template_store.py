@@ -0,0 +1,80 @@
+"""
+Tests for template materialization from the content-addressed store
+"""
+import os
+
+import pytest
+
+from app.services.blob_store import BlobStore, write_file
+from app.services.template_store import TemplateStore
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def templates(tmp_path):
+    base = tmp_path / "templates" / "basic" / "base"
+    _write(str(base / "app" / "layout.tsx"), "title: '{{BUSINESS_NAME}}'")
+    _write(str(base / "package.json"), '{"name": "site"}')
+    _write(str(base / "public" / "logo.svg"), "<svg/>")
+    os.makedirs(base / "public" / "empty")
+    return tmp_path / "templates"
+
+
+def _store(tmp_path, templates, mode="hardlink"):
+    return TemplateStore(BlobStore(str(tmp_path / "sites" / ".store"), mode=mode), str(templates))
+
+
+class TestTemplateStore:
+
+    def test_links_static_files_and_copies_rendered_ones(self, tmp_path, templates):
+        store = _store(tmp_path, templates)
+        target = tmp_path / "sites" / "project_1"
+
+        placed = store.materialize("basic", str(target))
+
+        assert placed == {"reflinked": 0, "hardlinked": 2, "copied": 1}
+        assert store.manifest("basic").rendered_paths == ["app/layout.tsx"]
+        assert os.stat(target / "package.json").st_nlink == 2
+        assert os.stat(target / "app" / "layout.tsx").st_nlink == 1
+        assert os.path.isdir(target / "public" / "empty")
+        assert _read(target / "public" / "logo.svg") == "<svg/>"
+
+    def test_writes_into_a_materialized_tree_never_reach_the_store(self, tmp_path, templates):
+        store = _store(tmp_path, templates)
+        first, second = tmp_path / "sites" / "project_1", tmp_path / "sites" / "project_2"
+        store.materialize("basic", str(first))
+        store.materialize("basic", str(second))
+
+        write_file(str(first / "package.json"), '{"name": "edited"}')
+
+        assert _read(first / "package.json") == '{"name": "edited"}'
+        assert _read(second / "package.json") == '{"name": "site"}'
+
+    def test_saved_manifest_is_reused_until_the_template_changes(self, tmp_path, templates):
+        _store(tmp_path, templates).manifest("basic")
+
+        other_process = _store(tmp_path, templates)
+        manifest = other_process.manifest("basic")
+        assert other_process.blobs.stats["stored"] == 0
+
+        _write(str(templates / "basic" / "base" / "public" / "robots.txt"), "User-agent: *")
+        rebuilt = other_process.manifest("basic")
+        assert rebuilt.signature != manifest.signature
+        assert "public/robots.txt" in [f.path for f in rebuilt.files]
+
+    def test_copy_mode_makes_independent_files(self, tmp_path, templates):
+        store = _store(tmp_path, templates, mode="copy")
+        target = tmp_path / "sites" / "project_1"
+
+        assert store.materialize("basic", str(target))["copied"] == 3
+        assert os.stat(target / "package.json").st_nlink == 1
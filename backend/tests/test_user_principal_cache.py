@@ -0,0 +1,98 @@
+"""
+Tests for the user principal cache behind get_current_user (no database or Redis)
+"""
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import inspect
+
+from app.models.user import User
+from app.services.user_principal_cache import UserPrincipalCache
+
+
+class FakeDB:
+    """Counts user SELECTs and serves the given row"""
+
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def execute(self, query):
+        self.queries += 1
+        user = self.user
+
+        class Result:
+            def scalar_one_or_none(self):
+                return user
+
+        return Result()
+
+
+def _user(**overrides):
+    fields = dict(
+        id=7, email="ana@example.com", name="Ana", role="vendedor", is_active=True,
+        token_version=0, password_hash="hash", created_at=datetime(2025, 1, 1), updated_at=datetime(2025, 1, 2),
+    )
+    fields.update(overrides)
+    return User(**fields)
+
+
+@pytest.fixture
+def cache():
+    return UserPrincipalCache(ttl=60, max_entries=10, use_redis=False, redis_url="redis://127.0.0.1:1")
+
+
+class TestUserPrincipalCache:
+
+    async def test_repeat_requests_skip_the_users_query(self, cache):
+        db = FakeDB(_user())
+        first = await cache.get_user(db, 7)
+        second = await cache.get_user(db, 7)
+
+        assert db.queries == 1
+        assert (second.id, second.email, second.role) == (7, "ana@example.com", "vendedor")
+        assert inspect(second).detached
+        assert "password_hash" not in second.__dict__
+        assert first is not second  # Every request gets its own instance
+
+    async def test_deactivation_takes_effect_after_invalidation(self, cache):
+        db = FakeDB(_user())
+        assert await cache.get_user(db, 7) is not None
+
+        db.user = _user(is_active=False)
+        cache.invalidate_local(7)
+        assert await cache.get_user(db, 7) is None
+
+    async def test_old_token_version_is_rejected(self, cache):
+        db = FakeDB(_user(token_version=3))
+        assert await cache.get_user(db, 7, token_version=2) is None
+        assert await cache.get_user(db, 7, token_version=3) is not None
+
+    async def test_load_racing_an_invalidation_is_not_stored(self, cache):
+        db = FakeDB(_user())
+        original = db.execute
+
+        async def execute_then_invalidate(query):
+            result = await original(query)
+            cache.invalidate_local(7)  # A write lands while the row is being read
+            return result
+
+        db.execute = execute_then_invalidate
+        await cache.get_user(db, 7)
+        await cache.get_user(db, 7)
+        assert db.queries == 2
+
+    async def test_published_ids_invalidate_one_user(self, cache):
+        db = FakeDB(_user())
+        await cache.get_user(db, 7)
+        await cache.get_user(FakeDB(_user(id=8)), 8)
+
+        with patch("threading.Thread.start"):
+            cache.start_listener()
+        cache._listener._on_message(b"7")
+        assert set(k[0] for k in cache._memory) == {8}
+
+        cache._listener._on_message(b"garbage")
+        assert not cache._memory
+        assert cache._listener.channel == "user_principal_invalidate"
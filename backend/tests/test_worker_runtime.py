@@ -0,0 +1,80 @@
+"""
+Tests for the per-process Celery worker event loop runtime (no database or Redis)
+"""
+import asyncio
+import concurrent.futures
+
+import pytest
+
+from app.core import database
+from app.core.worker_runtime import WorkerRuntime
+from app.services.ai_config_cache import ai_config_cache
+
+
+@pytest.fixture
+def runtime(monkeypatch):
+    monkeypatch.setattr(ai_config_cache, "start_listener", lambda: None)
+    runtime = WorkerRuntime()
+    yield runtime
+    runtime.shutdown(timeout=5)
+    # start() rebinds the app session factories to the worker engine
+    database.AsyncSessionLocal.configure(bind=database.engine)
+    database.ReadSessionLocal.configure(bind=database.read_engine)
+
+
+class TestWorkerRuntime:
+
+    def test_tasks_share_one_loop_and_engine(self, runtime):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = runtime.run(current_loop())
+        engine = runtime.engine
+        second = runtime.run(current_loop())
+
+        assert first is second is runtime.loop
+        assert runtime.engine is engine
+        assert database.AsyncSessionLocal.kw["bind"] is engine
+
+    def test_errors_propagate_and_loop_survives(self, runtime):
+        async def boom():
+            raise ValueError("bad order")
+
+        with pytest.raises(ValueError):
+            runtime.run(boom())
+
+        async def ok():
+            return 42
+
+        assert runtime.run(ok()) == 42
+
+    def test_timeout_cancels_the_coroutine(self, runtime):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            runtime.run(slow(), timeout=0.05)
+
+        async def was_cancelled():
+            await asyncio.wait_for(cancelled.wait(), 1)
+            return cancelled.is_set()
+
+        assert runtime.run(was_cancelled())
+
+    def test_shutdown_then_restart(self, runtime):
+        async def ok():
+            return "ok"
+
+        runtime.run(ok())
+        old_loop = runtime.loop
+        runtime.shutdown(timeout=5)
+        assert not runtime.running and old_loop.is_closed()
+
+        assert runtime.run(ok()) == "ok"
+        assert runtime.loop is not old_loop
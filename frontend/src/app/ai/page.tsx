@@ -24,6 +24,7 @@ export default function AIPage() {
   const [messages, setMessages] = useState<Message[]>([])
   const [input, setInput] = useState('')
   const [loading, setLoading] = useState(false)
+  const [streamingId, setStreamingId] = useState<string | null>(null)
   const [user, setUser] = useState<any>(null)
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
@@ -83,31 +84,88 @@ export default function AIPage() {
     setInput('')
     setLoading(true)
 
+    const aiMessageId = (Date.now() + 1).toString()
+    const updateAiMessage = (update: (message: Message) => Message) =>
+      setMessages(prev => prev.map(m => (m.id === aiMessageId ? update(m) : m)))
+
     try {
-      const response = await api.post('/api/ai/chat', {
-        prompt: input,
-        context: {
-          user_role: 'vendedor',
-          conversation_history: messages.slice(-5)
-        }
+      const token = localStorage.getItem('token')
+      const response = await fetch('/api/ai/chat/stream', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          ...(token ? { Authorization: `Bearer ${token}` } : {})
+        },
+        body: JSON.stringify({
+          prompt: input,
+          context: {
+            user_role: 'vendedor',
+            conversation_history: messages.slice(-5)
+          }
+        })
       })
-
-      const aiMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        content: response.data.response,
-        role: 'assistant',
-        timestamp: response.data.timestamp
+      if (!response.ok || !response.body) {
+        throw new Error(`HTTP ${response.status}`)
       }
 
-      setMessages(prev => [...prev, aiMessage])
+      // Server-Sent Events: "delta" per token chunk, then "done" (final text) or "error"
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let started = false
 
-      if (response.data.action_executed) {
-        toast.success(t('ai.actionExecuted'))
+      while (true) {
+        const { value, done } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+
+        let boundary: number
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const rawEvent = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          const event = rawEvent.match(/^event: (.*)$/m)?.[1]
+          const data = rawEvent.match(/^data: (.*)$/m)?.[1]
+          if (!event || !data) continue
+          const payload = JSON.parse(data)
+
+          if (event === 'delta') {
+            if (!started) {
+              started = true
+              setStreamingId(aiMessageId)
+              setMessages(prev => [...prev, {
+                id: aiMessageId,
+                content: payload.text,
+                role: 'assistant',
+                timestamp: new Date().toISOString()
+              }])
+            } else {
+              updateAiMessage(m => ({ ...m, content: m.content + payload.text }))
+            }
+          } else if (event === 'done') {
+            // Final text may differ from the streamed one when an action was executed
+            if (started) {
+              updateAiMessage(m => ({ ...m, content: payload.response, timestamp: payload.timestamp }))
+            } else {
+              setMessages(prev => [...prev, {
+                id: aiMessageId,
+                content: payload.response,
+                role: 'assistant',
+                timestamp: payload.timestamp
+              }])
+            }
+            if (payload.action_executed) {
+              toast.success(t('ai.actionExecuted'))
+            }
+          } else if (event === 'error') {
+            throw new Error(payload.detail)
+          }
+        }
       }
     } catch (error) {
       console.error('Erro no chat com IA:', error)
       toast.error(t('ai.error'))
     } finally {
+      setStreamingId(null)
       setLoading(false)
     }
   }
@@ -194,7 +252,7 @@ export default function AIPage() {
                 ))}
               </AnimatePresence>
 
-              {loading && (
+              {loading && !streamingId && (
                 <motion.div
                   initial={{ opacity: 0, y: 10 }}
                   animate={{ opacity: 1, y: 0 }}
@@ -0,0 +1,47 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+const BACKEND_URL = process.env.BACKEND_URL || 'http://backend:8000'
+
+export async function POST(request: NextRequest) {
+  try {
+    const authHeader = request.headers.get('authorization')
+    if (!authHeader) {
+      return NextResponse.json({ error: 'Token não fornecido' }, { status: 401 })
+    }
+
+    const body = await request.json()
+
+    const response = await fetch(`${BACKEND_URL}/api/ai/chat/stream`, {
+      method: 'POST',
+      headers: {
+        'Authorization': authHeader,
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(body),
+    })
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.text()
+      return NextResponse.json(
+        { error: 'Erro no chat com IA', details: errorData },
+        { status: response.status }
+      )
+    }
+
+    // Pass the Server-Sent Events through untouched so tokens reach the browser as they arrive
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      },
+    })
+
+  } catch (error) {
+    console.error('Erro na API Route POST /api/ai/chat/stream:', error)
+    return NextResponse.json(
+      { error: 'Erro interno do servidor' },
+      { status: 500 }
+    )
+  }
+}
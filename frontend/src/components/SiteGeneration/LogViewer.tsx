@@ -18,39 +18,85 @@ interface LogViewerProps {
     onComplete?: () => void
 }
 
+const RECONNECT_DELAY_MS = 3000
+
+function isFinished(log: LogEntry) {
+    return log.step === 'SUCCESS' || log.step === 'ERROR' || log.status === 'error' || log.status === 'success'
+}
+
 export default function LogViewer({ orderId, onComplete }: LogViewerProps) {
     const [logs, setLogs] = useState<LogEntry[]>([])
     const [loading, setLoading] = useState(true)
-    const [polling, setPolling] = useState(true)
+    const [streaming, setStreaming] = useState(true)
     const bottomRef = useRef<HTMLDivElement>(null)
+    const lastIdRef = useRef(0)
+    const onCompleteRef = useRef(onComplete)
+    onCompleteRef.current = onComplete
+
+    useEffect(() => {
+        lastIdRef.current = 0
+        setLogs([])
+        setLoading(true)
+        setStreaming(true)
+
+        let source: EventSource | null = null
+        let retry: ReturnType<typeof setTimeout> | null = null
+        let closed = false
+
+        const finish = (log: LogEntry) => {
+            closed = true
+            source?.close()
+            setStreaming(false)
+            if (log.status === 'success') onCompleteRef.current?.()
+        }
 
-    const fetchLogs = async () => {
-        try {
-            const res = await api.get<LogEntry[]>(`/api/site-orders/${orderId}/logs`)
-            setLogs(res.data)
-
-            // Check if finished
-            const lastLog = res.data[res.data.length - 1]
-            if (lastLog) {
-                if (lastLog.step === 'SUCCESS' || lastLog.step === 'ERROR' || lastLog.status === 'error' || lastLog.status === 'success') {
-                    setPolling(false)
-                    if (lastLog.status === 'success' && onComplete) onComplete()
+        const scheduleReconnect = () => {
+            if (closed || retry) return
+            retry = setTimeout(() => {
+                retry = null
+                connect()
+            }, RECONNECT_DELAY_MS)
+        }
+
+        const connect = async () => {
+            try {
+                // EventSource can't send the Authorization header: get a short-lived token scoped to this stream
+                const res = await api.post<{ token: string }>(`/api/site-orders/${orderId}/logs/stream-token`)
+                if (closed) return
+                const params = new URLSearchParams({ token: res.data.token, after_id: String(lastIdRef.current) })
+                source = new EventSource(`/api/site-orders/${orderId}/logs/stream?${params}`)
+            } catch (error) {
+                console.error("Failed to open log stream", error)
+                setLoading(false)
+                scheduleReconnect()
+                return
+            }
+
+            source.addEventListener('open', () => setLoading(false))
+            source.addEventListener('log', (event) => {
+                const log: LogEntry = JSON.parse((event as MessageEvent).data)
+                if (log.id <= lastIdRef.current) return
+                lastIdRef.current = log.id
+                setLogs(prev => [...prev, log])
+                if (isFinished(log)) finish(log)
+            })
+            source.onerror = () => {
+                // While CONNECTING the browser resumes by itself (sending Last-Event-ID);
+                // CLOSED means the server refused us (e.g. expired token), so start over with a new one
+                if (source?.readyState === EventSource.CLOSED) {
+                    source.close()
+                    scheduleReconnect()
                 }
             }
-        } catch (error) {
-            console.error("Failed to fetch logs", error)
-        } finally {
-            setLoading(false)
         }
-    }
-
-    useEffect(() => {
-        fetchLogs()
-        if (!polling) return
 
-        const interval = setInterval(fetchLogs, 2000) // Poll every 2s
-        return () => clearInterval(interval)
-    }, [orderId, polling])
+        connect()
+        return () => {
+            closed = true
+            if (retry) clearTimeout(retry)
+            source?.close()
+        }
+    }, [orderId])
 
     useEffect(() => {
         bottomRef.current?.scrollIntoView({ behavior: 'smooth' })
@@ -63,7 +109,7 @@ export default function LogViewer({ orderId, onComplete }: LogViewerProps) {
                     <Terminal className="w-4 h-4" />
                     Site Generation Logs
                 </div>
-                {polling && (
+                {streaming && (
                     <div className="flex items-center gap-2 text-blue-400 text-xs">
                         <Loader2 className="w-3 h-3 animate-spin" />
                         Generating...